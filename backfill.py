@@ -0,0 +1,184 @@
+"""
+Thread It backfill: convert replies that predate the bot into threads.
+
+Connects as the bot (guild events only), then walks each channel's
+history oldest-first a page at a time, converting replies grouped by
+parent with batched reposts and bulk deletes, paced to leave the live
+bot most of the REST budget. Progress is checkpointed per page, so an
+interrupted run picks up where it stopped; replies newer than a
+channel's first backfill run are left to the live bot.
+
+    python backfill.py --guild 123                     # every text channel in a guild
+    python backfill.py --channel 456 --channel 789 [--concurrency 4] \\
+        [--calls-per-second 10] [--dry-run]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+import discord
+
+from bot import build_orchestrator, setup_logging, use_discord_endpoints
+from config import Config
+from threadit.backfill import Backfiller, ChannelLike, CheckpointStore
+from threadit.metrics import Metrics
+from threadit.permissions import PermissionsService
+from threadit.restcalls import RestAccounting
+from threadit.types import DEFAULT_CLIENT_ID
+
+logger = logging.getLogger("threadit.backfill")
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="thread-it-backfill", description=__doc__.split("\n\n")[0].strip()
+    )
+    parser.add_argument(
+        "--guild",
+        type=int,
+        action="append",
+        default=[],
+        help="backfill every text channel of this guild (repeatable)",
+    )
+    parser.add_argument(
+        "--channel",
+        type=int,
+        action="append",
+        default=[],
+        help="backfill this channel (repeatable)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=Config.BACKFILL_CONCURRENCY,
+        help="parent groups converted at once within a channel",
+    )
+    parser.add_argument(
+        "--calls-per-second",
+        type=float,
+        default=Config.BACKFILL_CALLS_PER_SECOND,
+        help="REST calls per second the backfill may use",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        type=Path,
+        default=Path(Config.BACKFILL_CHECKPOINT_PATH),
+        help="per-channel progress file; rerun with the same one to resume",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="count replies per page without converting anything"
+    )
+    args = parser.parse_args(argv)
+    if not args.guild and not args.channel:
+        parser.error("give at least one --guild or --channel")
+    return args
+
+
+def select_channels(
+    client: discord.Client, guild_ids: list[int], channel_ids: list[int]
+) -> list[ChannelLike]:
+    channels: list[ChannelLike] = []
+    for guild_id in guild_ids:
+        guild = client.get_guild(guild_id)
+        if guild is None:
+            logger.warning("Guild %s not found (is the bot in it?)", guild_id)
+            continue
+        channels.extend(guild.text_channels)
+    for channel_id in channel_ids:
+        channel = client.get_channel(channel_id)
+        if not isinstance(
+            channel, discord.TextChannel | discord.VoiceChannel | discord.StageChannel
+        ):
+            logger.warning("Channel %s not found or has no message history", channel_id)
+            continue
+        if channel not in channels:
+            channels.append(channel)
+    return channels
+
+
+async def run(args: argparse.Namespace) -> None:
+    listener = setup_logging()
+    try:
+        await _run(args)
+    finally:
+        listener.stop()
+
+
+async def _run(args: argparse.Namespace) -> None:
+    Config.validate()
+    assert Config.DISCORD_TOKEN is not None  # narrowed by Config.validate()
+    use_discord_endpoints(Config.DISCORD_API_BASE_URL, Config.DISCORD_GATEWAY_URL)
+
+    metrics = Metrics()
+    rest = RestAccounting(metrics=metrics)
+    # Guild events only: enough for channels, permissions and guild.me.
+    client = discord.Client(
+        intents=discord.Intents(guilds=True),
+        max_messages=None,
+        member_cache_flags=discord.MemberCacheFlags.none(),
+        chunk_guilds_at_startup=False,
+        allowed_mentions=discord.AllowedMentions.none(),
+        http_trace=rest.trace_config(),
+    )
+    permissions = PermissionsService(
+        get_self_id=lambda: client.user.id if client.user else None,
+        get_client_id=lambda: str(client.user.id) if client.user else DEFAULT_CLIENT_ID,
+        logger=logging.getLogger("threadit.permissions"),
+    )
+    orchestrator = build_orchestrator(permissions, metrics, rest)
+    backfiller = Backfiller(
+        orchestrator,
+        CheckpointStore(args.checkpoint, logger=logger),
+        calls_per_second=args.calls_per_second,
+        concurrency=args.concurrency,
+        metrics=metrics,
+        logger=logger,
+        dry_run=args.dry_run,
+    )
+
+    async with client:
+        await client.login(Config.DISCORD_TOKEN)
+        gateway = asyncio.create_task(client.connect())
+        ready = asyncio.create_task(client.wait_until_ready())
+        await asyncio.wait({gateway, ready}, return_when=asyncio.FIRST_COMPLETED)
+        if gateway.done():
+            ready.cancel()
+            gateway.result()  # surface the connection error
+            return
+        channels = select_channels(client, args.guild, args.channel)
+        logger.info("Backfilling %d channel(s)", len(channels))
+        try:
+            total = await backfiller.run(channels)
+        finally:
+            await client.close()
+            await gateway
+            if orchestrator.transcoder is not None:
+                orchestrator.transcoder.close()
+    logger.info(
+        "Backfill finished: %d replies converted, %d REST calls",
+        total,
+        sum(v for key, v in metrics.snapshot().items() if key.startswith("rest_calls_total")),
+    )
+
+
+def main() -> None:
+    args = parse_args()
+    try:
+        asyncio.run(run(args))
+    except ValueError as exc:
+        print(f"Configuration error: {exc}", file=sys.stderr)
+        sys.exit(1)
+    except discord.LoginFailure:
+        print("Error: Invalid Discord token!", file=sys.stderr)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("Backfill interrupted; rerun to resume from the last checkpoint.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
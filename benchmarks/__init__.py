@@ -0,0 +1,2 @@
+"""Standalone performance benchmarks. Run from the repo root, e.g.
+``python -m benchmarks.bench_logging``. Not collected by pytest."""
@@ -0,0 +1,262 @@
+"""
+Client cache footprint: ``build_bot()`` vs ``build_bot(lean=True)``.
+
+Feeds synthetic READY-time GUILD_CREATE payloads (channels, roles, the
+bot's own member, a few members in voice) followed by MESSAGE_CREATE
+traffic straight into discord.py's connection state, with no gateway, then
+reports resident and Python-heap growth per 1,000 guilds. Each profile runs
+in a fresh interpreter so one doesn't inherit the other's heap.
+
+Afterwards it checks that ``channel.permissions_for(guild.me)`` (what
+``PermissionsService`` evaluates) still resolves in lean mode.
+
+    python -m benchmarks.bench_client_memory [--guilds 1000] [--messages 5000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import tracemalloc
+
+import discord
+
+import bot
+
+SELF_ID = 10**17
+CHANNELS_PER_GUILD = 20
+ROLES_PER_GUILD = 8
+VOICE_MEMBERS_PER_GUILD = 4
+
+
+def _user(user_id: int, name: str) -> dict:
+    return {
+        "id": str(user_id),
+        "username": name,
+        "discriminator": "0",
+        "global_name": name,
+        "avatar": None,
+        "bot": user_id == SELF_ID,
+    }
+
+
+def _member(user_id: int, name: str, roles: list[str]) -> dict:
+    return {
+        "user": _user(user_id, name),
+        "roles": roles,
+        "joined_at": "2024-01-01T00:00:00+00:00",
+        "deaf": False,
+        "mute": False,
+        "flags": 0,
+    }
+
+
+def guild_payload(index: int, *, voice_states: bool) -> dict:
+    gid = 2 * 10**17 + index * 1000
+    roles = [
+        {
+            "id": str(gid + r),
+            "name": "@everyone" if r == 0 else f"role-{r}",
+            # @everyone: view, send, embed links; the rest grant nothing.
+            "permissions": str(0x4C00 if r == 0 else 0),
+            "position": r,
+            "color": 0,
+            "hoist": False,
+            "managed": False,
+            "mentionable": False,
+            "flags": 0,
+        }
+        for r in range(ROLES_PER_GUILD)
+    ]
+    channels = [
+        {
+            "id": str(gid + 100 + c),
+            "type": 0,
+            "name": f"channel-{c}",
+            "position": c,
+            "permission_overwrites": [
+                {"id": str(gid + 1), "type": 0, "allow": "0", "deny": str(0x4000)}
+            ],
+            "topic": None,
+            "nsfw": False,
+            "parent_id": None,
+            "rate_limit_per_user": 0,
+        }
+        for c in range(CHANNELS_PER_GUILD)
+    ]
+    channels.append(
+        {
+            "id": str(gid + 999),
+            "type": 2,
+            "name": "voice",
+            "position": 99,
+            "permission_overwrites": [],
+            "bitrate": 64000,
+            "user_limit": 0,
+            "parent_id": None,
+            "rtc_region": None,
+        }
+    )
+    voice_ids = [gid + 500 + v for v in range(VOICE_MEMBERS_PER_GUILD)]
+    members = [_member(SELF_ID, "thread-it", [str(gid + 1)])]
+    members += [_member(uid, f"user-{uid}", [str(gid + 2)]) for uid in voice_ids]
+    payload = {
+        "id": str(gid),
+        "name": f"guild-{index}",
+        "icon": None,
+        "owner_id": str(voice_ids[0]),
+        "roles": roles,
+        "channels": channels,
+        "threads": [],
+        "members": members,
+        "emojis": [],
+        "stickers": [],
+        "features": [],
+        "member_count": 5000,
+        "large": True,
+        "unavailable": False,
+        "premium_tier": 0,
+        "verification_level": 0,
+        "default_message_notifications": 0,
+        "explicit_content_filter": 0,
+        "mfa_level": 0,
+        "nsfw_level": 0,
+        "preferred_locale": "en-US",
+        "system_channel_flags": 0,
+    }
+    if voice_states:
+        payload["voice_states"] = [
+            {
+                "user_id": str(uid),
+                "channel_id": str(gid + 999),
+                "session_id": "x",
+                "deaf": False,
+                "mute": False,
+                "self_deaf": False,
+                "self_mute": False,
+                "self_video": False,
+                "suppress": False,
+                "request_to_speak_timestamp": None,
+            }
+            for uid in voice_ids
+        ]
+    return payload
+
+
+def message_payload(index: int, guilds: int) -> dict:
+    gid = 2 * 10**17 + (index % guilds) * 1000
+    author = 3 * 10**17 + index
+    return {
+        "id": str(4 * 10**17 + index),
+        "channel_id": str(gid + 100 + index % CHANNELS_PER_GUILD),
+        "guild_id": str(gid),
+        "author": _user(author, f"author-{index}"),
+        "member": {
+            "roles": [str(gid + 2)],
+            "joined_at": "2024-01-01T00:00:00+00:00",
+            "deaf": False,
+            "mute": False,
+            "flags": 0,
+        },
+        "content": "a reasonably typical chat message " * 4,
+        "timestamp": "2025-01-01T00:00:00+00:00",
+        "edited_timestamp": None,
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [],
+        "mention_roles": [],
+        "attachments": [],
+        "embeds": [],
+        "pinned": False,
+        "type": 0,
+        "message_reference": {
+            "message_id": str(4 * 10**17 + index - 1),
+            "channel_id": str(gid + 100),
+        },
+    }
+
+
+def _rss_bytes() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def measure(lean: bool, guilds: int, messages: int) -> dict:
+    client = bot.build_bot(lean=lean)
+    state = client._connection
+    state.dispatch = lambda *args, **kwargs: None  # no listeners, no event loop
+    state.user = discord.ClientUser(state=state, data=_user(SELF_ID, "thread-it"))  # type: ignore[arg-type]
+    voice = client.intents.voice_states
+
+    gc.collect()
+    tracemalloc.start()
+    rss_before = _rss_bytes()
+    for i in range(guilds):
+        state._add_guild_from_data(guild_payload(i, voice_states=voice))  # type: ignore[arg-type]
+    for i in range(messages):
+        state.parse_message_create(message_payload(i, guilds))  # type: ignore[arg-type]
+    gc.collect()
+    heap, _ = tracemalloc.get_traced_memory()
+    rss = _rss_bytes() - rss_before
+    tracemalloc.stop()
+
+    guild = next(iter(state._guilds.values()))
+    channel = guild.text_channels[0]
+    perms = channel.permissions_for(guild.me)
+    return {
+        "rss": rss,
+        "heap": heap,
+        "cached_members": sum(len(g._members) for g in state._guilds.values()),
+        "cached_messages": len(state._messages or ()),
+        "me_resolves": guild.me is not None and perms.send_messages and not perms.embed_links,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--guilds", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--profile", choices=("default", "lean"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.profile:
+        print(json.dumps(measure(args.profile == "lean", args.guilds, args.messages)))
+        return
+
+    per = 1000 / args.guilds
+    print(f"{args.guilds} guilds, {args.messages} messages; growth scaled per 1,000 guilds\n")
+    print(
+        f"{'profile':<10} {'RSS MiB':>9} {'heap MiB':>9} {'members':>9} "
+        f"{'messages':>9}  guild.me permissions"
+    )
+    for profile in ("default", "lean"):
+        out = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.bench_client_memory",
+                "--profile",
+                profile,
+                "--guilds",
+                str(args.guilds),
+                "--messages",
+                str(args.messages),
+            ],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        r = json.loads(out)
+        print(
+            f"{profile:<10} {r['rss'] * per / 2**20:>9.1f} {r['heap'] * per / 2**20:>9.1f} "
+            f"{r['cached_members']:>9} {r['cached_messages']:>9}  "
+            f"{'ok' if r['me_resolves'] else 'BROKEN'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+End-to-end load test: the real ``bot.py`` against ``benchmarks.fakediscord``.
+
+Starts the fake Discord, launches ``bot.py`` pointed at it (with a
+throwaway DATA_DIR), waits for the bot's ``on_ready``, then fires
+``--rate`` replies per second for ``--duration`` seconds, spread round-
+robin across guilds, channels and parent messages (fewer parents means
+more parent-lock contention). Each reply has a fresh author so the bot's
+per-user buckets don't drop them.
+
+A conversion counts as done when the bot deletes the original reply.
+Reported: conversions/s, p50/p99 reply-to-delete latency, and REST calls
+per conversion (every call after startup, including retries and the
+deferred notification delete, divided by conversions).
+
+    python -m benchmarks.bench_e2e [--rate 5] [--duration 20] [--latency 0.05] \\
+        [--error-rate 0.01] [--inject-429 0.01] [--bot-env KEY=VALUE ...]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.fakediscord import FakeDiscord, FaultProfile, add_fault_arguments
+
+ROOT = Path(__file__).resolve().parent.parent
+FIRST_AUTHOR_ID = 5 * 10**17
+
+
+async def _wait_for(predicate, timeout: float, interval: float = 0.1) -> bool:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() >= deadline:
+            return False
+        await asyncio.sleep(interval)
+    return True
+
+
+async def run(args: argparse.Namespace) -> int:
+    fake = FakeDiscord(
+        guilds=args.guilds,
+        channels=args.channels,
+        parents=args.parents,
+        faults=FaultProfile(
+            latency=args.latency,
+            error_rate=args.error_rate,
+            inject_429_rate=args.inject_429,
+            global_limit=args.global_limit,
+        ),
+    )
+    await fake.start(port=args.port)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        env = {
+            **os.environ,
+            "DISCORD_TOKEN": "fake-token",
+            "DISCORD_API_BASE_URL": fake.api_url,
+            "DISCORD_GATEWAY_URL": fake.gateway_url,
+            "DATA_DIR": data_dir,
+            "LOG_LEVEL": args.bot_log_level,
+        }
+        env.update(kv.split("=", 1) for kv in args.bot_env)
+        bot = await asyncio.create_subprocess_exec(
+            sys.executable, str(ROOT / "bot.py"), cwd=data_dir, env=env
+        )
+        try:
+            await asyncio.wait_for(fake.ready.wait(), args.startup_timeout)
+            fake.reset_stats()
+
+            total = int(args.rate * args.duration)
+            authors = FIRST_AUTHOR_ID
+            started = time.perf_counter()
+            for i in range(total):
+                delay = started + i / args.rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                authors += 1
+                await fake.inject_reply(
+                    i % args.guilds,
+                    i // args.guilds % args.channels,
+                    i // (args.guilds * args.channels) % args.parents,
+                    author_id=authors,
+                )
+            sent_for = time.perf_counter() - started
+
+            await _wait_for(lambda: len(fake.converted) >= total, args.settle)
+            # The notification delete is deferred 8s; wait so it is counted.
+            await _wait_for(lambda: fake.outstanding_notifications == 0, 12)
+        finally:
+            if bot.returncode is None:
+                bot.terminate()
+                await bot.wait()
+            await fake.stop()
+
+    report(fake, total, sent_for, started)
+    return 0 if fake.converted else 1
+
+
+def report(fake: FakeDiscord, total: int, sent_for: float, started: float) -> None:
+    """Print throughput, latency and REST usage for the replies sent since ``started``."""
+    latencies = sorted(fake.converted[i] - fake.injected[i] for i in fake.converted)
+    done = len(latencies)
+    span = (max(fake.converted.values()) - started) if done else 0.0
+    stats = fake.stats
+
+    print(f"replies sent       {total} in {sent_for:.1f}s ({total / sent_for:.1f}/s)")
+    print(f"converted          {done} ({done / total:.0%})")
+    if done:
+        print(f"conversions/s      {done / span:.2f}")
+        p99 = statistics.quantiles(latencies, n=100)[98] if done > 1 else latencies[0]
+        print(f"latency p50 / p99  {statistics.median(latencies) * 1e3:.0f} / {p99 * 1e3:.0f} ms")
+        print(f"REST calls/conv    {stats.total / done:.2f}")
+    print(
+        f"REST calls         {stats.total} "
+        f"({', '.join(f'{code}: {n}' for code, n in sorted(stats.statuses.items()))})"
+    )
+    if stats.rate_limited:
+        print(f"429s by scope      {dict(stats.rate_limited)}")
+    print("\nREST calls by route")
+    for route, n in stats.calls.most_common():
+        print(f"  {n:>7}  {route.replace('/api/v10', '')}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rate", type=float, default=5.0, help="replies per second")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of traffic")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument(
+        "--settle", type=float, default=60.0, help="max seconds to wait for outstanding conversions"
+    )
+    parser.add_argument("--startup-timeout", type=float, default=30.0)
+    parser.add_argument("--bot-log-level", default="WARNING")
+    parser.add_argument(
+        "--bot-env",
+        action="append",
+        default=[],
+        metavar="KEY=VALUE",
+        help="extra environment for bot.py, e.g. FAST_RUNTIME=true",
+    )
+    add_fault_arguments(parser)
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
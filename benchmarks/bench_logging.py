@@ -0,0 +1,173 @@
+"""
+Per-message logging cost on the event-loop thread: eager f-strings with a
+synchronous stream handler (the old setup) vs lazy %-style records handed to
+the queue-backed handler from ``threadit.logutil``.
+
+Each "message" replays the log calls one successful conversion makes
+(on_message debug line, four stage debug lines, the METRICS line and the
+success line). Run at INFO, the production default, and at DEBUG.
+
+    python -m benchmarks.bench_logging [--messages 20000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import logging.handlers
+import os
+import queue
+import time
+
+from threadit.logutil import TEXT_FORMAT, DeferredQueueHandler, EventSampler, JsonFormatter
+
+
+class _Named:
+    """Stand-in for discord.Member/Guild/Channel: non-trivial __str__."""
+
+    def __init__(self, name: str, ident: int) -> None:
+        self.name = name
+        self.id = ident
+
+    def __str__(self) -> str:
+        return f"{self.name}#{self.id % 10000:04d}"
+
+
+AUTHOR = _Named("someone", 123456789012345678)
+GUILD = _Named("a guild", 223456789012345678)
+CHANNEL = _Named("general", 323456789012345678)
+THREAD_ID = 423456789012345678
+MESSAGE_ID = 523456789012345678
+
+
+def eager_message(log: logging.Logger) -> None:
+    log.debug(
+        f"Processing reply from {AUTHOR} (ID: {AUTHOR.id}) "
+        f"in guild {GUILD.name} (ID: {GUILD.id}), "
+        f"channel #{CHANNEL.name} (ID: {CHANNEL.id})"
+    )
+    log.debug(
+        f"Gathered reply info: content_length={120}, attachments={0}, embeds={0}, "
+        f"parent_author={AUTHOR}"
+    )
+    log.debug(f"Created thread 'x' (ID: {THREAD_ID}) on message {MESSAGE_ID} in #{CHANNEL.name}")
+    log.debug(f"Reposted reply content in thread {THREAD_ID}: content_length={120}")
+    log.debug(f"Deleted original reply message {MESSAGE_ID} from #{CHANNEL.name}")
+    log.info(f"METRICS: process_reply_to_thread SUCCESS ({0.4321:.2f}s)")
+    log.info(
+        f"Successfully processed reply: created thread 'x', "
+        f"reposted content, and cleaned up messages for reply from {AUTHOR}"
+    )
+
+
+def lazy_message(log: logging.Logger) -> None:
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug(
+            "Processing reply from %s (ID: %s) in guild %s (ID: %s), channel #%s (ID: %s)",
+            AUTHOR,
+            AUTHOR.id,
+            GUILD.name,
+            GUILD.id,
+            CHANNEL.name,
+            CHANNEL.id,
+            extra={"event": "reply.received", "guild_id": GUILD.id},
+        )
+    log.debug(
+        "Gathered reply info: content_length=%d, attachments=%d, embeds=%d, parent_author=%s",
+        120,
+        0,
+        0,
+        AUTHOR,
+        extra={"event": "reply.gathered"},
+    )
+    log.debug(
+        "Created thread '%s' (ID: %s) on message %s in #%s",
+        "x",
+        THREAD_ID,
+        MESSAGE_ID,
+        CHANNEL.name,
+    )
+    log.debug("Reposted reply content in thread %s: content_length=%d", THREAD_ID, 120)
+    log.debug("Deleted original reply message %s from #%s", MESSAGE_ID, CHANNEL.name)
+    log.info(
+        "METRICS: %s SUCCESS%s", "process_reply_to_thread", " (0.43s)", extra={"event": "metrics"}
+    )
+    log.info(
+        "Successfully processed reply: created thread '%s', "
+        "reposted content, and cleaned up messages for reply from %s",
+        "x",
+        AUTHOR,
+        extra={"event": "reply.processed", "guild_id": GUILD.id},
+    )
+
+
+def _sync_logger(level: int, sink) -> logging.Logger:
+    log = logging.getLogger(f"bench.sync.{level}")
+    log.handlers.clear()
+    log.propagate = False
+    handler = logging.StreamHandler(sink)
+    handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    log.addHandler(handler)
+    log.setLevel(level)
+    return log
+
+
+def _queued_logger(
+    level: int, sink, *, json_format: bool, sample: dict[str, int] | None
+) -> tuple[logging.Logger, logging.handlers.QueueListener]:
+    log = logging.getLogger(f"bench.queued.{level}.{json_format}.{bool(sample)}")
+    log.handlers.clear()
+    log.propagate = False
+    q: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    qh = DeferredQueueHandler(q)
+    if sample:
+        qh.addFilter(EventSampler(sample))
+    log.addHandler(qh)
+    log.setLevel(level)
+    stream = logging.StreamHandler(sink)
+    stream.setFormatter(JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT))
+    listener = logging.handlers.QueueListener(q, stream)
+    listener.start()
+    return log, listener
+
+
+def _time_per_message(fn, log: logging.Logger, n: int) -> float:
+    # thread_time isolates the caller (the "event loop") from the listener
+    # thread doing the formatting and writes.
+    start = time.thread_time()
+    for _ in range(n):
+        fn(log)
+    return (time.thread_time() - start) / n * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--messages", type=int, default=20000)
+    args = parser.parse_args()
+    n = args.messages
+
+    with open(os.devnull, "w") as sink:
+        print(f"{'scenario':<48} {'µs/message (loop thread CPU)':>28}")
+        for level in (logging.INFO, logging.DEBUG):
+            lname = logging.getLevelName(level)
+            baseline = _time_per_message(eager_message, _sync_logger(level, sink), n)
+            print(f"{'eager f-string + sync handler @' + lname:<48} {baseline:>28.2f}")
+
+            for json_format, sample in (
+                (False, None),
+                (True, None),
+                (True, {"metrics": 100, "reply.processed": 100}),
+            ):
+                log, listener = _queued_logger(level, sink, json_format=json_format, sample=sample)
+                cost = _time_per_message(lazy_message, log, n)
+                listener.stop()
+                label = (
+                    f"lazy + queue ({'json' if json_format else 'text'}"
+                    f"{', sampled 1/100' if sample else ''}) @{lname}"
+                )
+                saved = (1 - cost / baseline) * 100
+                print(f"{label:<48} {cost:>20.2f} ({saved:+.0f}% saved)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Gateway dispatch throughput: the stock runtime (asyncio loop, stdlib JSON)
+vs ``FAST_RUNTIME`` (uvloop, orjson).
+
+Feeds raw MESSAGE_CREATE frames through the same path a gateway frame
+takes after decompression: ``discord.utils._from_json``, the connection
+state's parser, and ``Client.dispatch``, which schedules the bot's and
+``ThreadItCog``'s ``on_message`` listeners as tasks on the running loop.
+Messages are ordinary chat (not replies), the bulk of real traffic, so
+the cog filters them out early. Each profile runs in a fresh interpreter;
+the stock one forces discord.py back to stdlib JSON in case orjson is
+installed.
+
+    python -m benchmarks.bench_runtime [--guilds 50] [--messages 50000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import subprocess
+import sys
+import time
+
+import discord
+
+import bot
+from benchmarks.bench_client_memory import SELF_ID, _user, guild_payload, message_payload
+from threadit.cog import ThreadItCog
+from threadit.orchestrator import ThreadingOrchestrator
+from threadit.permissions import PermissionsService
+from threadit.runtime import select_runtime
+
+BATCH = 500
+log = logging.getLogger("bench")
+
+
+def _frames(guilds: int, messages: int) -> list[str]:
+    frames = []
+    for i in range(messages):
+        data = message_payload(i, guilds)
+        del data["message_reference"]
+        frames.append(json.dumps({"op": 0, "t": "MESSAGE_CREATE", "s": i, "d": data}))
+    return frames
+
+
+async def _dispatch(guilds: int, frames: list[str]) -> dict:
+    client = bot.build_bot()
+    await client._async_setup_hook()  # binds client.loop, as login() would
+    permissions = PermissionsService(
+        get_self_id=lambda: SELF_ID, get_client_id=lambda: "1", logger=log
+    )
+    orchestrator = ThreadingOrchestrator(permissions=permissions, logger=log)
+    await client.add_cog(
+        ThreadItCog(client, orchestrator, permissions, get_client_id=lambda: "1", logger=log)
+    )
+    state = client._connection
+    state.user = discord.ClientUser(state=state, data=_user(SELF_ID, "thread-it"))  # type: ignore[arg-type]
+    for i in range(guilds):
+        state._add_guild_from_data(guild_payload(i, voice_states=False))  # type: ignore[arg-type]
+
+    from_json = discord.utils._from_json
+    parsers = state.parsers
+    wall, cpu = time.perf_counter(), time.process_time()
+    for start in range(0, len(frames), BATCH):
+        for raw in frames[start : start + BATCH]:
+            msg = from_json(raw)
+            parsers[msg["t"]](msg["d"])
+        # Let the listener tasks scheduled by this batch run to completion.
+        while len(asyncio.all_tasks()) > 1:
+            await asyncio.sleep(0)
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    return {"events": len(frames), "wall": wall, "cpu": cpu}
+
+
+def measure(fast: bool, guilds: int, messages: int) -> dict:
+    runtime = select_runtime(fast)
+    if not fast:
+        discord.utils._from_json = json.loads
+    result = {"loop": runtime.loop, "json": runtime.json if fast else "json"}
+    frames = _frames(guilds, messages)
+    with asyncio.Runner(loop_factory=runtime.loop_factory) as runner:
+        result.update(runner.run(_dispatch(guilds, frames)))
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--guilds", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--profile", choices=("default", "fast"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    if args.profile:
+        print(json.dumps(measure(args.profile == "fast", args.guilds, args.messages)))
+        return
+
+    print(f"{args.messages} MESSAGE_CREATE frames, best of {args.repeat}\n")
+    print(f"{'profile':<10} {'loop':<8} {'json':<7} {'events/s':>10} {'CPU µs/event':>13}")
+    for profile in ("default", "fast"):
+        runs = [
+            json.loads(
+                subprocess.run(
+                    [
+                        sys.executable,
+                        "-m",
+                        "benchmarks.bench_runtime",
+                        "--profile",
+                        profile,
+                        "--guilds",
+                        str(args.guilds),
+                        "--messages",
+                        str(args.messages),
+                    ],
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                ).stdout
+            )
+            for _ in range(args.repeat)
+        ]
+        best = min(runs, key=lambda r: r["cpu"])
+        print(
+            f"{profile:<10} {best['loop']:<8} {best['json']:<7} "
+            f"{best['events'] / best['wall']:>10,.0f} {best['cpu'] / best['events'] * 1e6:>13.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
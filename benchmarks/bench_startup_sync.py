@@ -0,0 +1,128 @@
+"""
+Time to first reply after a restart, with and without the slash-command
+sync in ``setup_hook``.
+
+Each boot starts the bot (login, ``setup_hook``, gateway connect, READY)
+against a fresh ``benchmarks.fakediscord`` and times how long it takes,
+from the start signal, for the first reply injected after ``on_ready``
+to finish ``ThreadingOrchestrator.process()``. ``setup_hook`` runs before
+the gateway connects, so a global sync delays everything behind it.
+Both kinds of boot include discord.py's wait of about 2 s for guilds
+to stream in after READY, as the real bot does.
+
+- Cold boots have no command-tree hash on disk (first deploy, or the
+  commands changed), so ``CommandSyncer`` does the global sync.
+- Warm boots find an up-to-date hash and skip it.
+
+``--sync-latency`` is how much longer than other calls the global sync's
+bulk upsert takes: typically a few hundred ms, and several seconds when
+it hits the per-application rate limit during a crash loop.
+
+    python -m benchmarks.bench_startup_sync [--boots 10] [--sync-latency 0.4] [--latency 0.05]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import bot
+from benchmarks.fakediscord import FakeDiscord, FaultProfile
+from threadit.cog import ThreadItCog
+from threadit.commandsync import CommandSyncer
+from threadit.orchestrator import ThreadingOrchestrator
+from threadit.permissions import PermissionsService
+
+FIRST_AUTHOR_ID = 5 * 10**17
+log = logging.getLogger("bench")
+
+
+async def _boot(state_path: Path, *, sync_latency: float, latency: float) -> tuple[float, bool]:
+    """Seconds from start to the first processed reply, and whether commands were synced."""
+    fake = FakeDiscord(faults=FaultProfile(latency=latency))
+    fake.command_sync_latency = sync_latency
+    await fake.start()
+    bot.use_discord_endpoints(fake.api_url, fake.gateway_url)
+
+    client = bot.build_bot()
+    permissions = PermissionsService(
+        get_self_id=lambda: client.user.id if client.user else None,
+        get_client_id=lambda: "1",
+        logger=log,
+    )
+    orchestrator = ThreadingOrchestrator(permissions=permissions, logger=log)
+    await client.add_cog(
+        ThreadItCog(client, orchestrator, permissions, get_client_id=lambda: "1", logger=log)
+    )
+    syncer = CommandSyncer(state_path=state_path, logger=log)
+    synced = False
+
+    @client.event
+    async def setup_hook() -> None:
+        nonlocal synced
+        synced = await syncer.sync(client.tree, client.application_id)
+
+    processed = asyncio.Event()
+    process = orchestrator.process
+
+    async def timed_process(*args, **kwargs):
+        result = await process(*args, **kwargs)
+        processed.set()
+        return result
+
+    orchestrator.process = timed_process  # type: ignore[method-assign]
+
+    started = time.perf_counter()
+    runner = asyncio.create_task(client.start("fake-token"))
+    try:
+        await asyncio.wait_for(fake.ready.wait(), 30)
+        await fake.inject_reply(0, 0, 0, author_id=FIRST_AUTHOR_ID)
+        await asyncio.wait_for(processed.wait(), 30)
+        elapsed = time.perf_counter() - started
+    finally:
+        await client.close()
+        await asyncio.wait_for(runner, 5)
+        await fake.stop()
+    return elapsed, synced
+
+
+async def main_async(boots: int, sync_latency: float, latency: float) -> None:
+    cold: list[float] = []
+    warm: list[float] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        state_path = Path(tmp) / "command-tree.sha256"
+        for _ in range(boots):
+            state_path.unlink(missing_ok=True)
+            elapsed, synced = await _boot(state_path, sync_latency=sync_latency, latency=latency)
+            assert synced, "cold boot skipped the sync"
+            cold.append(elapsed)
+        for _ in range(boots):
+            elapsed, synced = await _boot(state_path, sync_latency=sync_latency, latency=latency)
+            assert not synced, "warm boot synced again"
+            warm.append(elapsed)
+
+    print(f"{'start to first processed reply':<36} {'median ms':>10} {'max ms':>10}")
+    for label, times in (
+        ("cold hash (syncs commands)", cold),
+        ("warm hash (skips the sync)", warm),
+    ):
+        print(f"{label:<36} {statistics.median(times) * 1e3:>10.1f} {max(times) * 1e3:>10.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--boots", type=int, default=10)
+    parser.add_argument("--sync-latency", type=float, default=0.4)
+    parser.add_argument("--latency", type=float, default=0.05, help="mean REST latency (s)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+    asyncio.run(main_async(args.boots, args.sync_latency, args.latency))
+
+
+if __name__ == "__main__":
+    main()
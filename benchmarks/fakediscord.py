@@ -0,0 +1,951 @@
+"""
+A local stand-in for Discord's REST API and gateway, for end-to-end load
+tests of the real bot.
+
+Serves just enough of both for Thread It to log in, receive its guilds
+and replies over the gateway, and run conversions over REST: fetch the
+parent, create the thread, repost (as the bot or through a channel
+webhook), add the author, delete the original, post and later delete the
+notification. Every REST call pays a
+configurable latency and may be answered with a 500 or an injected 429.
+Per-route buckets and a global limit return real ``X-RateLimit-*``
+headers and 429 bodies, so discord.py's own rate limiter is exercised.
+
+Run it on its own and point a bot at it:
+
+    python -m benchmarks.fakediscord [--port 8765] [--guilds 10] [--latency 0.05]
+    DISCORD_API_BASE_URL=http://127.0.0.1:8765/api/v10 \\
+    DISCORD_GATEWAY_URL=ws://127.0.0.1:8765/gateway DISCORD_TOKEN=fake python bot.py
+
+or let ``benchmarks.bench_e2e`` start both and drive traffic.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import random
+import time
+from collections import Counter, deque
+from collections.abc import Awaitable, Callable, Sequence
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+import discord
+from aiohttp import WSMsgType, web
+
+BOT_ID = 10**17
+APPLICATION_ID = BOT_ID
+THREAD_ALREADY_EXISTS = 160004
+UNKNOWN_MESSAGE = 10008
+UNKNOWN_CHANNEL = 10003
+UNKNOWN_WEBHOOK = 10015
+
+# (method, route) -> (requests, window seconds), roughly what Discord
+# reports for these routes; everything else gets DEFAULT_ROUTE_LIMIT.
+# Buckets are per route and per channel (or webhook), like Discord's
+# major parameter. Webhook executions carry no bot token and so skip the
+# global limit.
+ROUTE_LIMITS: dict[tuple[str, str], tuple[int, float]] = {
+    ("POST", "/api/v10/channels/{channel_id}/messages"): (5, 5.0),
+    ("DELETE", "/api/v10/channels/{channel_id}/messages/{message_id}"): (5, 1.0),
+    ("POST", "/api/v10/channels/{channel_id}/messages/{message_id}/threads"): (10, 10.0),
+    ("POST", "/api/v10/webhooks/{webhook_id}/{webhook_token}"): (5, 2.0),
+}
+DEFAULT_ROUTE_LIMIT = (50, 1.0)
+# discord.py treats a 429 without this header as a Cloudflare ban and
+# gives up instead of retrying.
+VIA = {"Via": "1.1 google"}
+
+Handler = Callable[[web.Request], Awaitable[web.StreamResponse]]
+
+
+@dataclass
+class FaultProfile:
+    """How unfriendly the fake REST API is."""
+
+    latency: float = 0.05  # mean seconds per REST call
+    jitter: float = 0.5  # latency varies by ± this fraction
+    error_rate: float = 0.0  # share of calls answered 500
+    inject_429_rate: float = 0.0  # share answered 429 with a shared scope
+    injected_retry_after: float = 1.0
+    global_limit: int = 50  # requests per second across all routes; 0 = off
+    route_limits: bool = True  # enforce ROUTE_LIMITS buckets
+
+
+@dataclass
+class _Bucket:
+    limit: int
+    window: float
+    remaining: int = 0
+    reset_at: float = 0.0
+
+
+@dataclass
+class RestStats:
+    calls: Counter[str] = field(default_factory=Counter)  # "METHOD route" -> count
+    statuses: Counter[int] = field(default_factory=Counter)
+    rate_limited: Counter[str] = field(default_factory=Counter)  # scope -> 429s served
+
+    @property
+    def total(self) -> int:
+        return sum(self.calls.values())
+
+
+def _json(data: Any, *, status: int = 200, headers: dict[str, str] | None = None) -> web.Response:
+    # Exactly "application/json": discord.py doesn't parse a body whose
+    # content type carries a charset.
+    return web.Response(
+        body=json.dumps(data).encode(),
+        status=status,
+        headers={**VIA, **(headers or {})},
+        content_type="application/json",
+    )
+
+
+class _GatewaySession:
+    def __init__(self, ws: web.WebSocketResponse) -> None:
+        self.ws = ws
+        self.sequence = 0
+        self.shard = (0, 1)
+
+    def owns(self, guild_id: int) -> bool:
+        shard_id, shard_count = self.shard
+        return (guild_id >> 22) % shard_count == shard_id
+
+    async def send(self, op: int, data: Any, event: str | None = None) -> None:
+        payload: dict[str, Any] = {"op": op, "d": data, "s": None, "t": event}
+        if op == 0:
+            self.sequence += 1
+            payload["s"] = self.sequence
+        await self.ws.send_str(json.dumps(payload))
+
+
+class FakeDiscord:
+    """
+    In-memory guilds, channels and messages behind an aiohttp app.
+
+    ``guilds`` x ``channels`` text channels each start with ``parents``
+    messages from ordinary users; ``inject_reply`` sends a reply to one
+    of them over the gateway and records when the bot deletes it, which
+    is the last step of a successful conversion. ``bot_permissions`` is
+    the bot role's permission bitfield in every guild.
+    """
+
+    def __init__(
+        self,
+        *,
+        guilds: int = 1,
+        channels: int = 1,
+        parents: int = 1,
+        faults: FaultProfile | None = None,
+        heartbeat_interval: float = 41.25,
+        bot_permissions: int = 0x8,  # administrator
+    ) -> None:
+        self.faults = faults or FaultProfile()
+        self.heartbeat_interval = heartbeat_interval
+        self.stats = RestStats()
+        self.ready = asyncio.Event()  # the bot sent its first presence update (on_ready)
+        self.injected: dict[int, float] = {}  # reply id -> sent at
+        self.converted: dict[int, float] = {}  # reply id -> original deleted at
+        # "METHOD route" -> calls still to be carried out but answered 503,
+        # as if the response was lost on the way back.
+        self.lost_responses: Counter[str] = Counter()
+        # Extra seconds a global command sync takes on top of the usual latency.
+        self.command_sync_latency = 0.0
+        self.base_url = ""
+
+        self._ids = itertools.count()
+        self._sessions: list[_GatewaySession] = []
+        self._buckets: dict[str, _Bucket] = {}
+        self._global_window: deque[float] = deque()
+        self._rng = random.Random(0)
+        self._guilds: list[dict] = []
+        self._channels: dict[int, dict] = {}  # text channels and threads
+        self._messages: dict[int, dict] = {}
+        self._threads: dict[int, int] = {}  # parent message id -> thread id
+        self._notifications: set[int] = set()  # bot messages outside threads
+        self._webhooks: dict[int, dict] = {}
+        self._nonces: dict[str, int] = {}  # the bot's nonces -> message id
+        self._runner: web.AppRunner | None = None
+
+        self.bot_user = self._user(BOT_ID, "Thread It", bot=True)
+        self.bot_permissions = bot_permissions
+        for g in range(guilds):
+            self._guilds.append(self._make_guild(g, channels, parents))
+
+        app = web.Application(middlewares=[self._faults_middleware])
+        app.router.add_get("/gateway", self._gateway)
+        app.router.add_get("/attachments/{size}/{filename}", self._get_attachment)
+        api = "/api/v10"
+        app.router.add_get(f"{api}/users/@me", self._get_me)
+        app.router.add_get(f"{api}/oauth2/applications/@me", self._get_application)
+        app.router.add_get(f"{api}/gateway", self._get_gateway)
+        app.router.add_get(f"{api}/gateway/bot", self._get_gateway)
+        app.router.add_put(f"{api}/applications/{{application_id}}/commands", self._put_commands)
+        app.router.add_get(f"{api}/channels/{{channel_id}}", self._get_channel)
+        app.router.add_get(f"{api}/channels/{{channel_id}}/messages", self._list_messages)
+        app.router.add_post(f"{api}/channels/{{channel_id}}/messages", self._post_message)
+        app.router.add_post(
+            f"{api}/channels/{{channel_id}}/messages/bulk-delete", self._bulk_delete
+        )
+        message = f"{api}/channels/{{channel_id}}/messages/{{message_id}}"
+        app.router.add_get(message, self._get_message)
+        app.router.add_delete(message, self._delete_message)
+        app.router.add_post(f"{message}/threads", self._post_thread)
+        app.router.add_put(
+            f"{api}/channels/{{channel_id}}/thread-members/{{user_id}}", self._put_thread_member
+        )
+        app.router.add_get(f"{api}/channels/{{channel_id}}/webhooks", self._list_webhooks)
+        app.router.add_post(f"{api}/channels/{{channel_id}}/webhooks", self._post_webhook)
+        app.router.add_post(
+            f"{api}/webhooks/{{webhook_id}}/{{webhook_token}}", self._execute_webhook
+        )
+        self.app = app
+
+    # ------------------------------------------------------------------ #
+    # Lifecycle
+    # ------------------------------------------------------------------ #
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Serve on ``host:port`` (0 picks a free port); returns the base URL."""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        bound = self._runner.addresses[0][1]
+        self.base_url = f"http://{host}:{bound}"
+        return self.base_url
+
+    @property
+    def api_url(self) -> str:
+        return f"{self.base_url}/api/v10"
+
+    @property
+    def gateway_url(self) -> str:
+        return self.base_url.replace("http", "ws", 1) + "/gateway"
+
+    async def stop(self) -> None:
+        for session in self._sessions:
+            await session.ws.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def reset_stats(self) -> None:
+        """Forget login/startup traffic before a measured run."""
+        self.stats = RestStats()
+
+    @property
+    def outstanding_notifications(self) -> int:
+        return len(self._notifications)
+
+    # ------------------------------------------------------------------ #
+    # Traffic
+    # ------------------------------------------------------------------ #
+
+    def _channel(self, guild: int, channel: int) -> dict:
+        g = self._guilds[guild % len(self._guilds)]
+        return g["channels"][channel % len(g["channels"])]
+
+    def target(self, guild: int, channel: int, parent: int) -> tuple[int, int, int]:
+        """(guild_id, channel_id, parent_message_id) by index."""
+        ch = self._channel(guild, channel)
+        parents = ch["_parents"]
+        return int(ch["guild_id"]), int(ch["id"]), parents[parent % len(parents)]
+
+    def add_parent(self, guild: int, channel: int) -> int:
+        """Post one more parent message in a channel; returns its index."""
+        ch = self._channel(guild, channel)
+        parents = ch["_parents"]
+        author = self._user(BOT_ID + 100 + len(parents), "poster")
+        parents.append(int(self._message(int(ch["id"]), author, "Another parent message")["id"]))
+        return len(parents) - 1
+
+    async def delete_webhooks(self, guild: int, channel: int) -> None:
+        """Delete a channel's webhooks behind the bot's back, as a server admin would."""
+        ch = self._channel(guild, channel)
+        for webhook_id in [i for i, w in self._webhooks.items() if w["channel_id"] == ch["id"]]:
+            del self._webhooks[webhook_id]
+        await self._webhooks_update(ch)
+
+    def guild_payloads(self) -> list[dict]:
+        """GUILD_CREATE payloads, for feeding a client's state without a gateway."""
+        return [{**g, "channels": [self._public(c) for c in g["channels"]]} for g in self._guilds]
+
+    def reply_payload(
+        self,
+        guild: int,
+        channel: int,
+        parent: int,
+        *,
+        author_id: int,
+        content_length: int | None = None,
+        attachments: Sequence[int] = (),
+        embeds: int = 0,
+        age: float = 0.0,
+    ) -> dict:
+        """
+        A stored reply to the indexed parent, as MESSAGE_CREATE would carry
+        it. ``attachments`` are byte sizes served from ``/attachments``;
+        ``age`` backdates the reply's snowflake by that many seconds.
+        """
+        _, channel_id, parent_id = self.target(guild, channel, parent)
+        text = "a reply that should become a thread "
+        if content_length is None:
+            content = text * 3
+        else:
+            content = (text * (content_length // len(text) + 1))[:content_length]
+        data = self._message(
+            channel_id,
+            self._user(author_id, f"user-{author_id}"),
+            content,
+            reference=parent_id,
+            embeds=[{"type": "rich", "title": f"embed {i}"} for i in range(embeds)],
+            attachments=attachments,
+            age=age,
+        )
+        data["member"] = self._member_stub()
+        return data
+
+    async def inject_reply(
+        self, guild: int, channel: int, parent: int, *, author_id: int, **shape: Any
+    ) -> int:
+        """Send a reply (see ``reply_payload``) over the gateway; returns its id."""
+        data = self.reply_payload(guild, channel, parent, author_id=author_id, **shape)
+        self.injected[int(data["id"])] = time.perf_counter()
+        await self._dispatch(int(data["guild_id"]), "MESSAGE_CREATE", data)
+        return int(data["id"])
+
+    # ------------------------------------------------------------------ #
+    # Payloads
+    # ------------------------------------------------------------------ #
+
+    def _snowflake(self, age: float = 0.0) -> int:
+        # Real timestamps, so the bot's reply-age admission sees fresh replies.
+        created = datetime.now(UTC) - timedelta(seconds=age)
+        return discord.utils.time_snowflake(created) + next(self._ids) % (1 << 22)
+
+    @staticmethod
+    def _user(user_id: int, name: str, *, bot: bool = False) -> dict:
+        return {
+            "id": str(user_id),
+            "username": name,
+            "discriminator": "0",
+            "global_name": name,
+            "avatar": None,
+            "bot": bot,
+        }
+
+    @staticmethod
+    def _member_stub() -> dict:
+        return {
+            "roles": [],
+            "joined_at": "2024-01-01T00:00:00+00:00",
+            "deaf": False,
+            "mute": False,
+            "flags": 0,
+        }
+
+    def _message(
+        self,
+        channel_id: int,
+        author: dict,
+        content: str,
+        *,
+        reference: int | None = None,
+        embeds: list | None = None,
+        attachments: Sequence[int] = (),
+        age: float = 0.0,
+    ) -> dict:
+        channel = self._channels[channel_id]
+        message_id = self._snowflake(age)
+        data = {
+            "id": str(message_id),
+            "channel_id": str(channel_id),
+            "guild_id": channel["guild_id"],
+            "author": author,
+            "content": content,
+            "timestamp": datetime.now(UTC).isoformat(),
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": [
+                {
+                    "id": str(message_id + i),
+                    "filename": f"file-{i}.bin",
+                    "size": size,
+                    "url": f"{self.base_url}/attachments/{size}/file-{i}.bin",
+                    "proxy_url": f"{self.base_url}/attachments/{size}/file-{i}.bin",
+                    "content_type": "application/octet-stream",
+                }
+                for i, size in enumerate(attachments)
+            ],
+            "embeds": embeds or [],
+            "pinned": False,
+            "flags": 0,
+            "type": 0,
+        }
+        if reference is not None:
+            data["type"] = 19
+            data["message_reference"] = {
+                "message_id": str(reference),
+                "channel_id": str(channel_id),
+                "guild_id": channel["guild_id"],
+            }
+        self._messages[int(data["id"])] = data
+        return data
+
+    def _make_guild(self, index: int, channels: int, parents: int) -> dict:
+        gid = self._snowflake()
+        everyone = {
+            "id": str(gid),
+            "name": "@everyone",
+            "permissions": str(0x4C00),
+            "position": 0,
+            "color": 0,
+            "hoist": False,
+            "managed": False,
+            "mentionable": False,
+            "flags": 0,
+        }
+        bot_role = {
+            **everyone,
+            "id": str(gid + 1),
+            "name": "Thread It",
+            "permissions": str(self.bot_permissions),
+            "position": 1,
+            "managed": True,
+        }
+        guild: dict[str, Any] = {
+            "id": str(gid),
+            "name": f"guild-{index}",
+            "icon": None,
+            "owner_id": str(gid + 2),
+            "roles": [everyone, bot_role],
+            "channels": [],
+            "threads": [],
+            "members": [
+                {
+                    "user": self.bot_user,
+                    "roles": [bot_role["id"]],
+                    "joined_at": "2024-01-01T00:00:00+00:00",
+                    "deaf": False,
+                    "mute": False,
+                    "flags": 0,
+                }
+            ],
+            "emojis": [],
+            "stickers": [],
+            "features": [],
+            "member_count": 1000,
+            "large": True,
+            "unavailable": False,
+            "premium_tier": 0,
+            "verification_level": 0,
+            "default_message_notifications": 0,
+            "explicit_content_filter": 0,
+            "mfa_level": 0,
+            "nsfw_level": 0,
+            "preferred_locale": "en-US",
+            "system_channel_flags": 0,
+        }
+        for c in range(channels):
+            cid = self._snowflake()
+            channel = {
+                "id": str(cid),
+                "type": 0,
+                "guild_id": str(gid),
+                "name": f"channel-{c}",
+                "position": c,
+                "permission_overwrites": [],
+                "topic": None,
+                "nsfw": False,
+                "parent_id": None,
+                "rate_limit_per_user": 0,
+            }
+            self._channels[cid] = channel
+            author = self._user(gid + 10 + c, f"poster-{c}")
+            channel["_parents"] = [
+                int(self._message(cid, author, f"Parent message {p} in channel {c}")["id"])
+                for p in range(parents)
+            ]
+            guild["channels"].append(channel)
+        return guild
+
+    @staticmethod
+    def _public(data: dict) -> dict:
+        return {k: v for k, v in data.items() if not k.startswith("_")}
+
+    def _with_thread(self, message: dict) -> dict:
+        thread_id = self._threads.get(int(message["id"]))
+        if thread_id is None:
+            return message
+        return {**message, "thread": self._public(self._channels[thread_id])}
+
+    # ------------------------------------------------------------------ #
+    # Gateway
+    # ------------------------------------------------------------------ #
+
+    async def _dispatch(self, guild_id: int, event: str, data: dict) -> None:
+        for session in list(self._sessions):
+            if session.owns(guild_id) and not session.ws.closed:
+                await session.send(0, data, event)
+
+    async def _gateway(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        session = _GatewaySession(ws)
+        self._sessions.append(session)
+        await session.send(10, {"heartbeat_interval": int(self.heartbeat_interval * 1000)})
+        try:
+            async for frame in ws:
+                if frame.type != WSMsgType.TEXT:
+                    continue
+                msg = json.loads(frame.data)
+                op = msg["op"]
+                if op == 1:  # HEARTBEAT
+                    await session.send(11, None)
+                elif op == 2:  # IDENTIFY
+                    await self._identify(session, msg["d"])
+                elif op == 3:  # PRESENCE_UPDATE, sent from the bot's on_ready
+                    self.ready.set()
+                elif op == 6:  # RESUME
+                    await session.send(0, {}, "RESUMED")
+        finally:
+            self._sessions.remove(session)
+        return ws
+
+    async def _identify(self, session: _GatewaySession, data: dict) -> None:
+        shard = data.get("shard")
+        if shard:
+            session.shard = (int(shard[0]), int(shard[1]))
+        guilds = [g for g in self._guilds if session.owns(int(g["id"]))]
+        ready = {
+            "v": 10,
+            "user": self.bot_user,
+            "session_id": hashlib.md5(str(id(session)).encode()).hexdigest(),
+            "resume_gateway_url": self.gateway_url,
+            "shard": list(session.shard),
+            "guilds": [{"id": g["id"], "unavailable": True} for g in guilds],
+            "application": {"id": str(APPLICATION_ID), "flags": 0},
+        }
+        await session.send(0, ready, "READY")
+        for guild in guilds:
+            payload = {**guild, "channels": [self._public(c) for c in guild["channels"]]}
+            await session.send(0, payload, "GUILD_CREATE")
+
+    # ------------------------------------------------------------------ #
+    # REST: faults, latency and rate limits
+    # ------------------------------------------------------------------ #
+
+    @web.middleware
+    async def _faults_middleware(
+        self, request: web.Request, handler: Handler
+    ) -> web.StreamResponse:
+        if not request.path.startswith("/api/"):
+            return await handler(request)
+
+        faults = self.faults
+        if faults.latency > 0:
+            spread = faults.latency * faults.jitter
+            await asyncio.sleep(max(0.0, self._rng.uniform(-spread, spread) + faults.latency))
+
+        info = request.match_info
+        resource = info.route.resource
+        template = resource.canonical if resource is not None else request.path
+        route = f"{request.method} {template}"
+        self.stats.calls[route] += 1
+
+        now = time.monotonic()
+        if faults.global_limit and not template.startswith("/api/v10/webhooks/"):
+            window = self._global_window
+            while window and window[0] <= now - 1.0:
+                window.popleft()
+            if len(window) >= faults.global_limit:
+                return self._too_many(1.0 - (now - window[0]), scope="global")
+            window.append(now)
+
+        headers: dict[str, str] = {}
+        if faults.route_limits:
+            limit, period = ROUTE_LIMITS.get((request.method, template), DEFAULT_ROUTE_LIMIT)
+            key = f"{route}:{info.get('channel_id', info.get('webhook_id', ''))}"
+            bucket = self._buckets.setdefault(key, _Bucket(limit, period))
+            if now >= bucket.reset_at:
+                bucket.remaining, bucket.reset_at = bucket.limit, now + bucket.window
+            if bucket.remaining <= 0:
+                return self._too_many(bucket.reset_at - now, scope="user", bucket=bucket, key=key)
+            bucket.remaining -= 1
+            headers = self._bucket_headers(bucket, key, now)
+
+        if faults.inject_429_rate and self._rng.random() < faults.inject_429_rate:
+            return self._too_many(faults.injected_retry_after, scope="shared")
+        if faults.error_rate and self._rng.random() < faults.error_rate:
+            self.stats.statuses[500] += 1
+            return _json({"message": "500: Internal Server Error", "code": 0}, status=500)
+
+        response = await handler(request)
+        if self.lost_responses[route] > 0:
+            self.lost_responses[route] -= 1
+            self.stats.statuses[503] += 1
+            return _json({"message": "upstream connect error", "code": 0}, status=503)
+        response.headers.update({**VIA, **headers})
+        self.stats.statuses[response.status] += 1
+        return response
+
+    @staticmethod
+    def _bucket_headers(bucket: _Bucket, key: str, now: float) -> dict[str, str]:
+        reset_after = max(0.0, bucket.reset_at - now)
+        return {
+            "X-RateLimit-Limit": str(bucket.limit),
+            "X-RateLimit-Remaining": str(bucket.remaining),
+            "X-RateLimit-Reset": f"{time.time() + reset_after:.3f}",
+            "X-RateLimit-Reset-After": f"{reset_after:.3f}",
+            "X-RateLimit-Bucket": hashlib.sha1(key.rsplit(":", 1)[0].encode()).hexdigest()[:16],
+        }
+
+    def _too_many(
+        self,
+        retry_after: float,
+        *,
+        scope: str,
+        bucket: _Bucket | None = None,
+        key: str = "",
+    ) -> web.Response:
+        self.stats.rate_limited[scope] += 1
+        self.stats.statuses[429] += 1
+        retry_after = round(max(retry_after, 0.001), 3)
+        headers = {"Retry-After": str(retry_after), "X-RateLimit-Scope": scope}
+        if scope == "global":
+            headers["X-RateLimit-Global"] = "true"
+        if bucket is not None:
+            headers.update(self._bucket_headers(bucket, key, time.monotonic()))
+        body = {
+            "message": "You are being rate limited.",
+            "retry_after": retry_after,
+            "global": scope == "global",
+            "code": 0,
+        }
+        return _json(body, status=429, headers=headers)
+
+    @staticmethod
+    def _not_found(code: int, message: str) -> web.Response:
+        return _json({"message": message, "code": code}, status=404)
+
+    # ------------------------------------------------------------------ #
+    # REST: routes
+    # ------------------------------------------------------------------ #
+
+    async def _get_attachment(self, request: web.Request) -> web.Response:
+        # The CDN: not rate limited, no injected faults.
+        return web.Response(
+            body=bytes(int(request.match_info["size"])), content_type="application/octet-stream"
+        )
+
+    async def _get_me(self, request: web.Request) -> web.Response:
+        return _json(self.bot_user)
+
+    async def _get_application(self, request: web.Request) -> web.Response:
+        return _json(
+            {
+                "id": str(APPLICATION_ID),
+                "name": "Thread It",
+                "description": "",
+                "icon": None,
+                "bot_public": True,
+                "bot_require_code_grant": False,
+                "verify_key": "0" * 64,
+                "owner": self._user(BOT_ID + 1, "owner"),
+                "flags": 0,
+            }
+        )
+
+    async def _get_gateway(self, request: web.Request) -> web.Response:
+        return _json(
+            {
+                "url": self.gateway_url,
+                "shards": 1,
+                "session_start_limit": {
+                    "total": 1000,
+                    "remaining": 1000,
+                    "reset_after": 0,
+                    "max_concurrency": 1,
+                },
+            }
+        )
+
+    async def _put_commands(self, request: web.Request) -> web.Response:
+        commands = await request.json()
+        if self.command_sync_latency > 0:
+            await asyncio.sleep(self.command_sync_latency)
+        for command in commands:
+            command.setdefault("id", str(self._snowflake()))
+            command["application_id"] = str(APPLICATION_ID)
+            command.setdefault("version", "1")
+        return _json(commands)
+
+    async def _get_channel(self, request: web.Request) -> web.Response:
+        channel = self._channels.get(int(request.match_info["channel_id"]))
+        if channel is None:
+            return self._not_found(UNKNOWN_CHANNEL, "Unknown Channel")
+        return _json(self._public(channel))
+
+    async def _get_message(self, request: web.Request) -> web.Response:
+        message = self._messages.get(int(request.match_info["message_id"]))
+        if message is None or message["channel_id"] != request.match_info["channel_id"]:
+            return self._not_found(UNKNOWN_MESSAGE, "Unknown Message")
+        return _json(self._with_thread(message))
+
+    async def _list_messages(self, request: web.Request) -> web.Response:
+        # Discord's order: newest first, whichever direction was paged.
+        channel_id = request.match_info["channel_id"]
+        if int(channel_id) not in self._channels:
+            return self._not_found(UNKNOWN_CHANNEL, "Unknown Channel")
+        limit = min(int(request.query.get("limit", 50)), 100)
+        after = int(request.query.get("after", 0))
+        before = int(request.query.get("before", 1 << 63))
+        ids = sorted(
+            i
+            for i, m in self._messages.items()
+            if m["channel_id"] == channel_id and after < i < before
+        )
+        page = ids[:limit] if "after" in request.query else ids[-limit:]
+        return _json([self._with_thread(self._messages[i]) for i in reversed(page)])
+
+    async def _post_message(self, request: web.Request) -> web.Response:
+        channel_id = int(request.match_info["channel_id"])
+        channel = self._channels.get(channel_id)
+        if channel is None:
+            return self._not_found(UNKNOWN_CHANNEL, "Unknown Channel")
+        body = await self._message_body(request)
+        # enforce_nonce: a nonce the author used before, in any channel,
+        # returns the message it created (Discord remembers nonces for a
+        # few minutes; the fake, forever).
+        nonce = str(body["nonce"]) if body.get("enforce_nonce") and "nonce" in body else None
+        if nonce is not None:
+            existing = self._messages.get(self._nonces.get(nonce, 0))
+            if existing is not None:
+                return _json(existing)
+        data = self._message(
+            channel_id, self.bot_user, body.get("content") or "", embeds=body.get("embeds")
+        )
+        if nonce is not None:
+            data["nonce"] = nonce
+            self._nonces[nonce] = int(data["id"])
+        if channel["type"] == 0:
+            self._notifications.add(int(data["id"]))
+        await self._dispatch(int(channel["guild_id"]), "MESSAGE_CREATE", data)
+        return _json(data)
+
+    @staticmethod
+    async def _message_body(request: web.Request) -> dict:
+        if request.content_type == "application/json":
+            return await request.json()
+        form = await request.post()  # multipart: files plus a payload_json part
+        return json.loads(str(form.get("payload_json", "{}")))
+
+    async def _delete_message(self, request: web.Request) -> web.Response:
+        message_id = int(request.match_info["message_id"])
+        message = self._messages.get(message_id)
+        if message is None or message["channel_id"] != request.match_info["channel_id"]:
+            return self._not_found(UNKNOWN_MESSAGE, "Unknown Message")
+        await self._remove(message)
+        return web.Response(status=204)
+
+    async def _bulk_delete(self, request: web.Request) -> web.Response:
+        channel_id = request.match_info["channel_id"]
+        ids = [int(i) for i in (await request.json())["messages"]]
+        if not 2 <= len(ids) <= 100:
+            return _json({"message": "Invalid Form Body", "code": 50035}, status=400)
+        messages = [self._messages.get(i) for i in ids]
+        if any(m is None or m["channel_id"] != channel_id for m in messages):
+            return self._not_found(UNKNOWN_MESSAGE, "Unknown Message")
+        cutoff = discord.utils.time_snowflake(datetime.now(UTC) - timedelta(days=14))
+        if any(i < cutoff for i in ids):
+            return _json(
+                {
+                    "message": "You can only bulk delete messages that are under 14 days old.",
+                    "code": 50034,
+                },
+                status=400,
+            )
+        for message in messages:
+            await self._remove(message)  # type: ignore[arg-type]
+        return web.Response(status=204)
+
+    async def _remove(self, message: dict) -> None:
+        message_id = int(message["id"])
+        del self._messages[message_id]
+        self._notifications.discard(message_id)
+        if message_id in self.injected:
+            self.converted[message_id] = time.perf_counter()
+        await self._dispatch(
+            int(message["guild_id"]),
+            "MESSAGE_DELETE",
+            {
+                "id": str(message_id),
+                "channel_id": message["channel_id"],
+                "guild_id": message["guild_id"],
+            },
+        )
+
+    async def _post_thread(self, request: web.Request) -> web.Response:
+        channel_id = int(request.match_info["channel_id"])
+        parent_id = int(request.match_info["message_id"])
+        parent = self._messages.get(parent_id)
+        if parent is None or int(parent["channel_id"]) != channel_id:
+            return self._not_found(UNKNOWN_MESSAGE, "Unknown Message")
+        if parent_id in self._threads:
+            return _json(
+                {
+                    "message": "A thread has already been created for this message",
+                    "code": THREAD_ALREADY_EXISTS,
+                },
+                status=400,
+            )
+        body = await request.json()
+        guild_id = parent["guild_id"]
+        # Discord gives a thread started from a message that message's id.
+        thread = {
+            "id": str(parent_id),
+            "guild_id": guild_id,
+            "parent_id": str(channel_id),
+            "owner_id": str(BOT_ID),
+            "name": body.get("name", "thread"),
+            "type": 11,
+            "last_message_id": None,
+            "message_count": 0,
+            "member_count": 1,
+            "rate_limit_per_user": 0,
+            "flags": 0,
+            "total_message_sent": 0,
+            "thread_metadata": {
+                "archived": False,
+                "locked": False,
+                "auto_archive_duration": body.get("auto_archive_duration", 1440),
+                "archive_timestamp": datetime.now(UTC).isoformat(),
+            },
+        }
+        self._channels[parent_id] = thread
+        self._threads[parent_id] = parent_id
+        await self._dispatch(int(guild_id), "THREAD_CREATE", {**thread, "newly_created": True})
+        return _json(thread, status=201)
+
+    async def _put_thread_member(self, request: web.Request) -> web.Response:
+        if int(request.match_info["channel_id"]) not in self._channels:
+            return self._not_found(UNKNOWN_CHANNEL, "Unknown Channel")
+        return web.Response(status=204)
+
+    async def _list_webhooks(self, request: web.Request) -> web.Response:
+        channel_id = request.match_info["channel_id"]
+        if int(channel_id) not in self._channels:
+            return self._not_found(UNKNOWN_CHANNEL, "Unknown Channel")
+        return _json([w for w in self._webhooks.values() if w["channel_id"] == channel_id])
+
+    async def _post_webhook(self, request: web.Request) -> web.Response:
+        channel = self._channels.get(int(request.match_info["channel_id"]))
+        if channel is None:
+            return self._not_found(UNKNOWN_CHANNEL, "Unknown Channel")
+        webhook_id = self._snowflake()
+        webhook = {
+            "id": str(webhook_id),
+            "type": 1,
+            "guild_id": channel["guild_id"],
+            "channel_id": channel["id"],
+            "name": (await request.json())["name"],
+            "avatar": None,
+            "token": hashlib.sha1(str(webhook_id).encode()).hexdigest(),
+            "application_id": str(APPLICATION_ID),
+            "user": self.bot_user,
+        }
+        self._webhooks[webhook_id] = webhook
+        await self._webhooks_update(channel)
+        return _json(webhook)
+
+    async def _webhooks_update(self, channel: dict) -> None:
+        await self._dispatch(
+            int(channel["guild_id"]),
+            "WEBHOOKS_UPDATE",
+            {
+                "guild_id": channel["guild_id"],
+                "channel_id": channel["id"],
+            },
+        )
+
+    async def _execute_webhook(self, request: web.Request) -> web.Response:
+        webhook = self._webhooks.get(int(request.match_info["webhook_id"]))
+        if webhook is None or webhook["token"] != request.match_info["webhook_token"]:
+            return self._not_found(UNKNOWN_WEBHOOK, "Unknown Webhook")
+        channel_id = int(request.query.get("thread_id", webhook["channel_id"]))
+        channel = self._channels.get(channel_id)
+        if channel is None or webhook["channel_id"] not in (
+            channel["id"],
+            channel.get("parent_id"),
+        ):
+            return self._not_found(UNKNOWN_CHANNEL, "Unknown Channel")
+        body = await self._message_body(request)
+        author = self._user(int(webhook["id"]), body.get("username") or webhook["name"], bot=True)
+        data = self._message(
+            channel_id, author, body.get("content") or "", embeds=body.get("embeds")
+        )
+        data["webhook_id"] = webhook["id"]
+        await self._dispatch(int(channel["guild_id"]), "MESSAGE_CREATE", data)
+        if request.query.get("wait") not in ("1", "true"):
+            return web.Response(status=204)
+        return _json(data)
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    fake = FakeDiscord(
+        guilds=args.guilds,
+        channels=args.channels,
+        parents=args.parents,
+        faults=FaultProfile(
+            latency=args.latency,
+            error_rate=args.error_rate,
+            inject_429_rate=args.inject_429,
+            global_limit=args.global_limit,
+        ),
+    )
+    await fake.start(args.host, args.port)
+    print(f"DISCORD_API_BASE_URL={fake.api_url}")
+    print(f"DISCORD_GATEWAY_URL={fake.gateway_url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await fake.stop()
+
+
+def add_fault_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--guilds", type=int, default=10)
+    parser.add_argument("--channels", type=int, default=5, help="text channels per guild")
+    parser.add_argument("--parents", type=int, default=20, help="parent messages per channel")
+    parser.add_argument("--latency", type=float, default=0.05, help="mean REST latency (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of REST calls → 500")
+    parser.add_argument("--inject-429", type=float, default=0.0, help="share of REST calls → 429")
+    parser.add_argument(
+        "--global-limit",
+        type=int,
+        default=50,
+        help="global REST requests per second (0 = unlimited)",
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_fault_arguments(parser)
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Replay a recorded reply trace (``TRAFFIC_RECORD_PATH``) through the
+production ``ThreadingOrchestrator`` against ``benchmarks.fakediscord``.
+
+The trace's guilds, channels, parents and authors become fake ones in
+first-seen order, so parent reuse and per-channel bursts are preserved.
+Each reply is rebuilt with its recorded content length, attachment sizes
+(served by the fake CDN), embed count and age, and handed to
+``orchestrator.process()`` at its recorded offset divided by ``--speed``.
+A redelivered message id is replayed as the same message. The
+orchestrator comes from ``bot.build_orchestrator``, so ``Config`` / env
+settings apply; its REST calls go over real HTTP to the fake.
+
+    python -m benchmarks.replay data/traffic.jsonl [--speed 10] [--limit 5000] \\
+        [--latency 0.05] [--error-rate 0.01] [--inject-429 0.01]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+
+import discord
+
+import bot
+from benchmarks.bench_e2e import report
+from benchmarks.fakediscord import FakeDiscord, FaultProfile, add_fault_arguments
+from threadit.metrics import Metrics
+from threadit.permissions import PermissionsService
+from threadit.recorder import TraceRecord, read_trace
+from threadit.restcalls import RestAccounting
+
+FIRST_AUTHOR_ID = 5 * 10**17
+SEGMENT_GAP_MS = 1000
+
+
+class _Layout:
+    """Maps anonymized trace ids onto fake guild/channel/parent indexes."""
+
+    def __init__(self, records: list[TraceRecord]) -> None:
+        self.guilds: dict[tuple[int, int], int] = {}
+        self.channels: dict[tuple[int, int], tuple[int, int]] = {}
+        self.parents: dict[tuple[int, int, int], int] = {}
+        self.authors: dict[tuple[int, int], int] = {}
+        per_guild: dict[int, int] = {}
+        for r in records:
+            g = self.guilds.setdefault((r.segment, r.guild), len(self.guilds))
+            if (r.segment, r.channel) not in self.channels:
+                self.channels[(r.segment, r.channel)] = (g, per_guild.get(g, 0))
+                per_guild[g] = per_guild.get(g, 0) + 1
+            self.authors.setdefault((r.segment, r.author), FIRST_AUTHOR_ID + len(self.authors))
+        self.max_channels = max(per_guild.values(), default=1)
+
+    def place(self, fake: FakeDiscord, r: TraceRecord) -> tuple[int, int, int]:
+        """(guild, channel, parent) indexes, posting the parent on first use."""
+        g, c = self.channels[(r.segment, r.channel)]
+        key = (r.segment, r.channel, r.parent)
+        if key not in self.parents:
+            self.parents[key] = fake.add_parent(g, c)
+        return g, c, self.parents[key]
+
+
+def _timeline(records: list[TraceRecord]) -> list[float]:
+    """Seconds from replay start; segments are played back to back."""
+    times, offset, segment, last = [], 0, 0, 0
+    for r in records:
+        if r.segment != segment:
+            offset, segment = last + SEGMENT_GAP_MS, r.segment
+        last = offset + r.at_ms
+        times.append(last / 1000)
+    first = times[0] if times else 0.0
+    return [t - first for t in times]
+
+
+async def replay_trace(
+    records: list[TraceRecord], *, speed: float = 1.0, faults: FaultProfile | None = None
+) -> tuple[FakeDiscord, Metrics, float, float]:
+    """Replay ``records``; returns (fake, orchestrator metrics, started, send duration)."""
+    layout = _Layout(records)
+    fake = FakeDiscord(
+        guilds=len(layout.guilds) or 1, channels=layout.max_channels, parents=0, faults=faults
+    )
+    await fake.start()
+    bot.use_discord_endpoints(fake.api_url, fake.gateway_url)
+    metrics = Metrics()
+    rest = RestAccounting(metrics=metrics)
+    client = bot.build_bot(http_trace=rest.trace_config())
+    try:
+        await client.login("fake-token")
+        fake.reset_stats()
+        state = client._connection
+        for payload in fake.guild_payloads():
+            state._add_guild_from_data(payload)  # type: ignore[arg-type]
+        permissions = PermissionsService(
+            get_self_id=lambda: client.user.id if client.user else None,
+            get_client_id=lambda: str(client.application_id),
+            logger=logging.getLogger("threadit.permissions"),
+        )
+        orchestrator = bot.build_orchestrator(permissions, metrics, rest)
+
+        sent: dict[tuple[int, int], dict] = {}
+        tasks: list[asyncio.Task] = []
+        started = time.perf_counter()
+        for r, at in zip(records, _timeline(records), strict=True):
+            delay = started + at / speed - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            data = sent.get((r.segment, r.message))
+            if data is None:
+                g, c, p = layout.place(fake, r)
+                data = sent[(r.segment, r.message)] = fake.reply_payload(
+                    g,
+                    c,
+                    p,
+                    author_id=layout.authors[(r.segment, r.author)],
+                    content_length=r.content_length,
+                    attachments=r.attachment_sizes,
+                    embeds=r.embeds,
+                    age=r.age_ms / 1000,
+                )
+                fake.injected[int(data["id"])] = time.perf_counter()
+            channel = client.get_channel(int(data["channel_id"]))
+            message = discord.Message(state=state, channel=channel, data=data)  # type: ignore[arg-type]
+            tasks.append(asyncio.create_task(orchestrator.process(message)))
+        sent_for = time.perf_counter() - started
+        await asyncio.gather(*tasks)
+        # Fire the deferred notification deletes now so they are counted.
+        await orchestrator.drain(timeout=30)
+    finally:
+        await client.close()
+        await fake.stop()
+    return fake, metrics, started, sent_for
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("trace", type=Path)
+    parser.add_argument("--speed", type=float, default=1.0, help="1 = real time, 10 = 10x faster")
+    parser.add_argument("--limit", type=int, default=0, help="replay only the first N replies")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+
+    records = list(read_trace(args.trace))
+    if args.limit:
+        records = records[: args.limit]
+    if not records:
+        sys.exit(f"No replies in {args.trace}")
+    faults = FaultProfile(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        inject_429_rate=args.inject_429,
+        global_limit=args.global_limit,
+    )
+    fake, metrics, started, sent_for = asyncio.run(
+        replay_trace(records, speed=args.speed, faults=faults)
+    )
+    print(f"trace              {args.trace} ({len(records)} replies, {args.speed:g}x)")
+    report(fake, len(fake.injected), sent_for, started)
+    interesting = ("replies_shed_total", "duplicates_suppressed_total", "deadline_exceeded")
+    counters = {k: v for k, v in metrics.snapshot().items() if any(i in k for i in interesting)}
+    if counters:
+        print(f"\norchestrator       {counters}")
+    done = metrics.summary("rest_calls_per_conversion", stage="done")
+    if done is not None and done.count:
+        print(
+            f"API calls/conv     {done.total / done.count:.2f} in process() (max {done.max:g}), "
+            f"+{metrics.counter('rest_calls_after_conversion_total') / done.count:.2f} deferred"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -10,94 +10,482 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import logging.handlers
+import signal
 import sys
+from pathlib import Path
 
+import aiohttp
 import discord
+import yarl
 from discord.ext import commands
+from discord.gateway import DiscordWebSocket
 
 from config import Config
+from threadit.admission import FreshnessPolicy
+from threadit.catchup import CatchUp, WatermarkStore
+from threadit.circuit import CircuitBreaker
+from threadit.cluster import Heartbeat, parse_shard_ids
 from threadit.cog import ThreadItCog
+from threadit.commandsync import CommandSyncer
+from threadit.dedup import DuplicateFilter, SqliteSeenStore
+from threadit.journal import ConversionJournal, replay_journal
+from threadit.locks import SharedParentLock, SqliteLeaseStore
+from threadit.logutil import configure_logging, parse_sample_rates
+from threadit.loopmonitor import LoopMonitor
+from threadit.metrics import Metrics, MetricsReporter
 from threadit.orchestrator import ThreadingOrchestrator
+from threadit.pending import PendingDeletionStore, replay_pending_deletions
 from threadit.permissions import PermissionsService
+from threadit.profiling import Profiler
+from threadit.ratelimit import ReplyRateLimiter, TokenBuckets
+from threadit.recorder import TrafficRecorder
+from threadit.restcalls import RestAccounting
+from threadit.retry import Retrier, RetryBudget, RetryPolicy
+from threadit.runtime import RuntimeProfile, select_runtime
+from threadit.shadow import ShadowMode, parse_guild_ids
+from threadit.transcode import HAS_PILLOW, ImageTranscoder
 from threadit.types import DEFAULT_CLIENT_ID
+from threadit.webhooks import WebhookCache
 
 logger = logging.getLogger(__name__)
 
 
-def setup_logging() -> None:
-    """Configure root logger and quiet discord.py to WARNING."""
-    handler = logging.StreamHandler()
-    handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
-    logging.basicConfig(level=Config.LOG_LEVEL, handlers=[handler])
+def setup_logging() -> logging.handlers.QueueListener:
+    """
+    Configure root logger and quiet discord.py to WARNING.
+
+    Records are handed to a queue on the event loop and written by a
+    listener thread; the returned listener must be stopped on shutdown so
+    buffered lines are flushed.
+    """
+    listener = configure_logging(
+        level=Config.LOG_LEVEL,
+        fmt=Config.LOG_FORMAT,
+        sample_rates=parse_sample_rates(Config.LOG_SAMPLE_RATES),
+    )
     logging.getLogger("discord").setLevel(logging.WARNING)
-    logger.info(f"Logging configured - Level: {Config.LOG_LEVEL}")
-    logger.info(f"Bot starting up - discord.py version: {discord.__version__}")
+    logger.info("Logging configured - Level: %s, format: %s", Config.LOG_LEVEL, Config.LOG_FORMAT)
+    logger.info("Bot starting up - discord.py version: %s", discord.__version__)
+    return listener
+
+
+def build_bot(
+    *,
+    lean: bool = False,
+    sharded: bool = False,
+    shard_count: int | None = None,
+    shard_ids: list[int] | None = None,
+    http_trace: aiohttp.TraceConfig | None = None,
+) -> commands.Bot | commands.AutoShardedBot:
+    """
+    Construct the discord.py Bot with the intents/defaults Thread It needs.
+
+    ``lean`` trims the client to what the reply pipeline actually reads:
+    no message cache (every message the bot acts on arrives in its own
+    event, and parents are always fetched), no voice-state or typing
+    intents, and a member cache holding only the bot's own member, which
+    discord.py keeps regardless and ``PermissionsService`` relies on via
+    ``guild.me``. Guild chunking at startup is off either way.
 
+    ``sharded`` returns an ``AutoShardedBot``: all shards in one process
+    when ``shard_ids`` is ``None`` (``shard_count`` ``None`` asks Discord),
+    or just ``shard_ids`` out of ``shard_count`` when run as one worker of
+    the cluster launcher.
 
-def build_bot() -> commands.Bot:
-    """Construct the discord.py Bot with the intents/defaults Thread It needs."""
+    ``http_trace`` is attached to the client's HTTP session, e.g.
+    ``RestAccounting.trace_config()``.
+    """
     intents = discord.Intents.default()
     intents.message_content = True
     intents.guilds = True
     intents.guild_messages = True
 
-    return commands.Bot(
+    extra: dict = {}
+    if lean:
+        intents.voice_states = False
+        intents.typing = False
+        extra = {
+            "max_messages": None,
+            "member_cache_flags": discord.MemberCacheFlags.none(),
+        }
+
+    if http_trace is not None:
+        extra["http_trace"] = http_trace
+    if sharded:
+        extra["shard_count"] = shard_count
+        extra["shard_ids"] = shard_ids
+    bot_class = commands.AutoShardedBot if sharded else commands.Bot
+    return bot_class(
         # Prefix is kept only because hybrid commands need one for the text
         # form; the actual user-facing surface is `/thread-it` (slash).
         command_prefix="!",
         intents=intents,
         allowed_mentions=discord.AllowedMentions.none(),
         help_command=None,
+        chunk_guilds_at_startup=False,
+        **extra,
+    )
+
+
+def use_discord_endpoints(api_base_url: str, gateway_url: str) -> None:
+    """
+    Point discord.py's REST client and gateway at another server (empty
+    keeps Discord's). Affects every client in the process.
+    """
+    if api_base_url:
+        discord.http.Route.BASE = api_base_url.rstrip("/")
+        discord.webhook.async_.Route.BASE = discord.http.Route.BASE
+        logger.warning("Using Discord REST API at %s", discord.http.Route.BASE)
+    if gateway_url:
+        DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(gateway_url)
+        logger.warning("Using Discord gateway at %s", gateway_url)
+
+
+def build_orchestrator(
+    permissions: PermissionsService,
+    metrics: Metrics,
+    rest: RestAccounting | None = None,
+    *,
+    journal: ConversionJournal | None = None,
+) -> ThreadingOrchestrator:
+    """The orchestrator and its services as configured by ``Config``."""
+    dedup = DuplicateFilter(
+        ttl_seconds=Config.DEDUP_TTL_SECONDS,
+        logger=logging.getLogger("threadit.dedup"),
+        metrics=metrics,
+        store=(
+            SqliteSeenStore(Path(Config.DEDUP_DB_PATH), ttl_seconds=Config.DEDUP_TTL_SECONDS)
+            if Config.DEDUP_DB_PATH
+            else None
+        ),
+    )
+    shared_lock: SharedParentLock | None = None
+    if Config.PARENT_LOCK_BACKEND == "sqlite":
+        shared_lock = SharedParentLock(
+            SqliteLeaseStore(Path(Config.PARENT_LOCK_DB_PATH)),
+            lease_seconds=Config.PARENT_LOCK_LEASE_SECONDS,
+        )
+    shadow_guilds = parse_guild_ids(Config.SHADOW_GUILD_IDS)
+    if shadow_guilds:
+        logger.warning(
+            "Shadow mode for guild(s) %s: replies there are costed, not converted",
+            ", ".join(map(str, sorted(shadow_guilds))),
+        )
+    transcoder: ImageTranscoder | None = None
+    if Config.IMAGE_DOWNSCALE_ENABLED and not HAS_PILLOW:
+        logger.warning(
+            "IMAGE_DOWNSCALE_ENABLED is on but Pillow is not installed; oversize images "
+            "are skipped. Install with: pip install 'thread-it[images]'"
+        )
+    elif Config.IMAGE_DOWNSCALE_ENABLED:
+        transcoder = ImageTranscoder(
+            workers=Config.IMAGE_DOWNSCALE_WORKERS,
+            max_queued=Config.IMAGE_DOWNSCALE_MAX_QUEUED,
+            max_source_bytes=Config.IMAGE_DOWNSCALE_MAX_SOURCE_BYTES,
+            metrics=metrics,
+            logger=logging.getLogger("threadit.transcode"),
+        )
+    return ThreadingOrchestrator(
+        permissions=permissions,
+        logger=logging.getLogger("threadit.orchestrator"),
+        metrics=metrics,
+        dedup=dedup,
+        retrier=Retrier(
+            policy=RetryPolicy(
+                max_attempts=Config.RETRY_MAX_ATTEMPTS,
+                base_delay=Config.RETRY_BASE_DELAY_MS / 1000,
+                max_delay=Config.RETRY_MAX_DELAY_MS / 1000,
+                step_deadline=Config.RETRY_STEP_DEADLINE_SECONDS,
+            ),
+            budget=RetryBudget(
+                percent=Config.RETRY_BUDGET_PERCENT,
+                min_per_second=Config.RETRY_BUDGET_MIN_PER_SECOND,
+            ),
+            metrics=metrics,
+            logger=logging.getLogger("threadit.retry"),
+        ),
+        breaker=CircuitBreaker(
+            failure_threshold=Config.CIRCUIT_FAILURE_THRESHOLD,
+            guild_failure_threshold=Config.CIRCUIT_GUILD_FAILURE_THRESHOLD,
+            open_seconds=Config.CIRCUIT_OPEN_SECONDS,
+            logger=logging.getLogger("threadit.circuit"),
+            metrics=metrics,
+        ),
+        deadline_seconds=Config.CONVERSION_DEADLINE_SECONDS or None,
+        lock_hold_seconds=Config.PARENT_LOCK_MAX_HOLD_SECONDS or None,
+        freshness=FreshnessPolicy(
+            downgrade_after=Config.SHED_DOWNGRADE_AFTER_SECONDS or None,
+            shed_after=Config.SHED_DROP_AFTER_SECONDS or None,
+        ),
+        shared_lock=shared_lock,
+        rest=rest,
+        shadow=ShadowMode(shadow_guilds, metrics=metrics) if shadow_guilds else None,
+        webhooks=(
+            WebhookCache(
+                permissions=permissions,
+                metrics=metrics,
+                logger=logging.getLogger("threadit.webhooks"),
+                max_size=Config.WEBHOOK_CACHE_SIZE,
+            )
+            if Config.REPOST_VIA_WEBHOOK
+            else None
+        ),
+        transcoder=transcoder,
+        journal=journal,
     )
 
 
-async def run() -> None:
-    setup_logging()
+def _token_buckets(burst: int, refill_seconds: int) -> TokenBuckets | None:
+    """One token per ``refill_seconds`` up to ``burst``; ``None`` when either is 0."""
+    if burst <= 0 or refill_seconds <= 0:
+        return None
+    return TokenBuckets(rate=1 / refill_seconds, burst=burst)
+
+
+def _worker_path(path: str, shard_ids: list[int] | None) -> Path:
+    """``path``, made per-worker when running as a cluster worker."""
+    resolved = Path(path)
+    if shard_ids is None:
+        return resolved
+    # Cluster workers share DATA_DIR; keep their state files apart.
+    return resolved.with_stem(f"{resolved.stem}-{Config.SHARD_IDS}")
+
+
+async def run(runtime: RuntimeProfile | None = None) -> None:
+    listener = setup_logging()
+    try:
+        if runtime is not None:
+            runtime.log(logger)
+        await _run()
+    finally:
+        listener.stop()
+
+
+async def _run() -> None:
     Config.validate()
+    use_discord_endpoints(Config.DISCORD_API_BASE_URL, Config.DISCORD_GATEWAY_URL)
 
-    bot = build_bot()
+    shard_ids = parse_shard_ids(Config.SHARD_IDS)
+    metrics = Metrics()
+    rest = RestAccounting(metrics=metrics)
+    bot = build_bot(
+        lean=Config.LEAN_CLIENT,
+        sharded=Config.SHARDING_ENABLED,
+        shard_count=Config.SHARD_COUNT or None,
+        shard_ids=shard_ids,
+        http_trace=rest.trace_config(),
+    )
 
     permissions = PermissionsService(
         get_self_id=lambda: bot.user.id if bot.user else None,
         get_client_id=lambda: str(bot.user.id) if bot.user else DEFAULT_CLIENT_ID,
         logger=logging.getLogger("threadit.permissions"),
     )
-    orchestrator = ThreadingOrchestrator(
-        permissions=permissions,
-        logger=logging.getLogger("threadit.orchestrator"),
+    journal: ConversionJournal | None = None
+    if Config.JOURNAL_PATH:
+        journal = ConversionJournal(
+            _worker_path(Config.JOURNAL_PATH, shard_ids),
+            max_age_seconds=Config.JOURNAL_MAX_AGE_SECONDS,
+            logger=logging.getLogger("threadit.journal"),
+        )
+    orchestrator = build_orchestrator(permissions, metrics, rest, journal=journal)
+    profiler: Profiler | None = None
+    if Config.PROFILING_ENABLED:
+        profiler = Profiler(
+            output_dir=Path(Config.PROFILE_DIR),
+            logger=logging.getLogger("threadit.profiling"),
+            default_seconds=Config.PROFILE_DEFAULT_SECONDS,
+            max_seconds=Config.PROFILE_MAX_SECONDS,
+        )
+    rate_limiter = ReplyRateLimiter(
+        user_buckets=_token_buckets(
+            Config.RATE_LIMIT_USER_BURST, Config.RATE_LIMIT_USER_REFILL_SECONDS
+        ),
+        channel_buckets=_token_buckets(
+            Config.RATE_LIMIT_CHANNEL_BURST, Config.RATE_LIMIT_CHANNEL_REFILL_SECONDS
+        ),
+        metrics=metrics,
+        logger=logging.getLogger("threadit.ratelimit"),
     )
+    catchup: CatchUp | None = None
+    if Config.CATCHUP_ENABLED:
+        catchup_logger = logging.getLogger("threadit.catchup")
+        catchup = CatchUp(
+            WatermarkStore(
+                _worker_path(Config.CATCHUP_STATE_PATH, shard_ids), logger=catchup_logger
+            ),
+            orchestrator,
+            calls_per_second=Config.CATCHUP_CALLS_PER_SECOND,
+            max_age_seconds=Config.CATCHUP_MAX_AGE_SECONDS,
+            metrics=metrics,
+            logger=catchup_logger,
+            rate_limiter=rate_limiter,
+        )
     cog = ThreadItCog(
         bot,
         orchestrator,
         permissions,
         get_client_id=lambda: str(bot.user.id) if bot.user else DEFAULT_CLIENT_ID,
         logger=logging.getLogger("threadit.cog"),
+        profiler=profiler,
+        rate_limiter=rate_limiter,
+        recorder=(
+            TrafficRecorder(
+                Path(Config.TRAFFIC_RECORD_PATH), logger=logging.getLogger("threadit.recorder")
+            )
+            if Config.TRAFFIC_RECORD_PATH
+            else None
+        ),
+        catchup=catchup,
     )
     await bot.add_cog(cog)
 
+    loop_monitor: LoopMonitor | None = None
+    if Config.LOOP_MONITOR_ENABLED:
+        loop_monitor = LoopMonitor(
+            interval=Config.LOOP_MONITOR_INTERVAL_MS / 1000,
+            stall_threshold=Config.LOOP_STALL_THRESHOLD_MS / 1000,
+            logger=logging.getLogger("threadit.loopmonitor"),
+            metrics=metrics,
+            asyncio_debug=Config.LOOP_ASYNCIO_DEBUG,
+        )
+
+    metrics_reporter: MetricsReporter | None = None
+    if Config.METRICS_LOG_INTERVAL_SECONDS > 0:
+        metrics_reporter = MetricsReporter(
+            metrics,
+            interval=Config.METRICS_LOG_INTERVAL_SECONDS,
+            logger=logging.getLogger("threadit.metrics"),
+        )
+
+    command_syncer = CommandSyncer(
+        state_path=Path(Config.COMMAND_SYNC_STATE_PATH),
+        logger=logging.getLogger("threadit.commandsync"),
+        force=Config.FORCE_COMMAND_SYNC,
+    )
+    pending_store = PendingDeletionStore(
+        _worker_path(Config.PENDING_DELETIONS_PATH, shard_ids),
+        logger=logging.getLogger("threadit.pending"),
+    )
+    lifecycle_tasks: set[asyncio.Task] = set()
+    draining = False
+
+    async def drain_and_close(signame: str) -> None:
+        logger.info(
+            "%s received; draining for up to %ss before disconnecting",
+            signame,
+            Config.DRAIN_TIMEOUT_SECONDS,
+        )
+        try:
+            pending_store.save(await orchestrator.drain(Config.DRAIN_TIMEOUT_SECONDS))
+        finally:
+            await bot.close()
+
+    def on_shutdown_signal(signame: str) -> None:
+        nonlocal draining
+        if draining:
+            logger.warning("%s received again; still draining", signame)
+            return
+        draining = True
+        task = asyncio.get_running_loop().create_task(drain_and_close(signame))
+        lifecycle_tasks.add(task)
+        task.add_done_callback(lifecycle_tasks.discard)
+
+    heartbeat: Heartbeat | None = None
+    if Config.CLUSTER_HEARTBEAT_FILE:
+        heartbeat = Heartbeat(
+            Path(Config.CLUSTER_HEARTBEAT_FILE),
+            interval=Config.CLUSTER_HEARTBEAT_INTERVAL_SECONDS,
+            healthy=lambda: not bot.is_closed(),
+        )
+
     @bot.event
     async def setup_hook() -> None:
-        # Push the latest slash-command definitions to Discord. Global sync
-        # can take up to an hour to propagate; users can also force-sync per
-        # guild if they need faster iteration.
+        if loop_monitor is not None:
+            loop_monitor.start()
+        if metrics_reporter is not None:
+            metrics_reporter.start()
+        if heartbeat is not None:
+            heartbeat.start()
+        loop = asyncio.get_running_loop()
+        if profiler is not None and profiler.install_signal_handler(loop):
+            logger.info("Profiling enabled: send SIGUSR1 to capture to %s", Config.PROFILE_DIR)
+        # SIGTERM (docker stop, the cluster launcher) and Ctrl-C drain
+        # in-flight conversions before the gateway closes.
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(signum, on_shutdown_signal, signum.name)
+            except (NotImplementedError, RuntimeError):
+                pass
+        # Finish deletions the previous run couldn't, without delaying startup.
+        task = loop.create_task(
+            replay_pending_deletions(
+                pending_store,
+                lambda channel_id, message_id: bot.http.delete_message(channel_id, message_id),
+                logger,
+            )
+        )
+        lifecycle_tasks.add(task)
+        task.add_done_callback(lifecycle_tasks.discard)
+        # Resume conversions the previous run was cut off in the middle of.
+        if journal is not None:
+            task = loop.create_task(
+                replay_journal(
+                    journal,
+                    orchestrator,
+                    bot.get_channel,
+                    logger=logging.getLogger("threadit.journal"),
+                    ready=bot.wait_until_ready,
+                )
+            )
+            lifecycle_tasks.add(task)
+            task.add_done_callback(lifecycle_tasks.discard)
+
+        # Push the latest slash-command definitions to Discord, but only
+        # when they changed since the last successful sync: the global sync
+        # is rate-limited and delays startup. Global sync can take up to an
+        # hour to propagate; users can also force-sync per guild if they
+        # need faster iteration. Commands are global, so in a cluster only
+        # the worker owning shard 0 syncs.
+        if shard_ids is not None and 0 not in shard_ids:
+            return
         try:
-            synced = await bot.tree.sync()
-            logger.info(f"Synced {len(synced)} application command(s)")
+            await command_syncer.sync(bot.tree, bot.application_id)
         except Exception as exc:
-            logger.warning(f"Failed to sync application commands: {exc}")
+            logger.warning("Failed to sync application commands: %s", exc)
 
     assert Config.DISCORD_TOKEN is not None  # narrowed by Config.validate()
     # `async with bot:` guarantees bot.close() (HTTP session, websocket,
     # background tasks) runs on shutdown — including the exception path —
     # so the event loop tears down cleanly under container restarts and
     # test runners.
-    async with bot:
-        await bot.start(Config.DISCORD_TOKEN)
+    try:
+        async with bot:
+            await bot.start(Config.DISCORD_TOKEN)
+    finally:
+        if heartbeat is not None:
+            await heartbeat.stop()
+        if loop_monitor is not None:
+            await loop_monitor.stop()
+        if metrics_reporter is not None:
+            await metrics_reporter.stop()
+        if cog.recorder is not None:
+            cog.recorder.close()
+        if catchup is not None:
+            await catchup.close()
+        if orchestrator.transcoder is not None:
+            orchestrator.transcoder.close()
+        if journal is not None:
+            journal.close()
 
 
 def main() -> None:
+    # The loop must be chosen before it exists, hence before logging is up.
+    runtime = select_runtime(Config.FAST_RUNTIME)
     try:
-        asyncio.run(run())
+        with asyncio.Runner(loop_factory=runtime.loop_factory) as runner:
+            runner.run(run(runtime))
     except ValueError as exc:
         print(f"Configuration error: {exc}", file=sys.stderr)
         sys.exit(1)
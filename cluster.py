@@ -0,0 +1,98 @@
+"""
+Thread It shard cluster launcher.
+
+Splits the bot's shards across several ``bot.py`` worker processes on one
+host and keeps them running. Each worker is a complete bot (own event
+loop, orchestrator and caches) for its shard range, so conversions scale
+with cores.
+
+    python cluster.py            # CLUSTER_WORKERS (default: one per CPU)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import signal
+import sys
+from pathlib import Path
+
+import discord
+
+from bot import setup_logging, use_discord_endpoints
+from config import Config
+from threadit.cluster import ClusterSupervisor
+
+logger = logging.getLogger("threadit.cluster")
+
+
+async def recommended_sharding(token: str) -> tuple[int, int]:
+    """Ask Discord for (recommended shard count, identify max_concurrency)."""
+    client = discord.Client(intents=discord.Intents.none())
+    try:
+        await client.login(token)
+        shards, _, session_limit = await client.http.get_bot_gateway()
+    finally:
+        await client.close()
+    return shards, session_limit.get("max_concurrency", 1)
+
+
+async def run() -> None:
+    listener = setup_logging()
+    try:
+        await _run()
+    finally:
+        listener.stop()
+
+
+async def _run() -> None:
+    Config.validate()
+    assert Config.DISCORD_TOKEN is not None  # narrowed by Config.validate()
+    use_discord_endpoints(Config.DISCORD_API_BASE_URL, Config.DISCORD_GATEWAY_URL)
+
+    recommended, max_concurrency = await recommended_sharding(Config.DISCORD_TOKEN)
+    shard_count = Config.SHARD_COUNT or recommended
+    workers = Config.CLUSTER_WORKERS or os.cpu_count() or 1
+    logger.info(
+        "Discord recommends %d shard(s); running %d across up to %d worker(s)",
+        recommended,
+        shard_count,
+        workers,
+    )
+
+    supervisor = ClusterSupervisor(
+        shard_count=shard_count,
+        workers=workers,
+        command=[sys.executable, str(Path(__file__).with_name("bot.py"))],
+        heartbeat_dir=Path(Config.DATA_DIR) / "cluster",
+        heartbeat_timeout=Config.CLUSTER_HEARTBEAT_TIMEOUT_SECONDS,
+        logger=logger,
+        max_concurrency=max_concurrency,
+        # Give each worker's shutdown drain time to finish before SIGKILL.
+        stop_timeout=Config.DRAIN_TIMEOUT_SECONDS + 10,
+    )
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(signum, supervisor.stop)
+        except NotImplementedError:  # Windows
+            pass
+    await supervisor.run()
+
+
+def main() -> None:
+    try:
+        asyncio.run(run())
+    except ValueError as exc:
+        print(f"Configuration error: {exc}", file=sys.stderr)
+        sys.exit(1)
+    except discord.LoginFailure:
+        print("Error: Invalid Discord token!", file=sys.stderr)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("Cluster shutdown requested by user.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -16,36 +16,53 @@ load_dotenv()
 # Strip Unicode control (Cc) and format (Cf) characters except common
 # whitespace. This catches zero-width chars, bidi overrides, and other
 # invisible glyphs that would otherwise survive into thread names.
-_CONTROL_CHARS = ''.join(
-    chr(c) for c in range(0x110000)
-    if unicodedata.category(chr(c)) in ('Cc', 'Cf') and chr(c) not in '\t\n\r '
+_CONTROL_CHARS = "".join(
+    chr(c)
+    for c in range(0x110000)
+    if unicodedata.category(chr(c)) in ("Cc", "Cf") and chr(c) not in "\t\n\r "
 )
-_CONTROL_CHARS_RE = re.compile(f'[{re.escape(_CONTROL_CHARS)}]')
-_EVERYONE_RE = re.compile(r'@(everyone|here)\b', re.IGNORECASE)
-_WHITESPACE_RE = re.compile(r'\s+')
+_CONTROL_CHARS_RE = re.compile(f"[{re.escape(_CONTROL_CHARS)}]")
+_EVERYONE_RE = re.compile(r"@(everyone|here)\b", re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r"\s+")
 
 
 def _int_env(name: str, default: int) -> int:
     """Read an integer env var; raise a clear error instead of Python's default."""
     raw = os.getenv(name)
-    if raw is None or raw == '':
+    if raw is None or raw == "":
         return default
     try:
         return int(raw)
     except ValueError as exc:
-        raise ValueError(
-            f"Environment variable {name} must be an integer, got {raw!r}"
-        ) from exc
+        raise ValueError(f"Environment variable {name} must be an integer, got {raw!r}") from exc
+
+
+def _bool_env(name: str, default: bool) -> bool:
+    """Read a boolean env var (1/0, true/false, yes/no, on/off)."""
+    raw = os.getenv(name)
+    if raw is None or raw == "":
+        return default
+    value = raw.strip().lower()
+    if value in ("1", "true", "yes", "on"):
+        return True
+    if value in ("0", "false", "no", "off"):
+        return False
+    raise ValueError(f"Environment variable {name} must be a boolean (true/false), got {raw!r}")
 
 
 class Config:
     """Configuration class containing all bot settings."""
 
     # Discord API Configuration
-    DISCORD_TOKEN: str | None = os.getenv('DISCORD_TOKEN')
+    DISCORD_TOKEN: str | None = os.getenv("DISCORD_TOKEN")
 
     # Logging Configuration
-    LOG_LEVEL: str = os.getenv('LOG_LEVEL', 'INFO').upper()
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO").upper()
+    # 'text' (human-readable) or 'json' (one object per line for log pipelines).
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "text").lower()
+    # Per-event sampling for high-volume lines, e.g. "reply.processed=100"
+    # keeps one in 100. Empty disables sampling. Warnings are never sampled.
+    LOG_SAMPLE_RATES: str = os.getenv("LOG_SAMPLE_RATES", "")
 
     # Thread Configuration
     DEFAULT_AUTO_ARCHIVE_DURATION: int = 1440  # 24 hours in minutes
@@ -54,12 +71,198 @@ class Config:
     # Attachment Configuration
     # Per-attachment cap to avoid OOM on small hosts. Discord's per-file
     # limit for non-boosted servers is 25 MiB; we mirror that as the default.
-    MAX_ATTACHMENT_BYTES: int = _int_env('MAX_ATTACHMENT_BYTES', 25 * 1024 * 1024)
+    MAX_ATTACHMENT_BYTES: int = _int_env("MAX_ATTACHMENT_BYTES", 25 * 1024 * 1024)
 
     # Rate-limit for in-channel "missing permission" warnings, per channel.
-    PERMISSION_WARNING_COOLDOWN_SECONDS: int = _int_env(
-        'PERMISSION_WARNING_COOLDOWN_SECONDS', 3600
+    PERMISSION_WARNING_COOLDOWN_SECONDS: int = _int_env("PERMISSION_WARNING_COOLDOWN_SECONDS", 3600)
+
+    # Event-loop monitoring. The heartbeat measures loop lag every interval;
+    # a watchdog thread samples the loop's stack when it is blocked longer
+    # than the stall threshold. Cheap enough to leave on in production.
+    LOOP_MONITOR_ENABLED: bool = _bool_env("LOOP_MONITOR_ENABLED", True)
+    LOOP_MONITOR_INTERVAL_MS: int = _int_env("LOOP_MONITOR_INTERVAL_MS", 500)
+    LOOP_STALL_THRESHOLD_MS: int = _int_env("LOOP_STALL_THRESHOLD_MS", 250)
+    # Also enable asyncio debug mode's slow-callback warnings (same
+    # threshold). Adds per-callback overhead; use while investigating.
+    LOOP_ASYNCIO_DEBUG: bool = _bool_env("LOOP_ASYNCIO_DEBUG", False)
+
+    # Log every counter, gauge and latency summary this often (event
+    # "metrics.snapshot"); 0 disables it.
+    METRICS_LOG_INTERVAL_SECONDS: int = _int_env("METRICS_LOG_INTERVAL_SECONDS", 60)
+
+    # Local state (profiles and other runtime files) lives under DATA_DIR.
+    DATA_DIR: str = os.getenv("DATA_DIR", "data")
+
+    # On-demand profiling: SIGUSR1 or the owner-only `!thread-it-profile`
+    # command captures a CPU profile + tracemalloc snapshot to PROFILE_DIR.
+    PROFILING_ENABLED: bool = _bool_env("PROFILING_ENABLED", False)
+    PROFILE_DIR: str = os.getenv("PROFILE_DIR", os.path.join(DATA_DIR, "profiles"))
+    PROFILE_DEFAULT_SECONDS: int = _int_env("PROFILE_DEFAULT_SECONDS", 30)
+    PROFILE_MAX_SECONDS: int = _int_env("PROFILE_MAX_SECONDS", 300)
+
+    # Duplicate suppression: reply ids seen within the TTL are not processed
+    # again (gateway RESUME replays, overlapping instances during deploys).
+    # Set DEDUP_DB_PATH to share the seen set between processes on one host.
+    DEDUP_TTL_SECONDS: int = _int_env("DEDUP_TTL_SECONDS", 900)
+    DEDUP_DB_PATH: str = os.getenv("DEDUP_DB_PATH", "")
+
+    # Retries for transient Discord failures (5xx that outlived discord.py's
+    # own retries, network errors) on create-thread, repost and notify.
+    # Full-jitter exponential backoff, a deadline per step, and a
+    # process-wide budget: retries stay under RETRY_BUDGET_PERCENT of
+    # requests (plus a floor of RETRY_BUDGET_MIN_PER_SECOND).
+    RETRY_MAX_ATTEMPTS: int = _int_env("RETRY_MAX_ATTEMPTS", 3)
+    RETRY_BASE_DELAY_MS: int = _int_env("RETRY_BASE_DELAY_MS", 500)
+    RETRY_MAX_DELAY_MS: int = _int_env("RETRY_MAX_DELAY_MS", 8000)
+    RETRY_STEP_DEADLINE_SECONDS: int = _int_env("RETRY_STEP_DEADLINE_SECONDS", 30)
+    RETRY_BUDGET_PERCENT: int = _int_env("RETRY_BUDGET_PERCENT", 20)
+    RETRY_BUDGET_MIN_PER_SECOND: int = _int_env("RETRY_BUDGET_MIN_PER_SECOND", 1)
+
+    # Circuit breaker: after this many consecutive Forbidden/NotFound-type
+    # failures a channel (or a guild, once this many of its channels have
+    # failed) stops being processed for CIRCUIT_OPEN_SECONDS, then one probe
+    # reply is let through. Permission-change gateway events close it early.
+    CIRCUIT_FAILURE_THRESHOLD: int = _int_env("CIRCUIT_FAILURE_THRESHOLD", 3)
+    CIRCUIT_GUILD_FAILURE_THRESHOLD: int = _int_env("CIRCUIT_GUILD_FAILURE_THRESHOLD", 10)
+    CIRCUIT_OPEN_SECONDS: int = _int_env("CIRCUIT_OPEN_SECONDS", 300)
+
+    # Wall-clock cap on one reply conversion, end to end; on expiry the
+    # in-flight step is cancelled and the original left in place unless the
+    # repost already completed. 0 disables the cap.
+    CONVERSION_DEADLINE_SECONDS: int = _int_env("CONVERSION_DEADLINE_SECONDS", 120)
+    # Cap on how long one conversion may hold the per-parent lock (re-fetch
+    # + thread creation) before it is cancelled. 0 disables the cap.
+    PARENT_LOCK_MAX_HOLD_SECONDS: int = _int_env("PARENT_LOCK_MAX_HOLD_SECONDS", 30)
+
+    # Parent-message lock shared between processes: 'memory' serializes
+    # within this process only; 'sqlite' also locks across every process on
+    # the host through PARENT_LOCK_DB_PATH. Leases expire after
+    # PARENT_LOCK_LEASE_SECONDS in case a holder dies.
+    PARENT_LOCK_BACKEND: str = os.getenv("PARENT_LOCK_BACKEND", "memory").lower()
+    PARENT_LOCK_DB_PATH: str = os.getenv(
+        "PARENT_LOCK_DB_PATH", os.path.join(DATA_DIR, "locks.sqlite3")
     )
+    PARENT_LOCK_LEASE_SECONDS: int = _int_env("PARENT_LOCK_LEASE_SECONDS", 60)
+
+    # Load shedding by reply age (message.created_at vs now). Older than the
+    # first threshold: convert but skip the notification; older than the
+    # second: drop untouched. 0 disables a tier.
+    SHED_DOWNGRADE_AFTER_SECONDS: int = _int_env("SHED_DOWNGRADE_AFTER_SECONDS", 60)
+    SHED_DROP_AFTER_SECONDS: int = _int_env("SHED_DROP_AFTER_SECONDS", 300)
+
+    # Token buckets checked before any work: each user may convert
+    # RATE_LIMIT_USER_BURST replies at once, refilling one every
+    # RATE_LIMIT_USER_REFILL_SECONDS; likewise per channel. A burst or
+    # refill of 0 disables that bucket. Off by default: a reply over the
+    # limit is left unconverted, without a word (see DEPLOYMENT.md).
+    RATE_LIMIT_USER_BURST: int = _int_env("RATE_LIMIT_USER_BURST", 0)
+    RATE_LIMIT_USER_REFILL_SECONDS: int = _int_env("RATE_LIMIT_USER_REFILL_SECONDS", 10)
+    RATE_LIMIT_CHANNEL_BURST: int = _int_env("RATE_LIMIT_CHANNEL_BURST", 0)
+    RATE_LIMIT_CHANNEL_REFILL_SECONDS: int = _int_env("RATE_LIMIT_CHANNEL_REFILL_SECONDS", 2)
+
+    # Memory-lean client for large deployments: no message cache, no
+    # voice/typing intents, only the bot's own member cached. See build_bot.
+    LEAN_CLIENT: bool = _bool_env("LEAN_CLIENT", False)
+
+    # Run on uvloop and check discord.py's orjson backend is active. Both
+    # come from the `speed` extra; missing ones fall back with a warning.
+    FAST_RUNTIME: bool = _bool_env("FAST_RUNTIME", False)
+
+    # Sharding. SHARDING_ENABLED runs an AutoShardedBot; SHARD_COUNT 0 asks
+    # Discord for its recommended count. SHARD_IDS ("0-3,8") restricts this
+    # process to some shards and is normally set by the cluster launcher.
+    SHARDING_ENABLED: bool = _bool_env("SHARDING_ENABLED", False)
+    SHARD_COUNT: int = _int_env("SHARD_COUNT", 0)
+    SHARD_IDS: str = os.getenv("SHARD_IDS", "")
+
+    # Cluster launcher (python cluster.py): worker processes (0 = one per
+    # CPU) and heartbeat supervision. CLUSTER_HEARTBEAT_FILE is set per
+    # worker by the launcher; leave it unset otherwise.
+    CLUSTER_WORKERS: int = _int_env("CLUSTER_WORKERS", 0)
+    CLUSTER_HEARTBEAT_FILE: str = os.getenv("CLUSTER_HEARTBEAT_FILE", "")
+    CLUSTER_HEARTBEAT_INTERVAL_SECONDS: int = _int_env("CLUSTER_HEARTBEAT_INTERVAL_SECONDS", 10)
+    CLUSTER_HEARTBEAT_TIMEOUT_SECONDS: int = _int_env("CLUSTER_HEARTBEAT_TIMEOUT_SECONDS", 60)
+
+    # Slash commands are synced at startup only when their definitions hash
+    # differs from the one recorded here after the last successful sync.
+    # FORCE_COMMAND_SYNC syncs regardless.
+    COMMAND_SYNC_STATE_PATH: str = os.getenv(
+        "COMMAND_SYNC_STATE_PATH", os.path.join(DATA_DIR, "command-tree.sha256")
+    )
+    FORCE_COMMAND_SYNC: bool = _bool_env("FORCE_COMMAND_SYNC", False)
+
+    # On SIGTERM, stop taking replies and wait this long for in-flight
+    # conversions and notification deletes before disconnecting. Deletions
+    # still outstanding are saved to PENDING_DELETIONS_PATH and carried out
+    # on the next start. Keep below the container's stop grace period.
+    DRAIN_TIMEOUT_SECONDS: int = _int_env("DRAIN_TIMEOUT_SECONDS", 20)
+    PENDING_DELETIONS_PATH: str = os.getenv(
+        "PENDING_DELETIONS_PATH", os.path.join(DATA_DIR, "pending-deletions.json")
+    )
+
+    # Alternative Discord endpoints, e.g. the local fake in
+    # benchmarks/fakediscord.py for end-to-end load tests. Empty = discord.com.
+    DISCORD_API_BASE_URL: str = os.getenv("DISCORD_API_BASE_URL", "")
+    DISCORD_GATEWAY_URL: str = os.getenv("DISCORD_GATEWAY_URL", "")
+
+    # Append an anonymized trace of received replies (ids hashed, content
+    # reduced to its length) for `python -m benchmarks.replay`. Empty = off.
+    TRAFFIC_RECORD_PATH: str = os.getenv("TRAFFIC_RECORD_PATH", "")
+
+    # `thread-it-backfill` (backfill.py): REST calls per second it may use
+    # out of the bot-wide 50/s it shares with the live bot, parent groups
+    # converted at once within a channel, and where per-channel progress
+    # is checkpointed so an interrupted run resumes. CLI flags override.
+    BACKFILL_CALLS_PER_SECOND: int = _int_env("BACKFILL_CALLS_PER_SECOND", 10)
+    BACKFILL_CONCURRENCY: int = _int_env("BACKFILL_CONCURRENCY", 2)
+    BACKFILL_CHECKPOINT_PATH: str = os.getenv(
+        "BACKFILL_CHECKPOINT_PATH", os.path.join(DATA_DIR, "backfill-checkpoints.json")
+    )
+
+    # Catch-up after downtime: the newest message seen per channel is saved
+    # to CATCHUP_STATE_PATH, and after each READY the history after it is
+    # scanned and missed replies converted, at CATCHUP_CALLS_PER_SECOND.
+    # Gaps older than CATCHUP_MAX_AGE_SECONDS are skipped (0 = no limit).
+    CATCHUP_ENABLED: bool = _bool_env("CATCHUP_ENABLED", True)
+    CATCHUP_STATE_PATH: str = os.getenv(
+        "CATCHUP_STATE_PATH", os.path.join(DATA_DIR, "catchup-watermarks.json")
+    )
+    CATCHUP_CALLS_PER_SECOND: int = _int_env("CATCHUP_CALLS_PER_SECOND", 10)
+    CATCHUP_MAX_AGE_SECONDS: int = _int_env("CATCHUP_MAX_AGE_SECONDS", 86400)
+
+    # Shadow mode: comma-separated guild ids whose replies go through the
+    # whole decision path with every write recorded instead of made, to
+    # project what enabling the bot there would cost (see /thread-it stats).
+    SHADOW_GUILD_IDS: str = os.getenv("SHADOW_GUILD_IDS", "")
+
+    # Repost replies through a per-channel webhook, under the author's name
+    # and avatar, instead of as a bot embed. Webhook posts stay out of the
+    # bot's global rate limit. Needs Manage Webhooks; channels without it
+    # (and replies over 2000 characters) keep the embed repost. Up to
+    # WEBHOOK_CACHE_SIZE channels' webhooks are kept, least recently used
+    # evicted first.
+    REPOST_VIA_WEBHOOK: bool = _bool_env("REPOST_VIA_WEBHOOK", False)
+    WEBHOOK_CACHE_SIZE: int = _int_env("WEBHOOK_CACHE_SIZE", 1000)
+
+    # Downscale images over MAX_ATTACHMENT_BYTES so they can be reposted,
+    # instead of skipping them and keeping the original reply. Needs
+    # Pillow (the `images` extra). Runs in IMAGE_DOWNSCALE_WORKERS worker
+    # processes; beyond IMAGE_DOWNSCALE_MAX_QUEUED images running or
+    # waiting, oversize images are skipped as before. Images larger than
+    # IMAGE_DOWNSCALE_MAX_SOURCE_BYTES are never downloaded.
+    IMAGE_DOWNSCALE_ENABLED: bool = _bool_env("IMAGE_DOWNSCALE_ENABLED", False)
+    IMAGE_DOWNSCALE_WORKERS: int = _int_env("IMAGE_DOWNSCALE_WORKERS", 2)
+    IMAGE_DOWNSCALE_MAX_QUEUED: int = _int_env("IMAGE_DOWNSCALE_MAX_QUEUED", 8)
+    IMAGE_DOWNSCALE_MAX_SOURCE_BYTES: int = _int_env(
+        "IMAGE_DOWNSCALE_MAX_SOURCE_BYTES", 100 * 1024 * 1024
+    )
+
+    # Crash-safe conversions: each conversion's completed steps are appended
+    # to JOURNAL_PATH (SQLite), and on startup conversions the previous run
+    # left unfinished are resumed from their last step. Entries older than
+    # JOURNAL_MAX_AGE_SECONDS are dropped instead. Empty path = off.
+    JOURNAL_PATH: str = os.getenv("JOURNAL_PATH", os.path.join(DATA_DIR, "journal.sqlite3"))
+    JOURNAL_MAX_AGE_SECONDS: int = _int_env("JOURNAL_MAX_AGE_SECONDS", 3600)
 
     @classmethod
     def validate(cls) -> None:
@@ -70,6 +273,14 @@ class Config:
         """
         if not cls.DISCORD_TOKEN:
             raise ValueError("DISCORD_TOKEN environment variable not set.")
+        if cls.LOG_FORMAT not in ("text", "json"):
+            raise ValueError(f"LOG_FORMAT must be 'text' or 'json', got {cls.LOG_FORMAT!r}")
+        if cls.PARENT_LOCK_BACKEND not in ("memory", "sqlite"):
+            raise ValueError(
+                f"PARENT_LOCK_BACKEND must be 'memory' or 'sqlite', got {cls.PARENT_LOCK_BACKEND!r}"
+            )
+        if cls.SHARD_IDS and not (cls.SHARDING_ENABLED and cls.SHARD_COUNT > 0):
+            raise ValueError("SHARD_IDS requires SHARDING_ENABLED=true and an explicit SHARD_COUNT")
 
     @classmethod
     def get_thread_name(cls, original_message_content: str) -> str:
@@ -87,24 +298,25 @@ class Config:
 
         # Normalize and strip invisible control/format characters first so
         # tokenization below cannot be fooled by zero-width joins.
-        normalized = unicodedata.normalize('NFKC', original_message_content)
-        normalized = _CONTROL_CHARS_RE.sub('', normalized)
-        normalized = _EVERYONE_RE.sub('', normalized)
+        normalized = unicodedata.normalize("NFKC", original_message_content)
+        normalized = _CONTROL_CHARS_RE.sub("", normalized)
+        normalized = _EVERYONE_RE.sub("", normalized)
 
         # Remove mentions, links, and other Discord formatting tokens.
-        cleaned = ' '.join(
-            word for word in normalized.split()
+        cleaned = " ".join(
+            word
+            for word in normalized.split()
             if not (
-                word.startswith(('<@', '<#', 'http://', 'https://')) or
-                (word.startswith('||') and word.endswith('||')) or
-                (word.startswith('`') and word.endswith('`'))
+                word.startswith(("<@", "<#", "http://", "https://"))
+                or (word.startswith("||") and word.endswith("||"))
+                or (word.startswith("`") and word.endswith("`"))
             )
         )
 
-        cleaned = _WHITESPACE_RE.sub(' ', cleaned).strip()
+        cleaned = _WHITESPACE_RE.sub(" ", cleaned).strip()
 
         # Truncate to Discord's limit
         if len(cleaned) > cls.MAX_THREAD_NAME_LENGTH:
-            cleaned = cleaned[:cls.MAX_THREAD_NAME_LENGTH - 3] + "..."
+            cleaned = cleaned[: cls.MAX_THREAD_NAME_LENGTH - 3] + "..."
 
         return cleaned or "Discussion Thread"
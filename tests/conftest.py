@@ -2,7 +2,21 @@
 
 import os
 
+import discord
+import pytest
+from discord.gateway import DiscordWebSocket
+
 # bot.py / config.py read DISCORD_TOKEN at import time via load_dotenv.
 # Tests don't talk to Discord, but Config.validate() refuses to load
 # without one, so seed a placeholder before any test module imports bot.
 os.environ.setdefault("DISCORD_TOKEN", "test-token")
+
+
+@pytest.fixture
+def endpoints():
+    """Restore discord.py's endpoints after a test repoints them."""
+    rest, webhooks = discord.http.Route.BASE, discord.webhook.async_.Route.BASE
+    gateway = DiscordWebSocket.DEFAULT_GATEWAY
+    yield
+    discord.http.Route.BASE, discord.webhook.async_.Route.BASE = rest, webhooks
+    DiscordWebSocket.DEFAULT_GATEWAY = gateway
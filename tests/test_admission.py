@@ -0,0 +1,91 @@
+"""Tests for threadit.admission.FreshnessPolicy and its use in the orchestrator."""
+
+from __future__ import annotations
+
+import logging
+from datetime import UTC, datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+import discord
+import pytest
+
+from threadit.admission import Admission, FreshnessPolicy
+from threadit.metrics import Metrics
+from threadit.orchestrator import ThreadingOrchestrator
+from threadit.permissions import PermissionsService
+
+NOW = datetime(2025, 1, 1, 12, 0, tzinfo=UTC)
+
+
+def policy(downgrade: float | None = 60, shed: float | None = 300) -> FreshnessPolicy:
+    return FreshnessPolicy(downgrade_after=downgrade, shed_after=shed, clock=lambda: NOW)
+
+
+class TestFreshnessPolicy:
+    @pytest.mark.parametrize(
+        ("age", "expected"),
+        [
+            (5, Admission.FULL),
+            (60, Admission.FULL),
+            (61, Admission.DOWNGRADE),
+            (300, Admission.DOWNGRADE),
+            (301, Admission.SHED),
+        ],
+    )
+    def test_tiers(self, age, expected):
+        assert policy().classify(age) is expected
+
+    def test_age_from_created_at(self):
+        assert policy().age(NOW - timedelta(seconds=90)) == 90
+
+    def test_disabled_tiers(self):
+        assert policy(downgrade=None).classify(200) is Admission.FULL
+        assert policy(shed=None).classify(10_000) is Admission.DOWNGRADE
+
+    def test_rejects_inverted_thresholds(self):
+        with pytest.raises(ValueError):
+            policy(downgrade=600, shed=300)
+
+
+class TestOrchestratorAdmission:
+    @pytest.fixture
+    def setup(self):
+        perms = PermissionsService(
+            get_self_id=lambda: 999,
+            get_client_id=lambda: "999",
+            logger=logging.getLogger("test-perms"),
+        )
+        perms.validate_permissions = MagicMock(return_value=(False, ["Embed Links"], []))  # type: ignore[method-assign]
+        perms.send_permission_error_message = AsyncMock()  # type: ignore[method-assign]
+        metrics = Metrics()
+        orchestrator = ThreadingOrchestrator(
+            permissions=perms,
+            logger=logging.getLogger("test-orchestrator"),
+            metrics=metrics,
+            freshness=policy(),
+        )
+        message = MagicMock()
+        message.reference = MagicMock(message_id=1)
+        message.channel = MagicMock(spec=discord.TextChannel)
+        return orchestrator, perms, metrics, message
+
+    async def test_stale_reply_is_shed_before_any_work(self, setup):
+        orchestrator, perms, metrics, message = setup
+        message.created_at = NOW - timedelta(minutes=10)
+        await orchestrator.process(message)
+        perms.validate_permissions.assert_not_called()
+        assert metrics.counter("replies_shed_total", action="shed") == 1
+
+    async def test_bypass_processes_stale_reply(self, setup):
+        orchestrator, perms, metrics, message = setup
+        message.created_at = NOW - timedelta(minutes=10)
+        await orchestrator.process(message, enforce_freshness=False)
+        perms.validate_permissions.assert_called_once()
+        assert metrics.counter("replies_shed_total", action="shed") == 0
+
+    async def test_downgraded_cleanup_skips_notification(self, setup):
+        orchestrator, perms, _, _ = setup
+        perms.check_specific_permission = MagicMock(return_value=False)  # type: ignore[method-assign]
+        orchestrator.send_temporary_notification = AsyncMock()  # type: ignore[method-assign]
+        await orchestrator.cleanup_messages(MagicMock(), MagicMock(), notify=False)
+        orchestrator.send_temporary_notification.assert_not_awaited()
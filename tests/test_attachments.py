@@ -16,8 +16,9 @@ def logger() -> logging.Logger:
     return logging.getLogger("test-attachments")
 
 
-def _attachment(filename: str, size: int, read_data: bytes | None = None,
-                read_exc: Exception | None = None):
+def _attachment(
+    filename: str, size: int, read_data: bytes | None = None, read_exc: Exception | None = None
+):
     att = MagicMock(spec=discord.Attachment)
     att.filename = filename
     att.size = size
@@ -66,3 +67,22 @@ class TestBuildAttachmentFiles:
         assert ok is False
         assert len(files) == 1
         assert files[0].filename == "ok.txt"
+
+    async def test_oversize_image_downscaled_when_a_transcoder_accepts_it(self, logger):
+        photo = _attachment("photo.png", 30 * 1024 * 1024)
+        clip = _attachment("clip.mp4", 30 * 1024 * 1024)
+        transcoder = MagicMock()
+        transcoder.accepts.side_effect = lambda att: att is photo
+        transcoder.shrink_attachment = AsyncMock(return_value=(b"jpeg", "photo.jpg"))
+        files, ok = await build_attachment_files(
+            [photo, clip], max_bytes=MAX, logger=logger, transcoder=transcoder
+        )
+        assert [f.filename for f in files] == ["photo.jpg"]
+        assert ok is False  # the clip still couldn't be reposted
+        clip.read.assert_not_called()
+
+        transcoder.shrink_attachment.return_value = None  # pool full, or it wouldn't fit
+        files, ok = await build_attachment_files(
+            [photo], max_bytes=MAX, logger=logger, transcoder=transcoder
+        )
+        assert files == [] and ok is False
@@ -0,0 +1,180 @@
+"""Tests for threadit.backfill (batch planning, checkpoints, and a run against the fake)."""
+
+from __future__ import annotations
+
+import logging
+from datetime import UTC, datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+import discord
+
+import bot
+from benchmarks.fakediscord import FakeDiscord, FaultProfile
+from threadit.backfill import (
+    MAX_EMBEDS_PER_MESSAGE,
+    Backfiller,
+    ChannelCheckpoint,
+    CheckpointStore,
+    plan_batches,
+)
+from threadit.metrics import Metrics
+from threadit.orchestrator import ThreadingOrchestrator
+from threadit.permissions import PermissionsService
+from threadit.shadow import ShadowMode
+from threadit.types import ReplyInfo
+
+log = logging.getLogger("test-backfill")
+
+
+def _info(message_id: int, *, content: str = "hi", embeds: int = 0, files: int = 0) -> ReplyInfo:
+    author = MagicMock()
+    author.display_name = "user"
+    author.display_avatar.url = "https://cdn.example/a.png"
+    return ReplyInfo(
+        content=content,
+        author=author,
+        attachments=[MagicMock(spec=discord.Attachment) for _ in range(files)],
+        embeds=[discord.Embed(title=f"embed {i}") for i in range(embeds)],
+        channel=MagicMock(spec=discord.TextChannel),
+        parent_message=MagicMock(spec=discord.Message),
+        message_id=message_id,
+        created_at=datetime.now(UTC),
+    )
+
+
+class TestPlanBatches:
+    def test_packs_replies_up_to_the_embed_cap(self):
+        replies = [_info(i) for i in range(MAX_EMBEDS_PER_MESSAGE + 3)]
+        batches = plan_batches(replies)
+        assert [len(b) for b in batches] == [MAX_EMBEDS_PER_MESSAGE, 3]
+        assert [i.message_id for b in batches for i in b] == list(range(len(replies)))
+
+    def test_counts_a_replys_own_embeds(self):
+        batches = plan_batches([_info(1, embeds=5), _info(2, embeds=4), _info(3)])
+        assert [[i.message_id for i in b] for b in batches] == [[1], [2, 3]]
+
+    def test_splits_on_characters(self):
+        batches = plan_batches([_info(i, content="x" * 2500) for i in range(3)])
+        assert [len(b) for b in batches] == [2, 1]
+
+    def test_replies_with_attachments_go_alone_and_keep_order(self):
+        batches = plan_batches([_info(1), _info(2, files=1), _info(3)])
+        assert [[i.message_id for i in b] for b in batches] == [[1], [2], [3]]
+
+
+def test_checkpoint_store_roundtrip_and_unreadable_file(tmp_path):
+    store = CheckpointStore(tmp_path / "data" / "cp.json", logger=log)
+    assert store.load() == {}
+    store.save({5: ChannelCheckpoint(until=9, after=3, converted=2)})
+    assert store.load() == {5: ChannelCheckpoint(until=9, after=3, converted=2)}
+
+    store.path.write_text("{not json", encoding="utf-8")
+    assert store.load() == {}
+
+
+async def test_backfill_converts_history_grouped_by_parent_and_resumes(endpoints, tmp_path):
+    fake = FakeDiscord(faults=FaultProfile(latency=0), parents=2)
+    await fake.start()
+    bot.use_discord_endpoints(fake.api_url, fake.gateway_url)
+    day, author = 86400.0, 5 * 10**17
+
+    def reply(parent: int, age: float, *, by: int = author, **shape) -> int:
+        return int(fake.reply_payload(0, 0, parent, author_id=by, age=age, **shape)["id"])
+
+    handled = reply(0, 30 * day)  # a previous run's last page
+    old = reply(0, 20 * day)  # too old to bulk delete
+    grouped = [reply(0, day / 12, by=author + i % 2) for i in range(3)]
+    with_files = reply(1, day / 12, attachments=(2000,))
+    newer = reply(0, 0)  # after the first run started: the live bot's
+    _, channel_id, first_parent = fake.target(0, 0, 0)
+    second_parent = fake.target(0, 0, 1)[2]
+
+    store = CheckpointStore(tmp_path / "cp.json", logger=log)
+    started = discord.utils.time_snowflake(datetime.now(UTC) - timedelta(minutes=30))
+    store.save({channel_id: ChannelCheckpoint(until=started, after=handled)})
+
+    metrics = Metrics()
+    client = bot.build_bot()
+    try:
+        await client.login("fake-token")
+        state = client._connection
+        for payload in fake.guild_payloads():
+            state._add_guild_from_data(payload)  # type: ignore[arg-type]
+        permissions = PermissionsService(
+            get_self_id=lambda: client.user.id if client.user else None,
+            get_client_id=lambda: "1",
+            logger=log,
+        )
+        orchestrator = ThreadingOrchestrator(permissions=permissions, logger=log, metrics=metrics)
+        channel = client.get_channel(channel_id)
+        assert isinstance(channel, discord.TextChannel)
+
+        def backfiller() -> Backfiller:
+            return Backfiller(
+                orchestrator,
+                store,
+                calls_per_second=1000,
+                concurrency=2,
+                metrics=metrics,
+                logger=log,
+            )
+
+        orchestrator.shadow = ShadowMode([channel.guild.id], metrics=metrics)
+        assert await backfiller().run([channel]) == 0  # shadowed guild: left alone
+        orchestrator.shadow = None
+
+        fake.reset_stats()
+        assert await backfiller().run([channel]) == 5
+        assert await backfiller().run([channel]) == 0  # checkpoint says done
+    finally:
+        await client.close()
+        await fake.stop()
+
+    for gone in (old, *grouped, with_files):
+        assert gone not in fake._messages
+    for kept in (handled, newer):
+        assert kept in fake._messages
+    assert {first_parent, second_parent} <= set(fake._threads)
+    calls = fake.stats.calls
+    # One batched repost for the four text replies, one upload for the file.
+    assert calls["POST /api/v10/channels/{channel_id}/messages"] == 2
+    # The three recent text replies go in one bulk delete; the 20-day-old
+    # one and the lone file reply are deleted individually.
+    assert calls["POST /api/v10/channels/{channel_id}/messages/bulk-delete"] == 1
+    assert calls["DELETE /api/v10/channels/{channel_id}/messages/{message_id}"] == 2
+    # Each author once per thread: two in the batch, one with the file.
+    assert calls["PUT /api/v10/channels/{channel_id}/thread-members/{user_id}"] == 3
+    assert metrics.counter("backfill_replies_total", outcome="converted") == 5
+    assert store.load()[channel_id] == ChannelCheckpoint(
+        until=started, after=with_files, converted=5, done=True
+    )
+
+
+async def test_failed_bulk_delete_falls_back_to_one_by_one():
+    channel = MagicMock(spec=discord.TextChannel)
+    channel.name = "general"
+    channel.delete_messages = AsyncMock(
+        side_effect=discord.NotFound(MagicMock(status=404), "Unknown Message")
+    )
+    messages = []
+    for i in range(3):
+        message = MagicMock(spec=discord.Message)
+        message.id = i
+        message.created_at = datetime.now(UTC)
+        message.delete = AsyncMock()
+        messages.append(message)
+    messages[1].delete.side_effect = discord.NotFound(MagicMock(status=404), "gone")
+    backfiller = Backfiller(
+        MagicMock(),
+        MagicMock(),
+        calls_per_second=1000,
+        concurrency=1,
+        metrics=Metrics(),
+        logger=log,
+    )
+
+    await backfiller._delete(channel, messages)
+
+    channel.delete_messages.assert_awaited_once_with(messages)
+    for message in messages:
+        message.delete.assert_awaited_once()
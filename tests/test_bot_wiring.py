@@ -50,6 +50,25 @@ class TestBuildBot:
         assert b.allowed_mentions is not None
         assert b.allowed_mentions.everyone is False
 
+    def test_lean_profile_drops_caches_but_keeps_required_intents(self):
+        import discord
+
+        b = bot.build_bot(lean=True)
+        assert b._connection.max_messages is None
+        assert b._connection.member_cache_flags == discord.MemberCacheFlags.none()
+        assert b._connection._chunk_guilds is False
+        assert b.intents.voice_states is False
+        assert b.intents.message_content is True
+        assert b.intents.guild_messages is True
+
+    def test_sharded_worker_builds_auto_sharded_bot(self):
+        from discord.ext import commands
+
+        b = bot.build_bot(sharded=True, shard_count=4, shard_ids=[2, 3])
+        assert isinstance(b, commands.AutoShardedBot)
+        assert b.shard_count == 4
+        assert b.shard_ids == [2, 3]
+
     async def test_cog_loads_and_registers_thread_it_command(self):
         b = bot.build_bot()
         cog = _wire(b)
@@ -62,6 +81,16 @@ class TestBuildBot:
         assert "thread-it" in slash_names, f"slash command missing; tree has {slash_names}"
         await b.close()
 
+    async def test_thread_it_group_has_help_and_stats_subcommands(self):
+        b = bot.build_bot()
+        await b.add_cog(_wire(b))
+
+        assert b.get_command("thread-it stats") is not None
+        group = b.tree.get_command("thread-it")
+        assert group is not None
+        assert {c.name for c in group.walk_commands()} == {"help", "stats"}
+        await b.close()
+
     @pytest.mark.parametrize("listener_name", ["on_message", "on_ready", "on_guild_join"])
     async def test_cog_listeners_are_registered(self, listener_name):
         b = bot.build_bot()
@@ -70,7 +99,11 @@ class TestBuildBot:
 
         listeners = b.extra_events.get(listener_name, [])
         assert any(
-            getattr(coro, "__qualname__", "").startswith("ThreadItCog.")
-            for coro in listeners
+            getattr(coro, "__qualname__", "").startswith("ThreadItCog.") for coro in listeners
         ), f"ThreadItCog.{listener_name} not registered (have: {listeners})"
         await b.close()
+
+
+@pytest.mark.parametrize("burst, refill", [(0, 10), (5, 0)])
+def test_zero_burst_or_refill_disables_token_bucket(burst, refill):
+    assert bot._token_buckets(burst, refill) is None
@@ -0,0 +1,289 @@
+"""Tests for threadit.catchup (watermarks, and catching up against the fake)."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from unittest.mock import AsyncMock, MagicMock
+
+import discord
+import pytest
+
+import bot
+from benchmarks.fakediscord import FakeDiscord, FaultProfile
+from threadit.admission import FreshnessPolicy
+from threadit.catchup import MAX_HOLDS_PER_CHANNEL, CatchUp, WatermarkStore
+from threadit.cog import ThreadItCog
+from threadit.metrics import Metrics
+from threadit.orchestrator import ThreadingOrchestrator
+from threadit.permissions import PermissionsService
+
+log = logging.getLogger("test-catchup")
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _catchup(store: WatermarkStore, orchestrator=None, **kwargs) -> CatchUp:
+    if orchestrator is None:
+        orchestrator = MagicMock(freshness=None)
+    return CatchUp(
+        store,
+        orchestrator,
+        calls_per_second=1000,
+        max_age_seconds=kwargs.pop("max_age_seconds", 0),
+        metrics=Metrics(),
+        logger=log,
+        **kwargs,
+    )
+
+
+def test_watermark_store_roundtrip_and_unreadable_file(tmp_path):
+    store = WatermarkStore(tmp_path / "data" / "marks.json", logger=log)
+    assert store.load() == {}
+    store.save({1: 100, 2: 200})
+    assert store.load() == {1: 100, 2: 200}
+
+    store.path.write_text("[1, 2]", encoding="utf-8")
+    assert store.load() == {}
+
+
+def test_marks_only_move_forward_and_are_flushed_periodically(tmp_path):
+    store = WatermarkStore(tmp_path / "marks.json", logger=log)
+    clock = FakeClock()
+    catchup = _catchup(store, flush_seconds=30, clock=clock)
+
+    catchup.observe(1, 100)
+    catchup.observe(1, 90)  # out of order: keeps 100
+    assert store.load() == {}
+    clock.now += 30
+    catchup.observe(2, 5)
+    assert store.load() == {1: 100, 2: 5}
+
+
+async def test_cog_observes_channel_messages_and_starts_catch_up_on_ready(tmp_path):
+    catchup = _catchup(WatermarkStore(tmp_path / "marks.json", logger=log))
+    catchup.start = MagicMock()  # type: ignore[method-assign]
+    orchestrator = MagicMock(freshness=None)
+    orchestrator.process = AsyncMock()
+    client = MagicMock(command_prefix="!")
+    client.change_presence = AsyncMock()
+    cog = ThreadItCog(
+        client,
+        orchestrator,
+        MagicMock(),
+        get_client_id=lambda: "1",
+        logger=log,
+        catchup=catchup,
+    )
+    message = MagicMock()
+    message.id = 42
+    message.author.bot = True
+    message.channel = MagicMock(spec=discord.TextChannel)
+    message.channel.id = 7
+
+    await cog.on_message(message)
+    await cog.on_ready()
+
+    assert catchup._marks == {7: 42}
+    catchup.start.assert_called_once_with(client.get_channel)
+
+
+async def test_reply_turned_away_while_draining_stays_behind_the_mark(tmp_path):
+    store = WatermarkStore(tmp_path / "marks.json", logger=log)
+    catchup = _catchup(store)
+    orchestrator = ThreadingOrchestrator(permissions=MagicMock(), logger=log)
+    await orchestrator.drain(timeout=0)
+    cog = ThreadItCog(
+        MagicMock(command_prefix="!"),
+        orchestrator,
+        MagicMock(),
+        get_client_id=lambda: "1",
+        logger=log,
+        catchup=catchup,
+    )
+    channel = MagicMock(spec=discord.TextChannel)
+    channel.id = 7
+
+    def message(message_id: int, *, bot: bool) -> MagicMock:
+        msg = MagicMock()
+        msg.id = message_id
+        msg.author.bot = bot
+        msg.content = "hi"
+        msg.channel = channel
+        return msg
+
+    await cog.on_message(message(40, bot=True))
+    await cog.on_message(message(42, bot=False))  # a reply, rejected by the drain
+    await cog.on_message(message(50, bot=True))
+    catchup.flush()
+
+    assert orchestrator.metrics.counter("replies_rejected_total", reason="draining") == 1
+    assert store.load() == {7: 41}
+
+
+async def test_rate_limited_reply_is_done_with_and_moves_the_mark(tmp_path):
+    store = WatermarkStore(tmp_path / "marks.json", logger=log)
+    catchup = _catchup(store)
+    orchestrator = MagicMock(freshness=None)
+    orchestrator.process = AsyncMock(return_value=True)
+    limiter = MagicMock()
+    limiter.allow.return_value = False
+    cog = ThreadItCog(
+        MagicMock(command_prefix="!"),
+        orchestrator,
+        MagicMock(),
+        get_client_id=lambda: "1",
+        logger=log,
+        rate_limiter=limiter,
+        catchup=catchup,
+    )
+    reply = MagicMock()
+    reply.id = 42
+    reply.author.bot = False
+    reply.content = "spam"
+    reply.channel = MagicMock(spec=discord.TextChannel)
+    reply.channel.id = 7
+
+    await cog.on_message(reply)
+    catchup.flush()
+
+    orchestrator.process.assert_not_called()
+    assert store.load() == {7: 42}
+
+
+async def test_catch_up_goes_through_the_rate_limiter(tmp_path):
+    channel = MagicMock(spec=discord.TextChannel)
+    channel.id = 7
+    replies = []
+    for message_id in (20, 30):
+        message = MagicMock(spec=discord.Message)
+        message.id = message_id
+        message.type = discord.MessageType.reply
+        message.author.bot = False
+        message.author.id = message_id
+        message.channel = channel
+        message.reference = MagicMock(message_id=1, channel_id=7)
+        replies.append(message)
+
+    async def history(**_):
+        for message in replies:
+            yield message
+
+    channel.history = history
+    orchestrator = MagicMock(freshness=None)
+    orchestrator.process = AsyncMock(return_value=True)
+    limiter = MagicMock()
+    limiter.allow.side_effect = lambda user_id, _: user_id != 20
+    store = WatermarkStore(tmp_path / "marks.json", logger=log)
+    store.save({7: 10})
+    catchup = _catchup(store, orchestrator, rate_limiter=limiter)
+
+    assert await catchup.run(lambda _: channel) == 1
+    orchestrator.process.assert_awaited_once_with(replies[1])
+    catchup.flush()
+    assert store.load() == {7: 30}
+
+
+def test_holds_per_channel_are_capped(tmp_path):
+    catchup = _catchup(WatermarkStore(tmp_path / "marks.json", logger=log))
+    for message_id in range(1, MAX_HOLDS_PER_CHANNEL + 2):
+        catchup.hold(7, message_id)
+    catchup.release(7, MAX_HOLDS_PER_CHANNEL + 1)
+    assert len(catchup._holds[7]) == MAX_HOLDS_PER_CHANNEL - 1
+    assert catchup._stored_mark(7, catchup._marks[7]) == 1  # message 1 given up
+
+
+async def test_cut_short_run_keeps_the_stored_mark_at_its_progress(tmp_path):
+    channel = MagicMock(spec=discord.TextChannel)
+    channel.id = 7
+
+    def reply(message_id: int) -> MagicMock:
+        message = MagicMock(spec=discord.Message)
+        message.id = message_id
+        message.type = discord.MessageType.reply
+        message.author.bot = False
+        message.channel = channel
+        message.reference = MagicMock(message_id=1, channel_id=7)
+        return message
+
+    async def history(**_):
+        for message_id in (20, 30):
+            yield reply(message_id)
+
+    channel.history = history
+    orchestrator = MagicMock(freshness=None)
+    orchestrator.process = AsyncMock(side_effect=[True, asyncio.CancelledError()])
+    store = WatermarkStore(tmp_path / "marks.json", logger=log)
+    store.save({7: 10})
+    catchup = _catchup(store, orchestrator)
+
+    with pytest.raises(asyncio.CancelledError):
+        await catchup.run(lambda _: channel)
+    catchup.observe(7, 99)  # live traffic after the restart
+    await catchup.close()
+    assert store.load() == {7: 20}
+    # The next run resumes from there, not from the live mark.
+    orchestrator.process = AsyncMock(return_value=True)
+    await catchup.run(lambda _: channel)
+    catchup.flush()
+    assert store.load() == {7: 99}
+
+
+@pytest.mark.parametrize(
+    ("max_age_seconds", "shed_after", "expected"), [(0, None, 2), (600, None, 0), (0, 600, 0)]
+)
+async def test_missed_replies_after_the_mark_are_converted(
+    endpoints, tmp_path, max_age_seconds, shed_after, expected
+):
+    fake = FakeDiscord(faults=FaultProfile(latency=0))
+    await fake.start()
+    bot.use_discord_endpoints(fake.api_url, fake.gateway_url)
+    author = 5 * 10**17
+
+    def reply(age: float) -> int:
+        return int(fake.reply_payload(0, 0, 0, author_id=author, age=age)["id"])
+
+    seen = reply(3600)  # converted (or left) before the restart
+    missed = [reply(1800), reply(1700)]  # posted while the bot was down
+    _, channel_id, _ = fake.target(0, 0, 0)
+    store = WatermarkStore(tmp_path / "marks.json", logger=log)
+    store.save({channel_id: seen, 123: 456})  # plus a channel the bot can't see
+
+    metrics = Metrics()
+    client = bot.build_bot()
+    try:
+        await client.login("fake-token")
+        state = client._connection
+        for payload in fake.guild_payloads():
+            state._add_guild_from_data(payload)  # type: ignore[arg-type]
+        permissions = PermissionsService(
+            get_self_id=lambda: client.user.id if client.user else None,
+            get_client_id=lambda: "1",
+            logger=log,
+        )
+        orchestrator = ThreadingOrchestrator(
+            permissions=permissions,
+            logger=log,
+            metrics=metrics,
+            freshness=FreshnessPolicy(downgrade_after=None, shed_after=shed_after),
+        )
+        catchup = _catchup(store, orchestrator, max_age_seconds=max_age_seconds)
+        assert await catchup.run(client.get_channel) == expected
+        await orchestrator.drain(timeout=5)  # fire the deferred notification deletes
+        await catchup.close()
+    finally:
+        await client.close()
+        await fake.stop()
+
+    assert seen in fake._messages
+    for message_id in missed:
+        assert (message_id in fake._messages) == (expected == 0)
+    marks = store.load()
+    assert marks[123] == 456
+    assert marks[channel_id] > missed[-1]  # the parent, posted "now"
@@ -0,0 +1,180 @@
+"""Tests for threadit.circuit.CircuitBreaker and its orchestrator wiring."""
+
+from __future__ import annotations
+
+import logging
+from unittest.mock import AsyncMock, MagicMock
+
+import discord
+import pytest
+
+from threadit.circuit import CircuitBreaker, CircuitState
+from threadit.metrics import Metrics
+from threadit.orchestrator import ThreadingOrchestrator
+from threadit.permissions import PermissionsService
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def breaker(clock) -> CircuitBreaker:
+    return CircuitBreaker(
+        failure_threshold=3,
+        guild_failure_threshold=5,
+        open_seconds=60,
+        logger=logging.getLogger("test-circuit"),
+        metrics=Metrics(),
+        clock=clock,
+    )
+
+
+class TestCircuitBreaker:
+    def test_opens_after_threshold_and_short_circuits(self, breaker):
+        for _ in range(2):
+            breaker.record_failure(1, 10, "forbidden")
+        assert breaker.allow(1, 10) is True
+        breaker.record_failure(1, 10, "forbidden")
+        assert breaker.channel_state(1) is CircuitState.OPEN
+        assert breaker.allow(1, 10) is False
+        assert breaker.allow(2, 10) is True, "other channels in the guild unaffected"
+        assert breaker.metrics.counter("circuit_short_circuits_total", scope="channel") == 1
+
+    def test_success_resets_failure_count(self, breaker):
+        breaker.record_failure(1, 10, "forbidden")
+        breaker.record_failure(1, 10, "forbidden")
+        breaker.record_success(1, 10)
+        breaker.record_failure(1, 10, "forbidden")
+        assert breaker.channel_state(1) is CircuitState.CLOSED
+
+    def test_half_open_allows_single_probe(self, breaker, clock):
+        for _ in range(3):
+            breaker.record_failure(1, 10, "forbidden")
+        clock.now += 61
+        assert breaker.channel_state(1) is CircuitState.HALF_OPEN
+        assert breaker.allow(1, 10) is True
+        assert breaker.allow(1, 10) is False, "only one probe at a time"
+
+    def test_failed_probe_reopens_successful_probe_closes(self, breaker, clock):
+        for _ in range(3):
+            breaker.record_failure(1, 10, "forbidden")
+        clock.now += 61
+        breaker.allow(1, 10)
+        breaker.record_failure(1, 10, "forbidden")
+        assert breaker.channel_state(1) is CircuitState.OPEN
+
+        clock.now += 61
+        breaker.allow(1, 10)
+        breaker.record_success(1, 10)
+        assert breaker.channel_state(1) is CircuitState.CLOSED
+        assert breaker.open_count == 0
+
+    def test_abandoned_probe_does_not_wedge_circuit(self, breaker, clock):
+        for _ in range(3):
+            breaker.record_failure(1, 10, "forbidden")
+        clock.now += 61
+        assert breaker.allow(1, 10) is True  # probe never reports back
+        clock.now += 61
+        assert breaker.allow(1, 10) is True
+
+    def test_guild_opens_across_channels(self, breaker):
+        for channel_id in range(5):
+            breaker.record_failure(channel_id, 10, "forbidden")
+        assert breaker.guild_state(10) is CircuitState.OPEN
+        assert breaker.allow(99, 10) is False, "untouched channel blocked by guild circuit"
+
+    def test_one_failing_channel_never_opens_its_guild(self, breaker):
+        for _ in range(4):
+            for _ in range(3):
+                breaker.record_failure(1, 10, "missing permissions")
+            breaker.reset_channel(1)  # an overwrite edit that didn't help
+        assert breaker.guild_state(10) is CircuitState.CLOSED
+        assert breaker.allow(2, 10) is True
+
+    def test_idle_circuits_expire(self, breaker, clock):
+        breaker.record_failure(1, 10, "forbidden")
+        breaker.record_failure(1, 10, "forbidden")
+        clock.now += 600  # ten times open_seconds
+        breaker.record_failure(2, 20, "forbidden")  # sweeps
+        assert 1 not in breaker._channels and 10 not in breaker._guilds
+        breaker.record_failure(1, 10, "forbidden")
+        assert breaker.channel_state(1) is CircuitState.CLOSED, "the count started over"
+
+    def test_open_channel_probes_do_not_count_toward_guild(self, breaker, clock):
+        for _ in range(3):
+            breaker.record_failure(1, 10, "forbidden")
+        for _ in range(5):
+            clock.now += 61
+            assert breaker.allow(1, 10) is True
+            breaker.record_failure(1, 10, "forbidden")
+        assert breaker.channel_state(1) is CircuitState.OPEN
+        assert breaker.guild_state(10) is CircuitState.CLOSED
+        assert breaker.allow(2, 10) is True
+
+    def test_open_channel_does_not_take_guild_probe(self, breaker, clock):
+        for channel_id in range(5):
+            breaker.record_failure(channel_id, 10, "forbidden")
+        for _ in range(2):
+            breaker.record_failure(0, 10, "forbidden")  # channel 0 opens too
+        clock.now += 61
+        breaker.record_failure(0, 10, "forbidden")  # channel 0 reopens, 61s to go
+        assert breaker.guild_state(10) is CircuitState.HALF_OPEN
+        assert breaker.allow(0, 10) is False
+        assert breaker.allow(1, 10) is True, "the guild's probe is still free"
+
+    def test_reset_guild_clears_its_channels(self, breaker):
+        for _ in range(3):
+            breaker.record_failure(1, 10, "forbidden")
+            breaker.record_failure(2, 20, "forbidden")
+        breaker.reset_guild(10)
+        assert breaker.allow(1, 10) is True
+        assert breaker.allow(2, 20) is False
+
+    def test_reset_channel(self, breaker):
+        for _ in range(3):
+            breaker.record_failure(1, 10, "forbidden")
+        breaker.reset_channel(1)
+        assert breaker.allow(1, 10) is True
+
+
+class TestOrchestratorShortCircuit:
+    async def test_open_circuit_skips_permission_checks(self, breaker):
+        perms = PermissionsService(
+            get_self_id=lambda: 999,
+            get_client_id=lambda: "999",
+            logger=logging.getLogger("test-perms"),
+        )
+        perms.validate_permissions = MagicMock(return_value=(False, ["Embed Links"], []))  # type: ignore[method-assign]
+        perms.send_permission_error_message = AsyncMock()  # type: ignore[method-assign]
+        orchestrator = ThreadingOrchestrator(
+            permissions=perms,
+            logger=logging.getLogger("test-orchestrator"),
+            breaker=breaker,
+        )
+
+        def reply(message_id: int):
+            message = MagicMock()
+            message.id = message_id
+            message.reference = MagicMock(message_id=1)
+            message.channel = MagicMock(spec=discord.TextChannel)
+            message.channel.id = 5
+            message.channel.guild.id = 50
+            return message
+
+        for i in range(10):
+            await orchestrator.process(reply(i))
+
+        # Three failures open the circuit; the remaining seven replies never
+        # reach validate_permissions or the warning cooldown check.
+        assert perms.validate_permissions.call_count == 3
+        assert perms.send_permission_error_message.await_count == 3
@@ -0,0 +1,127 @@
+"""Tests for threadit.cluster (shard splitting, heartbeat, supervisor)."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+
+import pytest
+
+from threadit.cluster import ClusterSupervisor, Heartbeat, parse_shard_ids, split_shards
+
+
+class TestParseShardIds:
+    def test_empty_means_all(self):
+        assert parse_shard_ids("") is None
+        assert parse_shard_ids("  ") is None
+
+    def test_lists_and_ranges(self):
+        assert parse_shard_ids("0, 4-6,2,5") == [0, 2, 4, 5, 6]
+
+    @pytest.mark.parametrize("raw", ["a", "3-1", "1-", "1,,2"])
+    def test_rejects_garbage(self, raw):
+        with pytest.raises(ValueError, match="SHARD_IDS"):
+            parse_shard_ids(raw)
+
+
+class TestSplitShards:
+    def test_even_and_uneven_splits(self):
+        assert split_shards(4, 2) == [[0, 1], [2, 3]]
+        assert split_shards(5, 2) == [[0, 1, 2], [3, 4]]
+
+    def test_never_more_workers_than_shards(self):
+        assert split_shards(2, 8) == [[0], [1]]
+
+    def test_covers_every_shard_once(self):
+        ranges = split_shards(37, 6)
+        assert sorted(s for r in ranges for s in r) == list(range(37))
+
+    def test_rejects_zero(self):
+        with pytest.raises(ValueError):
+            split_shards(0, 1)
+
+
+async def test_heartbeat_touches_file(tmp_path):
+    path = tmp_path / "hb" / "worker-0.alive"
+    beat = Heartbeat(path, interval=0.01)
+    beat.start()
+    await asyncio.sleep(0.03)
+    await beat.stop()
+    assert path.exists()
+
+
+async def test_unhealthy_heartbeat_does_not_touch(tmp_path):
+    path = tmp_path / "worker-0.alive"
+    beat = Heartbeat(path, interval=0.01, healthy=lambda: False)
+    beat.start()
+    await asyncio.sleep(0.03)
+    await beat.stop()
+    assert not path.exists()
+
+
+def _supervisor(tmp_path, script: str, **kwargs) -> ClusterSupervisor:
+    return ClusterSupervisor(
+        shard_count=2,
+        workers=2,
+        command=[sys.executable, "-c", script],
+        heartbeat_dir=tmp_path,
+        logger=logging.getLogger("test-cluster"),
+        base_backoff=0.01,
+        max_backoff=0.01,
+        stop_timeout=2,
+        **kwargs,
+    )
+
+
+class TestClusterSupervisor:
+    async def test_workers_get_their_shard_environment(self, tmp_path):
+        script = (
+            "import os, pathlib; "
+            "pathlib.Path(os.environ['CLUSTER_HEARTBEAT_FILE'] + '.env').write_text("
+            "os.environ['SHARD_COUNT'] + '/' + os.environ['SHARD_IDS'])"
+        )
+        sup = _supervisor(tmp_path, script, heartbeat_timeout=60)
+        for worker in sup.workers:
+            await sup._spawn(worker)
+        await asyncio.gather(*(w.process.wait() for w in sup.workers))
+        assert (tmp_path / "worker-0.alive.env").read_text() == "2/0"
+        assert (tmp_path / "worker-1.alive.env").read_text() == "2/1"
+
+    async def test_exited_worker_is_restarted(self, tmp_path):
+        sup = _supervisor(tmp_path, "pass", heartbeat_timeout=60)
+        worker = sup.workers[0]
+        await sup._spawn(worker)
+        first_pid = worker.process.pid
+        await worker.process.wait()
+        await sup.check()
+        assert worker.process is None and worker.restart_at is not None
+        await asyncio.sleep(0.02)
+        await sup.check()
+        assert worker.process is not None and worker.process.pid != first_pid
+        assert worker.failures == 1
+        await worker.process.wait()
+
+    async def test_stale_worker_is_terminated(self, tmp_path):
+        sup = _supervisor(tmp_path, "import time; time.sleep(30)", heartbeat_timeout=0.05)
+        worker = sup.workers[0]
+        await sup._spawn(worker)
+        proc = worker.process
+        await asyncio.sleep(0.1)
+        await sup.check()
+        assert proc.returncode is not None, "stale worker was not stopped"
+        assert worker.restart_at is not None
+        sup.stop()
+        await sup._terminate_all()
+
+    async def test_run_stops_all_workers(self, tmp_path):
+        sup = _supervisor(
+            tmp_path, "import time; time.sleep(30)", heartbeat_timeout=60, identify_interval=0
+        )
+        task = asyncio.create_task(sup.run())
+        await asyncio.sleep(0.2)
+        procs = [w.process for w in sup.workers]
+        assert all(p is not None and p.returncode is None for p in procs)
+        sup.stop()
+        await asyncio.wait_for(task, timeout=5)
+        assert all(p.returncode is not None for p in procs)
@@ -0,0 +1,76 @@
+"""Tests for threadit.commandsync (hash-gated slash-command sync)."""
+
+from __future__ import annotations
+
+import logging
+from unittest.mock import AsyncMock
+
+import discord
+import pytest
+from discord import app_commands
+
+from threadit.commandsync import CommandSyncer, command_tree_hash
+
+
+def _tree(description: str = "Help") -> app_commands.CommandTree:
+    client = discord.Client(intents=discord.Intents.none())
+    tree = app_commands.CommandTree(client)
+
+    @tree.command(name="thread-it", description=description)
+    async def thread_it(interaction: discord.Interaction) -> None:  # pragma: no cover
+        pass
+
+    tree.sync = AsyncMock(return_value=[object()])  # type: ignore[method-assign]
+    return tree
+
+
+def _syncer(tmp_path, *, force: bool = False) -> CommandSyncer:
+    return CommandSyncer(
+        state_path=tmp_path / "state" / "command-tree.sha256",
+        logger=logging.getLogger("test-commandsync"),
+        force=force,
+    )
+
+
+class TestCommandTreeHash:
+    def test_stable_for_identical_trees(self):
+        assert command_tree_hash(_tree(), 1) == command_tree_hash(_tree(), 1)
+
+    def test_changes_with_definition_or_application(self):
+        base = command_tree_hash(_tree(), 1)
+        assert command_tree_hash(_tree("Other help"), 1) != base
+        assert command_tree_hash(_tree(), 2) != base
+
+
+class TestCommandSyncer:
+    async def test_first_boot_syncs_and_records_hash(self, tmp_path):
+        tree = _tree()
+        assert await _syncer(tmp_path).sync(tree, 1) is True
+        tree.sync.assert_awaited_once()
+        stored = (tmp_path / "state" / "command-tree.sha256").read_text().strip()
+        assert stored == command_tree_hash(tree, 1)
+
+    async def test_unchanged_tree_skips_sync(self, tmp_path):
+        await _syncer(tmp_path).sync(_tree(), 1)
+        tree = _tree()
+        assert await _syncer(tmp_path).sync(tree, 1) is False
+        tree.sync.assert_not_awaited()
+
+    async def test_changed_tree_syncs_again(self, tmp_path):
+        await _syncer(tmp_path).sync(_tree(), 1)
+        tree = _tree("New help text")
+        assert await _syncer(tmp_path).sync(tree, 1) is True
+
+    async def test_force_syncs_unchanged_tree(self, tmp_path):
+        await _syncer(tmp_path).sync(_tree(), 1)
+        tree = _tree()
+        assert await _syncer(tmp_path, force=True).sync(tree, 1) is True
+        tree.sync.assert_awaited_once()
+
+    async def test_failed_sync_is_not_recorded(self, tmp_path):
+        tree = _tree()
+        tree.sync = AsyncMock(side_effect=RuntimeError("429"))  # type: ignore[method-assign]
+        syncer = _syncer(tmp_path)
+        with pytest.raises(RuntimeError):
+            await syncer.sync(tree, 1)
+        assert not syncer.state_path.exists()
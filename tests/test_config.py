@@ -53,10 +53,7 @@ class TestGetThreadName:
         assert result.endswith("...")
 
     def test_only_stripped_tokens_returns_fallback(self):
-        assert (
-            config.Config.get_thread_name("<@123> https://x.com `code`")
-            == "Discussion Thread"
-        )
+        assert config.Config.get_thread_name("<@123> https://x.com `code`") == "Discussion Thread"
 
 
 class TestIntEnv:
@@ -101,3 +98,49 @@ class TestDotenvOrdering:
         # Force fresh evaluation of module-level os.getenv.
         reloaded = importlib.reload(config)
         assert reloaded.Config.DISCORD_TOKEN == "loaded-from-env"
+
+
+class TestLogFormatValidation:
+    def test_json_format_accepted(self, monkeypatch):
+        monkeypatch.setattr(config.Config, "DISCORD_TOKEN", "real-token-shape")
+        monkeypatch.setattr(config.Config, "LOG_FORMAT", "json")
+        config.Config.validate()
+
+    def test_unknown_format_rejected(self, monkeypatch):
+        monkeypatch.setattr(config.Config, "DISCORD_TOKEN", "real-token-shape")
+        monkeypatch.setattr(config.Config, "LOG_FORMAT", "xml")
+        with pytest.raises(ValueError, match="LOG_FORMAT"):
+            config.Config.validate()
+
+
+class TestShardValidation:
+    def test_shard_ids_need_explicit_sharding(self, monkeypatch):
+        monkeypatch.setattr(config.Config, "DISCORD_TOKEN", "real-token-shape")
+        monkeypatch.setattr(config.Config, "SHARD_IDS", "0-1")
+        monkeypatch.setattr(config.Config, "SHARDING_ENABLED", True)
+        monkeypatch.setattr(config.Config, "SHARD_COUNT", 0)
+        with pytest.raises(ValueError, match="SHARD_IDS"):
+            config.Config.validate()
+        monkeypatch.setattr(config.Config, "SHARD_COUNT", 4)
+        config.Config.validate()
+
+
+class TestBoolEnv:
+    def test_returns_default_when_unset(self, monkeypatch):
+        monkeypatch.delenv("FOO_THREADIT_TEST", raising=False)
+        assert config._bool_env("FOO_THREADIT_TEST", True) is True
+
+    @pytest.mark.parametrize("raw", ["1", "true", "YES", "on"])
+    def test_truthy(self, monkeypatch, raw):
+        monkeypatch.setenv("FOO_THREADIT_TEST", raw)
+        assert config._bool_env("FOO_THREADIT_TEST", False) is True
+
+    @pytest.mark.parametrize("raw", ["0", "false", "No", "off"])
+    def test_falsy(self, monkeypatch, raw):
+        monkeypatch.setenv("FOO_THREADIT_TEST", raw)
+        assert config._bool_env("FOO_THREADIT_TEST", True) is False
+
+    def test_raises_clear_error_on_garbage(self, monkeypatch):
+        monkeypatch.setenv("FOO_THREADIT_TEST", "maybe")
+        with pytest.raises(ValueError, match=r"FOO_THREADIT_TEST.*boolean.*'maybe'"):
+            config._bool_env("FOO_THREADIT_TEST", False)
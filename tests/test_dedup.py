@@ -0,0 +1,135 @@
+"""Tests for threadit.dedup (seen-id ring, shared SQLite store, filter)."""
+
+from __future__ import annotations
+
+import logging
+from unittest.mock import AsyncMock, MagicMock
+
+import discord
+import pytest
+
+from threadit.dedup import DuplicateFilter, SeenMessages, SqliteSeenStore
+from threadit.metrics import Metrics
+from threadit.orchestrator import ThreadingOrchestrator
+from threadit.permissions import PermissionsService
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestSeenMessages:
+    def test_second_add_is_duplicate(self):
+        seen = SeenMessages(ttl_seconds=60)
+        assert seen.add(1) is True
+        assert seen.add(1) is False
+        assert 1 in seen
+        assert 2 not in seen
+
+    def test_ids_expire_after_ttl(self):
+        clock = FakeClock()
+        seen = SeenMessages(ttl_seconds=80, buckets=8, clock=clock)
+        seen.add(1)
+        clock.now += 60
+        assert 1 in seen, "still within the TTL"
+        clock.now += 30
+        assert 1 not in seen
+        assert seen.add(1) is True
+
+    def test_long_idle_clears_everything(self):
+        clock = FakeClock()
+        seen = SeenMessages(ttl_seconds=10, buckets=4, clock=clock)
+        for i in range(100):
+            seen.add(i)
+        clock.now += 10_000
+        assert len(seen) == 0
+
+    @pytest.mark.parametrize("kwargs", [{"ttl_seconds": 0}, {"ttl_seconds": 10, "buckets": 1}])
+    def test_rejects_bad_parameters(self, kwargs):
+        with pytest.raises(ValueError):
+            SeenMessages(**kwargs)
+
+
+class TestSqliteSeenStore:
+    def test_first_claimer_wins_across_connections(self, tmp_path):
+        path = tmp_path / "seen.sqlite3"
+        a = SqliteSeenStore(path, ttl_seconds=60)
+        b = SqliteSeenStore(path, ttl_seconds=60)
+        try:
+            assert a.claim(42) is True
+            assert b.claim(42) is False
+            assert b.claim(43) is True
+        finally:
+            a.close()
+            b.close()
+
+    def test_expired_row_can_be_reclaimed_and_is_pruned(self, tmp_path):
+        clock = FakeClock()
+        store = SqliteSeenStore(tmp_path / "s.db", ttl_seconds=60, prune_every=2, clock=clock)
+        try:
+            assert store.claim(1) is True
+            clock.now += 120
+            assert store.claim(1) is True, "beyond the TTL it is not a duplicate"
+            store.claim(2)  # second claim triggers a prune
+            rows = store._conn.execute("SELECT COUNT(*) FROM seen_messages").fetchone()[0]
+            assert rows == 2
+        finally:
+            store.close()
+
+
+class TestDuplicateFilter:
+    async def test_local_duplicate_counted(self):
+        metrics = Metrics()
+        f = DuplicateFilter(ttl_seconds=60, logger=logging.getLogger("t"), metrics=metrics)
+        assert await f.claim(5) is True
+        assert await f.claim(5) is False
+        assert metrics.counter("duplicates_suppressed_total", source="local") == 1
+
+    async def test_shared_store_duplicate_counted(self, tmp_path):
+        metrics = Metrics()
+        path = tmp_path / "seen.db"
+        other_instance = SqliteSeenStore(path, ttl_seconds=60)
+        other_instance.claim(9)
+        f = DuplicateFilter(
+            ttl_seconds=60,
+            logger=logging.getLogger("t"),
+            metrics=metrics,
+            store=SqliteSeenStore(path, ttl_seconds=60),
+        )
+        assert await f.claim(9) is False
+        assert metrics.counter("duplicates_suppressed_total", source="shared") == 1
+        other_instance.close()
+
+
+class TestOrchestratorDedup:
+    async def test_replayed_message_skips_all_work(self):
+        perms = PermissionsService(
+            get_self_id=lambda: 999,
+            get_client_id=lambda: "999",
+            logger=logging.getLogger("test-perms"),
+        )
+        metrics = Metrics()
+        orchestrator = ThreadingOrchestrator(
+            permissions=perms,
+            logger=logging.getLogger("test-orchestrator"),
+            metrics=metrics,
+            dedup=DuplicateFilter(ttl_seconds=60, logger=logging.getLogger("t"), metrics=metrics),
+        )
+        perms.validate_permissions = MagicMock(return_value=(False, ["Embed Links"], []))  # type: ignore[method-assign]
+        perms.send_permission_error_message = AsyncMock()  # type: ignore[method-assign]
+
+        message = MagicMock()
+        message.id = 1234
+        message.reference = MagicMock(message_id=1)
+        message.guild = MagicMock()
+        message.channel = MagicMock(spec=discord.TextChannel)
+
+        await orchestrator.process(message)
+        await orchestrator.process(message)
+
+        assert perms.validate_permissions.call_count == 1
+        assert metrics.counter("duplicates_suppressed_total", source="local") == 1
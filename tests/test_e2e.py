@@ -0,0 +1,259 @@
+"""End to end: the real bot, cog and orchestrator against benchmarks.fakediscord."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+
+import discord
+from discord.gateway import DiscordWebSocket
+
+import bot
+from benchmarks.fakediscord import BOT_ID, FakeDiscord, FaultProfile
+from benchmarks.replay import replay_trace
+from threadit.cog import ThreadItCog
+from threadit.metrics import Metrics
+from threadit.orchestrator import ThreadingOrchestrator
+from threadit.permissions import PermissionsService
+from threadit.recorder import TraceRecord
+from threadit.restcalls import RestAccounting
+from threadit.retry import Retrier, RetryBudget, RetryPolicy
+
+log = logging.getLogger("test-e2e")
+
+
+async def _eventually(predicate, timeout: float = 5.0) -> None:
+    async with asyncio.timeout(timeout):
+        while not predicate():
+            await asyncio.sleep(0.01)
+
+
+def test_use_discord_endpoints_repoints_rest_and_gateway(endpoints):
+    bot.use_discord_endpoints("http://127.0.0.1:1/api/v10/", "ws://127.0.0.1:1/gateway")
+    assert discord.http.Route.BASE == "http://127.0.0.1:1/api/v10"
+    assert discord.webhook.async_.Route.BASE == discord.http.Route.BASE
+    assert str(DiscordWebSocket.DEFAULT_GATEWAY) == "ws://127.0.0.1:1/gateway"
+
+
+async def test_reply_is_converted_against_fake_discord(endpoints):
+    fake = FakeDiscord(faults=FaultProfile(latency=0))
+    await fake.start()
+    bot.use_discord_endpoints(fake.api_url, fake.gateway_url)
+
+    client = bot.build_bot()
+    permissions = PermissionsService(
+        get_self_id=lambda: client.user.id if client.user else None,
+        get_client_id=lambda: "1",
+        logger=log,
+    )
+    orchestrator = ThreadingOrchestrator(permissions=permissions, logger=log)
+    await client.add_cog(
+        ThreadItCog(client, orchestrator, permissions, get_client_id=lambda: "1", logger=log)
+    )
+    runner = asyncio.create_task(client.start("fake-token"))
+    try:
+        guild_id, _, parent_id = fake.target(0, 0, 0)
+        await _eventually(lambda: client.get_guild(guild_id) is not None)
+
+        reply_id = await fake.inject_reply(0, 0, 0, author_id=5 * 10**17)
+        await _eventually(lambda: reply_id in fake.converted)
+    finally:
+        await client.close()
+        await asyncio.wait_for(runner, 5)
+        await fake.stop()
+
+    calls = fake.stats.calls
+    assert calls["POST /api/v10/channels/{channel_id}/messages/{message_id}/threads"] == 1
+    assert calls["DELETE /api/v10/channels/{channel_id}/messages/{message_id}"] == 1
+    assert parent_id in fake._threads
+
+
+async def test_replayed_trace_is_converted_with_redeliveries_deduplicated(endpoints):
+    records = [
+        TraceRecord(
+            at_ms=0,
+            guild=7,
+            channel=70,
+            author=1,
+            message=100,
+            parent=700,
+            content_length=12,
+            attachment_sizes=(4096,),
+        ),
+        TraceRecord(
+            at_ms=10,
+            guild=7,
+            channel=71,
+            author=2,
+            message=101,
+            parent=710,
+            content_length=0,
+            embeds=1,
+        ),
+        TraceRecord(
+            at_ms=20, guild=7, channel=70, author=1, message=102, parent=700, content_length=5
+        ),
+        TraceRecord(
+            at_ms=30,
+            guild=7,
+            channel=70,
+            author=1,
+            message=100,
+            parent=700,
+            content_length=12,
+            attachment_sizes=(4096,),
+        ),  # gateway redelivery
+    ]
+    fake, metrics, _, _ = await replay_trace(records, speed=100, faults=FaultProfile(latency=0))
+
+    assert len(fake.injected) == 3
+    assert set(fake.converted) == set(fake.injected)
+    assert len(fake._threads) == 2  # two distinct parents
+    assert metrics.counter("duplicates_suppressed_total", source="local") == 1
+    assert fake.outstanding_notifications == 0
+
+
+# Bot role without manage_messages: everything else a conversion needs.
+NO_MANAGE_MESSAGES = discord.Permissions(
+    view_channel=True,
+    send_messages=True,
+    send_messages_in_threads=True,
+    create_public_threads=True,
+    read_message_history=True,
+    embed_links=True,
+    attach_files=True,
+).value
+
+
+async def _rest_calls_per_reply(fake: FakeDiscord, shapes: list[dict]) -> tuple[list, Metrics]:
+    """
+    Convert one reply to the first parent per ``shapes`` entry (extra
+    ``reply_payload`` arguments), in order; returns the API calls made by
+    each ``process()`` and the metrics.
+    """
+    await fake.start()
+    bot.use_discord_endpoints(fake.api_url, fake.gateway_url)
+    metrics = Metrics()
+    rest = RestAccounting(metrics=metrics)
+    client = bot.build_bot(http_trace=rest.trace_config())
+    try:
+        await client.login("fake-token")
+        state = client._connection
+        for payload in fake.guild_payloads():
+            state._add_guild_from_data(payload)  # type: ignore[arg-type]
+        permissions = PermissionsService(
+            get_self_id=lambda: client.user.id if client.user else None,
+            get_client_id=lambda: "1",
+            logger=log,
+        )
+        orchestrator = ThreadingOrchestrator(
+            permissions=permissions, logger=log, metrics=metrics, rest=rest
+        )
+        per_reply = []
+        for i, shape in enumerate(shapes):
+            data = fake.reply_payload(0, 0, 0, author_id=5 * 10**17 + i, **shape)
+            fake.injected[int(data["id"])] = 0.0
+            channel = client.get_channel(int(data["channel_id"]))
+            message = discord.Message(state=state, channel=channel, data=data)  # type: ignore[arg-type]
+            done_before = metrics.summary("rest_calls_per_conversion", stage="done")
+            before = done_before.total if done_before else 0
+            await orchestrator.process(message)
+            done = metrics.summary("rest_calls_per_conversion", stage="done")
+            assert done is not None and done.count == i + 1, "conversion did not complete"
+            per_reply.append(done.total - before)
+        await orchestrator.drain(timeout=5)  # fire the deferred notification deletes
+    finally:
+        await client.close()
+        await fake.stop()
+    return per_reply, metrics
+
+
+class TestRestCallBudget:
+    """
+    Upper bounds on API calls per conversion. Discord's global limit is
+    50 requests/s per bot, so these numbers cap conversions/s; raising one
+    should be a deliberate decision.
+    """
+
+    async def test_new_thread_and_existing_thread(self, endpoints):
+        fake = FakeDiscord(faults=FaultProfile(latency=0))
+        (new_thread, existing_thread), metrics = await _rest_calls_per_reply(fake, [{}, {}])
+
+        # fetch parent x2, create thread, repost, add user, fetch + delete original, notify
+        assert new_thread <= 8
+        # as above without creating the thread
+        assert existing_thread <= 7
+        # each notification is deleted later, outside process()
+        assert metrics.counter("rest_calls_after_conversion_total") <= 2
+        assert len(fake.converted) == 2
+        assert fake.outstanding_notifications == 0
+        # the live stats' inputs
+        assert metrics.recent("conversions", 60) == 2
+        create = metrics.summary("conversion_stage_seconds", stage="create_thread")
+        assert create is not None and create.count == 1
+
+    async def test_with_attachments(self, endpoints):
+        fake = FakeDiscord(faults=FaultProfile(latency=0))
+        (calls,), metrics = await _rest_calls_per_reply(fake, [{"attachments": (3000, 5000)}])
+
+        # Attachments ride on the repost; downloads go to the CDN, not the API.
+        assert calls <= 8
+        assert metrics.counter("rest_calls_total", route="GET cdn", outcome="2xx") == 2
+        uploaded = metrics.counter(
+            "rest_upload_bytes_total", route="POST /channels/{channel_id}/messages"
+        )
+        assert uploaded >= 8000
+
+    async def test_without_manage_messages(self, endpoints):
+        fake = FakeDiscord(faults=FaultProfile(latency=0), bot_permissions=NO_MANAGE_MESSAGES)
+        (calls,), metrics = await _rest_calls_per_reply(fake, [{}])
+
+        # No fetch/delete of the original, and the notification stays.
+        assert calls <= 6
+        assert metrics.counter("rest_calls_after_conversion_total") == 0
+        assert not fake.converted
+
+
+async def test_sends_whose_response_was_lost_are_not_posted_twice(endpoints):
+    fake = FakeDiscord(faults=FaultProfile(latency=0))
+    # The repost goes through, then answers 503.
+    fake.lost_responses["POST /api/v10/channels/{channel_id}/messages"] = 1
+    await fake.start()
+    bot.use_discord_endpoints(fake.api_url, fake.gateway_url)
+    metrics = Metrics()
+    client = bot.build_bot()
+    try:
+        await client.login("fake-token")
+        state = client._connection
+        for payload in fake.guild_payloads():
+            state._add_guild_from_data(payload)  # type: ignore[arg-type]
+        permissions = PermissionsService(
+            get_self_id=lambda: client.user.id if client.user else None,
+            get_client_id=lambda: "1",
+            logger=log,
+        )
+        retrier = Retrier(
+            policy=RetryPolicy(base_delay=0.01),
+            budget=RetryBudget(percent=20, min_per_second=1),
+            metrics=metrics,
+            logger=log,
+        )
+        orchestrator = ThreadingOrchestrator(
+            permissions=permissions, logger=log, metrics=metrics, retrier=retrier
+        )
+        data = fake.reply_payload(0, 0, 0, author_id=5 * 10**17)
+        channel = client.get_channel(int(data["channel_id"]))
+        message = discord.Message(state=state, channel=channel, data=data)  # type: ignore[arg-type]
+        await orchestrator.process(message)
+        sent = dict(fake._messages)  # before the notification is deleted
+        await orchestrator.drain(timeout=5)
+    finally:
+        await client.close()
+        await fake.stop()
+
+    assert metrics.counter("retries_total", step="repost", reason="http_503") == 1
+    assert message.id not in fake._messages  # converted
+    by_the_bot = [m for m in sent.values() if m["author"]["id"] == str(BOT_ID)]
+    assert len(by_the_bot) == 2  # one repost, one notification
+    # Discord deduplicates nonces per author: each send needs its own.
+    assert len({m["nonce"] for m in by_the_bot}) == 2
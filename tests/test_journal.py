@@ -0,0 +1,285 @@
+"""Tests for threadit.journal (the conversion journal and resuming from it)."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from unittest.mock import AsyncMock, MagicMock
+
+import discord
+import pytest
+
+import bot
+from benchmarks.fakediscord import FakeDiscord, FaultProfile
+from threadit.catchup import CatchUp, WatermarkStore
+from threadit.dedup import DuplicateFilter
+from threadit.journal import (
+    NOTIFIED,
+    PARENT_RESOLVED,
+    REPOSTED,
+    THREAD_CREATED,
+    ConversionJournal,
+    JournalEntry,
+    replay_journal,
+)
+from threadit.metrics import Metrics
+from threadit.orchestrator import ThreadingOrchestrator
+from threadit.permissions import PermissionsService
+
+log = logging.getLogger("test-journal")
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+async def test_unfinished_entries_are_their_latest_step(tmp_path):
+    clock = FakeClock()
+    journal = ConversionJournal(
+        tmp_path / "j" / "journal.sqlite3", max_age_seconds=600, logger=log, clock=clock
+    )
+    await journal.record(1, 10, PARENT_RESOLVED)
+    await journal.record(2, 10, PARENT_RESOLVED)
+    await journal.record(1, 10, THREAD_CREATED, thread_id=100)
+    await journal.record(3, 20, PARENT_RESOLVED)
+    await journal.finish(3, 20)
+    await journal.record(1, 10, REPOSTED, thread_id=100)
+    journal.close()
+
+    reopened = ConversionJournal(
+        tmp_path / "j" / "journal.sqlite3", max_age_seconds=600, logger=log, clock=clock
+    )
+    assert reopened.unfinished() == [
+        JournalEntry(2, 10, PARENT_RESOLVED, None, 1000.0),
+        JournalEntry(1, 10, REPOSTED, 100, 1000.0),
+    ]
+
+
+async def test_compaction_drops_finished_and_expired_entries(tmp_path):
+    clock = FakeClock()
+    journal = ConversionJournal(
+        tmp_path / "journal.sqlite3",
+        max_age_seconds=600,
+        logger=log,
+        compact_every=2,
+        clock=clock,
+    )
+    await journal.record(1, 10, PARENT_RESOLVED)
+    clock.now += 500
+    await journal.record(2, 10, PARENT_RESOLVED)
+    await journal.finish(2, 10)
+    clock.now += 200  # entry 1 has expired
+    assert journal.unfinished() == []
+    await journal.record(3, 10, PARENT_RESOLVED)
+    await journal.finish(3, 10)  # the second finish compacts
+    rows = journal._conn.execute("SELECT message_id, step FROM steps").fetchall()
+    assert rows == []
+    await journal.record(4, 10, NOTIFIED)
+    assert await journal.compact() == 0
+    assert [e.message_id for e in journal.unfinished()] == [4]
+
+
+async def test_replay_finishes_what_it_can_and_keeps_what_failed(tmp_path):
+    journal = ConversionJournal(tmp_path / "journal.sqlite3", max_age_seconds=600, logger=log)
+    await journal.record(1, 10, NOTIFIED)  # only the finish was missing
+    await journal.record(2, 99, PARENT_RESOLVED)  # channel gone
+    await journal.record(3, 10, PARENT_RESOLVED)  # Discord down: retried next start
+    channel = MagicMock(spec=discord.TextChannel)
+    channel.fetch_message = AsyncMock(
+        side_effect=discord.HTTPException(MagicMock(status=503, reason="x"), "down")
+    )
+    orchestrator = MagicMock()
+    orchestrator.metrics = Metrics()
+    ready = AsyncMock()
+
+    resumed = await replay_journal(
+        journal, orchestrator, {10: channel}.get, logger=log, ready=ready
+    )
+    ready.assert_awaited_once()
+    assert resumed == 1
+    orchestrator.process.assert_not_called()
+    assert [(e.message_id, e.step) for e in journal.unfinished()] == [(3, PARENT_RESOLVED)]
+
+
+async def test_conversions_cut_short_are_resumed_on_the_next_start(endpoints, tmp_path):
+    fake = FakeDiscord(faults=FaultProfile(latency=0), parents=3)
+    await fake.start()
+    bot.use_discord_endpoints(fake.api_url, fake.gateway_url)
+    path = tmp_path / "journal.sqlite3"
+    authors = {p: 5 * 10**17 + p for p in range(3)}
+    client = bot.build_bot()
+    try:
+        await client.login("fake-token")
+        state = client._connection
+        for payload in fake.guild_payloads():
+            state._add_guild_from_data(payload)  # type: ignore[arg-type]
+        permissions = PermissionsService(
+            get_self_id=lambda: client.user.id if client.user else None,
+            get_client_id=lambda: "1",
+            logger=log,
+        )
+
+        def reply(parent: int) -> discord.Message:
+            data = fake.reply_payload(0, 0, parent, author_id=authors[parent])
+            channel = client.get_channel(int(data["channel_id"]))
+            return discord.Message(state=state, channel=channel, data=data)  # type: ignore[arg-type]
+
+        # The first run: one conversion completes, one dies between the
+        # repost and the cleanup, one before anything was written.
+        journal = ConversionJournal(path, max_age_seconds=600, logger=log)
+        first = ThreadingOrchestrator(permissions=permissions, logger=log, journal=journal)
+        done, reposted, resolved = reply(0), reply(1), reply(2)
+        await first.process(done)
+        await first.drain(timeout=5)
+        first = ThreadingOrchestrator(permissions=permissions, logger=log, journal=journal)
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr(first, "cleanup_messages", AsyncMock(side_effect=asyncio.CancelledError))
+            with pytest.raises(asyncio.CancelledError):
+                await first.process(reposted)
+        await journal.record(resolved.id, resolved.channel.id, PARENT_RESOLVED)
+        journal.close()
+
+        journal = ConversionJournal(path, max_age_seconds=600, logger=log)
+        assert [e.step for e in journal.unfinished()] == [REPOSTED, PARENT_RESOLVED]
+        second = ThreadingOrchestrator(
+            permissions=permissions, logger=log, metrics=Metrics(), journal=journal
+        )
+        assert await replay_journal(journal, second, client.get_channel, logger=log) == 2
+        await second.drain(timeout=5)
+        assert journal.unfinished() == []
+        # Replay compacts once done: every entry was finished.
+        assert journal._conn.execute("SELECT step FROM steps").fetchall() == []
+        assert second.metrics.counter("journal_resumed_total", step=REPOSTED) == 1
+    finally:
+        await client.close()
+        await fake.stop()
+
+    assert not {done.id, reposted.id, resolved.id} & fake._messages.keys()
+    reposts = [
+        m["embeds"][0]["author"]["name"]
+        for m in fake._messages.values()
+        if int(m["channel_id"]) in fake._threads.values() and m["type"] == 0
+    ]
+    assert sorted(reposts) == [f"user-{a}" for a in authors.values()]  # each exactly once
+
+
+async def test_replay_and_catch_up_of_the_same_reply_repost_it_once(endpoints, tmp_path):
+    fake = FakeDiscord(faults=FaultProfile(latency=0))
+    await fake.start()
+    bot.use_discord_endpoints(fake.api_url, fake.gateway_url)
+    author = 5 * 10**17
+    seen = int(fake.reply_payload(0, 0, 0, author_id=author, age=600)["id"])
+    data = fake.reply_payload(0, 0, 0, author_id=author + 1, age=300)
+    reply_id, channel_id = int(data["id"]), int(data["channel_id"])
+    journal = ConversionJournal(tmp_path / "journal.sqlite3", max_age_seconds=600, logger=log)
+    await journal.record(reply_id, channel_id, PARENT_RESOLVED)  # cut short by the last run
+    store = WatermarkStore(tmp_path / "marks.json", logger=log)
+    store.save({channel_id: seen})
+    metrics = Metrics()
+    client = bot.build_bot()
+    try:
+        await client.login("fake-token")
+        state = client._connection
+        for payload in fake.guild_payloads():
+            state._add_guild_from_data(payload)  # type: ignore[arg-type]
+        permissions = PermissionsService(
+            get_self_id=lambda: client.user.id if client.user else None,
+            get_client_id=lambda: "1",
+            logger=log,
+        )
+        orchestrator = ThreadingOrchestrator(
+            permissions=permissions,
+            logger=log,
+            metrics=metrics,
+            journal=journal,
+            dedup=DuplicateFilter(ttl_seconds=600, logger=log, metrics=metrics),
+        )
+        catchup = CatchUp(
+            store,
+            orchestrator,
+            calls_per_second=1000,
+            max_age_seconds=0,
+            metrics=metrics,
+            logger=log,
+        )
+        resumed, caught_up = await asyncio.gather(
+            replay_journal(journal, orchestrator, client.get_channel, logger=log),
+            catchup.run(client.get_channel),
+        )
+        await orchestrator.drain(timeout=5)
+        await catchup.close()
+    finally:
+        await client.close()
+        await fake.stop()
+
+    assert (resumed, caught_up) == (1, 1)
+    assert metrics.counter("duplicates_suppressed_total", source="local") == 1
+    assert reply_id not in fake._messages
+    reposts = [
+        m
+        for m in fake._messages.values()
+        if int(m["channel_id"]) in fake._threads.values() and m["type"] == 0
+    ]
+    assert len(reposts) == 1
+
+
+async def test_writes_happen_off_the_event_loop(tmp_path):
+    threads = []
+
+    def clock() -> float:
+        threads.append(threading.get_ident())
+        return 1000.0
+
+    journal = ConversionJournal(
+        tmp_path / "journal.sqlite3",
+        max_age_seconds=600,
+        logger=log,
+        compact_every=1,
+        clock=clock,
+    )
+    await journal.record(1, 10, PARENT_RESOLVED)
+    await journal.finish(1, 10)  # and compacts
+    assert len(threads) == 3
+    assert threading.get_ident() not in threads
+
+
+async def test_failed_delete_of_the_original_is_retried_on_the_next_start(endpoints, tmp_path):
+    fake = FakeDiscord(faults=FaultProfile(latency=0))
+    await fake.start()
+    bot.use_discord_endpoints(fake.api_url, fake.gateway_url)
+    journal = ConversionJournal(tmp_path / "journal.sqlite3", max_age_seconds=600, logger=log)
+    client = bot.build_bot()
+    try:
+        await client.login("fake-token")
+        state = client._connection
+        for payload in fake.guild_payloads():
+            state._add_guild_from_data(payload)  # type: ignore[arg-type]
+        permissions = PermissionsService(
+            get_self_id=lambda: client.user.id if client.user else None,
+            get_client_id=lambda: "1",
+            logger=log,
+        )
+        data = fake.reply_payload(0, 0, 0, author_id=5 * 10**17)
+        channel = client.get_channel(int(data["channel_id"]))
+        message = discord.Message(state=state, channel=channel, data=data)  # type: ignore[arg-type]
+        first = ThreadingOrchestrator(permissions=permissions, logger=log, journal=journal)
+        first.delete_original_reply = AsyncMock(return_value=False)  # type: ignore[method-assign]
+        assert await first.process(message) is True
+        await first.drain(timeout=5)
+        assert [(e.message_id, e.step) for e in journal.unfinished()] == [(message.id, REPOSTED)]
+
+        second = ThreadingOrchestrator(
+            permissions=permissions, logger=log, metrics=Metrics(), journal=journal
+        )
+        assert await replay_journal(journal, second, client.get_channel, logger=log) == 1
+    finally:
+        await client.close()
+        await fake.stop()
+
+    assert message.id not in fake._messages
+    assert journal.unfinished() == []
@@ -0,0 +1,146 @@
+"""Tests for threadit.locks and the orchestrator's shared parent lock."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import subprocess
+import sys
+import time
+
+import pytest
+
+from threadit.locks import MemoryLeaseStore, SharedParentLock, SqliteLeaseStore
+from threadit.metrics import Metrics
+from threadit.orchestrator import ThreadingOrchestrator
+from threadit.permissions import PermissionsService
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _orchestrator(shared_lock: SharedParentLock, metrics: Metrics | None = None):
+    perms = PermissionsService(
+        get_self_id=lambda: 999,
+        get_client_id=lambda: "999",
+        logger=logging.getLogger("test-perms"),
+    )
+    return ThreadingOrchestrator(
+        permissions=perms,
+        logger=logging.getLogger("test-orchestrator"),
+        metrics=metrics,
+        shared_lock=shared_lock,
+    )
+
+
+class TestMemoryLeaseStore:
+    async def test_live_lease_blocks_until_expiry(self):
+        clock = FakeClock()
+        store = MemoryLeaseStore(clock=clock)
+        assert await store.acquire("k", "a", ttl=10)
+        assert not await store.acquire("k", "b", ttl=10)
+        clock.now += 11
+        assert await store.acquire("k", "b", ttl=10)
+
+    async def test_only_owner_can_release(self):
+        store = MemoryLeaseStore()
+        await store.acquire("k", "a", ttl=10)
+        await store.release("k", "b")
+        assert not await store.acquire("k", "c", ttl=10)
+        await store.release("k", "a")
+        assert await store.acquire("k", "c", ttl=10)
+
+
+class TestSqliteLeaseStore:
+    async def test_first_holder_wins_across_connections(self, tmp_path):
+        clock = FakeClock()
+        a = SqliteLeaseStore(tmp_path / "locks.db", clock=clock)
+        b = SqliteLeaseStore(tmp_path / "locks.db", clock=clock)
+        try:
+            assert await a.acquire("k", "a", ttl=10)
+            assert not await b.acquire("k", "b", ttl=10)
+            await b.release("k", "b")  # not the owner: no effect
+            assert not await b.acquire("k", "b", ttl=10)
+            clock.now += 11
+            assert await b.acquire("k", "b", ttl=10), "expired lease is reclaimable"
+            await b.release("k", "b")
+            assert await a.acquire("k", "a", ttl=10)
+        finally:
+            a.close()
+            b.close()
+
+
+async def _assert_serialized(first: ThreadingOrchestrator, second: ThreadingOrchestrator):
+    events: list[str] = []
+
+    async def worker(orch: ThreadingOrchestrator, name: str) -> None:
+        async with orch._with_parent_lock(42):
+            events.append(f"{name}-enter")
+            await asyncio.sleep(0.02)
+            events.append(f"{name}-exit")
+
+    await asyncio.gather(worker(first, "A"), worker(second, "B"))
+    assert events[0][0] == events[1][0] and events[2][0] == events[3][0], events
+
+
+class TestSharedParentLock:
+    async def test_two_instances_sharing_a_store_serialize(self):
+        store = MemoryLeaseStore()
+        metrics = Metrics()
+        a = _orchestrator(SharedParentLock(store, lease_seconds=5, poll_interval=0.005), metrics)
+        b = _orchestrator(SharedParentLock(store, lease_seconds=5, poll_interval=0.005), metrics)
+        await _assert_serialized(a, b)
+        assert metrics.summary("parent_lock_wait_seconds").count == 2
+        assert metrics.summary("parent_lock_wait_seconds").max >= 0.01
+
+    async def test_sqlite_backend_serializes(self, tmp_path):
+        stores = [SqliteLeaseStore(tmp_path / "locks.db") for _ in range(2)]
+        try:
+            a, b = (
+                _orchestrator(SharedParentLock(s, lease_seconds=5, poll_interval=0.005))
+                for s in stores
+            )
+            await _assert_serialized(a, b)
+        finally:
+            for s in stores:
+                s.close()
+
+    async def test_lease_released_when_body_raises(self):
+        store = MemoryLeaseStore()
+        lock = SharedParentLock(store, lease_seconds=60)
+        with pytest.raises(RuntimeError):
+            async with lock.hold(7):
+                raise RuntimeError("boom")
+        assert await store.acquire("threadit:parent:7", "other", ttl=1)
+
+    async def test_waits_for_another_process(self, tmp_path):
+        path = tmp_path / "locks.db"
+        with subprocess.Popen(
+            [
+                sys.executable,
+                "-c",
+                "import asyncio, sys, time\n"
+                "from pathlib import Path\n"
+                "from threadit.locks import SqliteLeaseStore\n"
+                f"s = SqliteLeaseStore(Path({str(path)!r}))\n"
+                "assert asyncio.run(s.acquire('threadit:parent:1', 'child', 30))\n"
+                "print('held', flush=True)\n"
+                "time.sleep(0.5)\n"
+                "asyncio.run(s.release('threadit:parent:1', 'child'))\n",
+            ],
+            stdout=subprocess.PIPE,
+            text=True,
+        ) as holder:
+            assert holder.stdout is not None and holder.stdout.readline().strip() == "held"
+            store = SqliteLeaseStore(path)
+            lock = SharedParentLock(store, lease_seconds=30, poll_interval=0.01)
+            started = time.monotonic()
+            async with lock.hold(1):
+                waited = time.monotonic() - started
+            store.close()
+        assert waited >= 0.2
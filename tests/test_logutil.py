@@ -0,0 +1,109 @@
+"""Tests for threadit.logutil (formatter, sampler, sample-rate parsing)."""
+
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import sys
+
+import pytest
+
+from threadit.logutil import (
+    DeferredQueueHandler,
+    EventSampler,
+    JsonFormatter,
+    parse_sample_rates,
+)
+
+
+def _record(msg: str, *args, level: int = logging.INFO, **extra) -> logging.LogRecord:
+    record = logging.LogRecord("threadit.test", level, __file__, 1, msg, args, None)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+
+class TestParseSampleRates:
+    def test_empty_string_disables_sampling(self):
+        assert parse_sample_rates("") == {}
+
+    def test_parses_multiple_entries_with_whitespace(self):
+        assert parse_sample_rates(" reply.processed=100, metrics=10 ,") == {
+            "reply.processed": 100,
+            "metrics": 10,
+        }
+
+    @pytest.mark.parametrize("raw", ["reply.processed", "metrics=abc", "metrics=0", "=5"])
+    def test_rejects_malformed_entries(self, raw):
+        with pytest.raises(ValueError, match="Invalid log sample entry"):
+            parse_sample_rates(raw)
+
+
+class TestJsonFormatter:
+    def test_emits_message_and_extra_fields(self):
+        record = _record("processed %s", 42, event="reply.processed", guild_id=7)
+        payload = json.loads(JsonFormatter().format(record))
+        assert payload["msg"] == "processed 42"
+        assert payload["level"] == "INFO"
+        assert payload["logger"] == "threadit.test"
+        assert payload["event"] == "reply.processed"
+        assert payload["guild_id"] == 7
+        # LogRecord bookkeeping attributes must not leak into the payload.
+        assert "args" not in payload
+        assert "lineno" not in payload
+
+    def test_includes_exception_text(self):
+        try:
+            raise RuntimeError("boom")
+        except RuntimeError:
+            record = logging.LogRecord(
+                "t", logging.ERROR, __file__, 1, "failed", None, sys.exc_info()
+            )
+        payload = json.loads(JsonFormatter().format(record))
+        assert "RuntimeError: boom" in payload["exc"]
+
+
+class TestEventSampler:
+    def test_keeps_one_in_n_starting_with_first(self):
+        sampler = EventSampler({"reply.processed": 3})
+        kept = [sampler.filter(_record("x", event="reply.processed")) for _ in range(7)]
+        assert kept == [True, False, False, True, False, False, True]
+
+    def test_unsampled_events_and_plain_records_pass(self):
+        sampler = EventSampler({"reply.processed": 100})
+        assert all(sampler.filter(_record("x", event="other")) for _ in range(5))
+        assert all(sampler.filter(_record("x")) for _ in range(5))
+
+    def test_warnings_are_never_sampled(self):
+        sampler = EventSampler({"metrics": 100})
+        records = [_record("x", level=logging.WARNING, event="metrics") for _ in range(5)]
+        assert all(sampler.filter(r) for r in records)
+
+
+class TestDeferredQueueHandler:
+    def test_interpolates_before_enqueueing(self):
+        q: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+        handler = DeferredQueueHandler(q)
+        pending = [1, 2]
+        record = _record("pending %s", pending, event="x")
+        handler.handle(record)
+        pending.append(3)  # after the call, before the listener formats
+        queued = q.get_nowait()
+        assert (queued.msg, queued.args) == ("pending [1, 2]", None)
+        assert queued.event == "x"  # type: ignore[attr-defined]
+        assert record.args == (pending,), "the caller's record is left alone"
+
+    def test_exception_is_left_to_the_listeners_formatter(self):
+        q: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+        handler = DeferredQueueHandler(q)
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            record = logging.LogRecord(
+                "threadit.test", logging.ERROR, __file__, 1, "failed %s", (7,), sys.exc_info()
+            )
+        handler.handle(record)
+        payload = json.loads(JsonFormatter().format(q.get_nowait()))
+        assert payload["msg"] == "failed 7"
+        assert "ValueError: boom" in payload["exc"]
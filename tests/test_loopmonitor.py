@@ -0,0 +1,91 @@
+"""Tests for threadit.loopmonitor.LoopMonitor."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+
+import pytest
+
+from threadit.loopmonitor import LoopMonitor
+from threadit.metrics import Metrics
+
+
+@pytest.fixture
+def metrics() -> Metrics:
+    return Metrics()
+
+
+def _monitor(metrics: Metrics, **kwargs) -> LoopMonitor:
+    return LoopMonitor(
+        interval=kwargs.pop("interval", 0.01),
+        stall_threshold=kwargs.pop("stall_threshold", 0.05),
+        logger=logging.getLogger("test-loopmonitor"),
+        metrics=metrics,
+        **kwargs,
+    )
+
+
+def _block_the_loop(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+class TestLoopMonitor:
+    async def test_records_lag_samples(self, metrics):
+        monitor = _monitor(metrics)
+        monitor.start()
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+        summary = metrics.summary("loop_lag_seconds")
+        assert summary is not None and summary.count >= 1
+
+    async def test_stall_is_reported_with_blocking_frame(self, metrics, caplog, monkeypatch):
+        counted_on: list[int] = []
+        incr = metrics.incr
+
+        def recording_incr(name, *args, **labels):
+            counted_on.append(threading.get_ident())
+            incr(name, *args, **labels)
+
+        monkeypatch.setattr(metrics, "incr", recording_incr)
+        monitor = _monitor(metrics)
+        monitor.start()
+        await asyncio.sleep(0.02)
+        with caplog.at_level(logging.WARNING, logger="test-loopmonitor"):
+            _block_the_loop(0.3)
+            await asyncio.sleep(0.03)
+        await monitor.stop()
+
+        assert metrics.counter("loop_stalls_total") == 1, "one sample per stall"
+        assert counted_on == [threading.get_ident()], "counted on the loop thread"
+        stall_logs = [r for r in caplog.records if getattr(r, "event", None) == "loop.stall"]
+        assert stall_logs, "watchdog should log the stall"
+        # The sampled stack must point at the code that blocked the loop.
+        assert "_block_the_loop" in stall_logs[0].getMessage()
+
+    async def test_asyncio_debug_mode_is_opt_in_and_undone_on_stop(self, metrics):
+        loop = asyncio.get_running_loop()
+        was_debug, was_duration = loop.get_debug(), loop.slow_callback_duration
+        monitor = _monitor(metrics, asyncio_debug=True, stall_threshold=0.123)
+        monitor.start()
+        try:
+            assert loop.get_debug() is True
+            assert loop.slow_callback_duration == pytest.approx(0.123)
+            # asyncio's slow-callback warning is counted into metrics.
+            logging.getLogger("asyncio").warning("Executing %s took %.3f seconds", "<Handle>", 0.2)
+            assert metrics.counter("loop_slow_callbacks_total") == 1
+        finally:
+            await monitor.stop()
+        assert loop.get_debug() is was_debug
+        assert loop.slow_callback_duration == was_duration
+
+    async def test_stop_is_idempotent_and_start_twice_is_noop(self, metrics):
+        monitor = _monitor(metrics)
+        monitor.start()
+        first_task = monitor._task
+        monitor.start()
+        assert monitor._task is first_task
+        await monitor.stop()
+        await monitor.stop()
@@ -0,0 +1,76 @@
+"""Tests for threadit.metrics.Metrics and MetricsReporter."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+
+from threadit.metrics import Metrics, MetricsReporter, percentile
+
+
+class TestPercentile:
+    def test_empty_is_zero(self):
+        assert percentile([], 99) == 0.0
+
+    def test_nearest_rank(self):
+        samples = [float(i) for i in range(1, 101)]
+        assert percentile(samples, 50) == 50.0
+        assert percentile(samples, 99) == 99.0
+        assert percentile(samples, 100) == 100.0
+
+
+class TestMetrics:
+    def test_counters_are_keyed_by_sorted_labels(self):
+        m = Metrics()
+        m.incr("retries_total", op="send", status=503)
+        m.incr("retries_total", status=503, op="send")
+        assert m.counter("retries_total", op="send", status=503) == 2
+        assert m.snapshot()["retries_total{op=send,status=503}"] == 2
+
+    def test_unknown_counter_and_gauge_read_as_zero(self):
+        m = Metrics()
+        assert m.counter("nope") == 0
+        assert m.gauge("nope") == 0
+
+    def test_gauge_overwrites(self):
+        m = Metrics()
+        m.set_gauge("queue_depth", 3)
+        m.set_gauge("queue_depth", 1)
+        assert m.gauge("queue_depth") == 1
+
+    def test_summary_tracks_count_max_and_percentiles(self):
+        m = Metrics()
+        for v in (0.1, 0.2, 0.3, 5.0):
+            m.observe("latency_seconds", v, stage="repost")
+        summary = m.summary("latency_seconds", stage="repost")
+        assert summary is not None
+        assert summary.count == 4
+        assert summary.max == 5.0
+        snap = m.snapshot()
+        assert snap["latency_seconds{stage=repost}.p50"] == 0.2
+        assert snap["latency_seconds{stage=repost}.p99"] == 5.0
+
+    def test_recent_counts_marks_inside_the_window(self):
+        now = [100.0]
+        m = Metrics(clock=lambda: now[0])
+        for t in (10.0, 50.0, 95.0, 99.0):
+            now[0] = t
+            m.mark("conversions")
+        now[0] = 100.0
+        assert m.recent("conversions", 60) == 3
+        assert m.recent("conversions", 3) == 1
+        assert m.recent("never", 60) == 0
+
+
+async def test_reporter_logs_snapshots_periodically_and_on_stop(caplog):
+    metrics = Metrics()
+    metrics.incr("replies_shed_total", action="shed")
+    reporter = MetricsReporter(metrics, interval=0.01, logger=logging.getLogger("test-metrics"))
+    with caplog.at_level(logging.INFO, logger="test-metrics"):
+        reporter.start()
+        await asyncio.sleep(0.05)
+        await reporter.stop()
+    records = [r for r in caplog.records if getattr(r, "event", None) == "metrics.snapshot"]
+    assert len(records) >= 2
+    assert records[-1].metrics == {"replies_shed_total{action=shed}": 1}
+    assert "replies_shed_total{action=shed}=1" in records[-1].getMessage()
@@ -4,12 +4,16 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from unittest.mock import MagicMock
+from datetime import UTC, datetime
+from unittest.mock import AsyncMock, MagicMock
 
+import discord
 import pytest
 
-from threadit.orchestrator import ThreadingOrchestrator
+from threadit.metrics import Metrics
+from threadit.orchestrator import LockHoldExceeded, ThreadingOrchestrator
 from threadit.permissions import PermissionsService
+from threadit.types import ReplyInfo
 
 
 @pytest.fixture
@@ -70,6 +74,41 @@ class TestWithParentLock:
                 raise RuntimeError("boom")
         assert 77 not in orchestrator._parent_locks
 
+    async def test_hold_cap_cancels_body_and_releases(self, orchestrator):
+        orchestrator.lock_hold_seconds = 0.01
+        with pytest.raises(LockHoldExceeded):
+            async with orchestrator._with_parent_lock(5):
+                await asyncio.sleep(1)
+        assert 5 not in orchestrator._parent_locks
+        assert orchestrator.metrics.counter("parent_lock_hold_exceeded_total") == 1
+
+    async def test_waiting_for_the_lock_does_not_count_towards_hold(self, orchestrator):
+        orchestrator.lock_hold_seconds = 0.05
+        entered: list[str] = []
+
+        async def worker(name: str):
+            async with orchestrator._with_parent_lock(6):
+                await asyncio.sleep(0.03)
+                entered.append(name)
+
+        await asyncio.gather(worker("A"), worker("B"))
+        assert entered == ["A", "B"]
+
+    async def test_load_counts_locks_and_queued_waiters(self, orchestrator):
+        release = asyncio.Event()
+
+        async def worker(parent_id: int):
+            async with orchestrator._with_parent_lock(parent_id):
+                await release.wait()
+
+        tasks = [asyncio.create_task(worker(p)) for p in (1, 1, 1, 2)]
+        await asyncio.sleep(0)
+        load = orchestrator.load()
+        assert (load.parent_locks, load.lock_waiters) == (2, 2)
+        release.set()
+        await asyncio.gather(*tasks)
+        assert orchestrator.load().parent_locks == 0
+
 
 class TestValidateProcessingConditions:
     def test_rejects_message_without_reference(self, orchestrator):
@@ -98,3 +137,124 @@ class TestValidateProcessingConditions:
         # spec=["create_thread"] so hasattr(channel, 'create_thread') is True
         message.channel = MagicMock(spec=["create_thread", "name"])
         assert orchestrator._validate_processing_conditions(message) is True
+
+
+class TestConversionDeadline:
+    @pytest.fixture
+    def slow_repost(self) -> tuple[ThreadingOrchestrator, Metrics, MagicMock]:
+        perms = PermissionsService(
+            get_self_id=lambda: 999,
+            get_client_id=lambda: "999",
+            logger=logging.getLogger("test-perms"),
+        )
+        perms.validate_permissions = MagicMock(return_value=(True, [], []))  # type: ignore[method-assign]
+        metrics = Metrics()
+        orchestrator = ThreadingOrchestrator(
+            permissions=perms,
+            logger=logging.getLogger("test-orchestrator"),
+            metrics=metrics,
+            deadline_seconds=0.05,
+        )
+        parent = MagicMock()
+        parent.thread = MagicMock(spec=discord.Thread)
+        channel = MagicMock(spec=discord.TextChannel)
+        channel.fetch_message = AsyncMock(return_value=parent)
+        reply_info = ReplyInfo(
+            content="hi",
+            author=MagicMock(),
+            attachments=[],
+            embeds=[],
+            channel=channel,
+            parent_message=parent,
+            message_id=2,
+            created_at=datetime.now(UTC),
+        )
+        orchestrator.gather_reply_information = AsyncMock(return_value=reply_info)  # type: ignore[method-assign]
+
+        async def hang(*_):
+            await asyncio.sleep(10)
+
+        orchestrator.repost_reply_in_thread = hang  # type: ignore[method-assign]
+        orchestrator.cleanup_messages = AsyncMock()  # type: ignore[method-assign]
+
+        message = MagicMock()
+        message.reference = MagicMock(message_id=1)
+        message.channel = channel
+        return orchestrator, metrics, message
+
+    async def test_expired_repost_leaves_original_and_counts_stage(self, slow_repost):
+        orchestrator, metrics, message = slow_repost
+        await asyncio.wait_for(orchestrator.process(message), timeout=1)
+        orchestrator.cleanup_messages.assert_not_awaited()
+        assert metrics.counter("conversion_deadline_exceeded_total", stage="repost") == 1
+        assert not orchestrator._parent_locks
+
+    async def test_no_deadline_means_no_cap(self, slow_repost):
+        orchestrator, _, message = slow_repost
+        orchestrator.deadline_seconds = None
+        task = asyncio.create_task(orchestrator.process(message))
+        await asyncio.sleep(0.1)
+        assert not task.done()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+
+class TestDrain:
+    async def test_rejects_new_replies_once_draining(self, orchestrator):
+        await orchestrator.drain(timeout=1)
+        message = MagicMock()
+        orchestrator._validate_processing_conditions = MagicMock()  # type: ignore[method-assign]
+        await orchestrator.process(message)
+        orchestrator._validate_processing_conditions.assert_not_called()
+        assert orchestrator.metrics.counter("replies_rejected_total", reason="draining") == 1
+
+    async def test_waits_for_in_flight_conversion(self, orchestrator):
+        finished = asyncio.Event()
+
+        async def slow_convert(*_):
+            await asyncio.sleep(0.05)
+            finished.set()
+
+        orchestrator._convert = slow_convert  # type: ignore[method-assign]
+        task = asyncio.create_task(orchestrator.process(MagicMock()))
+        await asyncio.sleep(0)
+        assert await orchestrator.drain(timeout=2) == []
+        assert finished.is_set() and task.done()
+
+    async def test_pending_notification_delete_fires_immediately(self, orchestrator):
+        notification = MagicMock()
+        notification.delete = AsyncMock()
+        task = asyncio.create_task(orchestrator._delete_after(notification, 3600))
+        orchestrator._background_tasks.add(task)
+        task.add_done_callback(orchestrator._background_tasks.discard)
+        await asyncio.sleep(0)
+        assert await asyncio.wait_for(orchestrator.drain(timeout=1), timeout=2) == []
+        notification.delete.assert_awaited_once()
+
+    async def test_overrunning_conversion_is_cancelled_and_reported(self, orchestrator):
+        message = MagicMock()
+        message.id = 5
+        message.channel.id = 50
+
+        async def stuck_in_cleanup(_message, progress, *_):
+            progress.reposted = True
+            progress.stage = "cleanup"
+            await asyncio.sleep(3600)
+
+        orchestrator._convert = stuck_in_cleanup  # type: ignore[method-assign]
+        task = asyncio.create_task(orchestrator.process(message))
+        await asyncio.sleep(0)
+        leftovers = await orchestrator.drain(timeout=0.02)
+        assert [(p.channel_id, p.message_id, p.kind) for p in leftovers] == [(50, 5, "original")]
+        assert task.cancelled()
+        assert not orchestrator._in_flight
+
+
+def test_each_send_about_a_reply_gets_its_own_nonce():
+    from threadit.orchestrator import NONCE_NOTIFY, NONCE_REPOST, message_nonce
+
+    reply_id = 2**63 - 1  # the largest snowflake
+    nonces = {message_nonce(reply_id, tag) for tag in (NONCE_REPOST, NONCE_NOTIFY)}
+    assert len(nonces) == 2
+    assert all(len(nonce) <= 25 for nonce in nonces)
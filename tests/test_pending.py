@@ -0,0 +1,52 @@
+"""Tests for threadit.pending (leftover deletions across restarts)."""
+
+from __future__ import annotations
+
+import logging
+from unittest.mock import AsyncMock, MagicMock
+
+import discord
+
+from threadit.pending import PendingDeletion, PendingDeletionStore, replay_pending_deletions
+
+log = logging.getLogger("test-pending")
+
+
+def _http_error(cls: type[discord.HTTPException], status: int) -> discord.HTTPException:
+    return cls(MagicMock(status=status, reason="x"), "boom")
+
+
+class TestPendingDeletionStore:
+    def test_save_appends_and_take_clears(self, tmp_path):
+        store = PendingDeletionStore(tmp_path / "d" / "pending.json", logger=log)
+        store.save([PendingDeletion(1, 10, "notification")])
+        store.save([PendingDeletion(2, 20, "original")])
+        store.save([])
+        assert store.take() == [
+            PendingDeletion(1, 10, "notification"),
+            PendingDeletion(2, 20, "original"),
+        ]
+        assert store.take() == []
+        assert not store.path.exists()
+
+    def test_corrupt_file_is_ignored(self, tmp_path):
+        path = tmp_path / "pending.json"
+        path.write_text("{not json")
+        assert PendingDeletionStore(path, logger=log).take() == []
+
+
+async def test_replay_deletes_and_tolerates_missing_messages(tmp_path):
+    store = PendingDeletionStore(tmp_path / "pending.json", logger=log)
+    store.save(
+        [
+            PendingDeletion(1, 10, "notification"),
+            PendingDeletion(2, 20, "original"),
+            PendingDeletion(3, 30, "original"),
+        ]
+    )
+    delete = AsyncMock(
+        side_effect=[None, _http_error(discord.NotFound, 404), _http_error(discord.Forbidden, 403)]
+    )
+    assert await replay_pending_deletions(store, delete, log) == 2
+    assert [c.args for c in delete.await_args_list] == [(1, 10), (2, 20), (3, 30)]
+    assert store.take() == []
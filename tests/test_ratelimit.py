@@ -0,0 +1,134 @@
+"""Tests for threadit.ratelimit and the cog's rate-limit drop path."""
+
+from __future__ import annotations
+
+import logging
+import time
+from unittest.mock import AsyncMock, MagicMock
+
+import discord
+import pytest
+
+from threadit.cog import ThreadItCog
+from threadit.metrics import Metrics
+from threadit.ratelimit import CallPacer, ReplyRateLimiter, TokenBuckets
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTokenBuckets:
+    def test_burst_then_refill(self):
+        clock = FakeClock()
+        buckets = TokenBuckets(rate=0.5, burst=2, clock=clock)
+        assert buckets.try_acquire(1)
+        assert buckets.try_acquire(1)
+        assert not buckets.try_acquire(1)
+        clock.now += 2
+        assert buckets.try_acquire(1)
+        assert not buckets.try_acquire(1)
+
+    def test_keys_are_independent(self):
+        buckets = TokenBuckets(rate=1, burst=1, clock=FakeClock())
+        assert buckets.try_acquire(1)
+        assert not buckets.try_acquire(1)
+        assert buckets.try_acquire(2)
+
+    def test_refill_is_capped_at_burst(self):
+        clock = FakeClock()
+        buckets = TokenBuckets(rate=1, burst=2, clock=clock)
+        buckets.try_acquire(1)
+        clock.now += 3600
+        assert [buckets.try_acquire(1) for _ in range(3)] == [True, True, False]
+
+    def test_evicts_least_recently_used(self):
+        buckets = TokenBuckets(rate=1, burst=1, max_keys=2, clock=FakeClock())
+        buckets.try_acquire(1)
+        buckets.try_acquire(2)
+        buckets.try_acquire(1)  # 1 is now most recent
+        buckets.try_acquire(3)
+        assert len(buckets) == 2
+        assert 2 not in buckets._buckets
+        assert not buckets.try_acquire(1), "1 kept its (empty) state"
+
+    @pytest.mark.parametrize("kwargs", [{"rate": 0, "burst": 1}, {"rate": 1, "burst": 0}])
+    def test_rejects_bad_parameters(self, kwargs):
+        with pytest.raises(ValueError):
+            TokenBuckets(**kwargs)
+
+
+class TestReplyRateLimiter:
+    def test_user_and_channel_scopes_are_counted(self):
+        metrics = Metrics()
+        limiter = ReplyRateLimiter(
+            user_buckets=TokenBuckets(rate=1, burst=1, clock=FakeClock()),
+            channel_buckets=TokenBuckets(rate=1, burst=2, clock=FakeClock()),
+            metrics=metrics,
+            logger=logging.getLogger("test-ratelimit"),
+        )
+        assert limiter.allow(user_id=1, channel_id=10)
+        assert not limiter.allow(user_id=1, channel_id=10)
+        assert limiter.allow(user_id=2, channel_id=10)
+        assert not limiter.allow(user_id=3, channel_id=10)
+        assert metrics.counter("replies_rate_limited_total", scope="user") == 1
+        assert metrics.counter("replies_rate_limited_total", scope="channel") == 1
+
+    def test_disabled_buckets_allow_everything(self):
+        limiter = ReplyRateLimiter(
+            user_buckets=None,
+            channel_buckets=None,
+            metrics=Metrics(),
+            logger=logging.getLogger("test-ratelimit"),
+        )
+        assert all(limiter.allow(1, 1) for _ in range(100))
+
+
+class TestCallPacer:
+    async def test_spreads_calls_past_the_burst(self):
+        pacer = CallPacer(rate=50, metrics=Metrics())
+        started = time.monotonic()
+        await pacer.wait(50)  # the burst
+        assert time.monotonic() - started < 0.05
+        await pacer.wait(5)
+        assert time.monotonic() - started >= 0.08
+
+    async def test_holds_off_after_a_recent_429(self):
+        metrics = Metrics()
+        pacer = CallPacer(rate=1000, metrics=metrics, backoff_seconds=0.1)
+        metrics.mark("rest_rate_limited")
+        started = time.monotonic()
+        await pacer.wait()
+        assert time.monotonic() - started >= 0.1
+
+
+async def test_cog_drops_limited_reply_without_dispatch():
+    orchestrator = MagicMock()
+    orchestrator.process = AsyncMock()
+    cog = ThreadItCog(
+        MagicMock(command_prefix="!"),
+        orchestrator,
+        MagicMock(),
+        get_client_id=lambda: "1",
+        logger=logging.getLogger("test-cog"),
+        rate_limiter=ReplyRateLimiter(
+            user_buckets=TokenBuckets(rate=0.01, burst=1),
+            channel_buckets=None,
+            metrics=Metrics(),
+            logger=logging.getLogger("test-ratelimit"),
+        ),
+    )
+    message = MagicMock()
+    message.type = discord.MessageType.reply
+    message.author.bot = False
+    message.author.id = 7
+    message.content = "spam"
+    message.channel = MagicMock(spec=discord.TextChannel)
+
+    await cog.on_message(message)
+    await cog.on_message(message)
+    orchestrator.process.assert_awaited_once_with(message)
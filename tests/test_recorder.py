@@ -0,0 +1,78 @@
+"""Tests for threadit.recorder (anonymized reply traces)."""
+
+from __future__ import annotations
+
+import datetime as dt
+import json
+import logging
+from unittest.mock import MagicMock
+
+import discord
+
+from threadit.recorder import TrafficRecorder, read_trace
+
+log = logging.getLogger("test-recorder")
+
+
+def _reply(message_id: int, parent_id: int | None = 900, *, attachments=(), content="hello"):
+    message = MagicMock()
+    message.id = message_id
+    message.guild.id = 1
+    message.channel.id = 10
+    message.author.id = 100
+    message.content = content
+    message.created_at = discord.utils.utcnow() - dt.timedelta(seconds=2)
+    message.attachments = [MagicMock(size=size) for size in attachments]
+    message.embeds = []
+    message.reference = None if parent_id is None else MagicMock(message_id=parent_id)
+    return message
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTrafficRecorder:
+    def test_round_trip_keeps_shape_but_not_identity(self, tmp_path):
+        path = tmp_path / "trace.jsonl"
+        clock = FakeClock()
+        recorder = TrafficRecorder(path, logger=log, clock=clock)
+        recorder.record(_reply(1, attachments=(2048, 10), content="secret text"))
+        clock.now = 1.5
+        recorder.record(_reply(2))
+        recorder.record(_reply(3, parent_id=None))  # not a reply: skipped
+        recorder.close()
+
+        first, second = read_trace(path)
+        assert (first.at_ms, second.at_ms) == (0, 1500)
+        assert first.attachment_sizes == (2048, 10)
+        assert first.content_length == len("secret text")
+        assert 1500 <= first.age_ms < 10_000
+        # Same parent/channel/author hash alike; nothing is stored raw.
+        assert first.parent == second.parent and first.message != second.message
+        assert first.parent != 900 and first.channel != 10
+        assert "secret" not in path.read_text()
+
+    def test_each_run_is_a_separate_segment_with_unrelated_ids(self, tmp_path):
+        path = tmp_path / "trace.jsonl"
+        for _ in range(2):
+            recorder = TrafficRecorder(path, logger=log)
+            recorder.record(_reply(1))
+            recorder.close()
+
+        a, b = read_trace(path)
+        assert (a.segment, b.segment) == (0, 1)
+        assert a.parent != b.parent
+        assert sum("segment" in json.loads(line) for line in path.read_text().splitlines()) == 2
+
+    def test_write_failure_is_logged_not_raised(self, tmp_path, caplog):
+        blocker = tmp_path / "not-a-dir"
+        blocker.write_text("")
+        recorder = TrafficRecorder(blocker / "trace.jsonl", logger=log)
+        recorder.record(_reply(1))
+        assert recorder.recorded == 0
+        assert "Could not append to traffic trace" in caplog.text
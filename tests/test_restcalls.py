@@ -0,0 +1,120 @@
+"""Tests for threadit.restcalls (route templates and the aiohttp trace hooks)."""
+
+from __future__ import annotations
+
+import asyncio
+
+import aiohttp
+import pytest
+from aiohttp import web
+from yarl import URL
+
+from threadit.metrics import Metrics
+from threadit.restcalls import RestAccounting, route_template
+from threadit.types import ConversionProgress
+
+
+@pytest.mark.parametrize(
+    ("method", "path", "expected"),
+    [
+        ("POST", "/api/v10/channels/1/messages", "POST /channels/{channel_id}/messages"),
+        (
+            "POST",
+            "/api/v10/channels/1/messages/22/threads",
+            "POST /channels/{channel_id}/messages/{message_id}/threads",
+        ),
+        (
+            "PUT",
+            "/api/v10/channels/1/thread-members/3",
+            "PUT /channels/{channel_id}/thread-members/{user_id}",
+        ),
+        (
+            "POST",
+            "/api/v10/interactions/9/aW50ZXJhY3Rpb24/callback",
+            "POST /interactions/{interaction_id}/{token}/callback",
+        ),
+        (
+            "PUT",
+            "/api/v10/channels/1/messages/2/reactions/%F0%9F%91%8D/@me",
+            "PUT /channels/{channel_id}/messages/{message_id}/reactions/{emoji}/@me",
+        ),
+        ("GET", "/api/v10/users/@me", "GET /users/@me"),
+        ("GET", "/attachments/1/2/file.png", "GET cdn"),
+    ],
+)
+def test_route_template(method, path, expected):
+    assert route_template(method, URL(f"https://discord.com{path}")) == expected
+
+
+async def _server(handler) -> tuple[web.AppRunner, str]:
+    app = web.Application()
+    app.router.add_route("*", "/{tail:.*}", handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, f"http://127.0.0.1:{runner.addresses[0][1]}"
+
+
+async def test_counts_calls_by_route_and_outcome_and_multipart_upload_bytes():
+    async def handler(request: web.Request) -> web.Response:
+        await request.read()
+        return web.Response(status=429 if request.method == "DELETE" else 200)
+
+    metrics = Metrics()
+    rest = RestAccounting(metrics=metrics)
+    runner, base = await _server(handler)
+    try:
+        async with aiohttp.ClientSession(trace_configs=[rest.trace_config()]) as session:
+            form = aiohttp.FormData()
+            form.add_field("files[0]", b"x" * 5000, filename="a.bin")
+            await (await session.post(f"{base}/api/v10/channels/1/messages", data=form)).read()
+            await (await session.delete(f"{base}/api/v10/channels/1/messages/2")).read()
+            await (await session.get(f"{base}/attachments/1/a.bin")).read()
+    finally:
+        await runner.cleanup()
+
+    post = "POST /channels/{channel_id}/messages"
+    assert metrics.counter("rest_calls_total", route=post, outcome="2xx") == 1
+    assert (
+        metrics.counter(
+            "rest_calls_total",
+            route="DELETE /channels/{channel_id}/messages/{message_id}",
+            outcome="429",
+        )
+        == 1
+    )
+    assert metrics.counter("rest_calls_total", route="GET cdn", outcome="2xx") == 1
+    assert metrics.counter("rest_upload_bytes_total", route=post) > 5000
+
+
+async def test_conversion_scope_counts_its_api_calls_and_later_ones_separately():
+    async def handler(request: web.Request) -> web.Response:
+        return web.Response()
+
+    metrics = Metrics()
+    rest = RestAccounting(metrics=metrics)
+    runner, base = await _server(handler)
+    try:
+        async with aiohttp.ClientSession(trace_configs=[rest.trace_config()]) as session:
+            await (await session.get(f"{base}/api/v10/gateway")).read()  # outside any conversion
+            progress = ConversionProgress(stage="done")
+            deferred_go = asyncio.Event()
+
+            async def deferred() -> None:
+                await deferred_go.wait()
+                await (await session.delete(f"{base}/api/v10/channels/1/messages/2")).read()
+
+            with rest.conversion(progress):
+                await (await session.get(f"{base}/api/v10/channels/1/messages/2")).read()
+                await (await session.get(f"{base}/attachments/1/a.bin")).read()  # CDN, not API
+                task = asyncio.create_task(deferred())
+            deferred_go.set()
+            await task
+    finally:
+        await runner.cleanup()
+
+    summary = metrics.summary("rest_calls_per_conversion", stage="done")
+    assert summary is not None
+    assert (summary.count, summary.total) == (1, 1)
+    assert metrics.counter("rest_calls_after_conversion_total") == 1
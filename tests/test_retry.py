@@ -0,0 +1,149 @@
+"""Tests for threadit.retry (classification, backoff, budget, Retrier)."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from unittest.mock import AsyncMock, MagicMock
+
+import aiohttp
+import discord
+import pytest
+
+from threadit.metrics import Metrics
+from threadit.orchestrator import THREAD_ALREADY_EXISTS, ThreadingOrchestrator
+from threadit.permissions import PermissionsService
+from threadit.retry import Retrier, RetryBudget, RetryPolicy, classify
+
+
+def http_error(
+    status: int, cls: type[discord.HTTPException] = discord.HTTPException, code: int = 0
+):
+    response = MagicMock(status=status, reason="reason")
+    return cls(response, {"code": code, "message": "err"})
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _retrier(metrics: Metrics, *, budget: RetryBudget | None = None, **policy) -> Retrier:
+    return Retrier(
+        policy=RetryPolicy(**policy),
+        budget=budget or RetryBudget(percent=20, min_per_second=1),
+        metrics=metrics,
+        logger=logging.getLogger("test-retry"),
+        rng=lambda: 0.0,  # no sleeping in tests
+    )
+
+
+class TestClassify:
+    @pytest.mark.parametrize(
+        "exc",
+        [
+            http_error(403, discord.Forbidden),
+            http_error(404, discord.NotFound),
+            http_error(400),
+            ValueError("bug"),
+        ],
+    )
+    def test_permanent_errors_not_retried(self, exc):
+        assert classify(exc) is None
+
+    def test_server_errors_retried(self):
+        assert classify(http_error(503, discord.DiscordServerError)) == "http_503"
+
+    def test_rate_limit_and_network_retried(self):
+        assert classify(http_error(429)) == "rate_limited"
+        assert classify(aiohttp.ClientConnectionError()) == "network"
+        assert classify(TimeoutError()) == "network"
+
+
+class TestRetryPolicy:
+    def test_backoff_is_capped_and_jittered(self):
+        policy = RetryPolicy(base_delay=1.0, max_delay=4.0)
+        assert policy.backoff(1, rng=lambda: 1.0) == 1.0
+        assert policy.backoff(2, rng=lambda: 1.0) == 2.0
+        assert policy.backoff(10, rng=lambda: 1.0) == 4.0
+        assert policy.backoff(10, rng=lambda: 0.5) == 2.0
+
+
+class TestRetryBudget:
+    def test_withdrawals_limited_by_tokens_and_refill(self):
+        clock = FakeClock()
+        budget = RetryBudget(percent=50, min_per_second=1, max_tokens=2, clock=clock)
+        assert budget.try_withdraw() and budget.try_withdraw()
+        assert budget.try_withdraw() is False
+        budget.record_request()
+        budget.record_request()
+        assert budget.try_withdraw() is True, "two requests at 50% fund one retry"
+        clock.now += 1.0
+        assert budget.try_withdraw() is True, "floor refills over time"
+
+
+class TestRetrier:
+    async def test_transient_error_retried_then_succeeds(self):
+        metrics = Metrics()
+        fn = AsyncMock(side_effect=[http_error(503, discord.DiscordServerError), "ok"])
+        assert await _retrier(metrics).call("repost", fn) == "ok"
+        assert fn.await_count == 2
+        assert metrics.counter("retries_total", step="repost", reason="http_503") == 1
+
+    async def test_permanent_error_raised_immediately(self):
+        metrics = Metrics()
+        fn = AsyncMock(side_effect=http_error(403, discord.Forbidden))
+        with pytest.raises(discord.Forbidden):
+            await _retrier(metrics).call("create_thread", fn)
+        assert fn.await_count == 1
+        assert metrics.snapshot() == {}
+
+    async def test_gives_up_after_max_attempts(self):
+        fn = AsyncMock(side_effect=aiohttp.ClientConnectionError())
+        with pytest.raises(aiohttp.ClientConnectionError):
+            await _retrier(Metrics(), max_attempts=3).call("notify", fn)
+        assert fn.await_count == 3
+
+    async def test_exhausted_budget_stops_retries(self):
+        metrics = Metrics()
+        empty = RetryBudget(percent=0, min_per_second=0, max_tokens=0)
+        fn = AsyncMock(side_effect=aiohttp.ClientConnectionError())
+        with pytest.raises(aiohttp.ClientConnectionError):
+            await _retrier(metrics, budget=empty).call("notify", fn)
+        assert fn.await_count == 1
+        assert metrics.counter("retry_budget_exhausted_total", step="notify") == 1
+
+    async def test_non_idempotent_step_retries_only_rate_limits(self):
+        fn = AsyncMock(side_effect=[http_error(429), http_error(503, discord.DiscordServerError)])
+        with pytest.raises(discord.DiscordServerError):
+            await _retrier(Metrics()).call("repost_webhook", fn, idempotent=False)
+        assert fn.await_count == 2
+
+    async def test_step_deadline_bounds_a_hung_call(self):
+        async def hang():
+            await asyncio.sleep(10)
+
+        with pytest.raises(TimeoutError):
+            await _retrier(Metrics(), step_deadline=0.02).call("repost", hang)
+
+
+class TestCreateThreadAlreadyExists:
+    async def test_recovers_thread_created_by_failed_attempt(self):
+        orchestrator = ThreadingOrchestrator(
+            permissions=PermissionsService(
+                get_self_id=lambda: 1, get_client_id=lambda: "1", logger=logging.getLogger("t")
+            ),
+            logger=logging.getLogger("t"),
+        )
+        thread = MagicMock(spec=discord.Thread)
+        parent = MagicMock()
+        parent.content = "hello"
+        parent.create_thread = AsyncMock(side_effect=http_error(400, code=THREAD_ALREADY_EXISTS))
+        channel = MagicMock()
+        channel.fetch_message = AsyncMock(return_value=MagicMock(thread=thread))
+        reply_info = MagicMock(parent_message=parent, channel=channel)
+
+        assert await orchestrator.create_thread_from_reply(reply_info) is thread
@@ -0,0 +1,39 @@
+"""Tests for threadit.runtime (optional uvloop / orjson profile)."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+
+import discord
+import pytest
+
+from threadit.runtime import RuntimeProfile, select_runtime
+
+
+def test_default_profile_keeps_the_stock_loop():
+    profile = select_runtime(False)
+    assert profile.loop == "asyncio"
+    assert profile.loop_factory is None
+    assert profile.missing == ()
+
+
+def test_fast_profile_uses_uvloop_when_installed():
+    uvloop = pytest.importorskip("uvloop")
+    profile = select_runtime(True)
+    assert profile.loop == "uvloop"
+    assert profile.loop_factory is uvloop.new_event_loop
+    with asyncio.Runner(loop_factory=profile.loop_factory) as runner:
+        assert runner.run(asyncio.sleep(0, result="ok")) == "ok"
+
+
+def test_fast_profile_falls_back_when_extras_missing(monkeypatch, caplog):
+    monkeypatch.setitem(sys.modules, "uvloop", None)  # makes the import fail
+    monkeypatch.setattr(discord.utils, "HAS_ORJSON", False)
+    profile = select_runtime(True)
+    assert profile == RuntimeProfile(missing=("uvloop", "orjson"))
+
+    with caplog.at_level(logging.INFO):
+        profile.log(logging.getLogger("test-runtime"))
+    assert "uvloop, orjson are not installed" in caplog.text
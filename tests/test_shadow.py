@@ -0,0 +1,173 @@
+"""Tests for threadit.shadow and the orchestrator's shadow path against the fake."""
+
+from __future__ import annotations
+
+import logging
+
+import discord
+import pytest
+
+import bot
+from benchmarks.fakediscord import FakeDiscord, FaultProfile
+from threadit.cog import build_shadow_message
+from threadit.metrics import Metrics
+from threadit.orchestrator import ThreadingOrchestrator
+from threadit.permissions import PermissionsService
+from threadit.shadow import (
+    CDN_DOWNLOAD,
+    CREATE_THREAD,
+    FETCH_MESSAGE,
+    SEND_MESSAGE,
+    ShadowMode,
+    parse_guild_ids,
+)
+
+log = logging.getLogger("test-shadow")
+
+# Bot role without manage_messages: everything else a conversion needs.
+NO_MANAGE_MESSAGES = discord.Permissions(
+    view_channel=True,
+    send_messages=True,
+    send_messages_in_threads=True,
+    create_public_threads=True,
+    read_message_history=True,
+    embed_links=True,
+    attach_files=True,
+).value
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_parse_guild_ids():
+    assert parse_guild_ids("") == frozenset()
+    assert parse_guild_ids("1, 22,") == {1, 22}
+    with pytest.raises(ValueError):
+        parse_guild_ids("1,abc")
+
+
+def test_report_projects_rates_contention_and_routes():
+    clock = FakeClock()
+    metrics = Metrics(clock=clock)
+    shadow = ShadowMode([7], metrics=metrics, clock=clock)
+    assert shadow.covers(7) and not shadow.covers(8) and not shadow.covers(None)
+
+    shadow.record(
+        7, parent_id=1, routes=[FETCH_MESSAGE, CREATE_THREAD, CDN_DOWNLOAD], attachment_bytes=4000
+    )
+    assert shadow.has_thread(1)
+    clock.now += 1  # inside the projected lock hold: would have queued
+    shadow.record(7, parent_id=1, routes=[FETCH_MESSAGE, SEND_MESSAGE], attachment_bytes=0)
+    clock.now += 10
+    shadow.record(7, parent_id=2, routes=[FETCH_MESSAGE, SEND_MESSAGE], attachment_bytes=0)
+    shadow.skip(7, "permissions")
+
+    report = shadow.report(7)
+    assert report.conversions == 3
+    assert report.conversions_per_minute == pytest.approx(0.3)
+    assert report.calls_per_conversion == pytest.approx(2.0)  # CDN downloads excluded
+    assert report.calls_per_minute == pytest.approx(0.6)
+    assert report.attachment_bytes_per_minute == pytest.approx(400)
+    assert report.lock_contention == pytest.approx(1 / 3)
+    assert report.skipped == 1
+    assert report.top_routes[0] == (FETCH_MESSAGE, 3)
+    assert "0.3/min" in build_shadow_message(report)
+
+
+async def test_missing_permissions_record_the_warning_a_live_run_would_send(endpoints):
+    cannot_create_threads = discord.Permissions(
+        view_channel=True, send_messages=True, read_message_history=True
+    ).value
+    fake = FakeDiscord(faults=FaultProfile(latency=0), bot_permissions=cannot_create_threads)
+    await fake.start()
+    bot.use_discord_endpoints(fake.api_url, fake.gateway_url)
+    guild_id, _, _ = fake.target(0, 0, 0)
+    metrics = Metrics()
+    shadow = ShadowMode([guild_id], metrics=metrics)
+    client = bot.build_bot()
+    try:
+        await client.login("fake-token")
+        state = client._connection
+        for payload in fake.guild_payloads():
+            state._add_guild_from_data(payload)  # type: ignore[arg-type]
+        permissions = PermissionsService(
+            get_self_id=lambda: client.user.id if client.user else None,
+            get_client_id=lambda: "1",
+            logger=log,
+        )
+        orchestrator = ThreadingOrchestrator(
+            permissions=permissions, logger=log, metrics=metrics, shadow=shadow
+        )
+        fake.reset_stats()
+        for i in range(2):  # the second is inside the warning cooldown
+            data = fake.reply_payload(0, 0, 0, author_id=5 * 10**17 + i)
+            channel = client.get_channel(int(data["channel_id"]))
+            message = discord.Message(state=state, channel=channel, data=data)  # type: ignore[arg-type]
+            await orchestrator.process(message)
+    finally:
+        await client.close()
+        await fake.stop()
+
+    assert fake.stats.total == 0
+    assert shadow.report(guild_id).skipped == 2
+    assert metrics.counter("shadow_calls_total", guild=guild_id, route=SEND_MESSAGE) == 1
+
+
+@pytest.mark.parametrize("bot_permissions", [0x8, NO_MANAGE_MESSAGES])
+async def test_shadowed_guild_reads_but_never_writes(endpoints, bot_permissions):
+    fake = FakeDiscord(faults=FaultProfile(latency=0), bot_permissions=bot_permissions)
+    await fake.start()
+    bot.use_discord_endpoints(fake.api_url, fake.gateway_url)
+    guild_id, _, _ = fake.target(0, 0, 0)
+    metrics = Metrics()
+    shadow = ShadowMode([guild_id], metrics=metrics)
+    client = bot.build_bot()
+    try:
+        await client.login("fake-token")
+        state = client._connection
+        for payload in fake.guild_payloads():
+            state._add_guild_from_data(payload)  # type: ignore[arg-type]
+        permissions = PermissionsService(
+            get_self_id=lambda: client.user.id if client.user else None,
+            get_client_id=lambda: "1",
+            logger=log,
+        )
+        orchestrator = ThreadingOrchestrator(
+            permissions=permissions, logger=log, metrics=metrics, shadow=shadow
+        )
+        fake.reset_stats()
+        replies = []
+        for i, shape in enumerate([{"attachments": (3000,)}, {}]):
+            data = fake.reply_payload(0, 0, 0, author_id=5 * 10**17 + i, **shape)
+            channel = client.get_channel(int(data["channel_id"]))
+            message = discord.Message(state=state, channel=channel, data=data)  # type: ignore[arg-type]
+            await orchestrator.process(message)
+            replies.append(message.id)
+        await orchestrator.drain(timeout=5)
+    finally:
+        await client.close()
+        await fake.stop()
+
+    # Parent fetch and re-fetch only, for each reply.
+    assert set(fake.stats.calls) == {"GET /api/v10/channels/{channel_id}/messages/{message_id}"}
+    assert fake.stats.total == 4
+    assert not fake._threads
+    assert all(reply in fake._messages for reply in replies)
+
+    report = shadow.report(guild_id)
+    assert report.conversions == 2
+
+    def calls(route: str) -> float:
+        return metrics.counter("shadow_calls_total", guild=guild_id, route=route)
+
+    assert calls(CREATE_THREAD) == 1  # the second reply goes to the "created" thread
+    assert calls(CDN_DOWNLOAD) == 1
+    # fetch x2, create, repost, add member, [fetch + delete original,]
+    # notify[, delete notification] -- then the same without the create.
+    manage = bot_permissions != NO_MANAGE_MESSAGES
+    assert report.calls_per_conversion == pytest.approx(8.5 if manage else 5.5)
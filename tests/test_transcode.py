@@ -0,0 +1,121 @@
+"""Tests for threadit.transcode (image downscaling and its bounded worker pool)."""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, MagicMock
+
+import discord
+import pytest
+
+from threadit.metrics import Metrics
+from threadit.transcode import ImageTranscoder, is_image, shrink_image
+
+Image = pytest.importorskip("PIL.Image")
+
+log = logging.getLogger("test-transcode")
+
+
+def noisy_image(size: tuple[int, int], fmt: str = "PNG", mode: str = "RGB") -> bytes:
+    """Random pixels: compresses badly, like a photo."""
+    channels = len(mode)
+    image = Image.frombytes(mode, size, os.urandom(size[0] * size[1] * channels))
+    out = io.BytesIO()
+    image.save(out, fmt)
+    return out.getvalue()
+
+
+def test_is_image_by_content_type_or_extension():
+    def attachment(filename: str, content_type: str | None) -> MagicMock:
+        att = MagicMock(spec=discord.Attachment)
+        att.filename, att.content_type = filename, content_type
+        return att
+
+    assert is_image(attachment("photo", "image/jpeg"))
+    assert is_image(attachment("scan.PNG", None))
+    assert not is_image(attachment("clip.mp4", "video/mp4"))
+
+
+def test_opaque_image_becomes_a_jpeg_under_the_cap():
+    data = noisy_image((1200, 900))
+    result = shrink_image(data, 200_000, "holiday.png")
+    assert result is not None
+    shrunk, filename = result
+    assert len(shrunk) <= 200_000 < len(data)
+    assert filename == "holiday.jpg"
+    with Image.open(io.BytesIO(shrunk)) as image:
+        assert image.format == "JPEG"
+
+
+def test_transparency_is_kept_as_webp():
+    result = shrink_image(noisy_image((800, 800), mode="RGBA"), 150_000, "logo.png")
+    assert result is not None
+    with Image.open(io.BytesIO(result[0])) as image:
+        assert image.format == "WEBP" and image.mode == "RGBA"
+    assert result[1] == "logo.webp"
+
+
+def test_unreadable_or_animated_images_are_left_alone():
+    assert shrink_image(b"not an image", 1000, "x.png") is None
+    frames = [Image.new("RGB", (64, 64), color) for color in ("red", "blue")]
+    out = io.BytesIO()
+    frames[0].save(out, "GIF", save_all=True, append_images=frames[1:])
+    assert shrink_image(out.getvalue(), 100, "party.gif") is None
+
+
+async def test_pool_is_bounded_and_refuses_beyond_its_queue():
+    release = threading.Event()
+
+    def blocked(*args):
+        release.wait(5)
+        return b"small", "x.jpg"
+
+    metrics = Metrics()
+    transcoder = ImageTranscoder(
+        workers=1,
+        max_queued=2,
+        max_source_bytes=10**6,
+        metrics=metrics,
+        logger=log,
+        executor=ThreadPoolExecutor(max_workers=1),
+    )
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr("threadit.transcode.shrink_image", blocked)
+        jobs = [
+            asyncio.create_task(transcoder.shrink(b"x" * 100, max_bytes=10, filename="x.png"))
+            for _ in range(2)
+        ]
+        await asyncio.sleep(0)
+        assert await transcoder.shrink(b"x", max_bytes=10, filename="x.png") is None
+        attachment = MagicMock(spec=discord.Attachment, filename="y.png")
+        attachment.read = AsyncMock(return_value=b"y")
+        assert await transcoder.shrink_attachment(attachment, max_bytes=10) is None
+        attachment.read.assert_not_called()  # refused before downloading
+        release.set()
+        assert await asyncio.gather(*jobs) == [(b"small", "x.jpg")] * 2
+        attachment.read.side_effect = discord.HTTPException(MagicMock(status=500), "boom")
+        with pytest.raises(discord.HTTPException):
+            await transcoder.shrink_attachment(attachment, max_bytes=10)
+        assert transcoder._queued == 0  # the failed download gave its slot back
+    transcoder.close()
+    assert metrics.counter("image_downscale_total", outcome="queue_full") == 2
+    assert metrics.counter("image_downscale_total", outcome="shrunk") == 2
+    assert metrics.counter("image_downscale_bytes_saved_total") == 190
+
+
+async def test_shrinks_in_a_worker_process():
+    transcoder = ImageTranscoder(
+        workers=1, max_queued=4, max_source_bytes=10**7, metrics=Metrics(), logger=log
+    )
+    try:
+        result = await transcoder.shrink(
+            noisy_image((600, 600)), max_bytes=100_000, filename="a.png"
+        )
+    finally:
+        transcoder.close()
+    assert result is not None and len(result[0]) <= 100_000
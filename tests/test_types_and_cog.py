@@ -1,8 +1,10 @@
-"""Tests for shared helpers and the cog's help-message builder."""
+"""Tests for shared helpers and the cog's help- and stats-message builders."""
 
 from __future__ import annotations
 
-from threadit.cog import build_help_message
+from threadit.cog import build_help_message, build_stats_message
+from threadit.metrics import Metrics
+from threadit.orchestrator import OrchestratorLoad
 from threadit.types import DEFAULT_CLIENT_ID, invite_url
 
 
@@ -75,3 +77,29 @@ class TestBuildHelpMessage:
             client_id="42",
         )
         assert "All permissions are correctly set up" in msg
+
+
+class TestBuildStatsMessage:
+    def test_reports_rates_latencies_and_backlog(self):
+        m = Metrics()
+        for _ in range(3):
+            m.mark("conversions")
+        m.mark("rest_rate_limited")
+        m.observe("conversion_seconds", 0.4)
+        m.observe("conversion_stage_seconds", 0.12, stage="repost")
+        load = OrchestratorLoad(
+            in_flight=4,
+            parent_locks=2,
+            lock_waiters=1,
+            pending_deletions=5,
+            attachment_bytes=2_500_000,
+        )
+        text = build_stats_message(load, m)
+        assert "Conversions: 3/min" in text
+        assert "total 400/400" in text
+        assert "repost 120/120" in text
+        assert "gather n/a" in text
+        assert "4 conversions, 1 queued on 2 parent locks" in text
+        assert "Pending deletions: 5" in text
+        assert "2.5 MB" in text
+        assert "1 Discord 429s, 0 replies dropped" in text
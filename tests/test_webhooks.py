@@ -0,0 +1,253 @@
+"""Tests for threadit.webhooks and the orchestrator's webhook repost against the fake."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from unittest.mock import ANY, AsyncMock, MagicMock
+
+import aiohttp
+import discord
+import pytest
+
+import bot
+from benchmarks.fakediscord import BOT_ID, FakeDiscord, FaultProfile
+from threadit.cog import ThreadItCog
+from threadit.metrics import Metrics
+from threadit.orchestrator import ThreadingOrchestrator
+from threadit.permissions import PermissionsService
+from threadit.webhooks import WEBHOOK_NAME, WebhookCache
+
+log = logging.getLogger("test-webhooks")
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _channel(channel_id: int, *existing: MagicMock) -> MagicMock:
+    channel = MagicMock(spec=discord.TextChannel)
+    channel.id = channel_id
+    channel.guild.me.id = BOT_ID
+    channel.webhooks = AsyncMock(return_value=list(existing))
+    channel.create_webhook = AsyncMock(
+        side_effect=lambda **_: _webhook(channel_id * 10, owner=BOT_ID)
+    )
+    return channel
+
+
+def _webhook(webhook_id: int, *, owner: int, token: str | None = "t") -> MagicMock:
+    webhook = MagicMock(spec=discord.Webhook)
+    webhook.id = webhook_id
+    webhook.type = discord.WebhookType.incoming
+    webhook.token = token
+    webhook.user.id = owner
+    return webhook
+
+
+def _cache(*, allowed: bool = True, **kwargs) -> WebhookCache:
+    permissions = MagicMock()
+    permissions.check_specific_permission.return_value = allowed
+    return WebhookCache(permissions=permissions, metrics=Metrics(), logger=log, **kwargs)
+
+
+async def test_reuses_the_bots_own_webhook_and_creates_one_otherwise():
+    cache = _cache()
+    someone_elses = _webhook(1, owner=42)
+    ours = _webhook(2, owner=BOT_ID)
+    reused = _channel(7, someone_elses, _webhook(3, owner=BOT_ID, token=None), ours)
+    assert await cache.get(reused) is ours
+    reused.create_webhook.assert_not_called()
+
+    bare = _channel(8, someone_elses)
+    created = await cache.get(bare)
+    assert created is not None and created.id == 80
+    bare.create_webhook.assert_awaited_once_with(name=WEBHOOK_NAME, reason=ANY)
+
+
+async def test_concurrent_gets_share_one_lookup_and_hits_skip_it():
+    cache = _cache()
+    channel = _channel(7)
+    first, second = await asyncio.gather(cache.get(channel), cache.get(channel))
+    assert first is second
+    assert await cache.get(channel) is first
+    channel.webhooks.assert_awaited_once()
+    assert cache.metrics.counter("webhook_cache_total", outcome="hit") == 1
+
+
+async def test_lru_eviction_and_invalidation():
+    cache = _cache(max_size=2)
+    a, b, c = _channel(1), _channel(2), _channel(3)
+    for channel in (a, b, a, c):  # touching a again makes b the oldest
+        await cache.get(channel)
+    assert len(cache) == 2
+    b.webhooks.reset_mock()
+    await cache.get(b)
+    b.webhooks.assert_awaited_once()
+
+    a.webhooks.reset_mock()
+    cache.invalidate(a.id)
+    await cache.get(a)
+    a.webhooks.assert_awaited_once()
+
+
+async def test_missing_permission_or_failed_lookup_means_post_as_the_bot():
+    assert await _cache(allowed=False).get(_channel(7)) is None
+
+    clock = FakeClock()
+    cache = _cache(failure_ttl_seconds=300, clock=clock)
+    full = _channel(7)
+    full.create_webhook.side_effect = discord.HTTPException(
+        MagicMock(status=400), {"code": 30007, "message": "Maximum number of webhooks reached"}
+    )
+    assert await cache.get(full) is None
+    assert await cache.get(full) is None  # not retried yet
+    full.webhooks.assert_awaited_once()
+    clock.now += 300
+    assert await cache.get(full) is None
+    assert full.webhooks.await_count == 2
+
+
+async def test_failed_lookups_are_forgotten_once_expired_and_capped():
+    clock = FakeClock()
+    cache = _cache(max_size=2, failure_ttl_seconds=300, clock=clock)
+    channels = [_channel(i) for i in (1, 2, 3)]
+    for channel in channels:
+        channel.webhooks.side_effect = discord.HTTPException(MagicMock(status=500), "boom")
+        assert await cache.get(channel) is None
+    assert list(cache._failed) == [2, 3]  # oldest dropped
+
+    clock.now += 300
+    channels[1].webhooks.side_effect = None
+    assert await cache.get(channels[1]) is not None
+    assert list(cache._failed) == [3]
+
+
+async def test_cog_invalidates_on_webhooks_update():
+    orchestrator = MagicMock()
+    orchestrator.webhooks = _cache()
+    orchestrator.webhooks.invalidate = MagicMock()
+    cog = ThreadItCog(MagicMock(), orchestrator, MagicMock(), get_client_id=lambda: "1", logger=log)
+    channel = MagicMock(spec=discord.TextChannel)
+    channel.id = 7
+    await cog.on_webhooks_update(channel)
+    orchestrator.webhooks.invalidate.assert_called_once_with(7)
+
+
+async def test_reposts_go_through_the_channel_webhook_and_fall_back_when_it_is_gone(endpoints):
+    fake = FakeDiscord(faults=FaultProfile(latency=0), parents=4)
+    await fake.start()
+    bot.use_discord_endpoints(fake.api_url, fake.gateway_url)
+    metrics = Metrics()
+    client = bot.build_bot()
+    try:
+        await client.login("fake-token")
+        state = client._connection
+        for payload in fake.guild_payloads():
+            state._add_guild_from_data(payload)  # type: ignore[arg-type]
+        permissions = PermissionsService(
+            get_self_id=lambda: client.user.id if client.user else None,
+            get_client_id=lambda: "1",
+            logger=log,
+        )
+        webhooks = WebhookCache(permissions=permissions, metrics=metrics, logger=log)
+        orchestrator = ThreadingOrchestrator(
+            permissions=permissions, logger=log, metrics=metrics, webhooks=webhooks
+        )
+
+        replies = []
+
+        async def convert(parent: int, **shape) -> None:
+            data = fake.reply_payload(0, 0, parent, author_id=5 * 10**17 + parent, **shape)
+            channel = client.get_channel(int(data["channel_id"]))
+            message = discord.Message(state=state, channel=channel, data=data)  # type: ignore[arg-type]
+            await orchestrator.process(message)
+            replies.append(message.id)
+
+        fake.reset_stats()
+        await convert(0)
+        await convert(1, attachments=(1500,))
+        await fake.delete_webhooks(0, 0)  # no gateway here: the cache can't know
+        await convert(2)  # Unknown Webhook: reposted as the bot
+        await convert(3)  # a fresh webhook
+        await orchestrator.drain(timeout=5)
+    finally:
+        await client.close()
+        await fake.stop()
+
+    assert not any(reply in fake._messages for reply in replies)  # all converted
+    calls = fake.stats.calls
+    assert calls["GET /api/v10/channels/{channel_id}/webhooks"] == 2
+    assert calls["POST /api/v10/channels/{channel_id}/webhooks"] == 2
+    assert calls["POST /api/v10/webhooks/{webhook_id}/{webhook_token}"] == 4
+    reposts = [
+        m
+        for m in fake._messages.values()
+        if int(m["channel_id"]) in fake._threads.values() and m["type"] == 0
+    ]
+    by_webhook = sorted(m["author"]["username"] for m in reposts if "webhook_id" in m)
+    assert by_webhook == [f"user-{5 * 10**17 + p}" for p in (0, 1, 3)]
+    assert [m["embeds"][0]["author"]["name"] for m in reposts if "webhook_id" not in m] == [
+        f"user-{5 * 10**17 + 2}"
+    ]
+    assert metrics.counter("webhook_reposts_total", outcome="fallback") == 1
+    assert metrics.counter("webhook_cache_total", outcome="created") == 2
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        aiohttp.ServerDisconnectedError(),
+        discord.DiscordServerError(MagicMock(status=503), "upstream connect error"),
+    ],
+    ids=["disconnected", "5xx"],
+)
+async def test_webhook_post_with_an_unknown_outcome_is_not_reposted_as_the_bot(
+    endpoints, monkeypatch, error
+):
+    fake = FakeDiscord(faults=FaultProfile(latency=0))
+    send = discord.Webhook.send
+
+    async def delivered_then_failed(self, *args, **kwargs):
+        await send(self, *args, **kwargs)
+        raise error
+
+    monkeypatch.setattr(discord.Webhook, "send", delivered_then_failed)
+    await fake.start()
+    bot.use_discord_endpoints(fake.api_url, fake.gateway_url)
+    metrics = Metrics()
+    client = bot.build_bot()
+    try:
+        await client.login("fake-token")
+        state = client._connection
+        for payload in fake.guild_payloads():
+            state._add_guild_from_data(payload)  # type: ignore[arg-type]
+        permissions = PermissionsService(
+            get_self_id=lambda: client.user.id if client.user else None,
+            get_client_id=lambda: "1",
+            logger=log,
+        )
+        webhooks = WebhookCache(permissions=permissions, metrics=metrics, logger=log)
+        orchestrator = ThreadingOrchestrator(
+            permissions=permissions, logger=log, metrics=metrics, webhooks=webhooks
+        )
+        data = fake.reply_payload(0, 0, 0, author_id=5 * 10**17)
+        channel = client.get_channel(int(data["channel_id"]))
+        message = discord.Message(state=state, channel=channel, data=data)  # type: ignore[arg-type]
+        fake.reset_stats()
+        await orchestrator.process(message)
+        await orchestrator.drain(timeout=5)
+    finally:
+        await client.close()
+        await fake.stop()
+
+    assert message.id in fake._messages, "the original stays: the repost is unconfirmed"
+    reposts = [m for m in fake._messages.values() if int(m["channel_id"]) in fake._threads.values()]
+    assert ["webhook_id" in m for m in reposts] == [True]
+    assert fake.stats.calls["POST /api/v10/channels/{channel_id}/messages"] == 0
+    assert metrics.counter("webhook_reposts_total", outcome="unknown") == 1
+    assert metrics.counter("webhook_reposts_total", outcome="fallback") == 0
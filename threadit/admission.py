@@ -0,0 +1,51 @@
+"""Freshness-based admission control for incoming replies."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from datetime import UTC, datetime
+from enum import Enum
+
+
+class Admission(Enum):
+    FULL = "full"
+    # Convert, but skip the "continue in thread" notification: the author
+    # has long since moved on and a ping now is just noise.
+    DOWNGRADE = "downgrade"
+    SHED = "shed"
+
+
+class FreshnessPolicy:
+    """
+    Decides how much work a reply still deserves from its age
+    (``message.created_at`` against the clock).
+
+    Replies older than ``downgrade_after`` seconds are converted without a
+    notification; older than ``shed_after`` they're dropped untouched. Either
+    threshold may be ``None`` to disable that tier. Under normal load every
+    reply is seconds old, so this only bites when a burst has backed up the
+    pipeline.
+    """
+
+    def __init__(
+        self,
+        *,
+        downgrade_after: float | None,
+        shed_after: float | None,
+        clock: Callable[[], datetime] = lambda: datetime.now(UTC),
+    ) -> None:
+        if downgrade_after is not None and shed_after is not None and downgrade_after > shed_after:
+            raise ValueError("downgrade_after must not exceed shed_after")
+        self.downgrade_after = downgrade_after
+        self.shed_after = shed_after
+        self._clock = clock
+
+    def age(self, created_at: datetime) -> float:
+        return (self._clock() - created_at).total_seconds()
+
+    def classify(self, age: float) -> Admission:
+        if self.shed_after is not None and age > self.shed_after:
+            return Admission.SHED
+        if self.downgrade_after is not None and age > self.downgrade_after:
+            return Admission.DOWNGRADE
+        return Admission.FULL
@@ -7,12 +7,15 @@ import logging
 
 import discord
 
+from .transcode import ImageTranscoder
+
 
 async def build_attachment_files(
     attachments: list[discord.Attachment],
     *,
     max_bytes: int,
     logger: logging.Logger,
+    transcoder: ImageTranscoder | None = None,
 ) -> tuple[list[discord.File], bool]:
     """
     Download attachments and convert them into ``discord.File`` objects,
@@ -22,28 +25,65 @@ async def build_attachment_files(
     Returns ``(files, all_succeeded)``. ``all_succeeded`` is ``False`` if any
     attachment was skipped (oversize) or failed to download — the caller
     uses this to avoid deleting the original message.
+
+    With a ``transcoder``, oversize images it accepts are downloaded and
+    downscaled to fit instead of skipped.
     """
     files: list[discord.File] = []
     all_succeeded = True
 
     for attachment in attachments:
         if attachment.size and attachment.size > max_bytes:
+            if transcoder is not None and transcoder.accepts(attachment):
+                file = await _downscaled_file(attachment, max_bytes, transcoder, logger)
+                if file is not None:
+                    files.append(file)
+                    continue
             logger.warning(
-                f"Skipping oversize attachment {attachment.filename} "
-                f"({attachment.size} bytes > {max_bytes} byte limit)"
+                "Skipping oversize attachment %s (%d bytes > %d byte limit)",
+                attachment.filename,
+                attachment.size,
+                max_bytes,
             )
             all_succeeded = False
             continue
 
         try:
             file_data = await attachment.read()
-            files.append(discord.File(
-                fp=io.BytesIO(file_data),
-                filename=attachment.filename,
-                description=attachment.description,
-            ))
+            files.append(
+                discord.File(
+                    fp=io.BytesIO(file_data),
+                    filename=attachment.filename,
+                    description=attachment.description,
+                )
+            )
         except Exception as e:
-            logger.warning(f"Failed to process attachment {attachment.filename}: {e}")
+            logger.warning("Failed to process attachment %s: %s", attachment.filename, e)
             all_succeeded = False
 
     return files, all_succeeded
+
+
+async def _downscaled_file(
+    attachment: discord.Attachment,
+    max_bytes: int,
+    transcoder: ImageTranscoder,
+    logger: logging.Logger,
+) -> discord.File | None:
+    try:
+        result = await transcoder.shrink_attachment(attachment, max_bytes=max_bytes)
+    except Exception as e:
+        logger.warning("Failed to download oversize image %s: %s", attachment.filename, e)
+        return None
+    if result is None:
+        return None
+    data, filename = result
+    logger.info(
+        "Downscaled %s from %d to %d bytes to fit the %d byte limit",
+        attachment.filename,
+        attachment.size,
+        len(data),
+        max_bytes,
+        extra={"event": "attachment.downscaled"},
+    )
+    return discord.File(fp=io.BytesIO(data), filename=filename, description=attachment.description)
@@ -0,0 +1,382 @@
+"""Backfill: convert replies already sitting in channel history into threads."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+from pathlib import Path
+
+import discord
+
+from .metrics import Metrics
+from .orchestrator import NONCE_REPOST, ThreadingOrchestrator, message_nonce, repost_embeds
+from .ratelimit import CallPacer
+from .types import ReplyInfo
+
+# Messages per history request; Discord's maximum.
+PAGE_SIZE = 100
+# Discord's caps on one message, which bound a batched repost.
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+# Bulk delete takes 2-100 messages, none older than 14 days (margin included).
+BULK_DELETE_MAX = 100
+BULK_DELETE_MAX_AGE = timedelta(days=14) - timedelta(minutes=10)
+
+ChannelLike = discord.TextChannel | discord.VoiceChannel | discord.StageChannel
+
+
+@dataclass
+class ChannelCheckpoint:
+    """How far backfill got in one channel."""
+
+    # Snowflake of the first run's start: newer replies belong to the live bot.
+    until: int
+    # Newest message of the last fully handled page; history resumes after it.
+    after: int = 0
+    converted: int = 0
+    done: bool = False
+
+
+class CheckpointStore:
+    """Per-channel checkpoints in one JSON file, rewritten atomically."""
+
+    def __init__(self, path: Path, *, logger: logging.Logger) -> None:
+        self.path = path
+        self.logger = logger
+
+    def load(self) -> dict[int, ChannelCheckpoint]:
+        try:
+            raw = json.loads(self.path.read_text(encoding="utf-8"))
+            return {int(cid): ChannelCheckpoint(**cp) for cid, cp in raw.items()}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError, TypeError) as e:
+            # Starting over is safe: converted replies are gone from history.
+            self.logger.warning("Ignoring unreadable backfill checkpoints in %s: %s", self.path, e)
+            return {}
+
+    def save(self, checkpoints: dict[int, ChannelCheckpoint]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        data = {str(cid): asdict(cp) for cid, cp in checkpoints.items()}
+        tmp.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+def plan_batches(replies: Iterable[ReplyInfo]) -> list[list[ReplyInfo]]:
+    """
+    Pack replies (in order) into as few thread posts as Discord allows:
+    at most 10 embeds and 6000 embed characters per message. A reply with
+    attachments is posted on its own so its files stay next to its text.
+    """
+    batches: list[list[ReplyInfo]] = []
+    current: list[ReplyInfo] = []
+    embeds = chars = 0
+    for info in replies:
+        if info.attachments:
+            if current:
+                batches.append(current)
+                current, embeds, chars = [], 0, 0
+            batches.append([info])
+            continue
+        built = repost_embeds(info)
+        size = sum(len(e) for e in built)
+        if current and (
+            embeds + len(built) > MAX_EMBEDS_PER_MESSAGE
+            or chars + size > MAX_EMBED_CHARS_PER_MESSAGE
+        ):
+            batches.append(current)
+            current, embeds, chars = [], 0, 0
+        current.append(info)
+        embeds += len(built)
+        chars += size
+    if current:
+        batches.append(current)
+    return batches
+
+
+def is_history_reply(message: discord.Message) -> bool:
+    """A user's reply to a message in the same channel."""
+    reference = message.reference
+    return (
+        message.type == discord.MessageType.reply
+        and not message.author.bot
+        and reference is not None
+        and reference.message_id is not None
+        and reference.channel_id == message.channel.id
+    )
+
+
+class Backfiller:
+    """
+    Walks channel history oldest-first, one page at a time, and converts
+    the replies on each page grouped by parent: one parent fetch and (at
+    most) one thread per group, reposts packed by ``plan_batches`` (their
+    authors added to the thread), and originals removed with bulk deletes
+    where Discord allows, one by one where it doesn't.
+
+    No notifications are sent; the replies are old. REST calls go through
+    a ``CallPacer`` at ``calls_per_second``. Up to
+    ``concurrency`` groups of a page are converted at once. A checkpoint is
+    saved after every page. Channels in shadow-mode guilds are left alone
+    unless ``dry_run``.
+    """
+
+    def __init__(
+        self,
+        orchestrator: ThreadingOrchestrator,
+        checkpoints: CheckpointStore,
+        *,
+        calls_per_second: float,
+        concurrency: int,
+        metrics: Metrics,
+        logger: logging.Logger,
+        dry_run: bool = False,
+    ) -> None:
+        self.orchestrator = orchestrator
+        self.checkpoints = checkpoints
+        self.concurrency = max(1, concurrency)
+        self.metrics = metrics
+        self.logger = logger
+        self.dry_run = dry_run
+        self._pacer = CallPacer(rate=calls_per_second, metrics=metrics)
+        self._state = checkpoints.load()
+
+    async def run(self, channels: Iterable[ChannelLike]) -> int:
+        """Backfill ``channels`` one after another; returns replies converted."""
+        total = 0
+        for channel in channels:
+            total += await self.backfill_channel(channel)
+        return total
+
+    async def backfill_channel(self, channel: ChannelLike) -> int:
+        shadow = self.orchestrator.shadow
+        if not self.dry_run and shadow is not None and shadow.covers(channel.guild.id):
+            self.logger.warning(
+                "Skipping #%s: its guild is in shadow mode (use --dry-run to size it up)",
+                channel.name,
+                extra={"event": "backfill.skipped", "channel_id": channel.id},
+            )
+            return 0
+        permissions = self.orchestrator.permissions
+        has_required, missing, _ = permissions.validate_permissions(channel)
+        if not has_required:
+            self.logger.warning(
+                "Skipping #%s: missing %s",
+                channel.name,
+                ", ".join(missing),
+                extra={"event": "backfill.skipped", "channel_id": channel.id},
+            )
+            return 0
+        can_delete = permissions.check_specific_permission(channel, "manage_messages")
+
+        checkpoint = self._state.get(channel.id)
+        if checkpoint is None:
+            checkpoint = ChannelCheckpoint(
+                until=discord.utils.time_snowflake(discord.utils.utcnow())
+            )
+        if checkpoint.done:
+            self.logger.info("#%s already backfilled; skipping", channel.name)
+            return 0
+        self.logger.info(
+            "Backfilling #%s%s",
+            channel.name,
+            f" from message {checkpoint.after}" if checkpoint.after else "",
+            extra={"event": "backfill.channel", "channel_id": channel.id},
+        )
+
+        converted = 0
+        page: list[discord.Message] = []
+        history = channel.history(
+            limit=None,
+            after=discord.Object(id=checkpoint.after),
+            before=discord.Object(id=checkpoint.until),
+            oldest_first=True,
+        )
+        async for message in history:
+            page.append(message)
+            if len(page) == PAGE_SIZE:
+                converted += await self._finish_page(channel, page, can_delete, checkpoint)
+                page = []
+        if page:
+            converted += await self._finish_page(channel, page, can_delete, checkpoint)
+        if not self.dry_run:
+            checkpoint.done = True
+            self._save(channel.id, checkpoint)
+        self.logger.info(
+            "Backfilled #%s: %d replies converted (%d in total)",
+            channel.name,
+            converted,
+            checkpoint.converted,
+            extra={"event": "backfill.channel_done", "channel_id": channel.id},
+        )
+        return converted
+
+    async def _finish_page(
+        self,
+        channel: ChannelLike,
+        page: list[discord.Message],
+        can_delete: bool,
+        checkpoint: ChannelCheckpoint,
+    ) -> int:
+        # The history request for this page already went out; charge it now.
+        await self._pacer.wait()
+        groups: dict[int, list[discord.Message]] = {}
+        for message in page:
+            if is_history_reply(message):
+                assert message.reference is not None and message.reference.message_id
+                groups.setdefault(message.reference.message_id, []).append(message)
+
+        if self.dry_run:
+            replies = sum(len(g) for g in groups.values())
+            self.metrics.incr("backfill_replies_total", replies, outcome="found")
+            self.logger.info(
+                "#%s: %d replies to %d parents up to message %s",
+                channel.name,
+                replies,
+                len(groups),
+                page[-1].id,
+            )
+            return 0
+
+        gate = asyncio.Semaphore(self.concurrency)
+
+        async def convert(parent_id: int, replies: list[discord.Message]) -> int:
+            async with gate:
+                return await self._convert_group(channel, parent_id, replies, can_delete)
+
+        converted = sum(await asyncio.gather(*(convert(p, r) for p, r in groups.items())))
+        checkpoint.after = page[-1].id
+        checkpoint.converted += converted
+        self._save(channel.id, checkpoint)
+        return converted
+
+    async def _convert_group(
+        self,
+        channel: ChannelLike,
+        parent_id: int,
+        replies: list[discord.Message],
+        can_delete: bool,
+    ) -> int:
+        await self._pacer.wait()
+        try:
+            parent = await channel.fetch_message(parent_id)
+        except discord.NotFound:
+            self.metrics.incr("backfill_replies_total", len(replies), outcome="parent_missing")
+            return 0
+        except discord.HTTPException as e:
+            self.logger.warning("Could not fetch parent %s: %s", parent_id, e)
+            self.metrics.incr("backfill_replies_total", len(replies), outcome="failed")
+            return 0
+
+        infos = [
+            ReplyInfo(
+                content=m.content,
+                author=m.author,
+                attachments=list(m.attachments),
+                embeds=list(m.embeds),
+                channel=channel,
+                parent_message=parent,
+                message_id=m.id,
+                created_at=m.created_at,
+            )
+            for m in replies
+        ]
+        thread = parent.thread
+        if thread is None:
+            await self._pacer.wait()
+            thread = await self.orchestrator.create_thread_from_reply(infos[0])
+            if thread is None:
+                self.metrics.incr("backfill_replies_total", len(replies), outcome="failed")
+                return 0
+
+        reposted: set[int] = set()
+        added: set[int] = set()  # authors already in the thread
+        for batch in plan_batches(infos):
+            if await self._repost(thread, batch):
+                reposted.update(info.message_id for info in batch)
+                await self._add_authors(thread, batch, added)
+        self.metrics.incr("backfill_replies_total", len(reposted), outcome="converted")
+        if len(reposted) < len(replies):
+            self.metrics.incr(
+                "backfill_replies_total", len(replies) - len(reposted), outcome="failed"
+            )
+        if can_delete:
+            await self._delete(channel, [m for m in replies if m.id in reposted])
+        return len(reposted)
+
+    async def _repost(self, thread: discord.Thread, batch: list[ReplyInfo]) -> bool:
+        if batch[0].attachments:
+            # Upload plus adding the author to the thread.
+            await self._pacer.wait(2)
+            return await self.orchestrator.repost_reply_in_thread(thread, batch[0])
+        embeds = [embed for info in batch for embed in repost_embeds(info)]
+        await self._pacer.wait()
+        try:
+            await self.orchestrator.retry.call(
+                "repost",
+                lambda: thread.send(
+                    embeds=embeds, nonce=message_nonce(batch[0].message_id, NONCE_REPOST)
+                ),
+            )
+        except discord.HTTPException as e:
+            self.logger.error(
+                "Batched repost of %d replies to %s failed: %s", len(batch), thread.id, e
+            )
+            return False
+        return True
+
+    async def _add_authors(
+        self, thread: discord.Thread, batch: list[ReplyInfo], added: set[int]
+    ) -> None:
+        """Add the batch's authors to ``thread``, each once per group, as a repost would."""
+        if batch[0].attachments:
+            # repost_reply_in_thread has added this one already.
+            added.add(batch[0].author.id)
+            return
+        for info in batch:
+            if info.author.id in added:
+                continue
+            added.add(info.author.id)
+            await self._pacer.wait()
+            await self.orchestrator.add_to_thread(thread, info.author)
+
+    async def _delete(self, channel: ChannelLike, messages: list[discord.Message]) -> None:
+        cutoff = discord.utils.utcnow() - BULK_DELETE_MAX_AGE
+        recent = [m for m in messages if m.created_at > cutoff]
+        singles = [m for m in messages if m.created_at <= cutoff]
+        for i in range(0, len(recent), BULK_DELETE_MAX):
+            chunk = recent[i : i + BULK_DELETE_MAX]
+            await self._pacer.wait()
+            try:
+                await channel.delete_messages(chunk)
+            except discord.HTTPException as e:
+                # One reply deleted meanwhile fails the whole request; the
+                # rest are already reposted, so delete them one by one.
+                self.logger.warning(
+                    "Bulk delete in #%s failed (%s); deleting %d replies one by one",
+                    channel.name,
+                    e,
+                    len(chunk),
+                )
+                singles.extend(chunk)
+        for message in singles:
+            await self._pacer.wait()
+            try:
+                await message.delete()
+            except discord.NotFound:
+                pass
+            except discord.HTTPException as e:
+                self.logger.warning("Could not delete reply %s: %s", message.id, e)
+
+    def _save(self, channel_id: int, checkpoint: ChannelCheckpoint) -> None:
+        self._state[channel_id] = checkpoint
+        try:
+            self.checkpoints.save(self._state)
+        except OSError as e:
+            self.logger.warning("Could not save backfill checkpoint: %s", e)
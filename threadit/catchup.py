@@ -0,0 +1,243 @@
+"""Catch-up: convert replies posted while the bot was down or disconnected."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections.abc import Callable
+from datetime import timedelta
+from pathlib import Path
+
+import discord
+
+from .backfill import PAGE_SIZE, ChannelLike, is_history_reply
+from .metrics import Metrics
+from .orchestrator import ThreadingOrchestrator
+from .ratelimit import CallPacer, ReplyRateLimiter
+
+# Paces a conversion as this many calls: the per-conversion REST budget
+# the end-to-end tests hold a new-thread conversion to.
+CALLS_PER_CONVERSION = 8
+# Unhandled messages held per channel before the oldest is given up.
+MAX_HOLDS_PER_CHANNEL = 100
+
+
+class WatermarkStore:
+    """``{channel_id: last seen message id}`` in a JSON file, rewritten atomically."""
+
+    def __init__(self, path: Path, *, logger: logging.Logger) -> None:
+        self.path = path
+        self.logger = logger
+
+    def load(self) -> dict[int, int]:
+        try:
+            raw = json.loads(self.path.read_text(encoding="utf-8"))
+            return {int(cid): int(mid) for cid, mid in raw.items()}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            self.logger.warning("Ignoring unreadable catch-up watermarks in %s: %s", self.path, e)
+            return {}
+
+    def save(self, marks: dict[int, int]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps({str(cid): mid for cid, mid in marks.items()}), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+class CatchUp:
+    """
+    Keeps a per-channel high-water mark of the newest message the gateway
+    delivered and the bot is done with (``observe``), and after every READY
+    (``start``, from ``on_ready``) walks each channel's history after its
+    mark, sending the replies found there through
+    ``ThreadingOrchestrator.process``. Gateway resumes replay missed events
+    themselves; this covers restarts and sessions that had to re-identify.
+
+    ``on_message`` ``hold``s every message as it arrives and ``release``s
+    it once the bot is done with it, including replies dropped on purpose
+    (rate limited, shed as too old). A reply refused while shutting down,
+    or whose conversion failed, stays held. The stored mark stays below
+    the oldest held message, so such a reply, or one still converting
+    when the bot died, is caught up on the next start. At most
+    ``MAX_HOLDS_PER_CHANNEL`` are kept per channel, the oldest given up
+    first.
+
+    Marks are written to the store at most every ``flush_seconds`` and on
+    ``close``. While a channel is still being caught up its stored mark
+    stays at the catch-up's position, so a crash mid-run repeats the gap
+    rather than skipping it. Replies older than ``max_age_seconds`` (0: no
+    limit) are left alone; converting those is the backfill's job.
+
+    History pages and conversions go through a ``CallPacer`` at
+    ``calls_per_second``, and replies through the live bot's
+    ``rate_limiter``, and the orchestrator's freshness policy applies as
+    it does live: history older than its shed window isn't even read, and
+    older replies are converted without a notification. The orchestrator's
+    duplicate filter keeps one the live gateway also delivers from
+    converting twice.
+    """
+
+    def __init__(
+        self,
+        store: WatermarkStore,
+        orchestrator: ThreadingOrchestrator,
+        *,
+        calls_per_second: float,
+        max_age_seconds: float,
+        metrics: Metrics,
+        logger: logging.Logger,
+        rate_limiter: ReplyRateLimiter | None = None,
+        flush_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.store = store
+        self.orchestrator = orchestrator
+        self.max_age_seconds = max_age_seconds
+        self.metrics = metrics
+        self.logger = logger
+        self.rate_limiter = rate_limiter
+        self.flush_seconds = flush_seconds
+        self._clock = clock
+        self._pacer = CallPacer(rate=calls_per_second, metrics=metrics)
+        self._marks = store.load()
+        # channel id -> newest message the running catch-up has handled.
+        self._catching_up: dict[int, int] = {}
+        # channel id -> messages delivered but not (yet) handled.
+        self._holds: dict[int, set[int]] = {}
+        self._dirty = False
+        self._flushed_at = clock()
+        self._task: asyncio.Task | None = None
+
+    def observe(self, channel_id: int, message_id: int) -> None:
+        """Record that ``message_id`` in ``channel_id`` was delivered and handled."""
+        if message_id > self._marks.get(channel_id, 0):
+            self._marks[channel_id] = message_id
+            self._dirty = True
+        if self._dirty and self._clock() - self._flushed_at >= self.flush_seconds:
+            self.flush()
+
+    def hold(self, channel_id: int, message_id: int) -> None:
+        """Keep the stored mark below ``message_id`` until it is ``release``d."""
+        held = self._holds.setdefault(channel_id, set())
+        held.add(message_id)
+        if len(held) > MAX_HOLDS_PER_CHANNEL:
+            held.discard(min(held))
+
+    def release(self, channel_id: int, message_id: int) -> None:
+        """``message_id`` was handled: drop its hold and ``observe`` it."""
+        held = self._holds.get(channel_id)
+        if held is not None and message_id in held:
+            held.discard(message_id)
+            if not held:
+                del self._holds[channel_id]
+            self._dirty = True  # the mark it held back can be written now
+        self.observe(channel_id, message_id)
+
+    def _stored_mark(self, channel_id: int, mark: int) -> int:
+        """``mark``, held back by a running catch-up and unhandled messages."""
+        mark = min(mark, self._catching_up.get(channel_id, mark))
+        held = self._holds.get(channel_id)
+        if held:
+            mark = min(mark, min(held) - 1)
+        return mark
+
+    def start(self, get_channel: Callable[[int], object]) -> None:
+        """Catch up every marked channel in the background, unless a run is going."""
+        if self._task is not None and not self._task.done():
+            return
+        self._task = asyncio.get_running_loop().create_task(self.run(get_channel))
+
+    async def run(self, get_channel: Callable[[int], object]) -> int:
+        """Catch up every marked channel; returns replies sent for conversion."""
+        # A run that was cut short left its channels' progress behind;
+        # resume those from there rather than from the live marks.
+        queued = {cid: self._stored_mark(cid, mark) for cid, mark in self._marks.items()}
+        self._catching_up.update(queued)
+        total = 0
+        for channel_id, mark in queued.items():
+            channel = get_channel(channel_id)
+            if isinstance(
+                channel, discord.TextChannel | discord.VoiceChannel | discord.StageChannel
+            ):
+                total += await self.catch_up_channel(channel, mark)
+            self._catching_up.pop(channel_id, None)
+            self._dirty = True  # its held-back mark can be written now
+        if total:
+            self.logger.info(
+                "Caught up on %d missed repl%s",
+                total,
+                "y" if total == 1 else "ies",
+                extra={"event": "catchup.done"},
+            )
+        return total
+
+    async def catch_up_channel(self, channel: ChannelLike, after: int) -> int:
+        permissions = self.orchestrator.permissions
+        if not permissions.check_specific_permission(channel, "read_message_history"):
+            return 0
+        max_age = self.max_age_seconds
+        freshness = self.orchestrator.freshness
+        if freshness is not None and freshness.shed_after is not None:
+            # Older replies would be shed anyway: don't page through them.
+            max_age = min(max_age, freshness.shed_after) if max_age > 0 else freshness.shed_after
+        if max_age > 0:
+            oldest = discord.utils.utcnow() - timedelta(seconds=max_age)
+            after = max(after, discord.utils.time_snowflake(oldest))
+
+        sent = 0
+        seen = 0
+        await self._pacer.wait()
+        try:
+            async for message in channel.history(
+                limit=None, after=discord.Object(id=after), oldest_first=True
+            ):
+                seen += 1
+                if seen % PAGE_SIZE == 0:
+                    await self._pacer.wait()
+                if is_history_reply(message) and (
+                    self.rate_limiter is None
+                    or self.rate_limiter.allow(message.author.id, channel.id)
+                ):
+                    await self._pacer.wait(CALLS_PER_CONVERSION)
+                    if not await self.orchestrator.process(message):
+                        # Shutting down, or it failed: the next run resumes here.
+                        break
+                    sent += 1
+                self._catching_up[channel.id] = message.id
+                self.release(channel.id, message.id)
+        except discord.HTTPException as e:
+            self.logger.warning("Catch-up in #%s stopped: %s", channel.name, e)
+        if sent:
+            self.metrics.incr("catchup_replies_total", sent)
+            self.logger.info(
+                "#%s: caught up on %d missed repl%s",
+                channel.name,
+                sent,
+                "y" if sent == 1 else "ies",
+                extra={"event": "catchup.channel", "channel_id": channel.id},
+            )
+        return sent
+
+    def flush(self) -> None:
+        """Write the marks, held back by running catch-ups and unhandled messages."""
+        self._flushed_at = self._clock()
+        if not self._dirty:
+            return
+        marks = {cid: self._stored_mark(cid, mark) for cid, mark in self._marks.items()}
+        try:
+            self.store.save(marks)
+            self._dirty = False
+        except OSError as e:
+            self.logger.warning("Could not save catch-up watermarks: %s", e)
+
+    async def close(self) -> None:
+        """Stop a running catch-up and write the marks."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self.flush()
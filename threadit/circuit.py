@@ -0,0 +1,194 @@
+"""Per-channel and per-guild circuit breaker for persistently failing scopes."""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from enum import Enum
+
+from .metrics import Metrics
+
+
+class CircuitState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+@dataclass
+class _Circuit:
+    failures: int = 0
+    opened_at: float | None = None
+    probe_started: float | None = None
+    last_failure: float = 0.0
+    # Channel circuits remember their guild so a guild-wide reset can
+    # clear them too.
+    guild_id: int | None = None
+    # Guild circuits count failing channels, not failures.
+    channels: set[int] = field(default_factory=set)
+
+
+class CircuitBreaker:
+    """
+    Short-circuits replies in channels (and guilds) that keep failing with
+    Forbidden/NotFound-type outcomes, before any permission check or REST
+    call is made.
+
+    A channel opens after ``failure_threshold`` consecutive failures; a
+    guild once ``guild_failure_threshold`` of its channels have failed. A
+    channel counts towards its guild while its own circuit is closed, and
+    only once, so one channel the bot can't post in (a permission
+    overwrite) never shuts off the rest of the guild. After
+    ``open_seconds`` one probe is let through (half-open): success closes
+    the circuit, failure re-opens it. Permission-change gateway events
+    close circuits early via ``reset_channel`` / ``reset_guild``.
+
+    Closed circuits with no failures are dropped, and so is any circuit
+    with no failure for ``idle_seconds`` (default ten times
+    ``open_seconds``), so memory only holds currently-failing scopes —
+    this *is* the negative-result cache.
+    """
+
+    def __init__(
+        self,
+        *,
+        failure_threshold: int,
+        guild_failure_threshold: int,
+        open_seconds: float,
+        logger: logging.Logger,
+        metrics: Metrics,
+        idle_seconds: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.guild_failure_threshold = guild_failure_threshold
+        self.open_seconds = open_seconds
+        self.idle_seconds = 10 * open_seconds if idle_seconds is None else idle_seconds
+        self.logger = logger
+        self.metrics = metrics
+        self._clock = clock
+        self._channels: dict[int, _Circuit] = {}
+        self._guilds: dict[int, _Circuit] = {}
+        self._swept_at = clock()
+
+    # ------------------------------------------------------------------ #
+    # Queries
+    # ------------------------------------------------------------------ #
+
+    def _state(self, circuit: _Circuit | None, now: float) -> CircuitState:
+        if circuit is None or circuit.opened_at is None:
+            return CircuitState.CLOSED
+        if now - circuit.opened_at < self.open_seconds:
+            return CircuitState.OPEN
+        return CircuitState.HALF_OPEN
+
+    def channel_state(self, channel_id: int) -> CircuitState:
+        return self._state(self._channels.get(channel_id), self._clock())
+
+    def guild_state(self, guild_id: int) -> CircuitState:
+        return self._state(self._guilds.get(guild_id), self._clock())
+
+    @property
+    def open_count(self) -> int:
+        now = self._clock()
+        return sum(
+            1
+            for c in (*self._channels.values(), *self._guilds.values())
+            if self._state(c, now) is not CircuitState.CLOSED
+        )
+
+    def allow(self, channel_id: int, guild_id: int) -> bool:
+        """``False`` if the reply should be dropped without any further work."""
+        now = self._clock()
+        probes: list[tuple[str, _Circuit]] = []
+        for scope, circuit in (
+            ("guild", self._guilds.get(guild_id)),
+            ("channel", self._channels.get(channel_id)),
+        ):
+            state = self._state(circuit, now)
+            if state is CircuitState.CLOSED:
+                continue
+            assert circuit is not None
+            if state is CircuitState.HALF_OPEN and (
+                circuit.probe_started is None
+                # A probe whose outcome was never recorded (e.g. the reply was
+                # skipped for another reason) must not wedge the circuit.
+                or now - circuit.probe_started >= self.open_seconds
+            ):
+                probes.append((scope, circuit))
+                continue
+            self.metrics.incr("circuit_short_circuits_total", scope=scope)
+            return False
+        # Probes are only taken once every scope lets the reply through, so
+        # a channel still open can't use up its guild's one probe.
+        for scope, circuit in probes:
+            circuit.probe_started = now
+            self.logger.info("Circuit half-open for %s; allowing probe", scope)
+        return True
+
+    # ------------------------------------------------------------------ #
+    # Outcomes
+    # ------------------------------------------------------------------ #
+
+    def record_success(self, channel_id: int, guild_id: int) -> None:
+        if self._channels.pop(channel_id, None) is not None:
+            self.logger.info("Circuit closed for channel %s", channel_id)
+        if self._guilds.pop(guild_id, None) is not None:
+            self.logger.info("Circuit closed for guild %s", guild_id)
+
+    def record_failure(self, channel_id: int, guild_id: int, reason: str) -> None:
+        now = self._clock()
+        if now - self._swept_at >= self.open_seconds:
+            self._expire_idle(now)
+        channel = self._channels.setdefault(channel_id, _Circuit(guild_id=guild_id))
+        guild = self._guilds.setdefault(guild_id, _Circuit())
+        scopes = [("channel", channel_id, channel, self.failure_threshold)]
+        # A channel already open is failing on its own: its probes don't
+        # count against the guild (unless the reply was the guild's probe).
+        if channel.opened_at is None or guild.probe_started is not None:
+            scopes.append(("guild", guild_id, guild, self.guild_failure_threshold))
+        for scope, scope_id, circuit, threshold in scopes:
+            if scope == "guild":
+                circuit.channels.add(channel_id)
+                circuit.failures = len(circuit.channels)
+            else:
+                circuit.failures += 1
+            circuit.last_failure = now
+            was_probing = circuit.probe_started is not None
+            if circuit.failures >= threshold or was_probing:
+                if circuit.opened_at is None or was_probing:
+                    self.metrics.incr("circuit_opened_total", scope=scope)
+                    self.logger.warning(
+                        "Circuit opened for %s %s after %d failure(s) (last: %s); "
+                        "short-circuiting for %ss",
+                        scope,
+                        scope_id,
+                        circuit.failures,
+                        reason,
+                        self.open_seconds,
+                        extra={"event": "circuit.opened", "scope": scope, "scope_id": scope_id},
+                    )
+                circuit.opened_at = now
+                circuit.probe_started = None
+
+    def _expire_idle(self, now: float) -> None:
+        self._swept_at = now
+        for circuits in (self._channels, self._guilds):
+            for scope_id in [
+                i for i, c in circuits.items() if now - c.last_failure >= self.idle_seconds
+            ]:
+                del circuits[scope_id]
+
+    def reset_channel(self, channel_id: int) -> None:
+        if self._channels.pop(channel_id, None) is not None:
+            self.logger.info("Circuit reset for channel %s (permissions changed)", channel_id)
+
+    def reset_guild(self, guild_id: int) -> None:
+        cleared = self._guilds.pop(guild_id, None) is not None
+        for channel_id in [cid for cid, c in self._channels.items() if c.guild_id == guild_id]:
+            del self._channels[channel_id]
+            cleared = True
+        if cleared:
+            self.logger.info("Circuits reset for guild %s (permissions changed)", guild_id)
@@ -0,0 +1,286 @@
+"""Multi-process shard cluster: shard splitting, worker heartbeats, supervision."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import os
+import time
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+
+
+def parse_shard_ids(raw: str) -> list[int] | None:
+    """
+    Parse ``"0,1,4-7"`` into ``[0, 1, 4, 5, 6, 7]``; empty means "all".
+
+    Raises ``ValueError`` on anything else.
+    """
+    raw = raw.strip()
+    if not raw:
+        return None
+    ids: list[int] = []
+    for part in raw.split(","):
+        part = part.strip()
+        try:
+            if "-" in part:
+                start, end = (int(x) for x in part.split("-", 1))
+                if end < start:
+                    raise ValueError
+                ids.extend(range(start, end + 1))
+            else:
+                ids.append(int(part))
+        except ValueError:
+            raise ValueError(
+                f"SHARD_IDS entries must be integers or ranges like 0-3, got {part!r}"
+            ) from None
+    return sorted(set(ids))
+
+
+def format_shard_ids(ids: Sequence[int]) -> str:
+    return ",".join(str(i) for i in ids)
+
+
+def split_shards(shard_count: int, workers: int) -> list[list[int]]:
+    """
+    Split ``range(shard_count)`` into at most ``workers`` contiguous,
+    near-equal ranges.
+    """
+    if shard_count < 1 or workers < 1:
+        raise ValueError("shard_count and workers must be >= 1")
+    workers = min(workers, shard_count)
+    base, extra = divmod(shard_count, workers)
+    ranges: list[list[int]] = []
+    start = 0
+    for i in range(workers):
+        size = base + (1 if i < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return ranges
+
+
+class Heartbeat:
+    """
+    Touches ``path`` every ``interval`` seconds from the event loop, so the
+    supervisor sees a stale mtime if the loop wedges or ``healthy`` turns
+    false (e.g. the client closed). Lives inside each worker.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        interval: float,
+        healthy: Callable[[], bool] = lambda: True,
+    ) -> None:
+        self.path = path
+        self.interval = interval
+        self._healthy = healthy
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Start beating; must be called from inside the running loop."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            if self._healthy():
+                self.path.touch()
+            await asyncio.sleep(self.interval)
+
+
+@dataclass
+class _Worker:
+    index: int
+    shard_ids: list[int]
+    heartbeat: Path
+    process: asyncio.subprocess.Process | None = None
+    started_at: float = 0.0
+    # Consecutive short-lived runs; drives the restart backoff.
+    failures: int = 0
+    restart_at: float | None = None
+    spawns: int = 0
+
+
+class ClusterSupervisor:
+    """
+    Runs one bot process per shard range and keeps them alive.
+
+    Each worker is ``command`` with ``SHARDING_ENABLED``, ``SHARD_COUNT``,
+    ``SHARD_IDS`` and ``CLUSTER_HEARTBEAT_FILE`` set in its environment, so
+    it is an ordinary ``bot.py`` with its own event loop, orchestrator and
+    caches. Workers are started one identify window apart per shard to stay
+    within Discord's identify limit. A worker that exits, or whose heartbeat
+    file goes stale for ``heartbeat_timeout`` seconds, is stopped and
+    restarted with exponential backoff; the backoff resets once a worker has
+    stayed up for ``stable_after`` seconds.
+    """
+
+    def __init__(
+        self,
+        *,
+        shard_count: int,
+        workers: int,
+        command: Sequence[str],
+        heartbeat_dir: Path,
+        heartbeat_timeout: float,
+        logger: logging.Logger,
+        identify_interval: float = 5.0,
+        max_concurrency: int = 1,
+        base_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        stable_after: float = 300.0,
+        stop_timeout: float = 30.0,
+        poll_interval: float = 1.0,
+        env: dict[str, str] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        wall_clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.shard_count = shard_count
+        self.command = list(command)
+        self.heartbeat_timeout = heartbeat_timeout
+        self.logger = logger
+        self.identify_interval = identify_interval
+        self.max_concurrency = max(1, max_concurrency)
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.stable_after = stable_after
+        self.stop_timeout = stop_timeout
+        self.poll_interval = poll_interval
+        self._env = dict(os.environ if env is None else env)
+        self._clock = clock
+        self._wall_clock = wall_clock
+        self._stopping = asyncio.Event()
+        self.workers = [
+            _Worker(index=i, shard_ids=ids, heartbeat=heartbeat_dir / f"worker-{i}.alive")
+            for i, ids in enumerate(split_shards(shard_count, workers))
+        ]
+
+    # ------------------------------------------------------------------ #
+    # Lifecycle
+    # ------------------------------------------------------------------ #
+
+    async def run(self) -> None:
+        """Start every worker and supervise until ``stop`` is called."""
+        self.logger.info(
+            "Starting %d worker(s) for %d shard(s)", len(self.workers), self.shard_count
+        )
+        for worker in self.workers:
+            if self._stopping.is_set():
+                break
+            await self._spawn(worker)
+            # Each shard identifies in turn; give this worker's shards their
+            # identify slots before the next worker starts competing.
+            await self._sleep(self.identify_interval * len(worker.shard_ids) / self.max_concurrency)
+        while not self._stopping.is_set():
+            await self.check()
+            await self._sleep(self.poll_interval)
+        await self._terminate_all()
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    async def _sleep(self, seconds: float) -> None:
+        with contextlib.suppress(TimeoutError):
+            await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+
+    # ------------------------------------------------------------------ #
+    # Supervision
+    # ------------------------------------------------------------------ #
+
+    async def check(self) -> None:
+        """One supervision pass: reap exits, kill stale workers, restart."""
+        now = self._clock()
+        for worker in self.workers:
+            proc = worker.process
+            if proc is not None and proc.returncode is None and self._is_stale(worker, now):
+                self.logger.warning(
+                    "Worker %d (shards %s) missed heartbeats for %ss; restarting",
+                    worker.index,
+                    format_shard_ids(worker.shard_ids),
+                    self.heartbeat_timeout,
+                    extra={"event": "cluster.worker_stale", "worker": worker.index},
+                )
+                await self._terminate(worker)
+            if proc is not None and proc.returncode is not None:
+                self._schedule_restart(worker, proc.returncode, now)
+            if worker.restart_at is not None and now >= worker.restart_at:
+                await self._spawn(worker)
+
+    def _is_stale(self, worker: _Worker, now: float) -> bool:
+        try:
+            age = self._wall_clock() - worker.heartbeat.stat().st_mtime
+        except FileNotFoundError:
+            age = float("inf")
+        # A fresh worker gets a full timeout before its first beat is due.
+        return min(age, now - worker.started_at) > self.heartbeat_timeout
+
+    def _schedule_restart(self, worker: _Worker, returncode: int, now: float) -> None:
+        uptime = now - worker.started_at
+        worker.failures = 0 if uptime >= self.stable_after else worker.failures + 1
+        delay = min(self.max_backoff, self.base_backoff * 2**worker.failures)
+        worker.process = None
+        worker.restart_at = now + delay
+        self.logger.warning(
+            "Worker %d (shards %s) exited with %s after %.0fs; restarting in %.0fs",
+            worker.index,
+            format_shard_ids(worker.shard_ids),
+            returncode,
+            uptime,
+            delay,
+            extra={
+                "event": "cluster.worker_exit",
+                "worker": worker.index,
+                "returncode": returncode,
+            },
+        )
+
+    async def _spawn(self, worker: _Worker) -> None:
+        worker.heartbeat.parent.mkdir(parents=True, exist_ok=True)
+        worker.heartbeat.unlink(missing_ok=True)
+        env = {
+            **self._env,
+            "SHARDING_ENABLED": "true",
+            "SHARD_COUNT": str(self.shard_count),
+            "SHARD_IDS": format_shard_ids(worker.shard_ids),
+            "CLUSTER_HEARTBEAT_FILE": str(worker.heartbeat),
+        }
+        worker.process = await asyncio.create_subprocess_exec(*self.command, env=env)
+        worker.started_at = self._clock()
+        worker.restart_at = None
+        if worker.spawns:
+            self.logger.info("Restarted worker %d (pid %s)", worker.index, worker.process.pid)
+        else:
+            self.logger.info(
+                "Started worker %d (pid %s) for shards %s",
+                worker.index,
+                worker.process.pid,
+                format_shard_ids(worker.shard_ids),
+            )
+        worker.spawns += 1
+
+    async def _terminate(self, worker: _Worker) -> None:
+        proc = worker.process
+        if proc is None or proc.returncode is not None:
+            return
+        proc.terminate()
+        try:
+            await asyncio.wait_for(proc.wait(), timeout=self.stop_timeout)
+        except TimeoutError:
+            self.logger.warning("Worker %d ignored SIGTERM; killing", worker.index)
+            proc.kill()
+            await proc.wait()
+
+    async def _terminate_all(self) -> None:
+        self.logger.info("Stopping %d worker(s)", len(self.workers))
+        await asyncio.gather(*(self._terminate(w) for w in self.workers))
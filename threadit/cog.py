@@ -8,8 +8,14 @@ from collections.abc import Callable
 import discord
 from discord.ext import commands
 
-from .orchestrator import ThreadingOrchestrator
+from .catchup import CatchUp
+from .metrics import Metrics, percentile
+from .orchestrator import OrchestratorLoad, ThreadingOrchestrator
 from .permissions import PermissionsService
+from .profiling import Profiler
+from .ratelimit import ReplyRateLimiter
+from .recorder import TrafficRecorder
+from .shadow import ShadowReport
 from .types import invite_url
 
 
@@ -63,26 +69,88 @@ def build_help_message(
     )
 
 
+# Conversion stages in flow order, as labelled in conversion_stage_seconds.
+STATS_STAGES = ("validate", "gather", "parent_lock", "create_thread", "repost", "cleanup")
+
+
+def _ms(metrics: Metrics, name: str, **labels: object) -> str:
+    summary = metrics.summary(name, **labels)
+    if summary is None or not summary.count:
+        return "n/a"
+    recent = list(summary.recent)
+    return f"{percentile(recent, 50) * 1000:.0f}/{percentile(recent, 99) * 1000:.0f}"
+
+
+def build_stats_message(load: OrchestratorLoad, metrics: Metrics) -> str:
+    """
+    Live numbers for ``/thread-it stats``. Rates come from the metrics
+    event rings, latencies from the last ``SUMMARY_WINDOW`` samples per
+    stage; nothing here makes a REST call.
+    """
+    stages = " · ".join(
+        f"{stage} {_ms(metrics, 'conversion_stage_seconds', stage=stage)}" for stage in STATS_STAGES
+    )
+    return (
+        "**Thread It — live stats**\n"
+        f"Conversions: {metrics.recent('conversions', 60)}/min "
+        f"(last 10 min: {metrics.recent('conversions', 600) / 10:.1f}/min)\n"
+        f"Latency p50/p99 ms: total {_ms(metrics, 'conversion_seconds')}\n"
+        f"↳ {stages}\n"
+        f"In flight: {load.in_flight} conversions, {load.lock_waiters} queued "
+        f"on {load.parent_locks} parent locks\n"
+        f"Pending deletions: {load.pending_deletions} · "
+        f"attachment bytes in flight: {load.attachment_bytes / 1e6:.1f} MB\n"
+        f"Rate limits (last 5 min): {metrics.recent('rest_rate_limited', 300)} Discord 429s, "
+        f"{metrics.recent('replies_rate_limited', 300)} replies dropped by per-user/"
+        "channel buckets"
+    )
+
+
+def build_shadow_message(report: ShadowReport) -> str:
+    """Projected cost of a shadowed guild, appended to its ``/thread-it stats``."""
+    routes = " · ".join(f"{route} x{count}" for route, count in report.top_routes) or "none yet"
+    return (
+        "**Shadow mode — nothing is posted in this server**\n"
+        f"Would convert: {report.conversions} replies so far, "
+        f"{report.conversions_per_minute:.1f}/min (last 10 min)\n"
+        f"Projected REST: {report.calls_per_conversion:.1f} calls per conversion, "
+        f"{report.calls_per_minute:.0f}/min of the bot-wide 3000/min\n"
+        f"Attachments: {report.attachment_bytes_per_minute / 1e6:.1f} MB/min re-uploaded\n"
+        f"Parent lock contention: {report.lock_contention:.0%} of conversions would queue\n"
+        f"Skipped for missing permissions: {report.skipped}\n"
+        f"Calls by route: {routes}"
+    )
+
+
 class ThreadItCog(commands.Cog, name="ThreadIt"):
     """
     Dispatches Discord gateway events to the orchestrator and serves the
-    hybrid ``/thread-it`` (slash) and ``!thread-it`` (prefix) help command.
+    hybrid ``/thread-it`` (slash) and ``!thread-it`` (prefix) command group:
+    help, plus owner/admin-only stats.
     """
 
     def __init__(
         self,
-        bot: commands.Bot,
+        bot: commands.Bot | commands.AutoShardedBot,
         orchestrator: ThreadingOrchestrator,
         permissions: PermissionsService,
         *,
         get_client_id: Callable[[], str],
         logger: logging.Logger,
+        profiler: Profiler | None = None,
+        rate_limiter: ReplyRateLimiter | None = None,
+        recorder: TrafficRecorder | None = None,
+        catchup: CatchUp | None = None,
     ) -> None:
         self.bot = bot
         self.orchestrator = orchestrator
         self.permissions = permissions
         self._get_client_id = get_client_id
         self.logger = logger
+        self.profiler = profiler
+        self.rate_limiter = rate_limiter
+        self.recorder = recorder
+        self.catchup = catchup
 
     # ------------------------------------------------------------------ #
     # Lifecycle
@@ -91,8 +159,8 @@ class ThreadItCog(commands.Cog, name="ThreadIt"):
     @commands.Cog.listener()
     async def on_ready(self) -> None:
         assert self.bot.user is not None
-        self.logger.info(f"Bot logged in as {self.bot.user} (ID: {self.bot.user.id})")
-        self.logger.info(f"Connected to {len(self.bot.guilds)} guilds")
+        self.logger.info("Bot logged in as %s (ID: %s)", self.bot.user, self.bot.user.id)
+        self.logger.info("Connected to %d guilds", len(self.bot.guilds))
 
         self.logger.info("Checking permissions across all guilds...")
         for guild in self.bot.guilds:
@@ -104,14 +172,55 @@ class ThreadItCog(commands.Cog, name="ThreadIt"):
         )
         await self.bot.change_presence(activity=activity)
 
+        # A fresh session (restart, or a reconnect that couldn't resume)
+        # missed whatever was posted in between.
+        if self.catchup is not None:
+            self.catchup.start(self.bot.get_channel)
+
     @commands.Cog.listener()
     async def on_guild_join(self, guild: discord.Guild) -> None:
-        self.logger.info(f"Joined guild: {guild.name} (ID: {guild.id})")
+        self.logger.info("Joined guild: %s (ID: %s)", guild.name, guild.id)
+        if self.orchestrator.breaker is not None:
+            self.orchestrator.breaker.reset_guild(guild.id)
         self.permissions.log_guild_permissions(guild)
 
     @commands.Cog.listener()
     async def on_guild_remove(self, guild: discord.Guild) -> None:
-        self.logger.info(f"Removed from guild: {guild.name} (ID: {guild.id})")
+        self.logger.info("Removed from guild: %s (ID: %s)", guild.name, guild.id)
+
+    # ------------------------------------------------------------------ #
+    # Permission changes: close circuits opened by earlier failures so the
+    # next reply is tried right away instead of after the open window.
+    # ------------------------------------------------------------------ #
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(
+        self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel
+    ) -> None:
+        if self.orchestrator.breaker is not None:
+            self.orchestrator.breaker.reset_channel(after.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role) -> None:
+        if self.orchestrator.breaker is not None:
+            self.orchestrator.breaker.reset_guild(after.guild.id)
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before: discord.Member, after: discord.Member) -> None:
+        # Our own role assignments changed.
+        breaker = self.orchestrator.breaker
+        if breaker is not None and after.id == getattr(self.bot.user, "id", None):
+            breaker.reset_guild(after.guild.id)
+
+    # ------------------------------------------------------------------ #
+    # Webhook changes: a webhook in the channel was created, edited or
+    # deleted. Ours may be gone, so look it up again on the next repost.
+    # ------------------------------------------------------------------ #
+
+    @commands.Cog.listener()
+    async def on_webhooks_update(self, channel: discord.abc.GuildChannel) -> None:
+        if self.orchestrator.webhooks is not None:
+            self.orchestrator.webhooks.invalidate(channel.id)
 
     # ------------------------------------------------------------------ #
     # Main event
@@ -120,20 +229,34 @@ class ThreadItCog(commands.Cog, name="ThreadIt"):
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message) -> None:
         # System "X started a thread" messages: delete ours immediately.
-        if (
-            message.type == discord.MessageType.thread_created
-            and message.author == self.bot.user
-        ):
+        if message.type == discord.MessageType.thread_created and message.author == self.bot.user:
             await self.orchestrator.delete_system_thread_message(message)
             return
 
+        # Everything delivered in a channel moves its catch-up mark once
+        # the bot is done with it (dropped on purpose counts as done); a
+        # reply refused while shutting down, failed, or cut off by a crash
+        # is left for the next catch-up.
+        catchup = (
+            self.catchup
+            if message.guild is not None and not isinstance(message.channel, discord.Thread)
+            else None
+        )
+        if catchup is not None:
+            catchup.hold(message.channel.id, message.id)
+        handled = await self._handle_message(message)
+        if catchup is not None and handled:
+            catchup.release(message.channel.id, message.id)
+
+    async def _handle_message(self, message: discord.Message) -> bool:
+        """Convert ``message`` if it is a reply; ``False`` if it isn't done with (see ``process``)."""
         # 1. Ignore bots (including ourselves) to prevent loops.
         if message.author.bot:
-            return
+            return True
 
         # 2. Ignore non-replies.
         if message.reference is None:
-            return
+            return True
 
         # 3. Ignore the bot's own prefix command when issued as a reply. The
         # text form of the hybrid `/thread-it` runs via process_commands; if
@@ -142,30 +265,58 @@ class ThreadItCog(commands.Cog, name="ThreadIt"):
         if isinstance(self.bot.command_prefix, str) and message.content.lower().startswith(
             f"{self.bot.command_prefix}thread-it"
         ):
-            return
+            return True
 
         # 4. Ignore messages already inside a thread.
         if isinstance(message.channel, discord.Thread):
-            return
+            return True
 
         # 5. Guild-only.
         if message.guild is None:
-            return
+            return True
 
-        self.logger.debug(
-            f"Processing reply from {message.author} (ID: {message.author.id}) "
-            f"in guild {message.guild.name} (ID: {message.guild.id}), "
-            f"channel #{getattr(message.channel, 'name', '?')} (ID: {message.channel.id})"
-        )
-        await self.orchestrator.process(message)
+        # Traces capture what Discord delivered, before our own limits.
+        if self.recorder is not None:
+            self.recorder.record(message)
+
+        # 6. Per-user / per-channel token buckets: a spammer's replies are
+        # dropped here, before they can spend the bot-wide REST budget.
+        if self.rate_limiter is not None and not self.rate_limiter.allow(
+            message.author.id, message.channel.id
+        ):
+            return True  # dropped on purpose
+
+        # Runs for every reply: skip building the argument tuple entirely
+        # unless DEBUG is on.
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(
+                "Processing reply from %s (ID: %s) in guild %s (ID: %s), channel #%s (ID: %s)",
+                message.author,
+                message.author.id,
+                message.guild.name,
+                message.guild.id,
+                getattr(message.channel, "name", "?"),
+                message.channel.id,
+                extra={
+                    "event": "reply.received",
+                    "guild_id": message.guild.id,
+                    "channel_id": message.channel.id,
+                    "message_id": message.id,
+                },
+            )
+        return await self.orchestrator.process(message)
 
     # ------------------------------------------------------------------ #
-    # Help command — hybrid (works as /thread-it and !thread-it)
+    # Command group — hybrid (/thread-it help and !thread-it [help])
     # ------------------------------------------------------------------ #
 
-    @commands.hybrid_command(  # type: ignore[arg-type]
+    # Slash commands with subcommands can't be invoked bare, so the slash
+    # help lives at `/thread-it help`; `!thread-it` alone still shows it.
+    @commands.hybrid_group(  # type: ignore[arg-type]
         name="thread-it",
         description="Show Thread It help and permission status for this channel.",
+        fallback="help",
+        invoke_without_command=True,
     )
     async def thread_it_help(self, ctx: commands.Context) -> None:
         in_guild = ctx.guild is not None
@@ -185,6 +336,62 @@ class ThreadItCog(commands.Cog, name="ThreadIt"):
         )
         await ctx.reply(message, ephemeral=True if ctx.interaction else False)
 
+    @thread_it_help.command(  # type: ignore[arg-type]
+        name="stats",
+        description="Live conversion, latency and backlog numbers (owner/admins).",
+    )
+    @commands.check_any(commands.is_owner(), commands.has_guild_permissions(administrator=True))
+    async def thread_it_stats(self, ctx: commands.Context) -> None:
+        """Answer from in-memory counters only, so it is safe mid-incident."""
+        message = build_stats_message(self.orchestrator.load(), self.orchestrator.metrics)
+        shadow = self.orchestrator.shadow
+        if shadow is not None and ctx.guild is not None and shadow.covers(ctx.guild.id):
+            message += "\n\n" + build_shadow_message(shadow.report(ctx.guild.id))
+        await ctx.reply(message, ephemeral=True if ctx.interaction else False)
+
+    @thread_it_stats.error
+    async def _thread_it_stats_error(
+        self, ctx: commands.Context, error: commands.CommandError
+    ) -> None:
+        if isinstance(error, commands.CheckFailure):
+            await ctx.reply(
+                "Stats are limited to the bot owner and server administrators.",
+                ephemeral=True if ctx.interaction else False,
+            )
+            return
+        self.logger.warning("thread-it stats failed: %s", error)
+
+    # ------------------------------------------------------------------ #
+    # Owner-only diagnostics (prefix form only; not synced as a slash command)
+    # ------------------------------------------------------------------ #
+
+    @commands.command(name="thread-it-profile", hidden=True)
+    @commands.is_owner()
+    async def thread_it_profile(self, ctx: commands.Context, seconds: int = 0) -> None:
+        """Capture a CPU profile + tracemalloc snapshot from live traffic."""
+        if self.profiler is None:
+            await ctx.reply("Profiling is disabled (set PROFILING_ENABLED=true).")
+            return
+        if self.profiler.busy:
+            await ctx.reply("A profile capture is already running.")
+            return
+
+        await ctx.reply(
+            f"Profiling for up to {seconds or self.profiler.default_seconds}s; "
+            "files will be written on the bot host."
+        )
+        capture = await self.profiler.capture(seconds, reason=f"command by {ctx.author.id}")
+        await ctx.reply(f"Profile written: `{capture.summary.name}` (+ .prof, .tracemalloc)")
+
+    @thread_it_profile.error
+    async def _thread_it_profile_error(
+        self, ctx: commands.Context, error: commands.CommandError
+    ) -> None:
+        # Non-owners get silence rather than confirmation the command exists.
+        if isinstance(error, commands.NotOwner):
+            return
+        self.logger.warning("thread-it-profile failed: %s", error)
+
 
 async def setup(bot: commands.Bot) -> None:  # pragma: no cover
     """
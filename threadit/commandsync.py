@@ -0,0 +1,79 @@
+"""Skip the global slash-command sync when the command tree hasn't changed."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Any
+
+from discord import app_commands
+
+
+def command_tree_hash(tree: app_commands.CommandTree[Any], application_id: int | None) -> str:
+    """
+    SHA-256 over the exact payload ``tree.sync()`` would upload for global
+    commands, plus the application id (a different bot token must sync even
+    if its tree is identical).
+    """
+    payload = sorted(
+        (command.to_dict(tree) for command in tree.get_commands()),
+        key=lambda c: (c.get("type", 1), c["name"]),
+    )
+    blob = json.dumps(
+        {"application_id": application_id, "commands": payload},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+class CommandSyncer:
+    """
+    Calls ``tree.sync()`` only when the command definitions differ from the
+    last successful sync recorded in ``state_path`` (or when ``force``).
+
+    The hash is written only after Discord accepted the sync, so a failed
+    sync is retried on the next boot.
+    """
+
+    def __init__(self, *, state_path: Path, logger: logging.Logger, force: bool = False) -> None:
+        self.state_path = state_path
+        self.logger = logger
+        self.force = force
+
+    def _stored_hash(self) -> str | None:
+        try:
+            return self.state_path.read_text(encoding="utf-8").strip() or None
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            self.logger.warning("Could not read command sync state %s: %s", self.state_path, e)
+            return None
+
+    async def sync(self, tree: app_commands.CommandTree[Any], application_id: int | None) -> bool:
+        """Sync if needed; return whether a sync request was made."""
+        digest = command_tree_hash(tree, application_id)
+        if not self.force and self._stored_hash() == digest:
+            self.logger.info(
+                "Application commands unchanged (%s); skipping sync",
+                digest[:12],
+                extra={"event": "commands.sync_skipped"},
+            )
+            return False
+
+        synced = await tree.sync()
+        self.logger.info(
+            "Synced %d application command(s) (%s)",
+            len(synced),
+            digest[:12],
+            extra={"event": "commands.synced"},
+        )
+        try:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            self.state_path.write_text(digest + "\n", encoding="utf-8")
+        except OSError as e:
+            self.logger.warning("Could not record command sync state %s: %s", self.state_path, e)
+        return True
@@ -0,0 +1,178 @@
+"""Seen-message-id filter so gateway replays can't trigger duplicate reposts."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from .metrics import Metrics
+
+
+class SeenMessages:
+    """
+    Time-bucketed ring of recently seen message ids.
+
+    The TTL is split into ``buckets`` slots of equal width; ids go into the
+    slot for "now" and whole slots are cleared as time moves past them. An
+    id is therefore remembered for between ``ttl * (buckets-1)/buckets``
+    and ``ttl`` seconds, memory is bounded by traffic within one TTL, and
+    expiry costs nothing per message.
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl_seconds: float,
+        buckets: int = 8,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if ttl_seconds <= 0 or buckets < 2:
+            raise ValueError("ttl_seconds must be > 0 and buckets >= 2")
+        self._width = ttl_seconds / buckets
+        self._slots: list[set[int]] = [set() for _ in range(buckets)]
+        self._clock = clock
+        self._epoch = int(clock() // self._width)
+
+    def _advance(self) -> int:
+        epoch = int(self._clock() // self._width)
+        if epoch != self._epoch:
+            # Clear every slot we skipped over (all of them after a long idle).
+            for step in range(1, min(epoch - self._epoch, len(self._slots)) + 1):
+                self._slots[(self._epoch + step) % len(self._slots)].clear()
+            self._epoch = epoch
+        return epoch % len(self._slots)
+
+    def __contains__(self, message_id: int) -> bool:
+        self._advance()
+        return any(message_id in slot for slot in self._slots)
+
+    def add(self, message_id: int) -> bool:
+        """Record ``message_id``; ``False`` if it was already present."""
+        current = self._advance()
+        if any(message_id in slot for slot in self._slots):
+            return False
+        self._slots[current].add(message_id)
+        return True
+
+    def __len__(self) -> int:
+        self._advance()
+        return sum(len(slot) for slot in self._slots)
+
+
+class SqliteSeenStore:
+    """
+    Seen-id table in a local SQLite file, shared by every process on the host.
+
+    ``INSERT OR IGNORE`` on the primary key makes "first claimer wins"
+    atomic across processes. Rows older than the TTL are pruned every
+    ``prune_every`` claims. Calls are blocking; ``DuplicateFilter`` runs
+    them in a worker thread.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        ttl_seconds: float,
+        prune_every: int = 500,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen_messages "
+            "(message_id INTEGER PRIMARY KEY, seen_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._ttl = ttl_seconds
+        self._prune_every = prune_every
+        self._claims = 0
+        self._clock = clock
+
+    def claim(self, message_id: int) -> bool:
+        """``True`` if this process is the first to see ``message_id``."""
+        now = self._clock()
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT OR IGNORE INTO seen_messages (message_id, seen_at) VALUES (?, ?)",
+                (message_id, now),
+            )
+            claimed = cur.rowcount == 1
+            if not claimed:
+                # A stale row from beyond the TTL doesn't count as a duplicate.
+                cur = self._conn.execute(
+                    "UPDATE seen_messages SET seen_at = ? WHERE message_id = ? AND seen_at < ?",
+                    (now, message_id, now - self._ttl),
+                )
+                claimed = cur.rowcount == 1
+            self._claims += 1
+            if self._claims % self._prune_every == 0:
+                self._conn.execute(
+                    "DELETE FROM seen_messages WHERE seen_at < ?", (now - self._ttl,)
+                )
+            self._conn.commit()
+        return claimed
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class DuplicateFilter:
+    """
+    Front door for ``ThreadingOrchestrator.process``: the in-memory ring
+    answers repeats inside this process for free; the optional SQLite store
+    settles races between overlapping instances during a deploy.
+    """
+
+    def __init__(
+        self,
+        *,
+        ttl_seconds: float,
+        logger: logging.Logger,
+        metrics: Metrics,
+        store: SqliteSeenStore | None = None,
+    ) -> None:
+        self.local = SeenMessages(ttl_seconds=ttl_seconds)
+        self.store = store
+        self.logger = logger
+        self.metrics = metrics
+
+    async def claim(self, message_id: int) -> bool:
+        """``True`` if the caller should process ``message_id``."""
+        if not self.claim_local(message_id):
+            return False
+        if self.store is None:
+            return True
+        try:
+            claimed = await asyncio.to_thread(self.store.claim, message_id)
+        except sqlite3.Error as e:
+            # Fail open: a broken shared store must not stop conversions.
+            self.logger.warning("Shared seen-message store error (%s); processing anyway", e)
+            return True
+        if not claimed:
+            self.metrics.incr("duplicates_suppressed_total", source="shared")
+            self.logger.debug(
+                "Skipping message %s: already claimed by another instance", message_id
+            )
+        return claimed
+
+    def claim_local(self, message_id: int) -> bool:
+        """
+        ``claim`` within this process only. For replies this instance
+        already holds in the shared store, such as those its previous run
+        left in the conversion journal.
+        """
+        if self.local.add(message_id):
+            return True
+        self.metrics.incr("duplicates_suppressed_total", source="local")
+        self.logger.debug("Skipping duplicate delivery of message %s", message_id)
+        return False
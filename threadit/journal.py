@@ -0,0 +1,220 @@
+"""Write-ahead journal of conversion steps, so a crash mid-conversion is resumed on restart."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import discord
+
+if TYPE_CHECKING:
+    from .orchestrator import ThreadingOrchestrator
+
+# A conversion's steps, in order. FINISHED closes an entry whatever the
+# outcome (converted, or given up on the way it is without a journal).
+PARENT_RESOLVED = "parent_resolved"
+THREAD_CREATED = "thread_created"
+REPOSTED = "reposted"
+ORIGINAL_DELETED = "original_deleted"
+NOTIFIED = "notified"
+FINISHED = "finished"
+
+
+@dataclass(frozen=True)
+class JournalEntry:
+    """The last step an unfinished conversion recorded."""
+
+    message_id: int
+    channel_id: int
+    step: str
+    thread_id: int | None
+    at: float
+
+
+class ConversionJournal:
+    """
+    Append-only SQLite log of conversion steps, one row per step. A reply
+    whose newest row isn't ``FINISHED`` was cut short by a crash (or a
+    shutdown that couldn't drain it) and is picked up by ``replay_journal``
+    on the next start.
+
+    Rows are small WAL appends without an fsync (``synchronous=NORMAL``):
+    they survive the process dying, which is what this guards against. The
+    commit still touches the disk, so every call runs in a worker thread,
+    like the lease and seen-message stores. Every ``compact_every``
+    finished conversions, entries that are finished or older than
+    ``max_age_seconds`` are deleted, in the same worker call. A broken
+    journal never stops conversions: write errors are logged and dropped.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        max_age_seconds: float,
+        logger: logging.Logger,
+        compact_every: int = 500,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.max_age_seconds = max_age_seconds
+        self.logger = logger
+        self.compact_every = compact_every
+        self._clock = clock
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS steps (seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "message_id INTEGER NOT NULL, channel_id INTEGER NOT NULL, step TEXT NOT NULL, "
+            "thread_id INTEGER, at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS steps_message ON steps (message_id)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._finished = 0
+
+    def _record(self, message_id: int, channel_id: int, step: str, thread_id: int | None) -> None:
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT INTO steps (message_id, channel_id, step, thread_id, at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (message_id, channel_id, step, thread_id, self._clock()),
+                )
+                self._conn.commit()
+                if step == FINISHED:
+                    self._finished += 1
+                compact = step == FINISHED and self._finished % self.compact_every == 0
+        except sqlite3.Error as e:
+            self.logger.warning("Could not journal %s for reply %s: %s", step, message_id, e)
+            return
+        if compact:
+            self._compact()
+
+    def unfinished(self) -> list[JournalEntry]:
+        """
+        Each open entry's newest step, oldest first; expired entries are left
+        out. A read, once per start: it runs inline, so ``replay_journal``
+        can claim the entries before anything else gets a turn.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT message_id, channel_id, step, thread_id, at FROM steps AS s "
+                "WHERE seq = (SELECT MAX(seq) FROM steps WHERE message_id = s.message_id) "
+                "AND step != ? AND at >= ? ORDER BY seq",
+                (FINISHED, self._clock() - self.max_age_seconds),
+            ).fetchall()
+        return [JournalEntry(*row) for row in rows]
+
+    def _compact(self) -> int:
+        try:
+            with self._lock:
+                cur = self._conn.execute(
+                    "DELETE FROM steps WHERE at < ? OR message_id IN "
+                    "(SELECT message_id FROM steps WHERE step = ?)",
+                    (self._clock() - self.max_age_seconds, FINISHED),
+                )
+                self._conn.commit()
+                # Hand the freed WAL pages back, so the files stay small.
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        except sqlite3.Error as e:
+            self.logger.warning("Could not compact the conversion journal: %s", e)
+            return 0
+        return cur.rowcount
+
+    async def record(
+        self, message_id: int, channel_id: int, step: str, *, thread_id: int | None = None
+    ) -> None:
+        """Append one completed step of the conversion of ``message_id``."""
+        await asyncio.to_thread(self._record, message_id, channel_id, step, thread_id)
+
+    async def finish(self, message_id: int, channel_id: int) -> None:
+        await self.record(message_id, channel_id, FINISHED)
+
+    async def compact(self) -> int:
+        """Delete finished and expired entries; returns the rows removed."""
+        return await asyncio.to_thread(self._compact)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+async def replay_journal(
+    journal: ConversionJournal,
+    orchestrator: ThreadingOrchestrator,
+    get_channel: Callable[[int], object],
+    *,
+    logger: logging.Logger,
+    ready: Callable[[], Awaitable[object]] | None = None,
+) -> int:
+    """
+    Resume the conversions the previous run left unfinished, from their
+    last completed step; returns how many were resumed.
+
+    Before the repost, the reply is fetched again and converted from the
+    start (the parent re-fetch finds a thread the first attempt created).
+    After it, only the original is left to delete; the notification is
+    skipped, as it would point at a reply minutes old. ``ready`` (e.g.
+    ``Client.wait_until_ready``) is awaited first, for the channel cache.
+
+    Every entry is claimed in the orchestrator's duplicate filter before
+    that, so catch-up and gateway redeliveries pass over the replies being
+    resumed here. An entry whose reply was already claimed is left open.
+    """
+    dedup = orchestrator.dedup
+    entries = [
+        entry
+        for entry in journal.unfinished()
+        if dedup is None or dedup.claim_local(entry.message_id)
+    ]
+    if ready is not None:
+        await ready()
+    resumed = 0
+    for entry in entries:
+        channel = get_channel(entry.channel_id)
+        if not isinstance(
+            channel, discord.TextChannel | discord.VoiceChannel | discord.StageChannel
+        ):
+            await journal.finish(entry.message_id, entry.channel_id)  # gone, or no longer ours
+            continue
+        try:
+            if entry.step in (PARENT_RESOLVED, THREAD_CREATED):
+                message = await channel.fetch_message(entry.message_id)
+                await orchestrator.process(message, enforce_freshness=False, check_duplicates=False)
+            elif entry.step == REPOSTED and orchestrator.permissions.check_specific_permission(
+                channel, "manage_messages"
+            ):
+                original = channel.get_partial_message(entry.message_id)
+                await orchestrator.retry.call("delete_original", original.delete)
+        except discord.NotFound:
+            pass  # the reply was deleted meanwhile: nothing left to do
+        except (discord.HTTPException, TimeoutError) as e:
+            # Left open: retried on the next start, until it expires.
+            logger.warning(
+                "Could not resume the conversion of reply %s (after %s): %s",
+                entry.message_id,
+                entry.step,
+                e,
+            )
+            continue
+        await journal.finish(entry.message_id, entry.channel_id)
+        orchestrator.metrics.incr("journal_resumed_total", step=entry.step)
+        resumed += 1
+    await journal.compact()
+    if resumed:
+        logger.info(
+            "Resumed %d conversion(s) cut short by the previous run",
+            resumed,
+            extra={"event": "journal.replayed"},
+        )
+    return resumed
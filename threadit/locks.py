@@ -0,0 +1,144 @@
+"""Cross-process parent-message locks built on leases in a shared store."""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Protocol
+
+
+class LeaseStore(Protocol):
+    """
+    The two primitives a shared lock needs. A Redis adapter maps these onto
+    ``SET key token NX PX ttl`` and a compare-and-delete script.
+    """
+
+    async def acquire(self, key: str, token: str, ttl: float) -> bool:
+        """Set ``key`` to ``token`` for ``ttl`` seconds unless a live lease exists."""
+        ...
+
+    async def release(self, key: str, token: str) -> None:
+        """Delete ``key`` only if it still holds ``token``."""
+        ...
+
+
+class MemoryLeaseStore:
+    """
+    Process-local ``LeaseStore``. Useful as a stand-in for a networked store
+    in tests, and to share one store object between several orchestrators.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self._leases: dict[str, tuple[str, float]] = {}
+        self._clock = clock
+
+    async def acquire(self, key: str, token: str, ttl: float) -> bool:
+        now = self._clock()
+        held = self._leases.get(key)
+        if held is not None and held[1] > now:
+            return False
+        self._leases[key] = (token, now + ttl)
+        return True
+
+    async def release(self, key: str, token: str) -> None:
+        held = self._leases.get(key)
+        if held is not None and held[0] == token:
+            del self._leases[key]
+
+
+class SqliteLeaseStore:
+    """
+    ``LeaseStore`` in a SQLite file shared by every process on one host.
+
+    Acquisition is a single upsert that only overwrites an expired row, so
+    "first live holder wins" is atomic across processes. Calls run in a
+    worker thread.
+    """
+
+    def __init__(self, path: Path, *, clock: Callable[[], float] = time.time) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS leases "
+            "(key TEXT PRIMARY KEY, token TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._clock = clock
+
+    def _acquire(self, key: str, token: str, ttl: float) -> bool:
+        now = self._clock()
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO leases (key, token, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET token = excluded.token, "
+                "expires_at = excluded.expires_at WHERE leases.expires_at <= ?",
+                (key, token, now + ttl, now),
+            )
+            self._conn.commit()
+            return cur.rowcount == 1
+
+    def _release(self, key: str, token: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM leases WHERE key = ? AND token = ?", (key, token))
+            self._conn.commit()
+
+    async def acquire(self, key: str, token: str, ttl: float) -> bool:
+        return await asyncio.to_thread(self._acquire, key, token, ttl)
+
+    async def release(self, key: str, token: str) -> None:
+        await asyncio.to_thread(self._release, key, token)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class SharedParentLock:
+    """
+    Mutual exclusion on a parent message across processes.
+
+    ``hold`` polls the store (with jitter) until it gets the lease, then
+    releases it on exit. The lease expires on its own after ``lease_seconds``
+    so a crashed holder can't wedge a parent forever; keep it comfortably
+    above the orchestrator's lock-hold cap. Cancelling a waiter (e.g. the
+    conversion deadline) simply stops polling.
+    """
+
+    def __init__(
+        self,
+        store: LeaseStore,
+        *,
+        lease_seconds: float,
+        poll_interval: float = 0.05,
+        max_poll_interval: float = 0.5,
+        namespace: str = "threadit:parent:",
+    ) -> None:
+        self.store = store
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.namespace = namespace
+
+    @asynccontextmanager
+    async def hold(self, parent_id: int) -> AsyncIterator[None]:
+        key = f"{self.namespace}{parent_id}"
+        token = uuid.uuid4().hex
+        delay = self.poll_interval
+        while not await self.store.acquire(key, token, self.lease_seconds):
+            await asyncio.sleep(delay * (0.5 + random.random()))
+            delay = min(self.max_poll_interval, delay * 2)
+        try:
+            yield
+        finally:
+            # Shielded so a cancelled holder still frees the lease promptly
+            # instead of leaving peers waiting for it to expire.
+            await asyncio.shield(self.store.release(key, token))
@@ -0,0 +1,144 @@
+"""Logging plumbing: JSON formatter, per-event sampling, queue-backed emission."""
+
+from __future__ import annotations
+
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+from datetime import UTC, datetime
+
+# Attributes every LogRecord carries. Anything else on a record came in via
+# ``extra=`` and is emitted as a structured field by JsonFormatter.
+_RESERVED_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message",
+    "asctime",
+    "taskName",
+}
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+
+def parse_sample_rates(raw: str) -> dict[str, int]:
+    """
+    Parse ``"event=N,other=M"`` into ``{"event": N, "other": M}``.
+
+    ``N`` means "keep one record in N" for that event. Raises ``ValueError``
+    with the offending entry so a typo in the env var fails loudly at boot.
+    """
+    rates: dict[str, int] = {}
+    for entry in raw.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, sep, value = entry.partition("=")
+        name = name.strip()
+        try:
+            every = int(value)
+        except ValueError:
+            every = 0
+        if not sep or not name or every < 1:
+            raise ValueError(f"Invalid log sample entry {entry!r}; expected 'event=N' with N >= 1")
+        rates[name] = every
+    return rates
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line. Fields passed through ``extra=`` (``event``,
+    ``guild_id``, ``message_id`` ...) are emitted as top-level keys so log
+    pipelines can filter without regex.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: dict[str, object] = {
+            "ts": datetime.fromtimestamp(record.created, UTC).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class EventSampler(logging.Filter):
+    """
+    Keep one in N records for each configured ``event``.
+
+    Counter-based rather than random so the kept fraction is exact and the
+    first occurrence of every event always gets through. Records without
+    an ``event`` attribute, and WARNING-or-above records, are never sampled.
+    """
+
+    def __init__(self, rates: dict[str, int]) -> None:
+        super().__init__()
+        self._rates = dict(rates)
+        self._seen: dict[str, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        event = getattr(record, "event", None)
+        if event is None or record.levelno >= logging.WARNING:
+            return True
+        every = self._rates.get(event)
+        if every is None or every == 1:
+            return True
+        count = self._seen.get(event, 0)
+        self._seen[event] = count + 1
+        return count % every == 0
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that interpolates the message and leaves the rest for later.
+
+    ``msg % args`` has to happen on the caller's thread: the args are live
+    objects the caller may change (or a dict snapshot may be mutated) before
+    the listener gets to them, and the line would then log the wrong values.
+    The stock ``prepare`` goes further and runs the whole formatter, folding
+    the traceback into the message; here the exception is kept on the
+    record (the queue is in-process), so the listener's formatter renders it
+    as usual, ``JsonFormatter`` as its own ``exc`` field.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)  # other handlers still see the original
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def configure_logging(
+    *,
+    level: str,
+    fmt: str = "text",
+    sample_rates: dict[str, int] | None = None,
+) -> logging.handlers.QueueListener:
+    """
+    Install a queue-backed root handler and return the started listener.
+
+    The event loop only pays for the level check, interpolating the message
+    and a ``put_nowait``; formatting and the blocking write to stderr happen
+    on the listener's thread. Callers must ``stop()`` the listener on
+    shutdown to flush.
+    """
+    stream = logging.StreamHandler()
+    if fmt == "json":
+        stream.setFormatter(JsonFormatter())
+    else:
+        stream.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(log_queue)
+    # Sampling runs before enqueue so dropped records cost nothing downstream.
+    if sample_rates:
+        queue_handler.addFilter(EventSampler(sample_rates))
+
+    logging.basicConfig(level=level, handlers=[queue_handler], force=True)
+    listener = logging.handlers.QueueListener(log_queue, stream)
+    listener.start()
+    return listener
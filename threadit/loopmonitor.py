@@ -0,0 +1,178 @@
+"""Event-loop lag heartbeat and blocked-loop watchdog."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections.abc import Callable
+
+from .metrics import Metrics
+
+
+class _SlowCallbackCounter(logging.Filter):
+    """Count asyncio's debug-mode "Executing <Handle> took N seconds" warnings."""
+
+    def __init__(self, metrics: Metrics) -> None:
+        super().__init__()
+        self._metrics = metrics
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if isinstance(record.msg, str) and record.msg.startswith("Executing "):
+            self._metrics.incr("loop_slow_callbacks_total")
+        return True
+
+
+class LoopMonitor:
+    """
+    Measures event-loop lag and reports synchronous stalls.
+
+    Two cooperating pieces:
+
+    * a heartbeat coroutine that sleeps ``interval`` and records how late it
+      woke up (``loop_lag_seconds``) — cheap, always on;
+    * a daemon watchdog thread that notices when the heartbeat has gone
+      quiet for longer than ``stall_threshold`` and samples the loop
+      thread's Python stack *while it is still blocked*, so the log shows
+      the offending frame rather than whatever ran next.
+
+    Optionally (``asyncio_debug=True``) it also turns on asyncio's own
+    slow-callback detection with the same threshold, and ``stop`` puts the
+    loop's own settings back. That mode adds per callback overhead, so it
+    is off by default; the heartbeat/watchdog pair is what makes this safe
+    to leave on in production.
+
+    ``Metrics`` is not thread-safe: the watchdog hands its counts to the
+    loop with ``call_soon_threadsafe``. They land once the stall is over.
+    """
+
+    def __init__(
+        self,
+        *,
+        interval: float,
+        stall_threshold: float,
+        logger: logging.Logger,
+        metrics: Metrics,
+        asyncio_debug: bool = False,
+    ) -> None:
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.logger = logger
+        self.metrics = metrics
+        self.asyncio_debug = asyncio_debug
+        self._task: asyncio.Task | None = None
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        # Written by the loop thread, read by the watchdog. Plain float
+        # assignment is atomic under the GIL.
+        self._last_beat = time.monotonic()
+        self._slow_callback_filter: _SlowCallbackCounter | None = None
+        # The loop's (debug, slow_callback_duration) before asyncio_debug.
+        self._saved_debug: tuple[bool, float] | None = None
+
+    def start(self) -> None:
+        """Start monitoring the running loop. Must be called from inside it."""
+        if self._task is not None:
+            return
+        loop = asyncio.get_running_loop()
+        self._loop = loop
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+
+        if self.asyncio_debug:
+            self._saved_debug = (loop.get_debug(), loop.slow_callback_duration)
+            loop.set_debug(True)
+            loop.slow_callback_duration = self.stall_threshold
+            self._slow_callback_filter = _SlowCallbackCounter(self.metrics)
+            logging.getLogger("asyncio").addFilter(self._slow_callback_filter)
+
+        self._task = loop.create_task(self._heartbeat(), name="threadit-loop-heartbeat")
+        self._thread = threading.Thread(
+            target=self._watchdog, name="threadit-loop-watchdog", daemon=True
+        )
+        self._thread.start()
+        self.logger.info(
+            "Loop monitor started (interval %.3fs, stall threshold %.3fs, asyncio debug %s)",
+            self.interval,
+            self.stall_threshold,
+            "on" if self.asyncio_debug else "off",
+        )
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread is not None:
+            # The watchdog sleeps at most one poll period; don't block the
+            # loop waiting for it — it's a daemon and exits on its own.
+            self._thread = None
+        if self._slow_callback_filter is not None:
+            logging.getLogger("asyncio").removeFilter(self._slow_callback_filter)
+            self._slow_callback_filter = None
+        if self._saved_debug is not None and self._loop is not None:
+            debug, slow_callback_duration = self._saved_debug
+            self._loop.set_debug(debug)
+            self._loop.slow_callback_duration = slow_callback_duration
+            self._saved_debug = None
+
+    async def _heartbeat(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self._last_beat = time.monotonic()
+            self.metrics.observe("loop_lag_seconds", lag)
+            self.metrics.set_gauge("loop_lag_seconds_last", lag)
+            if lag >= self.stall_threshold:
+                self.logger.warning(
+                    "Event loop lag %.3fs exceeded threshold %.3fs",
+                    lag,
+                    self.stall_threshold,
+                    extra={"event": "loop.lag", "lag_s": round(lag, 4)},
+                )
+
+    def _watchdog(self) -> None:
+        poll = max(self.stall_threshold / 2, 0.01)
+        reported_beat: float | None = None
+        while not self._stop.wait(poll):
+            last_beat = self._last_beat
+            blocked_for = time.monotonic() - last_beat - self.interval
+            if blocked_for < self.stall_threshold or reported_beat == last_beat:
+                continue
+            # One stack sample per stall: the heartbeat timestamp only moves
+            # once the loop is free again.
+            reported_beat = last_beat
+            self._report_stall(blocked_for)
+
+    def _report_stall(self, blocked_for: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id or -1)
+        stack = "".join(traceback.format_stack(frame)) if frame is not None else "<unavailable>"
+        self._on_loop(self.metrics.incr, "loop_stalls_total")
+        self.logger.warning(
+            "Event loop blocked for %.3fs (threshold %.3fs); loop thread stack:\n%s",
+            blocked_for,
+            self.stall_threshold,
+            stack,
+            extra={"event": "loop.stall", "blocked_s": round(blocked_for, 4)},
+        )
+
+    def _on_loop(self, fn: Callable[..., object], *args: object) -> None:
+        """Run ``fn(*args)`` on the loop thread, from the watchdog."""
+        if self._loop is None:
+            return
+        try:
+            self._loop.call_soon_threadsafe(fn, *args)
+        except RuntimeError:
+            pass  # the loop closed mid-stall: nothing left to count for
@@ -0,0 +1,167 @@
+"""In-process metrics registry: counters, gauges and latency summaries."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import math
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+# Recent observations kept per summary for percentile estimates. Bounded so
+# a long-running bot's memory doesn't grow with traffic.
+SUMMARY_WINDOW = 1024
+# Recent timestamps kept per event stream for "how many in the last N
+# seconds". At 4096, a one-minute window stays exact up to ~68 events/s.
+EVENT_WINDOW = 4096
+
+
+def _key(name: str, labels: dict[str, object]) -> str:
+    if not labels:
+        return name
+    inner = ",".join(f"{k}={labels[k]}" for k in sorted(labels))
+    return f"{name}{{{inner}}}"
+
+
+def percentile(samples: list[float], q: float) -> float:
+    """Nearest-rank percentile of ``samples`` (``q`` in 0..100); 0.0 if empty."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+@dataclass
+class Summary:
+    """Count/sum/max over all time plus a bounded window of recent values."""
+
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    recent: deque[float] = field(default_factory=lambda: deque(maxlen=SUMMARY_WINDOW))
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        self.recent.append(value)
+
+
+class Metrics:
+    """
+    Label-aware counters, gauges and summaries keyed as ``name{k=v,...}``,
+    plus event streams: bounded rings of timestamps for recent rates.
+
+    Updates are plain dict operations with no locking: everything reports
+    from the event loop thread, except the loop watchdog thread, which only
+    touches its own keys. One instance is built in ``bot.py`` and injected
+    into the services that report into it.
+    """
+
+    def __init__(self, *, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._counters: dict[str, float] = {}
+        self._gauges: dict[str, float] = {}
+        self._summaries: dict[str, Summary] = {}
+        self._events: dict[str, deque[float]] = {}
+
+    def incr(self, name: str, value: float = 1, **labels: object) -> None:
+        key = _key(name, labels)
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels: object) -> None:
+        self._gauges[_key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels: object) -> None:
+        key = _key(name, labels)
+        summary = self._summaries.get(key)
+        if summary is None:
+            summary = self._summaries[key] = Summary()
+        summary.add(value)
+
+    def mark(self, name: str, **labels: object) -> None:
+        """Record that an event happened now (see ``recent``)."""
+        key = _key(name, labels)
+        ring = self._events.get(key)
+        if ring is None:
+            ring = self._events[key] = deque(maxlen=EVENT_WINDOW)
+        ring.append(self._clock())
+
+    def recent(self, name: str, seconds: float, **labels: object) -> int:
+        """How many ``mark`` events in the last ``seconds`` (capped at EVENT_WINDOW)."""
+        ring = self._events.get(_key(name, labels))
+        if not ring:
+            return 0
+        cutoff = self._clock() - seconds
+        n = 0
+        for at in reversed(ring):
+            if at < cutoff:
+                break
+            n += 1
+        return n
+
+    def counter(self, name: str, **labels: object) -> float:
+        return self._counters.get(_key(name, labels), 0)
+
+    def gauge(self, name: str, **labels: object) -> float:
+        return self._gauges.get(_key(name, labels), 0)
+
+    def summary(self, name: str, **labels: object) -> Summary | None:
+        return self._summaries.get(_key(name, labels))
+
+    def snapshot(self) -> dict[str, float]:
+        """Flatten everything into ``{key: value}`` for logging or display."""
+        out: dict[str, float] = {**self._counters, **self._gauges}
+        for key, summary in list(self._summaries.items()):
+            recent = list(summary.recent)
+            out[f"{key}.count"] = summary.count
+            out[f"{key}.max"] = summary.max
+            out[f"{key}.p50"] = percentile(recent, 50)
+            out[f"{key}.p99"] = percentile(recent, 99)
+        return out
+
+
+class MetricsReporter:
+    """
+    Logs ``metrics.snapshot()`` every ``interval`` seconds from the event
+    loop, so the counters the docs refer to can be read from the bot's
+    logs: as ``name{labels}=value`` pairs in the message, and as a
+    ``metrics`` field in JSON logs (``event=metrics.snapshot``).
+    """
+
+    def __init__(self, metrics: Metrics, *, interval: float, logger: logging.Logger) -> None:
+        self.metrics = metrics
+        self.interval = interval
+        self.logger = logger
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Start reporting; must be called from inside the running loop."""
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop reporting, logging one last snapshot."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+            self.report()
+
+    def report(self) -> None:
+        snapshot = self.metrics.snapshot()
+        self.logger.info(
+            "Metrics: %s",
+            " ".join(f"{key}={value:g}" for key, value in sorted(snapshot.items())),
+            extra={"event": "metrics.snapshot", "metrics": snapshot},
+        )
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            self.report()
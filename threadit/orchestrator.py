@@ -3,17 +3,89 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
 import logging
-from contextlib import asynccontextmanager
-from dataclasses import replace
+from contextlib import AbstractAsyncContextManager, asynccontextmanager, nullcontext
+from dataclasses import dataclass, replace
 
+import aiohttp
 import discord
 
 from config import Config
 
+from .admission import Admission, FreshnessPolicy
 from .attachments import build_attachment_files
+from .circuit import CircuitBreaker
+from .dedup import DuplicateFilter
+from .journal import (
+    NOTIFIED,
+    ORIGINAL_DELETED,
+    PARENT_RESOLVED,
+    REPOSTED,
+    THREAD_CREATED,
+    ConversionJournal,
+)
+from .locks import SharedParentLock
+from .metrics import Metrics
+from .pending import PendingDeletion
 from .permissions import PermissionsService
-from .types import ReplyInfo
+from .restcalls import RestAccounting
+from .retry import Retrier, RetryBudget, RetryPolicy
+from .shadow import (
+    ADD_THREAD_MEMBER,
+    CDN_DOWNLOAD,
+    CREATE_THREAD,
+    DELETE_MESSAGE,
+    FETCH_MESSAGE,
+    SEND_MESSAGE,
+    ShadowMode,
+)
+from .transcode import ImageTranscoder
+from .types import ConversionProgress, ReplyInfo
+from .webhooks import MAX_WEBHOOK_CONTENT, WebhookCache
+
+# Discord's "A thread has already been created for this message" error.
+# Seen when a create_thread retry follows a 5xx that actually succeeded.
+THREAD_ALREADY_EXISTS = 160004
+# "Unknown Channel": the channel itself is gone, not just one message.
+UNKNOWN_CHANNEL = 10003
+# message_nonce tags, one per message the bot sends about a reply.
+NONCE_REPOST = "r"
+NONCE_NOTIFY = "n"
+
+
+class LockHoldExceeded(Exception):
+    """A conversion held a parent-message lock longer than allowed."""
+
+
+def message_nonce(message_id: int, tag: str) -> str:
+    """
+    The nonce for the bot's ``tag`` message about reply ``message_id``.
+    Discord deduplicates enforced nonces per author across channels, so
+    each message needs its own: a shared one would hand the notification
+    send back the repost. Fits Discord's 25-character limit.
+    """
+    return f"{message_id}{tag}"
+
+
+def repost_embeds(reply_info: ReplyInfo) -> list[discord.Embed]:
+    """The attribution embed carrying the reply's text, then the reply's own embeds."""
+    author = reply_info.author
+    embed = discord.Embed(description=reply_info.content or "", color=0x5865F2)
+    embed.set_author(name=author.display_name, icon_url=author.display_avatar.url)
+    embed.timestamp = reply_info.created_at
+    return [embed, *reply_info.embeds]
+
+
+@dataclass(frozen=True)
+class OrchestratorLoad:
+    """Point-in-time work counts, for live stats."""
+
+    in_flight: int  # conversions inside process()
+    parent_locks: int  # parents with a holder or waiter
+    lock_waiters: int  # conversions queued behind another on the same parent
+    pending_deletions: int  # notification auto-deletes not yet fired
+    attachment_bytes: int  # attachment bytes downloaded or being downloaded
 
 
 class ThreadingOrchestrator:
@@ -27,15 +99,72 @@ class ThreadingOrchestrator:
         *,
         permissions: PermissionsService,
         logger: logging.Logger,
+        metrics: Metrics | None = None,
+        dedup: DuplicateFilter | None = None,
+        retrier: Retrier | None = None,
+        breaker: CircuitBreaker | None = None,
+        deadline_seconds: float | None = None,
+        lock_hold_seconds: float | None = None,
+        freshness: FreshnessPolicy | None = None,
+        shared_lock: SharedParentLock | None = None,
+        rest: RestAccounting | None = None,
+        shadow: ShadowMode | None = None,
+        webhooks: WebhookCache | None = None,
+        transcoder: ImageTranscoder | None = None,
+        journal: ConversionJournal | None = None,
     ) -> None:
         self.permissions = permissions
         self.logger = logger
+        self.metrics = metrics or Metrics()
+        self.retry = retrier or Retrier(
+            policy=RetryPolicy(),
+            budget=RetryBudget(percent=20, min_per_second=1),
+            metrics=self.metrics,
+            logger=logger,
+        )
+        # Per-channel/guild negative-result cache; None disables it.
+        self.breaker = breaker
+        # Drops gateway replays (RESUME, overlapping instances) before any
+        # REST work. None disables the check.
+        self.dedup = dedup
+        # Sheds or downgrades replies that waited too long to be worth a
+        # full conversion. None admits everything.
+        self.freshness = freshness
+        # Wall-clock caps on a whole conversion and on holding one parent
+        # lock, so a stuck REST call can't occupy a task (or block every
+        # other reply to the same parent) forever. None means no cap.
+        self.deadline_seconds = deadline_seconds
+        self.lock_hold_seconds = lock_hold_seconds
+        # Cross-process lock taken after the in-process one, so instances
+        # sharing a host (or a lease store) can't both create a thread on
+        # the same parent. None: in-process serialization only.
+        self.shared_lock = shared_lock
+        # Attributes REST calls to the conversion that made them (see
+        # rest_calls_per_conversion). None: route counters only, if any.
+        self.rest = rest
+        # Guilds converted on paper only: every write recorded, none made.
+        self.shadow = shadow
+        # Reposts go out through a per-channel webhook, as the reply's
+        # author, where one is available. None: always as the bot.
+        self.webhooks = webhooks
+        # Downscales oversize images so they can be reposted. None: they
+        # are skipped, and the original reply kept.
+        self.transcoder = transcoder
+        # Records each conversion's completed steps, so one cut short by a
+        # crash is resumed on the next start. None: not journaled.
+        self.journal = journal
         # See _with_parent_lock for invariants.
         self._parent_locks: dict[int, list] = {}
         # Strong references to fire-and-forget background tasks so the event
         # loop doesn't GC them mid-await ("Task was destroyed but it is
         # pending"). Tasks remove themselves on completion.
         self._background_tasks: set[asyncio.Task] = set()
+        # Shutdown drain state: conversions currently inside process() and
+        # notification auto-deletes still waiting to fire.
+        self._draining = asyncio.Event()
+        self._in_flight: dict[asyncio.Task, tuple[discord.Message, ConversionProgress]] = {}
+        self._pending_notifications: dict[asyncio.Task, discord.Message] = {}
+        self._attachment_bytes = 0
 
     # ------------------------------------------------------------------ #
     # Per-parent serialization
@@ -51,12 +180,36 @@ class ThreadingOrchestrator:
         inside the finally, no other coroutine currently holds a reference
         to the lock via setdefault, so removing the entry cannot race a
         peer's acquisition.
+
+        With a ``shared_lock`` the cross-process lease is taken once the
+        local lock is held, so each process has at most one waiter polling
+        the shared store per parent. Time to acquire both is recorded as
+        ``parent_lock_wait_seconds``.
+
+        The body may hold the lock for at most ``lock_hold_seconds``; past
+        that it is cancelled, the lock released, and ``LockHoldExceeded``
+        raised. Time spent waiting for the lock doesn't count.
         """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
         entry = self._parent_locks.setdefault(parent_id, [asyncio.Lock(), 0])
         entry[1] += 1
+        shared: AbstractAsyncContextManager[None] = (
+            self.shared_lock.hold(parent_id) if self.shared_lock is not None else nullcontext()
+        )
         try:
-            async with entry[0]:
-                yield
+            async with entry[0], shared:
+                self.metrics.observe("parent_lock_wait_seconds", loop.time() - started)
+                try:
+                    async with asyncio.timeout(self.lock_hold_seconds) as hold:
+                        yield
+                except TimeoutError as e:
+                    if not hold.expired():
+                        raise
+                    self.metrics.incr("parent_lock_hold_exceeded_total")
+                    raise LockHoldExceeded(
+                        f"held lock for parent {parent_id} longer than {self.lock_hold_seconds}s"
+                    ) from e
         finally:
             entry[1] -= 1
             if entry[1] == 0:
@@ -66,109 +219,426 @@ class ThreadingOrchestrator:
     # Top-level entry
     # ------------------------------------------------------------------ #
 
-    async def process(self, message: discord.Message) -> None:
-        """Convert a valid reply message into a thread, or do nothing."""
+    async def process(
+        self,
+        message: discord.Message,
+        *,
+        enforce_freshness: bool = True,
+        check_duplicates: bool = True,
+    ) -> bool:
+        """
+        Convert a valid reply message into a thread, or do nothing.
+
+        Returns ``True`` once the bot is done with the reply: converted, or
+        dropped on purpose (shed as too old, a duplicate, missing
+        permissions). ``False`` means it was not: the bot is shutting down,
+        or the conversion failed or ran out of time, and a later catch-up
+        may try it again.
+
+        ``enforce_freshness=False`` skips the stale-reply admission check,
+        for callers that deliberately convert old replies;
+        ``check_duplicates=False`` skips the duplicate filter, for resuming
+        a conversion that already claimed the reply.
+
+        The whole conversion runs under ``deadline_seconds``. When it expires
+        the current step is cancelled and the outcome logged; because the
+        original is only deleted after a complete repost, an expired
+        conversion never loses the user's content.
+        """
+        if self._draining.is_set():
+            self.metrics.incr("replies_rejected_total", reason="draining")
+            self.logger.debug("Shutting down; ignoring reply %s", message.id)
+            return False
+
         start_time = asyncio.get_event_loop().time()
+        progress = ConversionProgress(stage_started=start_time)
+        task = asyncio.current_task()
+        if task is not None:
+            self._in_flight[task] = (message, progress)
 
+        accounting = self.rest.conversion(progress) if self.rest is not None else nullcontext()
+        interrupted = False
+        done = True
         try:
-            if not self._validate_processing_conditions(message):
-                return
+            with accounting:
+                async with asyncio.timeout(self.deadline_seconds) as deadline:
+                    await self._convert(
+                        message, progress, start_time, enforce_freshness, check_duplicates
+                    )
+        except TimeoutError as e:
+            done = False
+            if deadline.expired():
+                self._on_deadline_exceeded(message, progress)
+            else:
+                self._on_process_error(message, start_time, e)
+        except Exception as e:
+            done = False
+            self._on_process_error(message, start_time, e)
+        except asyncio.CancelledError:
+            interrupted = True
+            raise
+        finally:
+            if task is not None:
+                self._in_flight.pop(task, None)
+            # The journal entry stays open, for replay on the next start,
+            # when shutdown cut the conversion short or the reply was
+            # reposted but its original not dealt with. Otherwise the
+            # outcome is final.
+            if (
+                self.journal is not None
+                and progress.journaled
+                and not interrupted
+                and not (progress.reposted and not progress.cleaned_up)
+            ):
+                await self.journal.finish(message.id, message.channel.id)
+        return done
 
-            # _validate_processing_conditions confirmed the channel has
-            # `create_thread` and message is in a guild — narrow the type
-            # so the rest of the flow doesn't need a cascade of ignores.
-            assert isinstance(
-                message.channel,
-                discord.TextChannel | discord.VoiceChannel | discord.StageChannel,
-            ), f"unexpected channel type for guild reply: {type(message.channel).__name__}"
-            channel = message.channel
-
-            has_attachments = bool(message.attachments)
-            has_required_perms, missing_required, missing_optional = (
-                self.permissions.validate_permissions(
-                    channel, has_attachments=has_attachments
-                )
+    async def drain(self, timeout: float) -> list[PendingDeletion]:
+        """
+        Stop accepting replies and wait up to ``timeout`` seconds for
+        in-flight conversions and notification auto-deletes (which fire
+        immediately once draining starts).
+
+        Whatever is still running afterwards is cancelled. The deletions it
+        would have made are returned for the caller to persist: a reply that
+        was already reposted but not yet cleaned up, and any undeleted
+        notification.
+        """
+        self._draining.set()
+        pending = set(self._in_flight) | self._background_tasks
+        self.logger.info(
+            "Draining %d conversion(s) and %d background task(s) (up to %ss)",
+            len(self._in_flight),
+            len(self._background_tasks),
+            timeout,
+            extra={"event": "drain.started"},
+        )
+        if pending:
+            await asyncio.wait(pending, timeout=timeout)
+
+        leftovers: list[PendingDeletion] = []
+        for message, progress in self._in_flight.values():
+            if progress.reposted:
+                leftovers.append(PendingDeletion(message.channel.id, message.id, "original"))
+        for notification in self._pending_notifications.values():
+            leftovers.append(
+                PendingDeletion(notification.channel.id, notification.id, "notification")
             )
-            if not has_required_perms:
-                self.logger.error(
-                    f"Missing required permissions in #{channel.name}: "
-                    f"{', '.join(missing_required)}"
-                )
-                await self.permissions.send_permission_error_message(
-                    channel, missing_required
-                )
+        stragglers = set(self._in_flight) | self._background_tasks
+        for task in stragglers:
+            task.cancel()
+        await asyncio.gather(*stragglers, return_exceptions=True)
+
+        if stragglers:
+            self.metrics.incr("drain_abandoned_total", len(stragglers))
+            self.logger.warning(
+                "Drain deadline hit: cancelled %d task(s), %d deletion(s) left for next start",
+                len(stragglers),
+                len(leftovers),
+                extra={"event": "drain.incomplete"},
+            )
+        else:
+            self.logger.info("Drain complete", extra={"event": "drain.complete"})
+        return leftovers
+
+    async def _convert(
+        self,
+        message: discord.Message,
+        progress: ConversionProgress,
+        start_time: float,
+        enforce_freshness: bool,
+        check_duplicates: bool = True,
+    ) -> None:
+        if not self._validate_processing_conditions(message):
+            return
+
+        admission = Admission.FULL
+        if enforce_freshness and self.freshness is not None:
+            admission = self._admit(message, self.freshness)
+            if admission is Admission.SHED:
                 return
 
-            if missing_optional:
-                self.logger.info(
-                    f"Missing optional permissions in #{channel.name}: "
-                    f"{', '.join(missing_optional)} "
-                    "(bot will continue with reduced functionality)"
-                )
+        if check_duplicates and self.dedup is not None and not await self.dedup.claim(message.id):
+            return
+
+        # _validate_processing_conditions confirmed the channel has
+        # `create_thread` and message is in a guild — narrow the type
+        # so the rest of the flow doesn't need a cascade of ignores.
+        assert isinstance(
+            message.channel,
+            discord.TextChannel | discord.VoiceChannel | discord.StageChannel,
+        ), f"unexpected channel type for guild reply: {type(message.channel).__name__}"
+        channel = message.channel
+        guild_id = channel.guild.id
 
-            reply_info = await self.gather_reply_information(message, channel)
-            if reply_info is None:
-                self._log_metrics("gather_reply_info", False, error="Failed to gather info")
+        if self.breaker is not None and not self.breaker.allow(channel.id, guild_id):
+            self.logger.debug("Circuit open for #%s; dropping reply %s", channel.name, message.id)
+            return
+
+        has_attachments = bool(message.attachments)
+        has_required_perms, missing_required, missing_optional = (
+            self.permissions.validate_permissions(channel, has_attachments=has_attachments)
+        )
+        if not has_required_perms:
+            self.logger.error(
+                "Missing required permissions in #%s: %s",
+                channel.name,
+                ", ".join(missing_required),
+                extra={"event": "permissions.missing", "channel_id": channel.id},
+            )
+            self._record_failure(channel, "missing permissions")
+            if self.shadow is not None and self.shadow.covers(guild_id):
+                # A live run would post the setup warning (cooldown allowing).
+                warn = self.permissions.permission_warning_due(channel)
+                if warn:
+                    self.permissions.note_permission_warning(channel.id)
+                self.shadow.skip(guild_id, "permissions", routes=[SEND_MESSAGE] if warn else [])
                 return
+            await self.permissions.send_permission_error_message(channel, missing_required)
+            return
 
-            parent_id = reply_info.parent_message.id
-            thread: discord.Thread | None = None
-            async with self._with_parent_lock(parent_id):
-                # Re-fetch the parent inside the lock so we pick up a thread
-                # that another coroutine just created.
-                try:
-                    parent = await reply_info.channel.fetch_message(parent_id)
-                    reply_info = replace(reply_info, parent_message=parent)
-                except discord.NotFound:
-                    self.logger.info(
-                        f"Parent message {parent_id} deleted before thread creation; skipping"
-                    )
-                    return
-                except (discord.Forbidden, discord.HTTPException) as e:
-                    # Transient or permission issue on re-fetch — proceed
-                    # with the parent we already loaded.
-                    self.logger.warning(
-                        f"Re-fetch of parent {parent_id} failed ({e}); using cached copy"
-                    )
+        if missing_optional:
+            self.logger.info(
+                "Missing optional permissions in #%s: %s "
+                "(bot will continue with reduced functionality)",
+                channel.name,
+                ", ".join(missing_optional),
+                extra={"event": "permissions.optional_missing", "channel_id": channel.id},
+            )
+
+        self._enter_stage(progress, "gather")
+        reply_info = await self.gather_reply_information(message, channel)
+        if reply_info is None:
+            self._log_metrics("gather_reply_info", False, error="Failed to gather info")
+            return
 
-                if reply_info.parent_message.thread is not None:
-                    thread = reply_info.parent_message.thread
-                else:
-                    thread = await self.create_thread_from_reply(reply_info)
+        if self.shadow is not None and self.shadow.covers(guild_id):
+            await self._shadow_convert(reply_info, progress, admission)
+            return
 
-            if thread is None:
-                self.logger.warning(
-                    f"Failed to create thread for reply {reply_info.message_id}"
+        if self.journal is not None:
+            await self._journal_step(reply_info, PARENT_RESOLVED)
+            progress.journaled = True
+        parent_id = reply_info.parent_message.id
+        thread: discord.Thread | None = None
+        self._enter_stage(progress, "parent_lock")
+        async with self._with_parent_lock(parent_id):
+            # Re-fetch the parent inside the lock so we pick up a thread
+            # that another coroutine just created.
+            try:
+                parent = await reply_info.channel.fetch_message(parent_id)
+                reply_info = replace(reply_info, parent_message=parent)
+            except discord.NotFound:
+                self.logger.info(
+                    "Parent message %s deleted before thread creation; skipping", parent_id
                 )
                 return
-
-            repost_success = await self.repost_reply_in_thread(thread, reply_info)
-            if not repost_success:
-                # Repost failed (including partial attachment loss). Do NOT
-                # delete the original message; the user's content is still
-                # only safely available in the source channel.
+            except (discord.Forbidden, discord.HTTPException) as e:
+                # Transient or permission issue on re-fetch — proceed
+                # with the parent we already loaded.
                 self.logger.warning(
-                    f"Repost incomplete for reply {reply_info.message_id}; "
-                    "leaving original message intact to avoid data loss"
+                    "Re-fetch of parent %s failed (%s); using cached copy", parent_id, e
                 )
+
+            if reply_info.parent_message.thread is not None:
+                thread = reply_info.parent_message.thread
+            else:
+                self._enter_stage(progress, "create_thread")
+                thread = await self.create_thread_from_reply(reply_info)
+                if thread is not None:
+                    await self._journal_step(reply_info, THREAD_CREATED, thread)
+
+        if thread is None:
+            self.logger.warning("Failed to create thread for reply %s", reply_info.message_id)
+            return
+
+        self._enter_stage(progress, "repost")
+        # Oversize attachments are skipped, never downloaded, unless they
+        # are images to downscale.
+        held = sum(a.size for a in self._downloads(reply_info))
+        self._track_attachment_bytes(held)
+        try:
+            repost_success = await self.repost_reply_in_thread(thread, reply_info)
+        finally:
+            self._track_attachment_bytes(-held)
+        if not repost_success:
+            # Repost failed (including partial attachment loss). Do NOT
+            # delete the original message; the user's content is still
+            # only safely available in the source channel.
+            self.logger.warning(
+                "Repost incomplete for reply %s; "
+                "leaving original message intact to avoid data loss",
+                reply_info.message_id,
+            )
+            return
+
+        if self.breaker is not None:
+            self.breaker.record_success(channel.id, guild_id)
+
+        progress.reposted = True
+        await self._journal_step(reply_info, REPOSTED, thread)
+        self._enter_stage(progress, "cleanup")
+        progress.cleaned_up = await self.cleanup_messages(
+            thread, reply_info, notify=admission is not Admission.DOWNGRADE
+        )
+        self._enter_stage(progress, "done")
+
+        duration = asyncio.get_event_loop().time() - start_time
+        self.metrics.observe("conversion_seconds", duration)
+        self.metrics.mark("conversions")
+        self._log_metrics("process_reply_to_thread", True, duration)
+        self.logger.info(
+            "Successfully processed reply: created thread '%s', "
+            "reposted content, and cleaned up messages for reply from %s",
+            thread.name,
+            reply_info.author,
+            extra={
+                "event": "reply.processed",
+                "guild_id": message.guild.id if message.guild else None,
+                "channel_id": channel.id,
+                "message_id": reply_info.message_id,
+                "thread_id": thread.id,
+                "duration_s": round(duration, 4),
+            },
+        )
+
+    async def _shadow_convert(
+        self, reply_info: ReplyInfo, progress: ConversionProgress, admission: Admission
+    ) -> None:
+        """
+        The rest of ``_convert`` for a shadowed guild: the same parent lock,
+        re-fetch and decisions, with each write appended to the recorded
+        calls instead of made.
+        """
+        assert self.shadow is not None
+        channel = reply_info.channel
+        parent_id = reply_info.parent_message.id
+        routes = [FETCH_MESSAGE]  # gather_reply_information's parent fetch
+        thread_name: str | None = None
+        self._enter_stage(progress, "parent_lock")
+        async with self._with_parent_lock(parent_id):
+            routes.append(FETCH_MESSAGE)
+            try:
+                parent = await channel.fetch_message(parent_id)
+            except discord.NotFound:
                 return
+            except discord.HTTPException:
+                parent = reply_info.parent_message
+            if parent.thread is None and not self.shadow.has_thread(parent_id):
+                routes.append(CREATE_THREAD)
+                thread_name = Config.get_thread_name(parent.content)
+
+        downloads = self._downloads(reply_info)
+        routes += [CDN_DOWNLOAD] * len(downloads)
+        routes += [SEND_MESSAGE, ADD_THREAD_MEMBER]
+        can_delete = self.permissions.check_specific_permission(channel, "manage_messages")
+        if can_delete:
+            routes += [FETCH_MESSAGE, DELETE_MESSAGE]
+        if admission is not Admission.DOWNGRADE:
+            routes.append(SEND_MESSAGE)
+            if can_delete:
+                routes.append(DELETE_MESSAGE)  # the notification, 8s later
+
+        self._enter_stage(progress, "shadow")
+        attachment_bytes = sum(a.size for a in downloads)
+        self.shadow.record(
+            channel.guild.id, parent_id=parent_id, routes=routes, attachment_bytes=attachment_bytes
+        )
+        self.logger.debug(
+            "Shadow conversion of reply %s: %s, %d calls, %d attachment bytes",
+            reply_info.message_id,
+            f"new thread '{thread_name}'" if thread_name else "existing thread",
+            len(routes),
+            attachment_bytes,
+            extra={"event": "reply.shadowed", "message_id": reply_info.message_id},
+        )
+
+    def _downloads(self, reply_info: ReplyInfo) -> list[discord.Attachment]:
+        """The attachments a repost will download."""
+        transcoder = self.transcoder
+        return [
+            a
+            for a in reply_info.attachments
+            if a.size <= Config.MAX_ATTACHMENT_BYTES
+            or (transcoder is not None and transcoder.accepts(a))
+        ]
+
+    def _enter_stage(self, progress: ConversionProgress, stage: str) -> None:
+        now = asyncio.get_running_loop().time()
+        self.metrics.observe(
+            "conversion_stage_seconds", now - progress.stage_started, stage=progress.stage
+        )
+        progress.stage, progress.stage_started = stage, now
+
+    def _track_attachment_bytes(self, delta: int) -> None:
+        self._attachment_bytes += delta
+        self.metrics.set_gauge("attachment_bytes_in_flight", self._attachment_bytes)
 
-            await self.cleanup_messages(thread, reply_info)
+    def load(self) -> OrchestratorLoad:
+        waiting = sum(count - 1 for _, count in self._parent_locks.values())
+        return OrchestratorLoad(
+            in_flight=len(self._in_flight),
+            parent_locks=len(self._parent_locks),
+            lock_waiters=waiting,
+            pending_deletions=len(self._pending_notifications),
+            attachment_bytes=self._attachment_bytes,
+        )
 
-            duration = asyncio.get_event_loop().time() - start_time
-            self._log_metrics("process_reply_to_thread", True, duration)
+    def _admit(self, message: discord.Message, freshness: FreshnessPolicy) -> Admission:
+        age = freshness.age(message.created_at)
+        self.metrics.observe("reply_age_seconds", age)
+        admission = freshness.classify(age)
+        if admission is not Admission.FULL:
+            self.metrics.incr("replies_shed_total", action=admission.value)
             self.logger.info(
-                f"Successfully processed reply: created thread '{thread.name}', "
-                f"reposted content, and cleaned up messages for reply from {reply_info.author}"
+                "Reply %s is %.0fs old; %s",
+                message.id,
+                age,
+                "dropping it" if admission is Admission.SHED else "converting without notification",
+                extra={
+                    "event": "reply.shed",
+                    "message_id": message.id,
+                    "action": admission.value,
+                    "age_seconds": round(age, 1),
+                },
             )
+        return admission
 
-        except Exception as e:
-            duration = asyncio.get_event_loop().time() - start_time
-            self._log_metrics("process_reply_to_thread", False, duration, str(e))
-            self.logger.exception(
-                f"Error processing reply to thread for message {message.id} "
-                f"in guild {message.guild.id if message.guild else 'DM'}: {e}"
-            )
+    def _on_deadline_exceeded(self, message: discord.Message, progress: ConversionProgress) -> None:
+        self.metrics.incr("conversion_deadline_exceeded_total", stage=progress.stage)
+        self._log_metrics(
+            "process_reply_to_thread",
+            False,
+            self.deadline_seconds,
+            f"deadline exceeded during {progress.stage}",
+        )
+        if progress.reposted:
+            outcome = "repost done; original may still be in the channel"
+        else:
+            outcome = "repost not done; original left intact"
+        self.logger.warning(
+            "Conversion of reply %s exceeded %ss deadline during %s (%s)",
+            message.id,
+            self.deadline_seconds,
+            progress.stage,
+            outcome,
+            extra={
+                "event": "reply.deadline_exceeded",
+                "message_id": message.id,
+                "stage": progress.stage,
+                "reposted": progress.reposted,
+            },
+        )
+
+    def _on_process_error(self, message: discord.Message, start_time: float, e: Exception) -> None:
+        duration = asyncio.get_event_loop().time() - start_time
+        self._log_metrics("process_reply_to_thread", False, duration, str(e))
+        self.logger.exception(
+            "Error processing reply to thread for message %s in guild %s: %s",
+            message.id,
+            message.guild.id if message.guild else "DM",
+            e,
+        )
 
     # ------------------------------------------------------------------ #
     # Sub-steps
@@ -176,14 +646,15 @@ class ThreadingOrchestrator:
 
     def _validate_processing_conditions(self, message: discord.Message) -> bool:
         if not message.reference or not message.reference.message_id:
-            self.logger.debug(f"Message {message.id} has no valid reference")
+            self.logger.debug("Message %s has no valid reference", message.id)
             return False
         if message.guild is None:
-            self.logger.debug(f"Message {message.id} is not in a guild")
+            self.logger.debug("Message %s is not in a guild", message.id)
             return False
         if not hasattr(message.channel, "create_thread"):
             self.logger.debug(
-                f"Channel #{getattr(message.channel, 'name', '?')} does not support thread creation"
+                "Channel #%s does not support thread creation",
+                getattr(message.channel, "name", "?"),
             )
             return False
         return True
@@ -201,16 +672,20 @@ class ThreadingOrchestrator:
 
             try:
                 parent_message = await channel.fetch_message(parent_message_id)
-            except discord.NotFound:
+            except discord.NotFound as e:
                 self.logger.warning(
-                    f"Parent message {parent_message_id} not found for reply {message.id}"
+                    "Parent message %s not found for reply %s", parent_message_id, message.id
                 )
+                if e.code == UNKNOWN_CHANNEL:
+                    self._record_failure(channel, "unknown channel")
                 return None
             except discord.Forbidden:
                 self.logger.warning(
-                    f"No permission to fetch parent message {parent_message_id} "
-                    f"for reply {message.id}"
+                    "No permission to fetch parent message %s for reply %s",
+                    parent_message_id,
+                    message.id,
                 )
+                self._record_failure(channel, "forbidden: fetch parent")
                 return None
 
             info = ReplyInfo(
@@ -224,50 +699,78 @@ class ThreadingOrchestrator:
                 created_at=message.created_at,
             )
             self.logger.debug(
-                f"Gathered reply info: content_length={len(info.content)}, "
-                f"attachments={len(info.attachments)}, embeds={len(info.embeds)}, "
-                f"parent_author={info.parent_message.author}"
+                "Gathered reply info: content_length=%d, attachments=%d, embeds=%d, "
+                "parent_author=%s",
+                len(info.content),
+                len(info.attachments),
+                len(info.embeds),
+                info.parent_message.author,
+                extra={"event": "reply.gathered", "message_id": message.id},
             )
             return info
         except Exception as e:
-            self.logger.exception(f"Error gathering reply information for message {message.id}: {e}")
+            self.logger.exception(
+                "Error gathering reply information for message %s: %s", message.id, e
+            )
             return None
 
     async def create_thread_from_reply(self, reply_info: ReplyInfo) -> discord.Thread | None:
         try:
             parent_message = reply_info.parent_message
             thread_name = Config.get_thread_name(parent_message.content)
-            thread = await parent_message.create_thread(
-                name=thread_name,
-                auto_archive_duration=Config.DEFAULT_AUTO_ARCHIVE_DURATION,  # type: ignore[arg-type]
+            thread = await self.retry.call(
+                "create_thread",
+                lambda: parent_message.create_thread(
+                    name=thread_name,
+                    auto_archive_duration=Config.DEFAULT_AUTO_ARCHIVE_DURATION,  # type: ignore[arg-type]
+                ),
             )
             self.logger.debug(
-                f"Created thread '{thread.name}' (ID: {thread.id}) on message "
-                f"{parent_message.id} in channel "
-                f"#{getattr(parent_message.channel, 'name', '?')}"
+                "Created thread '%s' (ID: %s) on message %s in channel #%s",
+                thread.name,
+                thread.id,
+                parent_message.id,
+                getattr(parent_message.channel, "name", "?"),
+                extra={"event": "thread.created", "thread_id": thread.id},
             )
             return thread
         except discord.Forbidden:
-            guild_id = reply_info.parent_message.guild.id if reply_info.parent_message.guild else "?"
+            guild_id = (
+                reply_info.parent_message.guild.id if reply_info.parent_message.guild else "?"
+            )
             self.logger.error(
-                f"Missing permissions to create thread on message {reply_info.parent_message.id} "
-                f"in guild {guild_id}"
+                "Missing permissions to create thread on message %s in guild %s",
+                reply_info.parent_message.id,
+                guild_id,
             )
+            self._record_failure(reply_info.channel, "forbidden: create thread")
             return None
         except discord.HTTPException as e:
+            if e.code == THREAD_ALREADY_EXISTS:
+                # An earlier attempt succeeded despite the error response.
+                return await self._existing_thread(reply_info)
             self.logger.error(
-                f"HTTP error creating thread on message {reply_info.parent_message.id}: {e}"
+                "HTTP error creating thread on message %s: %s", reply_info.parent_message.id, e
             )
             return None
         except Exception as e:
             self.logger.exception(
-                f"Unexpected error creating thread on message {reply_info.parent_message.id}: {e}"
+                "Unexpected error creating thread on message %s: %s",
+                reply_info.parent_message.id,
+                e,
             )
             return None
 
-    async def repost_reply_in_thread(
-        self, thread: discord.Thread, reply_info: ReplyInfo
-    ) -> bool:
+    async def _existing_thread(self, reply_info: ReplyInfo) -> discord.Thread | None:
+        parent_id = reply_info.parent_message.id
+        try:
+            parent = await reply_info.channel.fetch_message(parent_id)
+        except discord.HTTPException as e:
+            self.logger.error("Could not re-fetch parent %s to find its thread: %s", parent_id, e)
+            return None
+        return parent.thread
+
+    async def repost_reply_in_thread(self, thread: discord.Thread, reply_info: ReplyInfo) -> bool:
         """
         Repost the original reply content in the thread.
 
@@ -278,59 +781,171 @@ class ThreadingOrchestrator:
             author = reply_info.author
             content = reply_info.content
 
-            embed = discord.Embed(description=content or "", color=0x5865F2)
-            embed.set_author(name=author.display_name, icon_url=author.display_avatar.url)
-            embed.timestamp = reply_info.created_at
-
             files, attachments_ok = await build_attachment_files(
                 reply_info.attachments,
                 max_bytes=Config.MAX_ATTACHMENT_BYTES,
                 logger=self.logger,
+                transcoder=self.transcoder,
             )
 
-            all_embeds = [embed, *reply_info.embeds]
-            if files:
-                await thread.send(embeds=all_embeds, files=files)
+            all_embeds = repost_embeds(reply_info)
+
+            nonce = message_nonce(reply_info.message_id, NONCE_REPOST)
+
+            async def send() -> discord.Message:
+                # The nonce (discord.py adds enforce_nonce) makes a retry of a
+                # send Discord already carried out return that message
+                # instead of posting a second copy.
+                if files:
+                    # A failed attempt may have consumed the buffers.
+                    for f in files:
+                        f.reset()
+                    return await thread.send(embeds=all_embeds, files=files, nonce=nonce)
+                return await thread.send(embeds=all_embeds, nonce=nonce)
+
+            via = "bot"
+            sent = await self._repost_via_webhook(thread, reply_info, files)
+            if sent is None:
+                return False  # it may be in the thread: don't post it twice
+            if sent:
+                via, all_embeds = "webhook", reply_info.embeds
             else:
-                await thread.send(embeds=all_embeds)
+                await self.retry.call("repost", send)
 
-            try:
-                await thread.add_user(author)
-                self.logger.debug(
-                    f"Added {author.display_name} as participant to thread {thread.id}"
-                )
-            except discord.Forbidden:
-                self.logger.warning(
-                    f"Missing permissions to add {author.display_name} to thread {thread.id}"
-                )
-            except discord.HTTPException as e:
-                self.logger.warning(
-                    f"HTTP error adding {author.display_name} to thread {thread.id}: {e}"
-                )
-            except Exception as e:
-                self.logger.warning(
-                    f"Unexpected error adding {author.display_name} to thread {thread.id}: {e}"
-                )
+            await self.add_to_thread(thread, author)
 
             self.logger.debug(
-                f"Reposted reply content in thread {thread.id}: "
-                f"content_length={len(content)}, attachments={len(reply_info.attachments)}, "
-                f"attachments_reposted={len(files)}, original_embeds={len(reply_info.embeds)}, "
-                f"total_embeds={len(all_embeds)}"
+                "Reposted reply content in thread %s as the %s: content_length=%d, "
+                "attachments=%d, attachments_reposted=%d, original_embeds=%d, total_embeds=%d",
+                thread.id,
+                via,
+                len(content),
+                len(reply_info.attachments),
+                len(files),
+                len(reply_info.embeds),
+                len(all_embeds),
+                extra={"event": "reply.reposted", "thread_id": thread.id},
             )
             return attachments_ok
 
         except discord.Forbidden:
-            self.logger.error(f"Missing permissions to send message in thread {thread.id}")
+            self.logger.error("Missing permissions to send message in thread %s", thread.id)
+            self._record_failure(reply_info.channel, "forbidden: repost")
             return False
         except discord.HTTPException as e:
-            self.logger.error(f"HTTP error sending message to thread {thread.id}: {e}")
+            self.logger.error("HTTP error sending message to thread %s: %s", thread.id, e)
             return False
         except Exception as e:
-            self.logger.exception(f"Unexpected error reposting in thread {thread.id}: {e}")
+            self.logger.exception("Unexpected error reposting in thread %s: %s", thread.id, e)
             return False
 
-    async def cleanup_messages(self, thread: discord.Thread, reply_info: ReplyInfo) -> None:
+    async def add_to_thread(
+        self, thread: discord.Thread, author: discord.Member | discord.User
+    ) -> None:
+        """Add ``author`` to ``thread``; a failure is logged, never raised."""
+        try:
+            await thread.add_user(author)
+            self.logger.debug(
+                "Added %s as participant to thread %s", author.display_name, thread.id
+            )
+        except discord.Forbidden:
+            self.logger.warning(
+                "Missing permissions to add %s to thread %s", author.display_name, thread.id
+            )
+        except discord.HTTPException as e:
+            self.logger.warning(
+                "HTTP error adding %s to thread %s: %s", author.display_name, thread.id, e
+            )
+        except Exception as e:
+            self.logger.warning(
+                "Unexpected error adding %s to thread %s: %s",
+                author.display_name,
+                thread.id,
+                e,
+            )
+
+    async def _repost_via_webhook(
+        self, thread: discord.Thread, reply_info: ReplyInfo, files: list[discord.File]
+    ) -> bool | None:
+        """
+        Post the reply into ``thread`` through its channel's webhook, under
+        the author's name and avatar. ``False`` when there is no webhook,
+        the reply doesn't fit one message, or Discord refused the post: the
+        caller then reposts as the bot. ``None`` when the post may or may
+        not have gone through (a 5xx, a timeout, a dropped connection):
+        reposting as the bot could show the reply twice, so the caller
+        leaves the original in place instead.
+        """
+        content = reply_info.content
+        if self.webhooks is None or len(content) > MAX_WEBHOOK_CONTENT:
+            return False
+        if not (content or reply_info.embeds or files):
+            return False  # nothing a webhook message can carry
+        channel = reply_info.channel
+        webhook = await self.webhooks.get(channel)
+        if webhook is None:
+            return False
+        author = reply_info.author
+
+        async def send() -> discord.WebhookMessage:
+            for f in files:
+                f.reset()
+            return await webhook.send(
+                content or discord.utils.MISSING,
+                username=author.display_name,
+                avatar_url=author.display_avatar.url,
+                embeds=reply_info.embeds,
+                files=files,
+                thread=thread,
+                allowed_mentions=discord.AllowedMentions.none(),
+                wait=True,
+            )
+
+        try:
+            # Webhook executions take no nonce: only 429s are safe to retry.
+            await self.retry.call("repost_webhook", send, idempotent=False)
+        except discord.HTTPException as e:
+            if e.status >= 500:
+                self._webhook_outcome_unknown(thread, e)
+                return None
+            # A 4xx (404, 403, 400, a 429 the retrier gave up on) means
+            # Discord turned the request away: nothing was posted.
+            if isinstance(e, discord.NotFound):  # deleted since we cached it
+                self.webhooks.invalidate(channel.id)
+            self.metrics.incr("webhook_reposts_total", outcome="fallback")
+            self.logger.warning(
+                "Webhook repost in thread %s failed (%s); reposting as the bot",
+                thread.id,
+                e,
+                extra={"event": "webhook.fallback", "thread_id": thread.id},
+            )
+            return False
+        except (TimeoutError, aiohttp.ClientError, ConnectionError) as e:
+            # asyncio.TimeoutError is the builtin since 3.11.
+            self._webhook_outcome_unknown(thread, e)
+            return None
+        self.metrics.incr("webhook_reposts_total", outcome="sent")
+        return True
+
+    def _webhook_outcome_unknown(self, thread: discord.Thread, error: BaseException) -> None:
+        self.metrics.incr("webhook_reposts_total", outcome="unknown")
+        self.logger.error(
+            "Webhook repost in thread %s may not have gone through (%r); "
+            "leaving the original in place rather than risk posting it twice",
+            thread.id,
+            error,
+            extra={"event": "webhook.unknown", "thread_id": thread.id},
+        )
+
+    async def cleanup_messages(
+        self, thread: discord.Thread, reply_info: ReplyInfo, *, notify: bool = True
+    ) -> bool:
+        """
+        Delete the original and send the notification. ``True`` when the
+        original is dealt with: deleted, or left on purpose because the bot
+        may not delete it. After a failed delete the journal entry stays at
+        ``REPOSTED``, so the next start tries the delete again.
+        """
         can_delete = self.permissions.check_specific_permission(
             reply_info.channel, "manage_messages"
         )
@@ -340,40 +955,65 @@ class ThreadingOrchestrator:
             deletion_successful = await self.delete_original_reply(reply_info)
         else:
             self.logger.info(
-                f"Skipping message deletion in #{reply_info.channel.name} - "
-                "missing manage_messages permission (this is optional)"
+                "Skipping message deletion in #%s - "
+                "missing manage_messages permission (this is optional)",
+                reply_info.channel.name,
+                extra={"event": "cleanup.skipped", "channel_id": reply_info.channel.id},
             )
+        handled = deletion_successful or not can_delete
+        if handled:
+            await self._journal_step(reply_info, ORIGINAL_DELETED, thread)
 
-        await self.send_temporary_notification(thread, reply_info, deletion_successful)
+        if notify:
+            await self.send_temporary_notification(thread, reply_info, deletion_successful)
+            if handled:
+                await self._journal_step(reply_info, NOTIFIED, thread)
+        return handled
+
+    async def _journal_step(
+        self, reply_info: ReplyInfo, step: str, thread: discord.Thread | None = None
+    ) -> None:
+        if self.journal is not None:
+            await self.journal.record(
+                reply_info.message_id,
+                reply_info.channel.id,
+                step,
+                thread_id=thread.id if thread is not None else None,
+            )
 
     async def delete_original_reply(self, reply_info: ReplyInfo) -> bool:
         try:
             original_message = await reply_info.channel.fetch_message(reply_info.message_id)
             await original_message.delete()
             self.logger.debug(
-                f"Deleted original reply message {reply_info.message_id} "
-                f"from #{reply_info.channel.name}"
+                "Deleted original reply message %s from #%s",
+                reply_info.message_id,
+                reply_info.channel.name,
+                extra={"event": "reply.deleted", "message_id": reply_info.message_id},
             )
             return True
         except discord.NotFound:
             self.logger.debug(
-                f"Original reply message {reply_info.message_id} not found (already deleted?)"
+                "Original reply message %s not found (already deleted?)", reply_info.message_id
             )
             return False
         except discord.Forbidden:
             self.logger.warning(
-                f"Missing permissions to delete original reply message {reply_info.message_id} "
-                f"in #{reply_info.channel.name}"
+                "Missing permissions to delete original reply message %s in #%s",
+                reply_info.message_id,
+                reply_info.channel.name,
             )
             return False
         except discord.HTTPException as e:
             self.logger.error(
-                f"HTTP error deleting original reply message {reply_info.message_id}: {e}"
+                "HTTP error deleting original reply message %s: %s", reply_info.message_id, e
             )
             return False
         except Exception as e:
             self.logger.exception(
-                f"Unexpected error deleting original reply message {reply_info.message_id}: {e}"
+                "Unexpected error deleting original reply message %s: %s",
+                reply_info.message_id,
+                e,
             )
             return False
 
@@ -401,25 +1041,32 @@ class ThreadingOrchestrator:
         )
 
         try:
-            notification_message = await channel.send(
-                notification_content, allowed_mentions=allowed
+            notification_message = await self.retry.call(
+                "notify",
+                lambda: channel.send(
+                    notification_content,
+                    allowed_mentions=allowed,
+                    nonce=message_nonce(reply_info.message_id, NONCE_NOTIFY),
+                ),
             )
         except discord.Forbidden:
             self.logger.warning(
-                f"Missing permissions to send notification message in #{channel.name}"
+                "Missing permissions to send notification message in #%s", channel.name
             )
             return
         except discord.HTTPException as e:
-            self.logger.error(f"HTTP error sending notification message: {e}")
+            self.logger.error("HTTP error sending notification message: %s", e)
             return
         except Exception as e:
-            self.logger.exception(f"Unexpected error sending temporary notification: {e}")
+            self.logger.exception("Unexpected error sending temporary notification: %s", e)
             return
 
         if not deletion_successful:
             self.logger.debug(
-                f"Sent notification message {notification_message.id} in #{channel.name} - "
-                "will not auto-delete because we don't own manage_messages"
+                "Sent notification message %s in #%s - "
+                "will not auto-delete because we don't own manage_messages",
+                notification_message.id,
+                channel.name,
             )
             return
 
@@ -427,47 +1074,68 @@ class ThreadingOrchestrator:
         task = asyncio.create_task(self._delete_after(notification_message, 8))
         self._background_tasks.add(task)
         task.add_done_callback(self._background_tasks.discard)
+        self._pending_notifications[task] = notification_message
+        task.add_done_callback(self._forget_notification)
+
+    def _forget_notification(self, task: asyncio.Task) -> None:
+        self._pending_notifications.pop(task, None)
 
     async def _delete_after(self, message: discord.Message, delay_seconds: float) -> None:
         try:
-            await asyncio.sleep(delay_seconds)
+            # A shutdown drain cuts the wait short so the delete still
+            # happens before the process exits.
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._draining.wait(), delay_seconds)
             await message.delete()
             self.logger.debug(
-                f"Auto-deleted notification message {message.id} in "
-                f"#{getattr(message.channel, 'name', '?')}"
+                "Auto-deleted notification message %s in #%s",
+                message.id,
+                getattr(message.channel, "name", "?"),
+                extra={"event": "notification.deleted", "message_id": message.id},
             )
         except discord.NotFound:
             pass
         except discord.Forbidden:
             self.logger.warning(
-                f"Lost manage_messages permission before auto-deleting notification {message.id}"
+                "Lost manage_messages permission before auto-deleting notification %s",
+                message.id,
             )
         except discord.HTTPException as e:
-            self.logger.warning(f"HTTP error auto-deleting notification {message.id}: {e}")
+            self.logger.warning("HTTP error auto-deleting notification %s: %s", message.id, e)
         except asyncio.CancelledError:
             raise
         except Exception as e:
-            self.logger.warning(f"Unexpected error auto-deleting notification {message.id}: {e}")
+            self.logger.warning("Unexpected error auto-deleting notification %s: %s", message.id, e)
 
     async def delete_system_thread_message(self, message: discord.Message) -> None:
         try:
             await message.delete()
             self.logger.debug(
-                f"Deleted system thread creation message {message.id} "
-                f"in #{getattr(message.channel, 'name', '?')}"
+                "Deleted system thread creation message %s in #%s",
+                message.id,
+                getattr(message.channel, "name", "?"),
+                extra={"event": "system_message.deleted", "message_id": message.id},
             )
         except discord.Forbidden:
             self.logger.warning(
-                f"Missing permissions to delete system messages in "
-                f"#{getattr(message.channel, 'name', '?')}"
+                "Missing permissions to delete system messages in #%s",
+                getattr(message.channel, "name", "?"),
             )
         except discord.HTTPException as e:
-            self.logger.error(f"HTTP error deleting system thread message {message.id}: {e}")
+            self.logger.error("HTTP error deleting system thread message %s: %s", message.id, e)
         except Exception as e:
             self.logger.exception(
-                f"Unexpected error deleting system thread message {message.id}: {e}"
+                "Unexpected error deleting system thread message %s: %s", message.id, e
             )
 
+    def _record_failure(
+        self,
+        channel: discord.TextChannel | discord.VoiceChannel | discord.StageChannel,
+        reason: str,
+    ) -> None:
+        if self.breaker is not None:
+            self.breaker.record_failure(channel.id, channel.guild.id, reason)
+
     def _log_metrics(
         self,
         operation: str,
@@ -475,12 +1143,27 @@ class ThreadingOrchestrator:
         duration: float | None = None,
         error: str | None = None,
     ) -> None:
-        status = "SUCCESS" if success else "FAILED"
-        duration_str = f" ({duration:.2f}s)" if duration else ""
+        extra = {
+            "event": "metrics",
+            "operation": operation,
+            "success": success,
+            "duration_s": round(duration, 4) if duration else None,
+        }
         if success:
-            self.logger.info(f"METRICS: {operation} {status}{duration_str}")
+            # Hot path (once per conversion): keep formatting lazy and let
+            # LOG_SAMPLE_RATES thin it out via the "metrics" event.
+            if self.logger.isEnabledFor(logging.INFO):
+                self.logger.info(
+                    "METRICS: %s SUCCESS%s",
+                    operation,
+                    f" ({duration:.2f}s)" if duration else "",
+                    extra=extra,
+                )
         else:
-            error_str = f" - {error}" if error else ""
-            self.logger.warning(f"METRICS: {operation} {status}{duration_str}{error_str}")
-
-
+            self.logger.warning(
+                "METRICS: %s FAILED%s%s",
+                operation,
+                f" ({duration:.2f}s)" if duration else "",
+                f" - {error}" if error else "",
+                extra={**extra, "error": error},
+            )
@@ -0,0 +1,82 @@
+"""Deletions left over at shutdown, persisted and replayed on the next boot."""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+import discord
+
+
+@dataclass(frozen=True)
+class PendingDeletion:
+    channel_id: int
+    message_id: int
+    # "notification": our temporary pointer message; "original": a reply
+    # whose repost finished but whose cleanup was cut short.
+    kind: str
+
+
+class PendingDeletionStore:
+    """A small JSON file of ``PendingDeletion`` entries, written atomically."""
+
+    def __init__(self, path: Path, *, logger: logging.Logger) -> None:
+        self.path = path
+        self.logger = logger
+
+    def save(self, entries: list[PendingDeletion]) -> None:
+        """Append ``entries`` to whatever is already stored."""
+        if not entries:
+            return
+        merged = self._read() + entries
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps([asdict(e) for e in merged]), encoding="utf-8")
+        os.replace(tmp, self.path)
+        self.logger.info("Persisted %d pending deletion(s) to %s", len(entries), self.path)
+
+    def take(self) -> list[PendingDeletion]:
+        """Return every stored entry and clear the file."""
+        entries = self._read()
+        self.path.unlink(missing_ok=True)
+        return entries
+
+    def _read(self) -> list[PendingDeletion]:
+        try:
+            raw = json.loads(self.path.read_text(encoding="utf-8"))
+            return [PendingDeletion(**item) for item in raw]
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError, TypeError) as e:
+            self.logger.warning("Ignoring unreadable pending deletions in %s: %s", self.path, e)
+            return []
+
+
+async def replay_pending_deletions(
+    store: PendingDeletionStore,
+    delete: Callable[[int, int], Awaitable[Any]],
+    logger: logging.Logger,
+) -> int:
+    """
+    Carry out deletions left by the previous run; returns how many
+    succeeded. Messages that are already gone count as done.
+    """
+    done = 0
+    for entry in store.take():
+        try:
+            await delete(entry.channel_id, entry.message_id)
+            done += 1
+        except discord.NotFound:
+            done += 1
+        except (discord.HTTPException, TimeoutError) as e:
+            logger.warning(
+                "Could not delete leftover %s message %s: %s", entry.kind, entry.message_id, e
+            )
+    if done:
+        logger.info("Completed %d deletion(s) left over from the last shutdown", done)
+    return done
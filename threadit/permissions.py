@@ -113,6 +113,26 @@ class PermissionsService:
         permissions = channel.permissions_for(bot_member)
         return bool(getattr(permissions, permission_name, False))
 
+    def permission_warning_due(
+        self,
+        channel: discord.TextChannel | discord.VoiceChannel | discord.StageChannel | discord.Thread,
+    ) -> bool:
+        """Whether ``send_permission_error_message`` would post in ``channel`` now."""
+        return self.check_specific_permission(
+            channel, "send_messages"
+        ) and not self._warning_cooling_down(channel.id)
+
+    def note_permission_warning(self, channel_id: int) -> None:
+        """Start the channel's warning cooldown, as if a warning was just posted."""
+        self._warning_sent_at[channel_id] = time.monotonic()
+
+    def _warning_cooling_down(self, channel_id: int) -> bool:
+        last_sent = self._warning_sent_at.get(channel_id)
+        return (
+            last_sent is not None
+            and time.monotonic() - last_sent < Config.PERMISSION_WARNING_COOLDOWN_SECONDS
+        )
+
     async def send_permission_error_message(
         self,
         channel: discord.TextChannel | discord.VoiceChannel | discord.StageChannel | discord.Thread,
@@ -125,17 +145,17 @@ class PermissionsService:
         # Avoid attempting a send we know will 403.
         if not self.check_specific_permission(channel, "send_messages"):
             self.logger.error(
-                f"Cannot send permission error message in #{channel.name} "
-                f"- missing Send Messages permission"
+                "Cannot send permission error message in #%s - missing Send Messages permission",
+                channel.name,
             )
             return
 
-        now = time.monotonic()
-        last_sent = self._warning_sent_at.get(channel.id)
-        if last_sent is not None and now - last_sent < Config.PERMISSION_WARNING_COOLDOWN_SECONDS:
+        if self._warning_cooling_down(channel.id):
             self.logger.debug(
-                f"Suppressing duplicate permission warning in #{channel.name} "
-                f"(cooldown {Config.PERMISSION_WARNING_COOLDOWN_SECONDS}s)"
+                "Suppressing duplicate permission warning in #%s (cooldown %ss)",
+                channel.name,
+                Config.PERMISSION_WARNING_COOLDOWN_SECONDS,
+                extra={"event": "permissions.warning_suppressed", "channel_id": channel.id},
             )
             return
 
@@ -152,19 +172,19 @@ class PermissionsService:
                 f"4. Or re-invite me with the correct permissions: {invite_url(self._get_client_id())}\n\n"
             )
             await channel.send(error_message)
-            self._warning_sent_at[channel.id] = now
-            self.logger.info(f"Sent permission error message to #{channel.name}")
+            self.note_permission_warning(channel.id)
+            self.logger.info("Sent permission error message to #%s", channel.name)
         except discord.Forbidden:
             self.logger.error(
-                f"Failed to send permission error message in #{channel.name} - forbidden"
+                "Failed to send permission error message in #%s - forbidden", channel.name
             )
         except discord.HTTPException as e:
             self.logger.error(
-                f"HTTP error sending permission error message in #{channel.name}: {e}"
+                "HTTP error sending permission error message in #%s: %s", channel.name, e
             )
         except Exception as e:
             self.logger.exception(
-                f"Unexpected error sending permission error message in #{channel.name}: {e}"
+                "Unexpected error sending permission error message in #%s: %s", channel.name, e
             )
 
     def log_guild_permissions(self, guild: discord.Guild) -> None:
@@ -172,15 +192,17 @@ class PermissionsService:
         try:
             self_id = self._get_self_id()
             if self_id is None:
-                self.logger.warning(f"Skipping permission log for {guild.name}: bot not yet ready")
+                self.logger.warning("Skipping permission log for %s: bot not yet ready", guild.name)
                 return
             bot_member = guild.get_member(self_id)
             if bot_member is None:
-                self.logger.warning(f"Bot not found as member in guild {guild.name} (ID: {guild.id})")
+                self.logger.warning(
+                    "Bot not found as member in guild %s (ID: %s)", guild.name, guild.id
+                )
                 return
 
             guild_permissions = bot_member.guild_permissions
-            self.logger.info(f"Guild {guild.name} (ID: {guild.id}) - Bot permissions status:")
+            self.logger.info("Guild %s (ID: %s) - Bot permissions status:", guild.name, guild.id)
 
             key_guild_permissions: list[tuple[str, str]] = [
                 ("view_channel", "View Channels"),
@@ -196,7 +218,7 @@ class PermissionsService:
                 f"{'✓' if getattr(guild_permissions, name, False) else '✗'} {display}"
                 for name, display in key_guild_permissions
             ]
-            self.logger.info(f"  Guild-level permissions: {', '.join(statuses)}")
+            self.logger.info("  Guild-level permissions: %s", ", ".join(statuses))
 
             problematic_channels: list[str] = []
             for channel in guild.text_channels:
@@ -208,11 +230,11 @@ class PermissionsService:
 
             if problematic_channels:
                 self.logger.warning(
-                    f"  Channels with permission issues: {'; '.join(problematic_channels)}"
+                    "  Channels with permission issues: %s", "; ".join(problematic_channels)
                 )
             else:
                 self.logger.info("  All text channels have required permissions ✓")
         except Exception as e:
             self.logger.exception(
-                f"Error logging permissions for guild {guild.name} (ID: {guild.id}): {e}"
+                "Error logging permissions for guild %s (ID: %s): %s", guild.name, guild.id, e
             )
@@ -0,0 +1,180 @@
+"""On-demand CPU profile + tracemalloc capture for a running bot."""
+
+from __future__ import annotations
+
+import asyncio
+import cProfile
+import io
+import logging
+import pstats
+import signal
+import tracemalloc
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+
+# Functions the capture summary calls out explicitly: the reply pipeline,
+# attachment download/re-upload, and the gateway dispatch into the cog.
+# pstats restrictions are regexes over "file:line(function)".
+FOCUS_PATTERN = (
+    r"orchestrator\.py:\d+\(process\)"
+    r"|attachments\.py:\d+\(build_attachment_files\)"
+    r"|cog\.py:\d+\(on_message\)"
+    r"|client\.py:\d+\((dispatch|_run_event)\)"
+)
+
+# Frames recorded per allocation while tracemalloc is on. Deeper stacks
+# attribute memory better but cost more per allocation.
+TRACEMALLOC_FRAMES = 10
+
+
+@dataclass(frozen=True)
+class ProfileCapture:
+    """Files written by one capture."""
+
+    cpu_profile: Path
+    memory_snapshot: Path
+    summary: Path
+
+
+class Profiler:
+    """
+    Time-boxed profiling of the live event loop.
+
+    ``capture`` turns on ``cProfile`` for the loop thread and ``tracemalloc``
+    for the process, sleeps for the requested window while real traffic
+    flows, then writes three files to ``output_dir``: a ``.prof`` (load with
+    ``pstats``/snakeviz), a ``.tracemalloc`` snapshot, and a ``.txt`` summary
+    that leads with the reply-pipeline hot paths. Only one capture runs at
+    a time.
+    """
+
+    def __init__(
+        self,
+        *,
+        output_dir: Path,
+        logger: logging.Logger,
+        default_seconds: float,
+        max_seconds: float,
+    ) -> None:
+        self.output_dir = output_dir
+        self.logger = logger
+        self.default_seconds = default_seconds
+        self.max_seconds = max_seconds
+        self._lock = asyncio.Lock()
+        self._signal_tasks: set[asyncio.Task] = set()
+
+    @property
+    def busy(self) -> bool:
+        return self._lock.locked()
+
+    async def capture(self, seconds: float | None = None, *, reason: str) -> ProfileCapture:
+        """
+        Profile for ``seconds`` (clamped to ``max_seconds``) and write the files.
+
+        Raises ``RuntimeError`` if a capture is already in progress.
+        """
+        if self.busy:
+            raise RuntimeError("A profile capture is already running")
+        window = min(seconds if seconds and seconds > 0 else self.default_seconds, self.max_seconds)
+        async with self._lock:
+            self.logger.info("Starting %.1fs profile capture (%s)", window, reason)
+            started_tracemalloc = not tracemalloc.is_tracing()
+            if started_tracemalloc:
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                await asyncio.sleep(window)
+            finally:
+                profile.disable()
+                snapshot = tracemalloc.take_snapshot()
+                if started_tracemalloc:
+                    tracemalloc.stop()
+
+            stamp = datetime.now(UTC).strftime("%Y%m%d-%H%M%S")
+            result = await asyncio.to_thread(self._write, profile, snapshot, stamp, window, reason)
+            self.logger.info(
+                "Profile capture written: %s, %s, %s",
+                result.cpu_profile,
+                result.memory_snapshot,
+                result.summary,
+                extra={"event": "profile.captured"},
+            )
+            return result
+
+    def _write(
+        self,
+        profile: cProfile.Profile,
+        snapshot: tracemalloc.Snapshot,
+        stamp: str,
+        window: float,
+        reason: str,
+    ) -> ProfileCapture:
+        """Serialize a capture. Runs in a worker thread, off the event loop."""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        base = self.output_dir / f"profile-{stamp}"
+        result = ProfileCapture(
+            cpu_profile=base.with_suffix(".prof"),
+            memory_snapshot=base.with_suffix(".tracemalloc"),
+            summary=base.with_suffix(".txt"),
+        )
+        profile.dump_stats(result.cpu_profile)
+        snapshot.dump(str(result.memory_snapshot))
+        result.summary.write_text(
+            render_summary(profile, snapshot, window=window, reason=reason), encoding="utf-8"
+        )
+        return result
+
+    def install_signal_handler(
+        self, loop: asyncio.AbstractEventLoop, signum: int | None = None
+    ) -> bool:
+        """
+        Start a default-length capture when ``signum`` arrives
+        (``kill -USR1 <pid>`` / ``docker kill --signal=USR1``).
+
+        Returns ``False`` where the loop doesn't support signal handlers
+        (Windows).
+        """
+        if signum is None:
+            signum = getattr(signal, "SIGUSR1", None)
+            if signum is None:
+                return False
+        try:
+            loop.add_signal_handler(signum, self._on_signal)
+        except (NotImplementedError, RuntimeError, AttributeError):
+            return False
+        return True
+
+    def _on_signal(self) -> None:
+        if self.busy:
+            self.logger.warning("Profile signal ignored: a capture is already running")
+            return
+        task = asyncio.get_running_loop().create_task(self.capture(reason="signal"))
+        self._signal_tasks.add(task)
+        task.add_done_callback(self._signal_tasks.discard)
+
+
+def render_summary(
+    profile: cProfile.Profile,
+    snapshot: tracemalloc.Snapshot,
+    *,
+    window: float,
+    reason: str,
+    top: int = 30,
+) -> str:
+    """Human-readable report: focus functions, top CPU, top allocation sites."""
+    out = io.StringIO()
+    out.write(f"Thread It profile capture — {window:.1f}s window ({reason})\n\n")
+
+    stats = pstats.Stats(profile, stream=out)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE)
+    out.write("== Reply pipeline hot paths (cumulative CPU on the loop thread) ==\n")
+    stats.print_stats(FOCUS_PATTERN)
+    out.write(f"\n== Top {top} functions by cumulative CPU ==\n")
+    stats.print_stats(top)
+
+    out.write(f"\n== Top {top} allocation sites (live at end of window) ==\n")
+    for stat in snapshot.statistics("lineno")[:top]:
+        out.write(f"{stat}\n")
+    return out.getvalue()
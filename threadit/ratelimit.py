@@ -0,0 +1,121 @@
+"""Token buckets guarding the reply pipeline and pacing background REST work."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+
+from .metrics import Metrics
+
+
+class TokenBuckets:
+    """
+    One token bucket per key, refilled at ``rate`` tokens/second up to
+    ``burst``.
+
+    State per key is a ``(tokens, updated_at)`` pair in an LRU-ordered
+    dict capped at ``max_keys``. Evicting a key is the same as letting its
+    bucket refill, so the cap only ever errs towards letting a message in;
+    with the default cap an evicted key has been idle far longer than any
+    sensible refill period anyway.
+    """
+
+    def __init__(
+        self,
+        *,
+        rate: float,
+        burst: float,
+        max_keys: int = 10_000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be > 0 and burst >= 1")
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets: OrderedDict[int, tuple[float, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def try_acquire(self, key: int) -> bool:
+        """Take one token for ``key``; ``False`` if its bucket is empty."""
+        now = self._clock()
+        state = self._buckets.pop(key, None)
+        if state is None:
+            tokens = self.burst
+        else:
+            tokens = min(self.burst, state[0] + (now - state[1]) * self.rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return allowed
+
+
+class ReplyRateLimiter:
+    """
+    Front-door limit for ``ThreadItCog.on_message``: a reply is dispatched
+    only if both its author's and its channel's bucket have a token. A
+    dropped reply costs two dict operations and no REST calls; it is simply
+    left where it was posted.
+    """
+
+    def __init__(
+        self,
+        *,
+        user_buckets: TokenBuckets | None,
+        channel_buckets: TokenBuckets | None,
+        metrics: Metrics,
+        logger: logging.Logger,
+    ) -> None:
+        self.user_buckets = user_buckets
+        self.channel_buckets = channel_buckets
+        self.metrics = metrics
+        self.logger = logger
+
+    def allow(self, user_id: int, channel_id: int) -> bool:
+        for scope, buckets, key in (
+            ("user", self.user_buckets, user_id),
+            ("channel", self.channel_buckets, channel_id),
+        ):
+            if buckets is not None and not buckets.try_acquire(key):
+                self.metrics.incr("replies_rate_limited_total", scope=scope)
+                self.metrics.mark("replies_rate_limited")
+                self.logger.debug(
+                    "Rate limited reply from user %s in channel %s (%s bucket empty)",
+                    user_id,
+                    channel_id,
+                    scope,
+                )
+                return False
+        return True
+
+
+class CallPacer:
+    """
+    Spreads a background job's REST calls (backfill, catch-up) out to
+    ``rate`` per second, so the live bot keeps the rest of Discord's
+    bot-wide limit. While any request has drawn a 429 in the last
+    ``backoff_seconds`` (``rest_rate_limited`` events from
+    ``RestAccounting``), no new call starts at all.
+    """
+
+    def __init__(self, *, rate: float, metrics: Metrics, backoff_seconds: float = 5.0) -> None:
+        self.metrics = metrics
+        self.backoff_seconds = backoff_seconds
+        self._bucket = TokenBuckets(rate=rate, burst=max(1.0, rate))
+
+    async def wait(self, calls: int = 1) -> None:
+        """Return once ``calls`` more REST calls may be made."""
+        while self.metrics.recent("rest_rate_limited", self.backoff_seconds):
+            await asyncio.sleep(self.backoff_seconds / 5)
+        for _ in range(calls):
+            while not self._bucket.try_acquire(0):
+                await asyncio.sleep(1 / self._bucket.rate)
@@ -0,0 +1,137 @@
+"""Anonymized reply-traffic traces for replaying real load shapes."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import time
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import IO, Any
+
+import discord
+
+TRACE_VERSION = 1
+
+
+@dataclass(frozen=True)
+class TraceRecord:
+    """
+    One received reply. Ids are keyed hashes: equal ids stay equal within a
+    recording segment (so parent reuse and bursts per channel survive) but
+    can't be mapped back to Discord objects.
+    """
+
+    at_ms: int  # since the start of its segment
+    guild: int
+    channel: int
+    author: int
+    message: int
+    parent: int
+    content_length: int
+    attachment_sizes: tuple[int, ...] = ()
+    embeds: int = 0
+    age_ms: int = 0  # reply creation -> receipt
+    segment: int = 0  # which process run recorded it
+
+
+class TrafficRecorder:
+    """
+    Appends one compact JSON line per reply to ``path``.
+
+    Each process run starts a new segment (a header line) with a fresh
+    random hashing key that is never written anywhere, so ids from
+    different segments are unrelated and no trace can be de-anonymized
+    by hashing known ids. Content is reduced to its length.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        logger: logging.Logger,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.path = path
+        self.logger = logger
+        self._clock = clock
+        self._key = os.urandom(16)
+        self._started = clock()
+        self._file: IO[str] | None = None
+        self.recorded = 0
+
+    def _open(self) -> IO[str]:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        f = self.path.open("a", encoding="utf-8", buffering=1)
+        header = {"v": TRACE_VERSION, "segment": datetime.now(UTC).isoformat(timespec="seconds")}
+        f.write(json.dumps(header, separators=(",", ":")) + "\n")
+        return f
+
+    def _anon(self, snowflake: int) -> int:
+        digest = hashlib.blake2b(snowflake.to_bytes(8, "big"), key=self._key, digest_size=6)
+        return int.from_bytes(digest.digest(), "big")
+
+    def record(self, message: discord.Message) -> None:
+        """Append ``message`` (a guild reply) to the trace; never raises."""
+        reference = message.reference
+        if reference is None or reference.message_id is None or message.guild is None:
+            return
+        now = self._clock()
+        row: dict[str, Any] = {
+            "t": round((now - self._started) * 1000),
+            "g": self._anon(message.guild.id),
+            "c": self._anon(message.channel.id),
+            "a": self._anon(message.author.id),
+            "m": self._anon(message.id),
+            "p": self._anon(reference.message_id),
+            "n": len(message.content),
+            "age": max(
+                0, round((discord.utils.utcnow() - message.created_at).total_seconds() * 1000)
+            ),
+        }
+        if message.attachments:
+            row["s"] = [a.size for a in message.attachments]
+        if message.embeds:
+            row["e"] = len(message.embeds)
+        try:
+            if self._file is None:
+                self._file = self._open()
+            self._file.write(json.dumps(row, separators=(",", ":")) + "\n")
+            self.recorded += 1
+        except OSError as e:
+            self.logger.warning("Could not append to traffic trace %s: %s", self.path, e)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_trace(path: Path) -> Iterator[TraceRecord]:
+    """Yield records in file order; segments are numbered from 0."""
+    segment = -1
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            row = json.loads(line)
+            if "segment" in row:
+                if row.get("v") != TRACE_VERSION:
+                    raise ValueError(f"Unsupported trace version {row.get('v')!r} in {path}")
+                segment += 1
+                continue
+            yield TraceRecord(
+                at_ms=row["t"],
+                guild=row["g"],
+                channel=row["c"],
+                author=row["a"],
+                message=row["m"],
+                parent=row["p"],
+                content_length=row["n"],
+                attachment_sizes=tuple(row.get("s", ())),
+                embeds=row.get("e", 0),
+                age_ms=row.get("age", 0),
+                segment=max(segment, 0),
+            )
@@ -0,0 +1,192 @@
+"""REST call accounting: per route, per outcome and per conversion."""
+
+from __future__ import annotations
+
+import re
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from types import SimpleNamespace
+
+import aiohttp
+from yarl import URL
+
+from .metrics import Metrics
+from .types import ConversionProgress
+
+_API_PATH = re.compile(r"^/api/v\d+(/.*)$")
+
+# Path segment -> placeholder for the snowflake that follows it, so calls
+# group by route the way Discord's rate-limit buckets do.
+_ID_NAMES = {
+    "applications": "application_id",
+    "channels": "channel_id",
+    "commands": "command_id",
+    "guilds": "guild_id",
+    "interactions": "interaction_id",
+    "members": "user_id",
+    "messages": "message_id",
+    "roles": "role_id",
+    "thread-members": "user_id",
+    "users": "user_id",
+    "webhooks": "webhook_id",
+}
+# Ids followed by a secret token segment (interaction/webhook callbacks).
+_TOKEN_AFTER = {"interaction_id", "webhook_id"}
+
+
+def route_template(method: str, url: URL) -> str:
+    """
+    ``"POST /channels/{channel_id}/messages"`` for a Discord API URL;
+    ``"GET cdn"`` for anything outside ``/api`` (attachment downloads).
+    """
+    match = _API_PATH.match(url.path)
+    if match is None:
+        return f"{method} cdn"
+    parts = match.group(1).strip("/").split("/")
+    out: list[str] = []
+    previous = ""
+    for part in parts:
+        if part.isdigit():
+            previous = _ID_NAMES.get(previous, "id")
+            part = f"{{{previous}}}"
+        elif previous in _TOKEN_AFTER and out and out[-1].startswith("{"):
+            part = previous = "{token}"
+        elif previous == "reactions":
+            part = previous = "{emoji}"
+        else:
+            previous = part
+        out.append(part)
+    return f"{method} /{'/'.join(out)}"
+
+
+def _outcome(status: int) -> str:
+    if status == 429:
+        return "429"
+    return f"{status // 100}xx"
+
+
+@dataclass
+class RestTally:
+    """REST usage of one conversion."""
+
+    calls: int = 0
+    # Set when process() returns; calls made afterwards by tasks it spawned
+    # (the deferred notification delete) are counted separately.
+    closed: bool = False
+
+
+_current_tally: ContextVar[RestTally | None] = ContextVar("threadit_rest_tally", default=None)
+
+
+class RestAccounting:
+    """
+    Counts every HTTP request discord.py makes, via an aiohttp
+    ``TraceConfig`` passed to the client as ``http_trace``.
+
+    Reported into ``metrics``:
+
+    - ``rest_calls_total{route,outcome}``: one per attempt, so discord.py's
+      own 429 retries count; outcome is ``2xx``/``4xx``/``429``/``5xx``/
+      ``error``. Attachment downloads appear as route ``GET cdn``.
+    - ``rest_upload_bytes_total{route}``: bytes sent in multipart bodies,
+      i.e. re-uploaded attachments.
+    - ``rest_calls_per_conversion{stage}``: API calls (not CDN downloads)
+      made inside ``ThreadingOrchestrator.process``, labelled with the
+      stage it ended at (``done`` for a completed conversion).
+    - ``rest_calls_after_conversion_total``: calls made by a conversion's
+      background tasks after it returned.
+    - ``rest_rate_limited`` events: one per 429, for recent-hit counts.
+
+    Attribution uses a context variable, so it follows the conversion
+    across awaits and into tasks it creates.
+    """
+
+    def __init__(self, *, metrics: Metrics) -> None:
+        self.metrics = metrics
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        trace = aiohttp.TraceConfig()
+        trace.on_request_start.append(self._on_request_start)
+        trace.on_request_headers_sent.append(self._on_headers_sent)
+        trace.on_request_chunk_sent.append(self._on_chunk_sent)
+        trace.on_request_end.append(self._on_request_end)
+        trace.on_request_exception.append(self._on_request_exception)
+        return trace
+
+    @contextmanager
+    def conversion(self, progress: ConversionProgress) -> Iterator[RestTally]:
+        """Attribute calls in this block to one conversion."""
+        tally = RestTally()
+        token = _current_tally.set(tally)
+        try:
+            yield tally
+        finally:
+            _current_tally.reset(token)
+            tally.closed = True
+            self.metrics.observe("rest_calls_per_conversion", tally.calls, stage=progress.stage)
+
+    async def _on_request_start(
+        self,
+        session: aiohttp.ClientSession,
+        ctx: SimpleNamespace,
+        params: aiohttp.TraceRequestStartParams,
+    ) -> None:
+        # The gateway websocket handshake goes through the same session.
+        ctx.skip = params.headers.get("Upgrade", "").lower() == "websocket"
+        ctx.multipart = False
+        ctx.sent = 0
+
+    async def _on_headers_sent(
+        self,
+        session: aiohttp.ClientSession,
+        ctx: SimpleNamespace,
+        params: aiohttp.TraceRequestHeadersSentParams,
+    ) -> None:
+        # Only the sent headers carry the Content-Type aiohttp derived
+        # from the body; a multipart body means attachments.
+        ctx.multipart = params.headers.get("Content-Type", "").startswith("multipart/")
+
+    async def _on_chunk_sent(
+        self,
+        session: aiohttp.ClientSession,
+        ctx: SimpleNamespace,
+        params: aiohttp.TraceRequestChunkSentParams,
+    ) -> None:
+        ctx.sent += len(params.chunk)
+
+    async def _on_request_end(
+        self,
+        session: aiohttp.ClientSession,
+        ctx: SimpleNamespace,
+        params: aiohttp.TraceRequestEndParams,
+    ) -> None:
+        if ctx.skip:
+            return
+        upload = ctx.sent if ctx.multipart else 0
+        self._record(params.method, params.url, _outcome(params.response.status), upload)
+
+    async def _on_request_exception(
+        self,
+        session: aiohttp.ClientSession,
+        ctx: SimpleNamespace,
+        params: aiohttp.TraceRequestExceptionParams,
+    ) -> None:
+        if not ctx.skip:
+            self._record(params.method, params.url, "error", 0)
+
+    def _record(self, method: str, url: URL, outcome: str, upload: int) -> None:
+        route = route_template(method, url)
+        self.metrics.incr("rest_calls_total", route=route, outcome=outcome)
+        if outcome == "429":
+            self.metrics.mark("rest_rate_limited")
+        if upload:
+            self.metrics.incr("rest_upload_bytes_total", upload, route=route)
+        tally = _current_tally.get()
+        if tally is None or route.endswith(" cdn"):
+            return
+        if tally.closed:
+            self.metrics.incr("rest_calls_after_conversion_total")
+        else:
+            tally.calls += 1
@@ -0,0 +1,170 @@
+"""Shared retry policy for transient Discord HTTP failures."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import TypeVar
+
+import aiohttp
+import discord
+
+from .metrics import Metrics
+
+T = TypeVar("T")
+
+
+def classify(exc: BaseException) -> str | None:
+    """
+    Return a short retry reason for transient failures, ``None`` otherwise.
+
+    discord.py already retries 500/502/504/524 and 429 internally; what
+    reaches us is a 503, a 5xx that outlived its retries, a 429 it gave up
+    on, or a connection-level error. 4xx outcomes (Forbidden, NotFound,
+    validation errors) will fail the same way again and are never retried.
+    """
+    if isinstance(exc, discord.Forbidden | discord.NotFound):
+        return None
+    if isinstance(exc, discord.HTTPException):
+        if exc.status >= 500:
+            return f"http_{exc.status}"
+        if exc.status == 429:
+            return "rate_limited"
+        return None
+    if isinstance(exc, aiohttp.ClientError | TimeoutError | ConnectionError):
+        return "network"
+    return None
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Attempts, backoff shape and the per-step deadline (seconds)."""
+
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+    step_deadline: float = 30.0
+
+    def backoff(self, attempt: int, rng: Callable[[], float] = random.random) -> float:
+        """Full-jitter backoff before retry number ``attempt`` (1-based)."""
+        return rng() * min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+
+
+class RetryBudget:
+    """
+    Process-wide cap on retries so they can't amplify an outage.
+
+    Every first attempt deposits ``percent``/100 of a token and every retry
+    withdraws a whole one, so in steady state retries stay under that share
+    of traffic. A small floor refills at ``min_per_second`` so a quiet bot
+    can still retry the odd failure. Tokens are capped at ``max_tokens``.
+    """
+
+    def __init__(
+        self,
+        *,
+        percent: float,
+        min_per_second: float,
+        max_tokens: float = 20.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._ratio = percent / 100
+        self._min_rate = min_per_second
+        self._max = max_tokens
+        self._clock = clock
+        self._tokens = max_tokens
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self._max, self._tokens + (now - self._updated) * self._min_rate)
+        self._updated = now
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+    def record_request(self) -> None:
+        self._refill()
+        self._tokens = min(self._max, self._tokens + self._ratio)
+
+    def try_withdraw(self) -> bool:
+        self._refill()
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+
+class Retrier:
+    """Runs one REST step under a ``RetryPolicy`` and a shared ``RetryBudget``."""
+
+    def __init__(
+        self,
+        *,
+        policy: RetryPolicy,
+        budget: RetryBudget,
+        metrics: Metrics,
+        logger: logging.Logger,
+        rng: Callable[[], float] = random.random,
+    ) -> None:
+        self.policy = policy
+        self.budget = budget
+        self.metrics = metrics
+        self.logger = logger
+        self._rng = rng
+
+    async def call(
+        self, step: str, fn: Callable[[], Awaitable[T]], *, idempotent: bool = True
+    ) -> T:
+        """
+        Await ``fn()``, retrying classified transient errors with jittered
+        backoff. The last error is re-raised when attempts, the step deadline
+        or the budget run out; exceeding the deadline raises ``TimeoutError``.
+
+        A message POST without a nonce is not idempotent: after a 5xx or a
+        dropped connection Discord may already have posted it, and a retry
+        would post it twice. With ``idempotent=False`` only 429s, which
+        Discord rejected before doing anything, are retried.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.policy.step_deadline
+        self.budget.record_request()
+        attempt = 1
+        async with asyncio.timeout_at(deadline):
+            while True:
+                try:
+                    return await fn()
+                except Exception as exc:
+                    reason = classify(exc)
+                    if not idempotent and reason != "rate_limited":
+                        raise
+                    if reason is None or attempt >= self.policy.max_attempts:
+                        raise
+                    delay = self.policy.backoff(attempt, self._rng)
+                    if loop.time() + delay >= deadline:
+                        raise
+                    if not self.budget.try_withdraw():
+                        self.metrics.incr("retry_budget_exhausted_total", step=step)
+                        self.logger.warning(
+                            "Retry budget exhausted; not retrying %s after %s", step, exc
+                        )
+                        raise
+                    self.metrics.incr("retries_total", step=step, reason=reason)
+                    self.logger.info(
+                        "Retrying %s in %.2fs (attempt %d/%d, %s): %s",
+                        step,
+                        delay,
+                        attempt + 1,
+                        self.policy.max_attempts,
+                        reason,
+                        exc,
+                        extra={"event": "retry", "step": step, "reason": reason},
+                    )
+                    await asyncio.sleep(delay)
+                    attempt += 1
@@ -0,0 +1,66 @@
+"""Optional high-performance runtime: uvloop event loop and orjson gateway JSON."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import Callable
+from dataclasses import dataclass
+
+import discord
+
+
+@dataclass(frozen=True)
+class RuntimeProfile:
+    """What the process actually runs on, after falling back for missing extras."""
+
+    loop: str = "asyncio"
+    json: str = "json"
+    loop_factory: Callable[[], asyncio.AbstractEventLoop] | None = None
+    # Speedups that were requested but are not installed.
+    missing: tuple[str, ...] = ()
+
+    def log(self, logger: logging.Logger) -> None:
+        logger.info(
+            "Runtime: event loop=%s, gateway JSON=%s",
+            self.loop,
+            self.json,
+            extra={"event": "runtime.selected"},
+        )
+        if self.missing:
+            logger.warning(
+                "FAST_RUNTIME is on but %s %s not installed; using the standard "
+                "fallback. Install with: pip install 'thread-it[speed]'",
+                ", ".join(self.missing),
+                "is" if len(self.missing) == 1 else "are",
+            )
+
+
+def select_runtime(fast: bool) -> RuntimeProfile:
+    """
+    Pick the event loop for ``asyncio.Runner`` and report the JSON backend.
+
+    discord.py switches its gateway/REST JSON to orjson by itself whenever
+    orjson is importable, so there is nothing to toggle there; this only
+    checks it. Runs before logging is configured, so findings are returned
+    rather than logged (see ``RuntimeProfile.log``).
+    """
+    json_backend = "orjson" if discord.utils.HAS_ORJSON else "json"
+    if not fast:
+        return RuntimeProfile(json=json_backend)
+
+    missing: list[str] = []
+    loop_name = "asyncio"
+    loop_factory: Callable[[], asyncio.AbstractEventLoop] | None = None
+    try:
+        import uvloop
+    except ImportError:
+        missing.append("uvloop")
+    else:
+        loop_name = "uvloop"
+        loop_factory = uvloop.new_event_loop
+    if json_backend != "orjson":
+        missing.append("orjson")
+    return RuntimeProfile(
+        loop=loop_name, json=json_backend, loop_factory=loop_factory, missing=tuple(missing)
+    )
@@ -0,0 +1,152 @@
+"""Shadow mode: convert on paper in chosen guilds, to size them up first."""
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+
+from .metrics import Metrics
+
+# The calls a conversion makes, as RestAccounting names their routes.
+FETCH_MESSAGE = "GET /channels/{channel_id}/messages/{message_id}"
+CREATE_THREAD = "POST /channels/{channel_id}/messages/{message_id}/threads"
+SEND_MESSAGE = "POST /channels/{channel_id}/messages"
+ADD_THREAD_MEMBER = "PUT /channels/{channel_id}/thread-members/{user_id}"
+DELETE_MESSAGE = "DELETE /channels/{channel_id}/messages/{message_id}"
+CDN_DOWNLOAD = "GET cdn"
+
+# How long a real conversion holds its parent lock (re-fetch, create,
+# repost) in a typical run; shadow conversions hold it only for the
+# re-fetch, so contention is projected from reply spacing instead.
+PROJECTED_LOCK_HOLD_SECONDS = 2.0
+
+
+def parse_guild_ids(raw: str) -> frozenset[int]:
+    """``"1,2, 3"`` -> ``{1, 2, 3}``; empty means none."""
+    ids = [part.strip() for part in raw.split(",") if part.strip()]
+    if not all(part.isdigit() for part in ids):
+        raise ValueError(f"guild ids must be comma-separated numbers, got {raw!r}")
+    return frozenset(int(part) for part in ids)
+
+
+@dataclass(frozen=True)
+class ShadowReport:
+    """What converting one shadowed guild's replies would cost."""
+
+    guild_id: int
+    conversions: int  # since start
+    conversions_per_minute: float  # over the last 10 minutes
+    calls_per_conversion: float  # API calls, CDN downloads excluded
+    calls_per_minute: float
+    attachment_bytes_per_minute: float
+    lock_contention: float  # share of conversions that would queue on a parent
+    skipped: int  # replies a live run would not convert (missing permissions)
+    top_routes: list[tuple[str, int]]
+
+
+class ShadowMode:
+    """
+    Guilds in ``guild_ids`` go through ``ThreadingOrchestrator``'s whole
+    decision path (validation, permissions, parent fetch and lock, thread
+    naming) but every write (create thread, repost, add member, deletes,
+    notification) is recorded here instead of made. Reads stay real.
+
+    Reported into ``metrics``, labelled by guild: ``shadow_conversions``
+    events and ``shadow_conversions_total``, ``shadow_calls_total{route}``,
+    ``shadow_calls_per_conversion``, ``shadow_attachment_bytes_total``,
+    ``shadow_lock_contended_total`` and ``shadow_skipped_total{reason}``.
+    ``report`` turns those into per-minute projections.
+
+    No thread is ever created, so parents converted in shadow are
+    remembered (up to ``max_parents``) and later replies to them costed as
+    going to an existing thread, as they would live.
+    """
+
+    def __init__(
+        self,
+        guild_ids: Iterable[int],
+        *,
+        metrics: Metrics,
+        lock_hold_seconds: float = PROJECTED_LOCK_HOLD_SECONDS,
+        max_parents: int = 10_000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.guild_ids = frozenset(guild_ids)
+        self.metrics = metrics
+        self.lock_hold_seconds = lock_hold_seconds
+        self.max_parents = max_parents
+        self._clock = clock
+        # parent id -> when its last shadow conversion finished.
+        self._parents: OrderedDict[int, float] = OrderedDict()
+
+    def covers(self, guild_id: int | None) -> bool:
+        return guild_id in self.guild_ids
+
+    def has_thread(self, parent_id: int) -> bool:
+        """Whether a shadow conversion already "created" this parent's thread."""
+        return parent_id in self._parents
+
+    def record(
+        self, guild_id: int, *, parent_id: int, routes: list[str], attachment_bytes: int
+    ) -> None:
+        """One conversion that would have made ``routes`` calls."""
+        now = self._clock()
+        last = self._parents.pop(parent_id, None)
+        self._parents[parent_id] = now
+        if len(self._parents) > self.max_parents:
+            self._parents.popitem(last=False)
+
+        metrics = self.metrics
+        metrics.incr("shadow_conversions_total", guild=guild_id)
+        metrics.mark("shadow_conversions", guild=guild_id)
+        api_calls = 0
+        for route in routes:
+            metrics.incr("shadow_calls_total", guild=guild_id, route=route)
+            api_calls += route != CDN_DOWNLOAD
+        metrics.observe("shadow_calls_per_conversion", api_calls, guild=guild_id)
+        if attachment_bytes:
+            metrics.incr("shadow_attachment_bytes_total", attachment_bytes, guild=guild_id)
+        if last is not None and now - last < self.lock_hold_seconds:
+            metrics.incr("shadow_lock_contended_total", guild=guild_id)
+
+    def skip(self, guild_id: int, reason: str, *, routes: Iterable[str] = ()) -> None:
+        """A reply a live run would have given up on, after making ``routes`` calls."""
+        self.metrics.incr("shadow_skipped_total", guild=guild_id, reason=reason)
+        for route in routes:
+            self.metrics.incr("shadow_calls_total", guild=guild_id, route=route)
+
+    def report(self, guild_id: int) -> ShadowReport:
+        metrics = self.metrics
+        conversions = int(metrics.counter("shadow_conversions_total", guild=guild_id))
+        per_minute = metrics.recent("shadow_conversions", 600, guild=guild_id) / 10
+        calls = metrics.summary("shadow_calls_per_conversion", guild=guild_id)
+        calls_each = calls.total / calls.count if calls is not None and calls.count else 0.0
+        attachment_each = (
+            metrics.counter("shadow_attachment_bytes_total", guild=guild_id) / conversions
+            if conversions
+            else 0.0
+        )
+        contended = metrics.counter("shadow_lock_contended_total", guild=guild_id)
+        skipped = metrics.counter("shadow_skipped_total", guild=guild_id, reason="permissions")
+        prefix = f"shadow_calls_total{{guild={guild_id},route="
+        routes = sorted(
+            (
+                (key[len(prefix) : -1], int(value))
+                for key, value in metrics.snapshot().items()
+                if key.startswith(prefix)
+            ),
+            key=lambda item: -item[1],
+        )
+        return ShadowReport(
+            guild_id=guild_id,
+            conversions=conversions,
+            conversions_per_minute=per_minute,
+            calls_per_conversion=calls_each,
+            calls_per_minute=per_minute * calls_each,
+            attachment_bytes_per_minute=per_minute * attachment_each,
+            lock_contention=contended / conversions if conversions else 0.0,
+            skipped=int(skipped),
+            top_routes=routes[:5],
+        )
@@ -0,0 +1,194 @@
+"""Optional downscaling of oversize images, in worker processes, so they can be reposted."""
+
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import io
+import logging
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import PurePath
+
+import discord
+
+from .metrics import Metrics
+
+# Pillow is the `images` extra; without it the transcoder is never built.
+HAS_PILLOW = importlib.util.find_spec("PIL") is not None
+
+# Formats worth re-encoding. Animated images are passed over (re-encoding
+# would keep only the first frame).
+IMAGE_EXTENSIONS = frozenset({".jpg", ".jpeg", ".png", ".webp", ".bmp", ".tif", ".tiff"})
+# Longest side after downscaling; Discord's viewer shows no more than this.
+MAX_DIMENSION = 4096
+QUALITY_STEPS = (85, 75, 65)
+MAX_ATTEMPTS = 8
+
+
+def is_image(attachment: discord.Attachment) -> bool:
+    content_type = attachment.content_type or ""
+    return content_type.startswith("image/") or (
+        PurePath(attachment.filename).suffix.lower() in IMAGE_EXTENSIONS
+    )
+
+
+def shrink_image(data: bytes, max_bytes: int, filename: str) -> tuple[bytes, str] | None:
+    """
+    Re-encode ``data`` to at most ``max_bytes``: JPEG for opaque images,
+    WebP where there is transparency, stepping quality down and then the
+    size. Returns ``(data, new filename)``, or ``None`` when the image
+    can't be read, is animated, or doesn't fit within ``MAX_ATTEMPTS``.
+
+    CPU-bound and blocking: runs in an ``ImageTranscoder`` worker process.
+    """
+    from PIL import Image, ImageOps
+
+    try:
+        with Image.open(io.BytesIO(data)) as source:
+            if getattr(source, "n_frames", 1) > 1:
+                return None
+            source.draft("RGB", (MAX_DIMENSION, MAX_DIMENSION))  # JPEG: decode at reduced size
+            image = ImageOps.exif_transpose(source)
+            image.thumbnail((MAX_DIMENSION, MAX_DIMENSION))
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+
+    alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+    image = image.convert("RGBA" if alpha else "RGB")
+    fmt, suffix = ("WEBP", ".webp") if alpha else ("JPEG", ".jpg")
+    stem = PurePath(filename).stem or "image"
+
+    attempts = 0
+    while attempts < MAX_ATTEMPTS:
+        for quality in QUALITY_STEPS:
+            attempts += 1
+            out = io.BytesIO()
+            image.save(out, fmt, quality=quality, optimize=fmt == "JPEG")
+            if out.tell() <= max_bytes:
+                return out.getvalue(), stem + suffix
+        # Bytes scale roughly with pixel count: shrink both sides by the
+        # square root of the overshoot, plus a margin.
+        scale = min(0.9, (max_bytes / out.tell()) ** 0.5 * 0.95)
+        width, height = image.size
+        if width * scale < 16 or height * scale < 16:
+            return None
+        image = image.resize((int(width * scale), int(height * scale)), Image.Resampling.LANCZOS)
+    return None
+
+
+class ImageTranscoder:
+    """
+    Downscales images over the attachment cap so a repost can carry them
+    instead of dropping them (and so leaving the reply unconverted).
+
+    The work runs in a pool of ``workers`` processes, so decoding and
+    encoding never hold the event loop or the GIL. At most ``max_queued``
+    images are in flight, downloading, running or waiting. More than that
+    are refused before they are downloaded, rather than queued without
+    limit, and their replies are handled as before. Images over
+    ``max_source_bytes`` aren't downloaded at all.
+
+    Reported into ``metrics``: ``image_downscale_total{outcome}``,
+    ``image_downscale_seconds``, ``image_downscale_bytes_saved_total`` and
+    the ``image_downscale_queued`` gauge.
+    """
+
+    def __init__(
+        self,
+        *,
+        workers: int,
+        max_queued: int,
+        max_source_bytes: int,
+        metrics: Metrics,
+        logger: logging.Logger,
+        executor: Executor | None = None,
+    ) -> None:
+        self.max_queued = max_queued
+        self.max_source_bytes = max_source_bytes
+        self.metrics = metrics
+        self.logger = logger
+        self.workers = workers
+        self._executor = executor or self._new_pool()
+        self._queued = 0
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        # Spawned, not forked: the parent is a threaded asyncio process.
+        # Workers start on first use.
+        return ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def accepts(self, attachment: discord.Attachment) -> bool:
+        """Whether an attachment is an image small enough to download and shrink."""
+        return is_image(attachment) and attachment.size <= self.max_source_bytes
+
+    async def shrink(
+        self, data: bytes, *, max_bytes: int, filename: str
+    ) -> tuple[bytes, str] | None:
+        """``shrink_image`` in the pool; ``None`` if it fails or the pool is full."""
+        if not self._reserve():
+            return None
+        try:
+            return await self._run(data, max_bytes, filename)
+        finally:
+            self._release()
+
+    async def shrink_attachment(
+        self, attachment: discord.Attachment, *, max_bytes: int
+    ) -> tuple[bytes, str] | None:
+        """
+        Download ``attachment`` and ``shrink`` it, taking the pool slot
+        first: a full pool refuses the image without downloading it.
+        Download errors propagate.
+        """
+        if not self._reserve():
+            return None
+        try:
+            data = await attachment.read()
+            return await self._run(data, max_bytes, attachment.filename)
+        finally:
+            self._release()
+
+    def _reserve(self) -> bool:
+        if self._queued >= self.max_queued:
+            self.metrics.incr("image_downscale_total", outcome="queue_full")
+            return False
+        self._queued += 1
+        self.metrics.set_gauge("image_downscale_queued", self._queued)
+        return True
+
+    def _release(self) -> None:
+        self._queued -= 1
+        self.metrics.set_gauge("image_downscale_queued", self._queued)
+
+    async def _run(self, data: bytes, max_bytes: int, filename: str) -> tuple[bytes, str] | None:
+        started = time.perf_counter()
+        executor = self._executor
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(
+                executor, shrink_image, data, max_bytes, filename
+            )
+        except BrokenProcessPool as e:
+            # A worker died (e.g. out of memory on a huge image); every
+            # job in the pool failed with it. The first to notice starts
+            # a fresh pool.
+            self.logger.warning("Image worker died downscaling %s: %s", filename, e)
+            if self._executor is executor and isinstance(executor, ProcessPoolExecutor):
+                self._executor = self._new_pool()
+            result = None
+        except Exception as e:
+            self.logger.warning("Could not downscale %s: %s", filename, e)
+            result = None
+        self.metrics.observe("image_downscale_seconds", time.perf_counter() - started)
+        if result is None:
+            self.metrics.incr("image_downscale_total", outcome="failed")
+            return None
+        self.metrics.incr("image_downscale_total", outcome="shrunk")
+        self.metrics.incr("image_downscale_bytes_saved_total", len(data) - len(result[0]))
+        return result
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -22,10 +22,7 @@ _INVITE_SCOPES = "bot+applications.commands"
 
 
 def invite_url(client_id: str | int) -> str:
-    return (
-        "https://discord.com/oauth2/authorize"
-        f"?client_id={client_id}&scope={_INVITE_SCOPES}"
-    )
+    return f"https://discord.com/oauth2/authorize?client_id={client_id}&scope={_INVITE_SCOPES}"
 
 
 @dataclass(frozen=True)
@@ -40,3 +37,20 @@ class ReplyInfo:
     parent_message: discord.Message
     message_id: int
     created_at: datetime
+
+
+@dataclass
+class ConversionProgress:
+    """How far one conversion got; read when it is cut short."""
+
+    stage: str = "validate"
+    # Event-loop time the current stage began; feeds conversion_stage_seconds.
+    stage_started: float = 0.0
+    # True once the thread holds a complete copy of the reply, i.e. from
+    # this point the original may be deleted.
+    reposted: bool = False
+    # True once the original is deleted, or left because the bot may not
+    # delete it.
+    cleaned_up: bool = False
+    # True once the conversion has an entry in the journal to close.
+    journaled: bool = False
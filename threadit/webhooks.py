@@ -0,0 +1,145 @@
+"""Per-channel webhooks, for reposting replies under their author's name."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+
+import discord
+
+from .metrics import Metrics
+from .permissions import PermissionsService
+
+WEBHOOK_NAME = "Thread It"
+# Webhook message content is capped at 2000 characters even when the
+# reply (Nitro) was longer; those replies keep the embed repost.
+MAX_WEBHOOK_CONTENT = 2000
+
+WebhookChannel = discord.TextChannel | discord.VoiceChannel | discord.StageChannel
+
+
+class WebhookCache:
+    """
+    One webhook per parent channel, used to post a reply's repost into the
+    channel's threads as the reply's author. Webhook executions carry no
+    bot token, so they stay out of the bot's global rate limit and get
+    their own per-webhook bucket, instead of queueing with every other
+    call the bot makes.
+
+    A channel's webhook is looked up on first use: one the bot made
+    earlier is reused, otherwise one is created (needs Manage Webhooks;
+    without it ``get`` returns ``None`` and the caller reposts as the bot).
+    Concurrent lookups for one channel share a single request. Up to
+    ``max_size`` channels are kept, least recently used evicted first.
+
+    ``invalidate`` drops a channel's webhook: called on the gateway's
+    webhooks-update events and when an execution finds the webhook gone.
+    A channel whose lookup failed (e.g. Discord's per-channel webhook cap)
+    isn't retried for ``failure_ttl_seconds``.
+    """
+
+    def __init__(
+        self,
+        *,
+        permissions: PermissionsService,
+        metrics: Metrics,
+        logger: logging.Logger,
+        max_size: int = 1000,
+        failure_ttl_seconds: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.permissions = permissions
+        self.metrics = metrics
+        self.logger = logger
+        self.max_size = max_size
+        self.failure_ttl_seconds = failure_ttl_seconds
+        self._clock = clock
+        self._webhooks: OrderedDict[int, discord.Webhook] = OrderedDict()
+        self._loading: dict[int, asyncio.Task[discord.Webhook | None]] = {}
+        # channel id -> when its lookup failed, oldest first; also capped at max_size.
+        self._failed: OrderedDict[int, float] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._webhooks)
+
+    async def get(self, channel: WebhookChannel) -> discord.Webhook | None:
+        """The channel's webhook, looked up or created if needed; ``None``: post as the bot."""
+        webhook = self._webhooks.get(channel.id)
+        if webhook is not None:
+            self._webhooks.move_to_end(channel.id)
+            self.metrics.incr("webhook_cache_total", outcome="hit")
+            return webhook
+        failed_at = self._failed.get(channel.id)
+        if failed_at is not None:
+            if self._clock() - failed_at < self.failure_ttl_seconds:
+                return None
+            del self._failed[channel.id]
+        if not self.permissions.check_specific_permission(channel, "manage_webhooks"):
+            self.metrics.incr("webhook_cache_total", outcome="no_permission")
+            return None
+        task = self._loading.get(channel.id)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(self._load(channel))
+            self._loading[channel.id] = task
+        # Shielded: one waiter being cancelled mustn't cancel the others' lookup.
+        return await asyncio.shield(task)
+
+    def invalidate(self, channel_id: int) -> None:
+        """Forget the channel's webhook (and any failed lookup); the next ``get`` looks again."""
+        self._failed.pop(channel_id, None)
+        if self._webhooks.pop(channel_id, None) is not None:
+            self.metrics.incr("webhook_cache_total", outcome="invalidated")
+            self.metrics.set_gauge("webhook_cache_size", len(self._webhooks))
+
+    async def _load(self, channel: WebhookChannel) -> discord.Webhook | None:
+        try:
+            me = channel.guild.me
+            webhook = next(
+                (
+                    w
+                    for w in await channel.webhooks()
+                    if w.type is discord.WebhookType.incoming
+                    and w.token
+                    and w.user is not None
+                    and w.user.id == me.id
+                ),
+                None,
+            )
+            outcome = "reused"
+            if webhook is None:
+                webhook = await channel.create_webhook(
+                    name=WEBHOOK_NAME, reason="Reposting replies in this channel's threads"
+                )
+                outcome = "created"
+        except discord.HTTPException as e:
+            self._failed.pop(channel.id, None)
+            self._failed[channel.id] = self._clock()
+            if len(self._failed) > self.max_size:
+                self._failed.popitem(last=False)
+            self.metrics.incr("webhook_cache_total", outcome="failed")
+            self.logger.warning(
+                "No webhook for #%s (%s); reposting there as the bot",
+                channel.name,
+                e,
+                extra={"event": "webhook.unavailable", "channel_id": channel.id},
+            )
+            return None
+        finally:
+            self._loading.pop(channel.id, None)
+
+        self.metrics.incr("webhook_cache_total", outcome=outcome)
+        self.logger.debug(
+            "Webhook %s %s for #%s",
+            webhook.id,
+            outcome,
+            channel.name,
+            extra={"event": "webhook.loaded", "channel_id": channel.id},
+        )
+        self._webhooks[channel.id] = webhook
+        if len(self._webhooks) > self.max_size:
+            self._webhooks.popitem(last=False)
+        self.metrics.set_gauge("webhook_cache_size", len(self._webhooks))
+        return webhook